@@ -1,4 +1,25 @@
-from .corredera_2025_audio_interface import Corredera2025AudioInterface
-from .corredera_2025_stimulus_interface import Corredera2025StimulusInterface
-from .corredera_2025_white_matter_recording_interface import Corredera2025WhiteMatterRecordingInterface
-from .corredera_2025_nwbconverter import Corredera2025NWBConverter
+"""Conversion of the Corredera 2025 dataset.
+
+The public classes are imported lazily, on first attribute access, so that importing the package does not import
+neuroconv, spikeinterface, pynwb and the other heavy dependencies until they are needed.
+"""
+from typing import TYPE_CHECKING
+
+from schneider_lab_to_nwb.tools.lazy_exports import get_lazy_attribute_functions
+
+if TYPE_CHECKING:
+    from .corredera_2025_audio_interface import Corredera2025AudioInterface
+    from .corredera_2025_stimulus_interface import Corredera2025StimulusInterface
+    from .corredera_2025_white_matter_recording_interface import Corredera2025WhiteMatterRecordingInterface
+    from .corredera_2025_nwbconverter import Corredera2025NWBConverter
+
+_attribute_name_to_module_name = dict(
+    Corredera2025AudioInterface=".corredera_2025_audio_interface",
+    Corredera2025StimulusInterface=".corredera_2025_stimulus_interface",
+    Corredera2025WhiteMatterRecordingInterface=".corredera_2025_white_matter_recording_interface",
+    Corredera2025NWBConverter=".corredera_2025_nwbconverter",
+)
+
+__all__ = list(_attribute_name_to_module_name)
+
+__getattr__, __dir__ = get_lazy_attribute_functions(globals(), _attribute_name_to_module_name)
@@ -12,8 +12,8 @@ from copy import deepcopy
 from neuroconv.basedatainterface import BaseDataInterface
 from neuroconv.utils import get_base_schema, get_schema_from_hdmf_class
 from neuroconv.tools import nwb_helpers
-from neuroconv.tools.hdmf import SliceableDataChunkIterator
-import tempfile
+
+from schneider_lab_to_nwb.tools import MemmapDataChunkIterator, create_temporary_memmap, get_io_slot
 
 
 class Corredera2025AudioInterface(BaseDataInterface):
@@ -34,7 +34,9 @@ class Corredera2025AudioInterface(BaseDataInterface):
         super().__init__(file_path=file_path)
         self.verbose = verbose
         self.timestamps = None
+        self.timestamps_first_sample = 0
         self.start_sample = None
+        self.stop_sample = None
 
     def get_metadata_schema(self) -> dict:
         metadata_schema = super().get_metadata_schema()
@@ -54,7 +56,7 @@ class Corredera2025AudioInterface(BaseDataInterface):
         }
         return metadata_schema
 
-    def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict, stub_test: bool = False):
+    def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict, stub_test: bool = False, buffer_gb: float = None):
         # Define constants
         NUM_CHANNELS = 4
         SAMPLING_RATE = 192_000.0
@@ -63,15 +65,22 @@ class Corredera2025AudioInterface(BaseDataInterface):
         file_path = self.source_data["file_path"]
         file_size = os.path.getsize(file_path)
         dtype = np.dtype("float32")
-        num_samples = int(file_size // (dtype.itemsize * NUM_CHANNELS))
-        memmaped_data = np.memmap(file_path, dtype=dtype, mode="r", shape=(num_samples, NUM_CHANNELS))
-        if self.start_sample is not None:
-            memmaped_data = memmaped_data[self.start_sample :]
-            num_samples -= self.start_sample
+        num_file_samples = int(file_size // (dtype.itemsize * NUM_CHANNELS))
+        start_sample = self.start_sample if self.start_sample is not None else 0
+        stop_sample = min(self.stop_sample, num_file_samples) if self.stop_sample is not None else num_file_samples
+        num_samples = stop_sample - start_sample
         if stub_test:
             num_samples = min(num_samples, int(SAMPLING_RATE))
-            memmaped_data = memmaped_data[:num_samples]
-        data = SliceableDataChunkIterator(data=memmaped_data, display_progress=self.verbose)
+        data = MemmapDataChunkIterator(
+            file_path=file_path,
+            dtype=dtype,
+            shape=(num_file_samples, NUM_CHANNELS),
+            start_row=start_sample,
+            stop_row=start_sample + num_samples,
+            buffer_gb=buffer_gb,
+            display_progress=self.verbose,
+            io_slot=get_io_slot(path=file_path),
+        )
 
         # Add Data to NWBFile
         metadata_copy = deepcopy(metadata)  # Avoid modifying the original metadata
@@ -81,9 +90,20 @@ class Corredera2025AudioInterface(BaseDataInterface):
         if self.timestamps is None:
             audio_kwargs["rate"] = SAMPLING_RATE
         else:
-            timestamps = self.timestamps[self.start_sample :] if self.start_sample is not None else self.timestamps
-            timestamps = timestamps[:num_samples] if stub_test else timestamps
-            timestamps = SliceableDataChunkIterator(data=timestamps, display_progress=self.verbose)
+            # The rows of the timestamps are the samples from self.timestamps_first_sample on
+            first_sample = self.timestamps_first_sample
+            stop_timestamp = first_sample + len(self.timestamps)
+            if num_samples < num_file_samples - start_sample:  # truncated by stub_test or the stop sample
+                stop_timestamp = min(start_sample + num_samples, stop_timestamp)
+            timestamps = MemmapDataChunkIterator(
+                file_path=self.timestamps.filename,
+                dtype=self.timestamps.dtype,
+                shape=self.timestamps.shape,
+                start_row=start_sample - first_sample,
+                stop_row=stop_timestamp - first_sample,
+                buffer_gb=buffer_gb,
+                display_progress=self.verbose,
+            )
             audio_kwargs["timestamps"] = timestamps
         audio_series = TimeSeries(**audio_kwargs)
         nwbfile.add_acquisition(audio_series)
@@ -93,14 +113,25 @@ class Corredera2025AudioInterface(BaseDataInterface):
             device = Device(**device_kwargs)
             nwbfile.add_device(device)
 
-    def set_aligned_timestamps(self, timestamps: np.ndarray):
-        timestamps_path = tempfile.mktemp(suffix=".dat")
-        timestamps_file = np.memmap(timestamps_path, dtype=np.float64, mode="w+", shape=timestamps.shape)
-        timestamps_file[:] = timestamps
-        timestamps_file.flush()
+    def set_aligned_timestamps(self, timestamps: np.ndarray, first_sample: int = 0):
+        """Set the aligned timestamps of the audio samples.
 
-        # Create read-only memmap for actual use
-        self.timestamps = np.memmap(timestamps_path, dtype=np.float64, mode="r", shape=timestamps.shape)
+        Parameters
+        ----------
+        timestamps : np.ndarray
+            The timestamps of consecutive samples, in seconds.
+        first_sample : int, optional
+            The index of the sample of the first timestamp, by default 0 (the timestamps start with the file). It must
+            not be after the start sample.
+        """
+        self.timestamps_first_sample = int(first_sample)
+        if isinstance(timestamps, np.memmap):  # already on disk, ex. from Corredera2025NWBConverter
+            self.timestamps = timestamps
+            return
+        timestamps = np.asarray(timestamps)
+        self.timestamps = create_temporary_memmap(shape=timestamps.shape, dtype=np.float64)
+        self.timestamps[:] = timestamps
+        self.timestamps.flush()
 
     def set_start_sample(self, start_sample: int):
         """Set the starting sample for the audio data and timestamps.
@@ -111,3 +142,13 @@ class Corredera2025AudioInterface(BaseDataInterface):
             The starting sample index.
         """
         self.start_sample = start_sample
+
+    def set_stop_sample(self, stop_sample: int):
+        """Set the sample after the last one of the audio data and timestamps, ex. at the end of a preview window.
+
+        Parameters
+        ----------
+        stop_sample : int
+            The index of the sample after the last one.
+        """
+        self.stop_sample = stop_sample
@@ -8,6 +8,7 @@ from pydantic import FilePath, DirectoryPath
 
 from neuroconv.utils import load_dict_from_file, dict_deep_update
 from schneider_lab_to_nwb.corredera_2025 import Corredera2025NWBConverter
+from schneider_lab_to_nwb.tools import get_buffer_gb, transcode_video
 
 
 def session_to_nwb(
@@ -21,8 +22,19 @@ def session_to_nwb(
     stimulus_file_path: FilePath,
     session_type: Literal["natural_exploration", "vr_exploration", "playback", "loom_threat"],
     stub_test: bool = False,
+    preview_window: Optional[tuple[float, float]] = None,
+    checkpoint: bool = False,
+    memory_budget_gb: Optional[float] = None,
+    backend: Literal["hdf5", "zarr"] = "hdf5",
+    number_of_jobs: int = 1,
+    motion_energy: bool = False,
+    motion_energy_roi: Optional[tuple[int, int, int, int]] = None,
+    transcoded_video_dir_path: Optional[DirectoryPath] = None,
+    split_ecephys: bool = False,
+    narrow_dtypes: bool = False,
+    metadata_only: bool = False,
     verbose: bool = True,
-):
+) -> Optional[dict]:
     """Convert a session of data to NWB format.
 
     Parameters
@@ -47,8 +59,57 @@ def session_to_nwb(
         The type of session being converted.
     stub_test : bool, optional
         If True, runs a stub test with minimal data for testing purposes. Defaults to False.
+    preview_window : Optional[tuple[float, float]], optional
+        The (start, stop) in seconds after the first audio buffer of a window of the session to which every interface
+        is restricted, for a quick preview of the NWB file in a 'nwb_preview' subdirectory of output_dir_path. The
+        recordings, the spikes, the audio (whose timestamps are only interpolated within the window), the motion energy
+        and the stimulus presentations are restricted to the window, the visual stimuli to those that overlap it. The
+        video is still linked in full and the SLEAP poses are added in full, with all their timestamps. Defaults to None
+        (the whole session).
+    checkpoint : bool, optional
+        If True, writes each interface in its own checkpointed step so that a failed conversion resumes on rerun.
+        Defaults to False.
+    memory_budget_gb : Optional[float], optional
+        The maximum memory in GB that the conversion should use, which sizes the buffers of the recordings and the
+        audio. Defaults to None (default buffer sizes).
+    backend : Literal["hdf5", "zarr"], optional
+        The backend of the NWB file. Zarr files are written to a '.nwb.zarr' directory store. Defaults to "hdf5".
+    number_of_jobs : int, optional
+        The number of processes that write the chunks of the recordings and the audio in parallel with the Zarr
+        backend, and that decode the video to compute its motion energy or to transcode it. Defaults to 1.
+    motion_energy : bool, optional
+        If True, decodes the video to add the motion energy of every frame, on the aligned camera timestamps.
+        Defaults to False.
+    motion_energy_roi : Optional[tuple[int, int, int, int]], optional
+        The (x, y, width, height) in pixels of a region of interest of the video, whose motion energy is also added
+        when motion_energy is True. Defaults to None.
+    transcoded_video_dir_path : Optional[DirectoryPath], optional
+        If provided, the video is re-encoded to H.264 in this directory (with number_of_jobs segments encoded in
+        parallel, and its frame count verified), and the NWB file links to the transcoded video instead of the raw
+        .avi, with the same aligned timestamps. An up-to-date transcoded video is reused. Requires ffmpeg.
+        Defaults to None.
+    split_ecephys : bool, optional
+        If True, writes the raw and processed recordings, with their electrodes, and the audio to a companion
+        'sub-<subject_id>_ses-<session_id>_desc-ecephys.nwb' file, so that the NWB file only holds the behavior,
+        stimulus tables, units and metadata and links to the large streams by HDF5 external links. The NWB file is
+        written first. Only supported with the HDF5 backend. Defaults to False.
+    narrow_dtypes : bool, optional
+        Whether to store the audio stimulus templates and the visual stimulus properties in the narrowest dtype in which
+        they round-trip exactly (ex. integer-valued floats as small integers, float64 values that are exact in float32
+        as float32), by default False. Times are never narrowed. The narrowed dtypes depend on the values of each
+        session, so the same dataset or column may get different dtypes in different sessions.
+    metadata_only : bool, optional
+        If True, only resolves the metadata and the path of the NWB file, from cheap sources (file names, the
+        editable metadata and the settings of the stimulus file), without opening any other data or writing anything.
+        Defaults to False.
     verbose : bool, optional
         If True, enables verbose output during conversion. Defaults to True.
+
+    Returns
+    -------
+    Optional[dict]
+        If metadata_only is True, a dictionary with the 'nwbfile_path', the 'metadata' and the 'source_data' of the
+        session. Otherwise None.
     """
     raw_ephys_file_path = Path(raw_ephys_file_path)
     processed_ephys_file_path = Path(processed_ephys_file_path)
@@ -56,7 +117,10 @@ def session_to_nwb(
     video_file_path = Path(video_file_path)
     sleap_file_path = Path(sleap_file_path)
     output_dir_path = Path(output_dir_path)
-    output_dir_path.mkdir(parents=True, exist_ok=True)
+    if preview_window is not None:
+        output_dir_path = output_dir_path / "nwb_preview"
+    if not metadata_only:
+        output_dir_path.mkdir(parents=True, exist_ok=True)
 
     source_data = dict()
     conversion_options = dict()
@@ -94,8 +158,22 @@ def session_to_nwb(
     conversion_options.update(dict(Sorting=dict()))
 
     # Add Video
-    source_data.update(dict(Video=dict(file_paths=[video_file_path], verbose=verbose, video_name="VideoFLIR")))
+    linked_video_file_path = video_file_path
+    if transcoded_video_dir_path is not None and not metadata_only:
+        linked_video_file_path = Path(transcoded_video_dir_path) / f"{video_file_path.stem}.mp4"
+        transcode_video(
+            input_file_path=video_file_path,
+            output_file_path=linked_video_file_path,
+            number_of_jobs=number_of_jobs,
+            verbose=verbose,
+        )
+    source_data.update(dict(Video=dict(file_paths=[linked_video_file_path], verbose=verbose, video_name="VideoFLIR")))
     conversion_options.update(dict(Video=dict()))
+    if motion_energy:
+        source_data.update(dict(MotionEnergy=dict(file_path=video_file_path, roi=motion_energy_roi)))
+        conversion_options.update(
+            dict(MotionEnergy=dict(stub_test=stub_test, number_of_jobs=number_of_jobs, preview_window=preview_window))
+        )
 
     # Add Audio
     source_data.update(dict(Audio=dict(file_path=audio_file_path)))
@@ -103,14 +181,30 @@ def session_to_nwb(
 
     # Add Stimulus
     source_data.update(dict(Stimulus=dict(file_path=stimulus_file_path)))
-    conversion_options.update(dict(Stimulus=dict()))
+    conversion_options.update(
+        dict(Stimulus=dict(narrow_dtypes=narrow_dtypes, preview_window=preview_window, verbose=verbose))
+    )
 
     # Add SLEAP
-    source_data.update(dict(SLEAP=dict(file_path=sleap_file_path, video_file_path=video_file_path, verbose=verbose)))
+    source_data.update(
+        dict(SLEAP=dict(file_path=sleap_file_path, video_file_path=linked_video_file_path, verbose=verbose))
+    )
     conversion_options.update(dict(SLEAP=dict()))
 
+    # Size the buffers of the recordings and the audio to fit the memory budget
+    if memory_budget_gb is not None:
+        buffer_gb = get_buffer_gb(
+            memory_budget_gb=memory_budget_gb, in_memory_file_paths=[stimulus_file_path, sleap_file_path]
+        )
+        conversion_options["RawRecording"]["iterator_opts"] = dict(buffer_gb=buffer_gb)
+        conversion_options["ProcessedRecording"]["iterator_opts"] = dict(buffer_gb=buffer_gb)
+        conversion_options["Audio"]["buffer_gb"] = buffer_gb
+
     converter = Corredera2025NWBConverter(source_data=source_data, verbose=verbose)
-    metadata = converter.get_metadata()
+    if metadata_only:
+        metadata = converter.get_session_metadata()
+    else:
+        metadata = converter.get_metadata()
 
     # Update default metadata with the editable in the corresponding yaml file
     editable_metadata_path = Path(__file__).parent / "corredera_2025_metadata.yaml"
@@ -121,7 +215,8 @@ def session_to_nwb(
 
     session_id = metadata["NWBFile"]["session_id"]
     subject_id = metadata["Subject"]["subject_id"]
-    nwbfile_path = output_dir_path / f"sub-{subject_id}_ses-{session_id}.nwb"
+    nwbfile_suffix = ".nwb.zarr" if backend == "zarr" else ".nwb"
+    nwbfile_path = output_dir_path / f"sub-{subject_id}_ses-{session_id}{nwbfile_suffix}"
 
     # Add session start time to metadata
     split_name = video_file_path.stem.split("_")
@@ -135,8 +230,20 @@ def session_to_nwb(
     session_description = session_metadata["description"]
     metadata["NWBFile"]["session_description"] = session_description
 
+    if metadata_only:
+        return dict(nwbfile_path=nwbfile_path, metadata=metadata, source_data=source_data)
+
     # Run conversion
-    converter.run_conversion(metadata=metadata, nwbfile_path=nwbfile_path, conversion_options=conversion_options)
+    converter.run_conversion(
+        metadata=metadata,
+        nwbfile_path=nwbfile_path,
+        conversion_options=conversion_options,
+        checkpoint=checkpoint,
+        backend=backend,
+        number_of_jobs=number_of_jobs,
+        companion_interface_names=["RawRecording", "ProcessedRecording", "Audio"] if split_ecephys else None,
+        preview_window=preview_window,
+    )
 
 
 def main():
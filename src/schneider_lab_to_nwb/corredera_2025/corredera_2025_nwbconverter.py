@@ -1,22 +1,37 @@
 """Primary NWBConverter class for this dataset."""
-from pymatreader import read_mat
+from typing import Optional
 import numpy as np
-from neuroconv import NWBConverter
+from neuroconv.tools.nwb_helpers import get_default_nwbfile_metadata
+from neuroconv.utils import DeepDict, dict_deep_update
 from neuroconv.datainterfaces import (
     PhySortingInterface,
     ExternalVideoInterface,
     SLEAPInterface,
     WhiteMatterRecordingInterface,
 )
+from pynwb import NWBFile
 
 from schneider_lab_to_nwb.corredera_2025 import (
     Corredera2025AudioInterface,
     Corredera2025StimulusInterface,
     Corredera2025WhiteMatterRecordingInterface,
 )
+from schneider_lab_to_nwb.tools import (
+    add_sample_index_columns,
+    create_temporary_memmap,
+    get_electrical_series_name,
+    LazyNWBConverter,
+    MotionEnergyInterface,
+    restrict_recording_interface,
+    restrict_sorting_interface,
+    run_checkpointed_conversion,
+    run_split_conversion,
+    run_zarr_conversion,
+    validate_video_timestamps,
+)
 
 
-class Corredera2025NWBConverter(NWBConverter):
+class Corredera2025NWBConverter(LazyNWBConverter):
     """Primary conversion class."""
 
     data_interface_classes = dict(
@@ -27,28 +42,207 @@ class Corredera2025NWBConverter(NWBConverter):
         ProcessedRecording=Corredera2025WhiteMatterRecordingInterface,
         Sorting=PhySortingInterface,
         Stimulus=Corredera2025StimulusInterface,
+        MotionEnergy=MotionEnergyInterface,
     )
 
+    def get_session_metadata(self) -> DeepDict:
+        """Get the session-level metadata from cheap sources only, initializing the stimulus interface alone.
+
+        The subject and the session ids are read from the settings of the stimulus file, as for a full conversion.
+        The session start time and the descriptions come from the file names and the editable metadata.
+        """
+        metadata = get_default_nwbfile_metadata()
+        return dict_deep_update(metadata, self.data_interface_objects["Stimulus"].get_metadata())
+
     def temporally_align_data_interfaces(self, metadata: dict | None = None, conversion_options: dict | None = None):
-        file_path = self.data_interface_objects["Stimulus"].source_data["file_path"]
-        mat_file = read_mat(file_path)
+        """Align every data interface to the first audio buffer.
+
+        With a preview window, the recordings and the sorting are restricted to it on their own clock, before they are
+        aligned, and the audio timestamps are only interpolated within it.
+        """
+        mat_file = self.data_interface_objects["Stimulus"].read_data()  # parsed once, shared with the interface
         first_timestamp = mat_file["audio_rec"]["MicTimeStamps"][0]
 
         ephys_starting_time = mat_file["audio_rec"]["ttl_ephys"]["ttl_ephysTimeStamp"] - first_timestamp
+        if self.preview_window is not None:
+            ephys_preview_window = tuple(time - ephys_starting_time for time in self.preview_window)
+            for name in ("RawRecording", "ProcessedRecording"):
+                restrict_recording_interface(self.data_interface_objects[name], preview_window=ephys_preview_window)
+            restrict_sorting_interface(self.data_interface_objects["Sorting"], preview_window=ephys_preview_window)
         self.data_interface_objects["RawRecording"].set_aligned_starting_time(ephys_starting_time)
         self.data_interface_objects["ProcessedRecording"].set_aligned_starting_time(ephys_starting_time)
         self.data_interface_objects["Sorting"].set_aligned_starting_time(ephys_starting_time)
         cam_timestamps = mat_file["cam"]["camflir"]["TimeStamps_corr"] - first_timestamp
         self.data_interface_objects["Video"].set_aligned_timestamps([cam_timestamps])
         self.data_interface_objects["SLEAP"].set_aligned_timestamps(cam_timestamps)
+        if "MotionEnergy" in self.data_interface_objects:
+            self.data_interface_objects["MotionEnergy"].set_aligned_timestamps(cam_timestamps)
+        # Frame counts from the video header, before the video and the SLEAP poses are written with these timestamps
+        (video_file_path,) = self.data_interface_objects.source_data["Video"]["file_paths"]
+        validate_video_timestamps(file_path_to_timestamps={video_file_path: cam_timestamps})
 
         ptb_indices = np.cumsum(mat_file["audio_rec"]["MicNrSamples"]) - 1
-        audio_indices = np.arange(0, ptb_indices[-1] + 1)
-        audio_timestamps = np.interp(
-            audio_indices, ptb_indices, mat_file["audio_rec"]["MicTimeStamps"], left=np.nan, right=np.nan
+        ptb_timestamps = mat_file["audio_rec"]["MicTimeStamps"] - first_timestamp
+        if self.preview_window is None:
+            start_sample, stop_sample = 0, None
+        else:
+            # The samples whose interpolated timestamps are in the window
+            start_sample, stop_sample = np.interp(self.preview_window, ptb_timestamps, ptb_indices)
+            start_sample = max(int(np.ceil(start_sample)), int(ptb_indices[0]))
+            stop_sample = max(min(int(np.floor(stop_sample)) + 1, int(ptb_indices[-1]) + 1), start_sample)
+            self.data_interface_objects["Audio"].set_stop_sample(stop_sample)
+        audio_timestamps = interpolate_audio_timestamps(
+            ptb_indices=ptb_indices, ptb_timestamps=ptb_timestamps, start_sample=start_sample, stop_sample=stop_sample
         )
-        audio_timestamps = audio_timestamps - first_timestamp
-        self.data_interface_objects["Audio"].set_aligned_timestamps(audio_timestamps)
-        self.data_interface_objects["Audio"].set_start_sample(ptb_indices[0])
+        self.data_interface_objects["Audio"].set_aligned_timestamps(audio_timestamps, first_sample=start_sample)
+        self.data_interface_objects["Audio"].set_start_sample(max(start_sample, int(ptb_indices[0])))
 
         self.data_interface_objects["Stimulus"].set_aligned_starting_time(first_timestamp)
+
+    def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict, conversion_options: Optional[dict] = None):
+        """Add the data of all the data interfaces to the NWBFile, then the sample-index columns of its tables."""
+        super().add_to_nwbfile(nwbfile=nwbfile, metadata=metadata, conversion_options=conversion_options)
+        self.add_sample_index_columns(nwbfile=nwbfile, metadata=metadata)
+
+    def add_sample_index_columns(self, nwbfile: NWBFile, metadata: dict, time_series_nwbfile: Optional[NWBFile] = None):
+        """Add the sample indices of the stimulus times into the recordings and the audio to the stimulus tables.
+
+        The presentation times of the AudioStimulus table and the onset and offset times of the VisualStimulus table are
+        indexed into the raw and processed ElectricalSeries and into the audio recording. It is called by add_to_nwbfile()
+        once every data interface has been added, and by the split conversion once both NWBFiles are built, so that the
+        rows can be sliced from the large streams without searching their timestamps.
+
+        Parameters
+        ----------
+        nwbfile : NWBFile
+            The NWBFile with the tables.
+        metadata : dict
+            Metadata dictionary with information used to create the NWBFile.
+        time_series_nwbfile : NWBFile, optional
+            The NWBFile with the series, by default None (the same NWBFile).
+        """
+        time_series_nwbfile = time_series_nwbfile or nwbfile
+        raw_name = get_electrical_series_name(metadata=metadata, es_key="ElectricalSeriesRaw")
+        processed_name = get_electrical_series_name(metadata=metadata, es_key="ElectricalSeriesProcessed")
+        time_series_list = [
+            time_series_nwbfile.acquisition.get(raw_name),
+            time_series_nwbfile.acquisition.get(metadata["Audio"]["AudioRecording"]["name"]),
+        ]
+        if "ecephys" in time_series_nwbfile.processing:
+            ecephys_module = time_series_nwbfile.processing["ecephys"]
+            time_series_list.append(ecephys_module.data_interfaces.get(processed_name))
+        table_name_to_time_column_names = dict(
+            AudioStimulus=["presentation_time"], VisualStimulus=["onset_time", "offset_time"]
+        )
+        for table_name, time_column_names in table_name_to_time_column_names.items():
+            if table_name not in nwbfile.stimulus:
+                continue
+            for time_series in time_series_list:
+                if time_series is not None:
+                    add_sample_index_columns(
+                        table=nwbfile.stimulus[table_name], time_series=time_series, time_column_names=time_column_names
+                    )
+
+    def run_conversion(
+        self,
+        checkpoint: bool = False,
+        number_of_jobs: int = 1,
+        companion_interface_names: Optional[list[str]] = None,
+        preview_window: Optional[tuple[float, float]] = None,
+        **kwargs,
+    ):
+        """Run the NWB conversion over all the instantiated data interfaces.
+
+        Parameters
+        ----------
+        checkpoint : bool, optional
+            Whether to write each interface to the NWB file in its own append step and record it in a completion
+            journal, so that a rerun after a failure skips the interfaces that were already written, by default False.
+            Only supported with the HDF5 backend.
+        number_of_jobs : int, optional
+            Number of processes that write the chunks of the large datasets in parallel when backend="zarr",
+            by default 1.
+        companion_interface_names : list[str], optional
+            The names of the interfaces to write to a companion '<name>_desc-ecephys.nwb' file, linked from the NWB
+            file by HDF5 external links, by default None (a single file). Only supported with the HDF5 backend,
+            without checkpointing.
+        preview_window : tuple[float, float], optional
+            The (start, stop) of a window of the session, in seconds, on the timeline of the NWB file, to which the
+            recordings, the sorting and the audio are restricted, by default None (the whole session). The other
+            interfaces are restricted by their own 'preview_window' conversion option.
+        **kwargs
+            Keyword arguments passed to NWBConverter.run_conversion().
+        """
+        self.preview_window = preview_window
+        if companion_interface_names is not None:
+            if kwargs.get("backend") == "zarr" or checkpoint:
+                raise ValueError("Companion files are only supported with the HDF5 backend, without checkpointing.")
+            run_split_conversion(
+                converter=self,
+                nwbfile_path=kwargs["nwbfile_path"],
+                metadata=kwargs["metadata"],
+                companion_interface_names=companion_interface_names,
+                conversion_options=kwargs["conversion_options"],
+            )
+        elif kwargs.get("backend") == "zarr":
+            if checkpoint:
+                raise ValueError("Checkpointing is only supported with the HDF5 backend.")
+            run_zarr_conversion(
+                converter=self,
+                nwbfile_path=kwargs["nwbfile_path"],
+                metadata=kwargs["metadata"],
+                conversion_options=kwargs["conversion_options"],
+                number_of_jobs=number_of_jobs,
+            )
+        elif checkpoint:
+            run_checkpointed_conversion(
+                converter=self,
+                nwbfile_path=kwargs["nwbfile_path"],
+                metadata=kwargs["metadata"],
+                conversion_options=kwargs["conversion_options"],
+            )
+        else:
+            super().run_conversion(**kwargs)
+
+
+def interpolate_audio_timestamps(
+    ptb_indices: np.ndarray,
+    ptb_timestamps: np.ndarray,
+    chunk_size: int = 10_000_000,
+    start_sample: int = 0,
+    stop_sample: Optional[int] = None,
+) -> np.memmap:
+    """Interpolate a timestamp for every audio sample in a range, one chunk at a time, into a temporary file on disk.
+
+    A session holds hundreds of millions of audio samples, so the timestamps are never held in memory all at once.
+
+    Parameters
+    ----------
+    ptb_indices : np.ndarray
+        Index of the last sample of each audio buffer.
+    ptb_timestamps : np.ndarray
+        Timestamp of each audio buffer, in seconds.
+    chunk_size : int, optional
+        Number of samples interpolated at once, by default 10_000_000.
+    start_sample : int, optional
+        Index of the first sample of the range, by default 0.
+    stop_sample : int, optional
+        Index of the sample after the last one of the range, by default None (the sample after the last buffer).
+
+    Returns
+    -------
+    np.memmap
+        Timestamps of the samples of the range, the first one being that of start_sample, NaN before the first buffer.
+        Their temporary file is deleted once the memory map is garbage collected.
+    """
+    if stop_sample is None:
+        stop_sample = int(ptb_indices[-1]) + 1
+    num_samples = stop_sample - start_sample
+    timestamps = create_temporary_memmap(shape=(num_samples,), dtype=np.float64)
+    for start in range(0, num_samples, chunk_size):
+        stop = min(start + chunk_size, num_samples)
+        timestamps[start:stop] = np.interp(
+            np.arange(start_sample + start, start_sample + stop), ptb_indices, ptb_timestamps, left=np.nan, right=np.nan
+        )
+    timestamps.flush()
+    return timestamps
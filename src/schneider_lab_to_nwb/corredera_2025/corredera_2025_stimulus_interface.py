@@ -8,11 +8,14 @@ from pynwb.device import Device
 from pynwb.core import DynamicTable
 from ndx_events import Events, AnnotatedEventsTable
 from pathlib import PureWindowsPath
+from typing import Optional
 
 from neuroconv.basedatainterface import BaseDataInterface
 from neuroconv.utils import get_base_schema, get_schema_from_hdmf_class
 from neuroconv.tools import nwb_helpers
 
+from schneider_lab_to_nwb.tools import get_window_mask, get_window_overlap_mask, narrow_array_dtypes
+
 
 class Corredera2025StimulusInterface(BaseDataInterface):
     """Stimulus interface for corredera_2025 conversion"""
@@ -29,12 +32,19 @@ class Corredera2025StimulusInterface(BaseDataInterface):
         """
         self.starting_time = None
         super().__init__(file_path=file_path)
+        self._mat_file = None
+
+    def read_data(self) -> dict:
+        """Read the .mat file, once. The returned dictionary is shared, so it must not be modified in place."""
+        if self._mat_file is None:
+            self._mat_file = read_mat(self.source_data["file_path"])
+        return self._mat_file
 
     def get_metadata(self):
         metadata = super().get_metadata()
 
         file_path = self.source_data["file_path"]
-        file = read_mat(file_path)
+        file = read_mat(file_path, variable_names=["settings"])  # the rest of the file is not needed here
         metadata["Subject"]["subject_id"] = file["settings"]["animalID"]
         metadata["NWBFile"]["session_id"] = file["settings"]["date_str"]
 
@@ -71,9 +81,33 @@ class Corredera2025StimulusInterface(BaseDataInterface):
         }
         return metadata_schema
 
-    def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict):
-        file_path = self.source_data["file_path"]
-        file = read_mat(file_path)
+    def add_to_nwbfile(
+        self,
+        nwbfile: NWBFile,
+        metadata: dict,
+        narrow_dtypes: bool = False,
+        preview_window: Optional[tuple[float, float]] = None,
+        verbose: bool = False,
+    ):
+        """Add the audio and visual stimuli to the NWBFile.
+
+        Parameters
+        ----------
+        nwbfile : pynwb.NWBFile
+            The in-memory object to add the data to.
+        metadata : dict
+            Metadata dictionary with information used to create the NWBFile.
+        narrow_dtypes : bool, optional
+            Whether to store the audio stimulus templates and the visual stimulus properties in the narrowest dtype in
+            which they round-trip exactly, by default False.
+        preview_window : tuple[float, float], optional
+            The (start, stop) of a window of the session, in seconds, on the timeline of the NWB file, to which the
+            presentations are restricted (the visual stimuli that overlap it are kept), by default None (all of them).
+            The audio stimulus templates are always added.
+        verbose : bool, optional
+            Whether to print the savings of the narrowed dtypes, by default False.
+        """
+        file = self.read_data()
         epoch_names = ["fullBattery", "exploration", "threat"]
         audio_stimulus_table = DynamicTable(
             name="AudioStimulus",
@@ -97,6 +131,8 @@ class Corredera2025StimulusInterface(BaseDataInterface):
 
             for name, data, rate, presentation_times in zip(names, sound_data, rates, soundTimeStamps):
                 data = data[0, :]
+                if narrow_dtypes:
+                    data = narrow_array_dtypes(name_to_array={name: data}, verbose=verbose)[name]
                 rate = float(rate)
                 template_time_series = TimeSeries(
                     name=name,
@@ -106,9 +142,12 @@ class Corredera2025StimulusInterface(BaseDataInterface):
                     rate=rate,
                 )
                 nwbfile.add_stimulus_template(template_time_series)
-                for i, presentation_time in enumerate(presentation_times):
-                    if self.starting_time is not None:
-                        presentation_time = presentation_time - self.starting_time
+                presentation_times = np.atleast_1d(presentation_times)
+                if self.starting_time is not None:
+                    presentation_times = presentation_times - self.starting_time
+                if preview_window is not None:
+                    presentation_times = presentation_times[get_window_mask(presentation_times, preview_window)]
+                for presentation_time in presentation_times:
                     audio_stimulus_table.add_row(
                         presentation_time=presentation_time,
                         stimulus_name=name,
@@ -120,7 +159,16 @@ class Corredera2025StimulusInterface(BaseDataInterface):
             nwbfile.add_device(device)
 
         # Add visual stimulus
-        if len(file["vis"]["visTimeStamps"]) == 0:
+        # When only one visual stimulus is presented, the timestamps are stored in a 1D array (3,)
+        visual_stimulus_timestamps = np.asarray(file["vis"]["visTimeStamps"], dtype="float64").reshape(-1, 3)
+        if self.starting_time is not None:
+            visual_stimulus_timestamps = visual_stimulus_timestamps - self.starting_time
+        if preview_window is not None:
+            is_in_window = get_window_overlap_mask(
+                visual_stimulus_timestamps[:, 0], visual_stimulus_timestamps[:, 2], preview_window
+            )
+            visual_stimulus_timestamps = visual_stimulus_timestamps[is_in_window]
+        if len(visual_stimulus_timestamps) == 0:
             return  # Skip if no visual stimulus is present
         visual_stimulus_table = DynamicTable(
             name="VisualStimulus",
@@ -138,24 +186,28 @@ class Corredera2025StimulusInterface(BaseDataInterface):
             name="offset_time",
             description="Time when the visual stimulus (disk) disappears from the screen.",
         )
-        row_properties = dict()
-        for property_metadata in metadata["Stimulus"]["VisualStimulusProperties"]:
-            visual_stimulus_table.add_column(
-                name=property_metadata["name"],
-                description=property_metadata["description"],
-            )
-            row_properties[property_metadata["name"]] = file["vis"][property_metadata["name"]]
 
-        # When only one visual stimulus is presented, the timestamps are stored in a 1D array (3,)
-        visual_stimulus_timestamps = file["vis"]["visTimeStamps"].reshape(-1, 3)
         for row in visual_stimulus_timestamps:
-            if self.starting_time is not None:
-                row = row - self.starting_time
             visual_stimulus_table.add_row(
                 onset_time=row[0],
                 peak_expansion_time=row[1],
                 offset_time=row[2],
-                **row_properties,
+            )
+
+        # The properties are the same for every presentation
+        property_name_to_data = {
+            property_metadata["name"]: np.asarray(
+                [file["vis"][property_metadata["name"]]] * len(visual_stimulus_timestamps)
+            )
+            for property_metadata in metadata["Stimulus"]["VisualStimulusProperties"]
+        }
+        if narrow_dtypes:
+            property_name_to_data = narrow_array_dtypes(name_to_array=property_name_to_data, verbose=verbose)
+        for property_metadata in metadata["Stimulus"]["VisualStimulusProperties"]:
+            visual_stimulus_table.add_column(
+                name=property_metadata["name"],
+                description=property_metadata["description"],
+                data=property_name_to_data[property_metadata["name"]],
             )
         nwbfile.add_stimulus(visual_stimulus_table)
 
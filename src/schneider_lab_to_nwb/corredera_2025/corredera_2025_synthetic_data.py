@@ -0,0 +1,381 @@
+"""Generate a synthetic session of the Corredera 2025 dataset, laid out as the example sessions, for benchmarks."""
+from datetime import datetime
+from pathlib import Path, PureWindowsPath
+from typing import Iterator
+
+import numpy as np
+from pydantic import DirectoryPath, FilePath
+
+from schneider_lab_to_nwb.tools import (
+    generate_spike_trains,
+    generate_traces,
+    write_binary_traces,
+    write_mat_file,
+    write_phy_folder,
+    write_video,
+)
+
+# Fixed by the acquisition systems, as in session_to_nwb()
+NUM_CHANNELS = 64
+SAMPLING_FREQUENCY = 25_000.0
+WHITE_MATTER_HEADER_SIZE = 8
+NUM_AUDIO_CHANNELS = 4
+AUDIO_SAMPLING_FREQUENCY = 192_000.0
+
+SKELETON_NODE_NAMES = ("nose", "left_ear", "right_ear", "neck", "body", "tail_base")
+SKELETON_EDGES = (
+    ("nose", "neck"),
+    ("left_ear", "neck"),
+    ("right_ear", "neck"),
+    ("neck", "body"),
+    ("body", "tail_base"),
+)
+SOUND_DIR_PATH = PureWindowsPath("C:\\Users\\Schneider Lab\\Documents\\Sounds")
+
+
+def generate_synthetic_session(
+    *,
+    data_dir_path: DirectoryPath,
+    duration: float = 60.0,
+    has_visual_stimulus: bool = False,
+    num_units: int = 32,
+    video_frame_rate: float = 30.0,
+    frame_shape: tuple[int, int] = (240, 320),
+    audio_buffer_length: int = 19_200,
+    seed: int = 0,
+) -> dict:
+    """Generate the raw data of a session of 2024-12-12 in data_dir_path, laid out as the example sessions.
+
+    The session has the raw and the pre-processed WhiteMatter recordings (64 channels at 25 kHz, after an 8-byte
+    header), a Kilosort 4 curated Phy folder, a FLIR video, the SLEAP predictions of its frames, the 4-channel .mic
+    audio recording (192 kHz) and the stimulus .mat file, with the settings, the sounds of the epochs, the visual
+    stimulus, the audio buffers and the camera timestamps on the Psychtoolbox clock. A session with a visual stimulus is
+    a 'loom_threat' session of subject m14_vr_threat, and one without is a 'playback' session of subject m14_pb.
+
+    The SLEAP file is written with sleap-io, which is only required by this conversion.
+
+    Parameters
+    ----------
+    data_dir_path : DirectoryPath
+        The path to the directory of the synthetic session.
+    duration : float, optional
+        The duration of the session, in seconds, by default 60.0.
+    has_visual_stimulus : bool, optional
+        Whether the session has looming visual stimuli, by default False.
+    num_units : int, optional
+        The number of units of the sorting, by default 32.
+    video_frame_rate : float, optional
+        The frame rate of the camera, in Hz, by default 30.0.
+    frame_shape : tuple[int, int], optional
+        The (height, width) of the frames of the video, in pixels, by default (240, 320).
+    audio_buffer_length : int, optional
+        The number of samples of each buffer of the audio recording, by default 19_200 (0.1 s).
+    seed : int, optional
+        The seed of the random generators, by default 0.
+
+    Returns
+    -------
+    dict
+        The kwargs of session_to_nwb() for the session, except output_dir_path.
+    """
+    data_dir_path = Path(data_dir_path)
+    session_start_time = datetime(2024, 12, 12, 10, 28, 13)
+    subject_id = "m14_vr_threat" if has_visual_stimulus else "m14_pb"
+    session_type = "loom_threat" if has_visual_stimulus else "playback"
+    prefix = f"{subject_id}_{session_start_time:%Y-%m-%d}_001"
+    minutes, seconds = divmod(int(duration), 60)
+    recording_name = (
+        f"HSW_{session_start_time:%Y_%m_%d__%H_%M_%S}__{minutes}min_{seconds}sec__hsamp_{NUM_CHANNELS}ch_"
+        f"{int(SAMPLING_FREQUENCY)}sps.bin"
+    )
+    raw_ephys_file_path = data_dir_path / recording_name
+    processed_ephys_file_path = data_dir_path / f"preKS_{recording_name}"
+    sorting_folder_path = data_dir_path / "kilosort4_curated"
+    video_file_path = data_dir_path / f"{prefix}_CamFlir1_{session_start_time:%Y%m%d_%H%M%S}.avi"
+    sleap_file_path = data_dir_path / f"labels.v001.slp.{session_start_time:%y%m%d_%H%M%S}.predictions.slp"
+    audio_file_path = data_dir_path / f"{prefix}_micrec.mic"
+    stimulus_file_path = data_dir_path / f"{prefix}_data.mat"
+
+    # Stimulus file, with every clock of the session
+    stimulus = get_synthetic_stimulus(
+        duration=duration,
+        subject_id=subject_id,
+        session_id=f"{session_start_time:%Y-%m-%d}",
+        has_visual_stimulus=has_visual_stimulus,
+        video_frame_rate=video_frame_rate,
+        audio_buffer_length=audio_buffer_length,
+        seed=seed,
+    )
+    write_mat_file(file_path=stimulus_file_path, variables=stimulus)
+
+    # Recordings and sorting
+    num_samples = int(duration * SAMPLING_FREQUENCY)
+    spike_samples, spike_units = generate_spike_trains(
+        num_samples=num_samples, num_units=num_units, sampling_frequency=SAMPLING_FREQUENCY, seed=seed
+    )
+    for file_path, noise_level in ((raw_ephys_file_path, 40.0), (processed_ephys_file_path, 15.0)):
+        traces = generate_traces(
+            num_samples=num_samples,
+            num_channels=NUM_CHANNELS,
+            spike_samples=spike_samples,
+            spike_units=spike_units,
+            noise_level=noise_level,
+            seed=seed,
+        )
+        write_binary_traces(file_path=file_path, traces=traces, header_size=WHITE_MATTER_HEADER_SIZE)
+    write_phy_folder(
+        folder_path=sorting_folder_path,
+        spike_samples=spike_samples,
+        spike_units=spike_units,
+        sampling_frequency=SAMPLING_FREQUENCY,
+        num_channels=NUM_CHANNELS,
+        seed=seed,
+    )
+
+    # Audio, with the samples of every logged buffer
+    num_audio_samples = int(np.sum(stimulus["audio_rec"]["MicNrSamples"]))
+    write_binary_traces(
+        file_path=audio_file_path,
+        traces=_generate_audio(num_samples=num_audio_samples, chunk_length=audio_buffer_length, seed=seed),
+    )
+
+    # Video and poses
+    num_frames = len(stimulus["cam"]["camflir"]["TimeStamps_corr"])
+    write_video(
+        file_path=video_file_path,
+        num_frames=num_frames,
+        frame_rate=video_frame_rate,
+        frame_shape=frame_shape,
+        fourcc="MJPG",
+        seed=seed,
+    )
+    write_sleap_predictions(
+        file_path=sleap_file_path,
+        video_file_path=video_file_path,
+        num_frames=num_frames,
+        frame_shape=frame_shape,
+        seed=seed,
+    )
+    return dict(
+        raw_ephys_file_path=raw_ephys_file_path,
+        processed_ephys_file_path=processed_ephys_file_path,
+        sorting_folder_path=sorting_folder_path,
+        video_file_path=video_file_path,
+        sleap_file_path=sleap_file_path,
+        audio_file_path=audio_file_path,
+        stimulus_file_path=stimulus_file_path,
+        session_type=session_type,
+    )
+
+
+def get_synthetic_stimulus(
+    duration: float,
+    subject_id: str,
+    session_id: str,
+    has_visual_stimulus: bool = False,
+    video_frame_rate: float = 30.0,
+    audio_buffer_length: int = 19_200,
+    seed: int = 0,
+) -> dict:
+    """Get the variables of a synthetic stimulus .mat file, with every time on the Psychtoolbox clock.
+
+    Parameters
+    ----------
+    duration : float
+        The duration of the session, in seconds.
+    subject_id : str
+        The subject id, as in the 'animalID' of the settings.
+    session_id : str
+        The session id, as in the 'date_str' of the settings.
+    has_visual_stimulus : bool, optional
+        Whether the session has looming visual stimuli during its threat epoch, by default False.
+    video_frame_rate : float, optional
+        The frame rate of the camera, in Hz, by default 30.0.
+    audio_buffer_length : int, optional
+        The number of samples of each buffer of the audio recording, by default 19_200.
+    seed : int, optional
+        The seed of the random generator, by default 0.
+
+    Returns
+    -------
+    dict
+        The 'settings', 'sounds', 'vis', 'audio_rec' and 'cam' variables, for write_mat_file().
+    """
+    rng = np.random.default_rng(seed)
+    clock_offset = 3_612.5  # Psychtoolbox time (GetSecs) at the start of the audio recording
+
+    # Audio buffers, the first of which is logged once it is full
+    buffer_duration = audio_buffer_length / AUDIO_SAMPLING_FREQUENCY
+    num_buffers = int(duration / buffer_duration)
+    mic_timestamps = clock_offset + buffer_duration * np.arange(1, num_buffers + 1)
+    mic_timestamps = mic_timestamps + rng.normal(0.0, 1e-4, size=num_buffers)
+    audio_rec = dict(
+        MicTimeStamps=mic_timestamps,
+        MicNrSamples=np.full(num_buffers, float(audio_buffer_length)),
+        ttl_ephys=dict(ttl_ephysTimeStamp=mic_timestamps[0] + 0.05),
+    )
+
+    # Camera frames, from the first buffer on, with the jitter of the corrected FLIR timestamps
+    frame_times = np.arange(mic_timestamps[0] + 0.02, mic_timestamps[-1] - 0.02, 1 / video_frame_rate)
+    frame_times = frame_times + rng.normal(0.0, 1e-4, size=len(frame_times))
+    cam = dict(camflir=dict(TimeStamps_corr=frame_times))
+
+    # Sounds, each played several times during the full battery and the exploration epochs, which play different sounds
+    epoch_boundaries = np.linspace(mic_timestamps[0] + 0.5, mic_timestamps[-1] - 0.5, 4)
+    epoch_name_to_sound_names = dict(
+        fullBattery=("sound01_F2000_L65_D0.1+0.005", "sound02_F8000_L65_D0.1+0.005", "sound03_WN_L65_D0.1+0.005"),
+        exploration=("sound04_F4000_L65_D0.1+0.005", "sound05_F16000_L65_D0.1+0.005"),
+    )
+    sound_sampling_frequency = 96_000.0
+    sounds = dict()
+    for epoch_index, epoch_name in enumerate(("fullBattery", "exploration", "threat")):
+        if epoch_name == "threat":
+            sounds[epoch_name] = dict(button_cnt=0)
+            continue
+        sound_names = epoch_name_to_sound_names[epoch_name]
+        start_time, stop_time = epoch_boundaries[epoch_index], epoch_boundaries[epoch_index + 1]
+        sound_times = np.sort(rng.uniform(start_time, stop_time - 0.2, size=4 * len(sound_names)))
+        sounds[epoch_name] = dict(
+            button_cnt=len(sound_times),
+            soundData=[
+                _get_sound(name=name, sampling_frequency=sound_sampling_frequency, seed=seed + sound_index)
+                for sound_index, name in enumerate(sound_names)
+            ],
+            soundTimeStamps=[sound_times[sound_index :: len(sound_names)] for sound_index in range(len(sound_names))],
+            soundFS=np.full(len(sound_names), sound_sampling_frequency),
+            wavFiles_fullpath=[str(SOUND_DIR_PATH / f"{name}.wav") for name in sound_names],
+        )
+
+    # Looming disks during the threat epoch, as (onset, peak expansion, offset) times
+    if has_visual_stimulus:
+        interval = min(5.0, (epoch_boundaries[3] - epoch_boundaries[2]) / 4)
+        onset_times = np.arange(epoch_boundaries[2] + interval / 2, epoch_boundaries[3] - 1.5, interval)
+        visual_stimulus_timestamps = np.stack([onset_times, onset_times + 0.5, onset_times + 1.0], axis=1)
+    else:
+        visual_stimulus_timestamps = np.array([])
+    vis = dict(
+        visTimeStamps=visual_stimulus_timestamps,
+        post_stim_interval_sec=2.0,
+        win=10.0,
+        screenRect=np.array([0.0, 0.0, 1920.0, 1080.0]),
+        width_px=1920.0,
+        height_px=1080.0,
+        ifi=1 / 60,
+        sigma=2.0,
+        useAlpha=1.0,
+        smoothMethod=1.0,
+        rotAngle=0.0,
+        myAlpha=1.0,
+        discColor=np.array([0.0, 0.0, 0.0, 255.0]),
+        pixel_cm=37.8,
+        pixel_cm_vert=37.8,
+        degperpix=0.0425,
+        pixperdeg=23.5,
+        width_deg=81.6,
+        height_deg=45.9,
+        radius_init_px=12.0,
+        discSize_init_px=24.0,
+        expansionIncrement_degpf=1.0,
+        expansionIncrement_pxpf=23.5,
+        discSize_end_px=846.0,
+        discTexture=11.0,
+        texRect=np.array([0.0, 0.0, 846.0, 846.0]),
+        dstRects=np.array([537.0, 117.0, 1383.0, 963.0]),
+    )
+    settings = dict(animalID=subject_id, date_str=session_id)
+    return dict(settings=settings, sounds=sounds, vis=vis, audio_rec=audio_rec, cam=cam)
+
+
+def write_sleap_predictions(
+    file_path: FilePath,
+    video_file_path: FilePath,
+    num_frames: int,
+    frame_shape: tuple[int, int] = (240, 320),
+    seed: int = 0,
+) -> Path:
+    """Write the SLEAP predictions of the pose of a mouse on every frame of a video, to a '.slp' file.
+
+    Parameters
+    ----------
+    file_path : FilePath
+        The path of the '.slp' file.
+    video_file_path : FilePath
+        The path of the video of the predictions.
+    num_frames : int
+        The number of frames of the video.
+    frame_shape : tuple[int, int], optional
+        The (height, width) of the frames, in pixels, by default (240, 320).
+    seed : int, optional
+        The seed of the random generator, by default 0.
+
+    Returns
+    -------
+    Path
+        The path of the '.slp' file.
+    """
+    try:
+        import sleap_io
+    except ImportError as error:
+        raise ImportError(
+            "Writing synthetic SLEAP predictions requires sleap-io, see corredera_2025/requirements-frozen.txt."
+        ) from error
+
+    rng = np.random.default_rng(seed)
+    skeleton = sleap_io.Skeleton(nodes=list(SKELETON_NODE_NAMES), edges=list(SKELETON_EDGES), name="mouse")
+    video = sleap_io.Video(filename=str(video_file_path))
+    height, width = frame_shape
+    body_offsets = rng.normal(0.0, 8.0, size=(len(SKELETON_NODE_NAMES), 2))
+    position = np.array([width / 2, height / 2])
+    labeled_frames = []
+    for frame_index in range(num_frames):
+        position = np.clip(position + rng.normal(0.0, 2.0, size=2), 0, [width - 1, height - 1])
+        points = position + body_offsets + rng.normal(0.0, 1.0, size=body_offsets.shape)
+        point_scores = rng.uniform(0.5, 1.0, size=len(SKELETON_NODE_NAMES))
+        points[point_scores < 0.55] = np.nan  # occluded nodes
+        instance = sleap_io.PredictedInstance.from_numpy(
+            points_data=points, skeleton=skeleton, point_scores=point_scores, score=float(np.mean(point_scores))
+        )
+        labeled_frames.append(sleap_io.LabeledFrame(video=video, frame_idx=frame_index, instances=[instance]))
+    labels = sleap_io.Labels(labeled_frames=labeled_frames, videos=[video], skeletons=[skeleton])
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    sleap_io.save_slp(labels, str(file_path))
+    return file_path
+
+
+def _get_sound(name: str, sampling_frequency: float, seed: int, duration: float = 0.105) -> np.ndarray:
+    """Get the 2 channels of a sound as the stimulus file logs them: the sound and a copy of it."""
+    rng = np.random.default_rng(seed)
+    times = np.arange(int(duration * sampling_frequency)) / sampling_frequency
+    ramp = np.clip(np.minimum(times, duration - times) / 0.005, 0.0, 1.0)
+    if "_WN_" in name:
+        sound = rng.uniform(-1.0, 1.0, size=len(times))
+    else:
+        frequency = float(name.split("_F")[1].split("_")[0])
+        sound = np.sin(2 * np.pi * frequency * times)
+    sound = 0.5 * ramp * sound
+    return np.stack([sound, sound])
+
+
+def _generate_audio(num_samples: int, chunk_length: int, seed: int) -> Iterator[np.ndarray]:
+    """Generate the 4 channels of the microphones, one buffer at a time: noise with brief vocalization-like chirps."""
+    rng = np.random.default_rng(seed)
+    times = np.arange(chunk_length) / AUDIO_SAMPLING_FREQUENCY
+    for chunk_start in range(0, num_samples, chunk_length):
+        num_chunk_samples = min(chunk_length, num_samples - chunk_start)
+        chunk = rng.normal(0.0, 0.01, size=(num_chunk_samples, NUM_AUDIO_CHANNELS))
+        if rng.random() < 0.2:
+            frequency = rng.uniform(40_000, 80_000) + 100_000 * times[:num_chunk_samples]
+            chirp = 0.2 * np.sin(2 * np.pi * frequency * times[:num_chunk_samples])
+            chirp *= np.exp(-((times[:num_chunk_samples] - times[num_chunk_samples // 2]) ** 2) / (2 * 0.01**2))
+            chunk += chirp[:, np.newaxis] * rng.uniform(0.5, 1.0, size=NUM_AUDIO_CHANNELS)
+        yield chunk.astype("float32")
+
+
+if __name__ == "__main__":
+
+    # Parameters for the synthetic session
+    data_dir_path = Path("/Volumes/T7/CatalystNeuro/Schneider/SyntheticData/Corredera")
+    duration = 600.0
+
+    print(generate_synthetic_session(data_dir_path=data_dir_path, duration=duration))
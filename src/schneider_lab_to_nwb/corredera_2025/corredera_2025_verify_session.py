@@ -0,0 +1,166 @@
+"""Primary script to verify a converted session against its source data."""
+import os
+from functools import lru_cache, partial
+from pathlib import Path
+
+import numpy as np
+from neuroconv.utils import load_dict_from_file
+from pydantic import FilePath
+from pymatreader import read_mat
+
+from schneider_lab_to_nwb.corredera_2025.corredera_2025_nwbconverter import interpolate_audio_timestamps
+from schneider_lab_to_nwb.tools.verification import (
+    format_verification_report,
+    read_memmap_rows,
+    run_verification,
+    verify_dataset,
+    verify_value,
+)
+
+NUM_CHANNELS = 64
+SAMPLING_FREQUENCY = 25_000.0
+NUM_AUDIO_CHANNELS = 4
+
+
+def verify_session(
+    *,
+    nwbfile_path: FilePath,
+    raw_ephys_file_path: FilePath,
+    processed_ephys_file_path: FilePath,
+    audio_file_path: FilePath,
+    stimulus_file_path: FilePath,
+    max_workers: int = 1,
+    verbose: bool = True,
+) -> list[dict]:
+    """Verify that the recordings and the audio of a converted session match the source data.
+
+    The raw and processed recordings are compared chunk by chunk with the '.bin' files, after applying the declared
+    conversion of the ElectricalSeries, and their starting time with the ephys TTL of the stimulus file. The audio is
+    compared with the '.mic' file from its first aligned sample, and its timestamps with the interpolation of the
+    microphone timestamps of the stimulus file.
+
+    Parameters
+    ----------
+    nwbfile_path : FilePath
+        Path to the NWB file of the session.
+    raw_ephys_file_path : FilePath
+        Path to the raw electrophysiology data file.
+    processed_ephys_file_path : FilePath
+        Path to the processed electrophysiology data file.
+    audio_file_path : FilePath
+        Path to the audio .mic file.
+    stimulus_file_path : FilePath
+        Path to the stimulus .mat file.
+    max_workers : int, optional
+        The maximum number of processes that run the checks, by default 1.
+    verbose : bool, optional
+        Whether to print the report, by default True.
+
+    Returns
+    -------
+    list[dict]
+        The report of each check, as returned by run_verification().
+    """
+    mat_file = read_mat(stimulus_file_path)
+    first_timestamp = mat_file["audio_rec"]["MicTimeStamps"][0]
+    ephys_starting_time = mat_file["audio_rec"]["ttl_ephys"]["ttl_ephysTimeStamp"] - first_timestamp
+
+    checks = []
+    for file_path, time_series_path in (
+        (raw_ephys_file_path, "acquisition/ElectricalSeriesRaw"),
+        (processed_ephys_file_path, "processing/ecephys/ElectricalSeriesProcessed"),
+    ):
+        name = time_series_path.rsplit("/", 1)[1]
+        recording = _get_recording(file_path=str(file_path))
+        checks.append(
+            partial(
+                verify_dataset,
+                name=f"{name} data",
+                nwb_dataset_path=f"{time_series_path}/data",
+                read_source_rows=partial(read_recording_rows, str(file_path)),
+                num_rows=recording.get_num_samples(),
+                apply_conversion=True,
+                rtol=1e-5,
+            )
+        )
+        checks.append(
+            partial(
+                verify_value,
+                name=f"{name} starting_time",
+                nwb_dataset_path=f"{time_series_path}/starting_time",
+                expected_value=ephys_starting_time,
+                rtol=1e-12,
+            )
+        )
+
+    editable_metadata = load_dict_from_file(Path(__file__).parent / "corredera_2025_metadata.yaml")
+    audio_path = f"acquisition/{editable_metadata['Audio']['AudioRecording']['name']}"
+    ptb_indices = np.cumsum(mat_file["audio_rec"]["MicNrSamples"]) - 1
+    start_sample = int(ptb_indices[0])
+    num_file_samples = os.path.getsize(audio_file_path) // (np.dtype("float32").itemsize * NUM_AUDIO_CHANNELS)
+    audio_timestamps = interpolate_audio_timestamps(
+        ptb_indices=ptb_indices, ptb_timestamps=mat_file["audio_rec"]["MicTimeStamps"] - first_timestamp
+    )
+    checks.append(
+        partial(
+            verify_dataset,
+            name="audio data",
+            nwb_dataset_path=f"{audio_path}/data",
+            read_source_rows=partial(
+                read_memmap_rows, str(audio_file_path), "float32", (num_file_samples, NUM_AUDIO_CHANNELS), start_sample
+            ),
+            num_rows=num_file_samples - start_sample,
+        )
+    )
+    checks.append(
+        partial(
+            verify_dataset,
+            name="audio timestamps",
+            nwb_dataset_path=f"{audio_path}/timestamps",
+            read_source_rows=partial(
+                read_memmap_rows, audio_timestamps.filename, "float64", audio_timestamps.shape, start_sample
+            ),
+            num_rows=len(audio_timestamps) - start_sample,
+        )
+    )
+
+    checks = [partial(check, nwbfile_path=nwbfile_path) for check in checks]
+    report = run_verification(checks=checks, max_workers=max_workers)
+    if verbose:
+        print(f"Verification of {Path(nwbfile_path).name}:")
+        print(format_verification_report(report))
+    return report
+
+
+def read_recording_rows(file_path: str, start: int, stop: int) -> np.ndarray:
+    """Read the samples [start, stop) of a WhiteMatter recording, in volts."""
+    recording = _get_recording(file_path=file_path)
+    return recording.get_traces(start_frame=start, end_frame=stop, return_scaled=True) * 1e-6
+
+
+@lru_cache(maxsize=2)
+def _get_recording(file_path: str):
+    from spikeinterface.extractors import WhiteMatterRecordingExtractor
+
+    return WhiteMatterRecordingExtractor(
+        file_path=file_path, sampling_frequency=SAMPLING_FREQUENCY, num_channels=NUM_CHANNELS
+    )
+
+
+if __name__ == "__main__":
+    # Parameters for verification
+    data_dir_path = Path("/Volumes/T7/CatalystNeuro/Schneider/Ariadna Corredera Project Data")
+    output_dir_path = Path("/Volumes/T7/CatalystNeuro/Schneider/conversion_nwb/corredera_2025")
+
+    # Example Session w/o visual stimulus
+    session_dir_path = data_dir_path / "example_data_ari_01"
+    verify_session(
+        nwbfile_path=output_dir_path / "sub-m14_ses-pb-2024-12-12-001.nwb",
+        raw_ephys_file_path=session_dir_path / "HSW_2024_12_12__10_28_23__70min_17sec__hsamp_64ch_25000sps.bin",
+        processed_ephys_file_path=(
+            session_dir_path / "preKS_HSW_2024_12_12__10_28_23__70min_17sec__hsamp_64ch_25000sps.bin"
+        ),
+        audio_file_path=session_dir_path / "m14_pb_2024-12-12_001_micrec.mic",
+        stimulus_file_path=session_dir_path / "m14_pb_2024-12-12_001_data.mat",
+        max_workers=4,
+    )
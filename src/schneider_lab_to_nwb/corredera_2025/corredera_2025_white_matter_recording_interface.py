@@ -8,6 +8,8 @@ from neuroconv.utils import dict_deep_update
 from spikeinterface.extractors import WhiteMatterRecordingExtractor
 from probeinterface import get_probe
 
+from schneider_lab_to_nwb.tools import add_electrodes_in_bulk, admit_new_data_chunk_iterators
+
 
 class Corredera2025WhiteMatterRecordingInterface(WhiteMatterRecordingInterface):
     """WhiteMatter RecordingInterface for corredera_2025 conversion."""
@@ -47,4 +49,10 @@ class Corredera2025WhiteMatterRecordingInterface(WhiteMatterRecordingInterface):
         for electrode_group in metadata["Ecephys"]["ElectrodeGroup"]:
             electrode_group["location"] = location
 
+        # The raw and processed recordings share their electrodes: the second one adds no rows
+        add_electrodes_in_bulk(recording=self.recording_extractor, nwbfile=nwbfile, metadata=metadata)
+        object_ids_before = {neurodata_object.object_id for neurodata_object in nwbfile.all_children()}
         super().add_to_nwbfile(nwbfile=nwbfile, metadata=metadata, **conversion_options)
+        admit_new_data_chunk_iterators(
+            nwbfile=nwbfile, object_ids_before=object_ids_before, path=self.source_data["file_path"]
+        )
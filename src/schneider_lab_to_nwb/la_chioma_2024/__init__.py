@@ -1 +1,19 @@
-from .la_chioma_2024_nwbconverter import LaChioma2024NWBConverter
+"""Conversion of the La Chioma 2024 dataset.
+
+The public classes are imported lazily, on first attribute access, so that importing the package does not import
+neuroconv, spikeinterface, pynwb and the other heavy dependencies until they are needed.
+"""
+from typing import TYPE_CHECKING
+
+from schneider_lab_to_nwb.tools.lazy_exports import get_lazy_attribute_functions
+
+if TYPE_CHECKING:
+    from .la_chioma_2024_nwbconverter import LaChioma2024NWBConverter
+
+_attribute_name_to_module_name = dict(
+    LaChioma2024NWBConverter=".la_chioma_2024_nwbconverter",
+)
+
+__all__ = list(_attribute_name_to_module_name)
+
+__getattr__, __dir__ = get_lazy_attribute_functions(globals(), _attribute_name_to_module_name)
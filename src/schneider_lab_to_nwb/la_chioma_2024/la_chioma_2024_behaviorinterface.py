@@ -1,6 +1,7 @@
 """Primary class for converting experiment-specific behavior."""
 import warnings
 from collections import defaultdict
+from typing import Optional
 
 import numpy as np
 import pandas as pd
@@ -13,6 +14,8 @@ from pynwb.core import DynamicTable, VectorData
 from pynwb.behavior import BehavioralTimeSeries
 from pynwb.epoch import TimeIntervals
 
+from schneider_lab_to_nwb.tools import get_window_mask, get_window_overlap_mask, narrow_array_dtypes
+
 
 class LaChioma2024BehaviorInterface(BaseDataInterface):
     """Behavior interface for la_chioma_2024 conversion"""
@@ -42,7 +45,14 @@ class LaChioma2024BehaviorInterface(BaseDataInterface):
             self._file = read_mat(self.source_data["file_path"])
         return self._file
 
-    def add_continuous_data(self, nwbfile: NWBFile, metadata: dict):
+    def add_continuous_data(
+        self,
+        nwbfile: NWBFile,
+        metadata: dict,
+        narrow_dtypes: bool = False,
+        preview_window: Optional[tuple[float, float]] = None,
+        verbose: bool = False,
+    ):
         """
         Add continuous behavioral data from a MAT file to the NWBFile.
 
@@ -53,6 +63,13 @@ class LaChioma2024BehaviorInterface(BaseDataInterface):
         metadata : dict
             A dictionary containing the behavioral module description in `metadata["Behavior"]["Module"]` and
             the time series metadata in `metadata["Behavior"]["TimeSeries"]`.
+        narrow_dtypes : bool, optional
+            Whether to store the wheel data in the narrowest dtype in which it round-trips exactly, by default False.
+        preview_window : tuple[float, float], optional
+            The (start, stop) in seconds of the window of the session to which the wheel data is restricted, by default
+            None (the whole session).
+        verbose : bool, optional
+            Whether to print the savings of the narrowed dtypes, by default False.
 
         Raises
         ------
@@ -70,6 +87,8 @@ class LaChioma2024BehaviorInterface(BaseDataInterface):
             raise ValueError(f"Expected 'wheel' key in the continuous data, but found: {continuous_data.keys()}")
 
         wheel_data = pd.DataFrame(continuous_data["wheel"])
+        if preview_window is not None:
+            wheel_data = wheel_data[get_window_mask(times=wheel_data["time"], preview_window=preview_window)]
         # Add continuous data to nwbfile
         behavior_module = nwb_helpers.get_module(
             nwbfile=nwbfile,
@@ -86,6 +105,10 @@ class LaChioma2024BehaviorInterface(BaseDataInterface):
                     continue
                 data = np.array(wheel_per_exp_id[time_series_metadata["name"]]).squeeze()
                 time_series_name = time_series_metadata["standardized_name"] + f"_{expIdx}"
+                if narrow_dtypes:
+                    data = narrow_array_dtypes(name_to_array={time_series_name: data}, verbose=verbose)[
+                        time_series_name
+                    ]
                 time_series = TimeSeries(
                     name=time_series_name,
                     timestamps=ephys_aligned_timestamps,
@@ -103,7 +126,7 @@ class LaChioma2024BehaviorInterface(BaseDataInterface):
             )
             behavior_module.add(behavioral_time_series)
 
-    def add_experiments(self, nwbfile: NWBFile, metadata: dict):
+    def add_experiments(self, nwbfile: NWBFile, metadata: dict, preview_window: Optional[tuple[float, float]] = None):
         """Add experiments to the NWBFile.
 
         The start and stop times of the experiment intervals are extracted from the 'timeRange' field in the experiment log.
@@ -114,6 +137,9 @@ class LaChioma2024BehaviorInterface(BaseDataInterface):
             The in-memory object to add the data to.
         metadata : dict
             Metadata dictionary with information used to create the NWBFile.
+        preview_window : tuple[float, float], optional
+            The (start, stop) in seconds of the window of the session to which the experiments are restricted: the
+            experiments and the VR modes that overlap it, by default None (the whole session).
         """
         processed_data = self.read_data()
         experiment_log = processed_data["meta"]["expLog"]
@@ -135,6 +161,14 @@ class LaChioma2024BehaviorInterface(BaseDataInterface):
         for experiment_index, experiment in enumerate(experiment_log):
             # link the continuous data to the epoch (experiment)
             behavioral_time_series_name = f"behavioral_time_series_{experiment_index + 1}"
+            if preview_window is not None:
+                start_time, stop_time = experiment["timeRange"]
+                if not get_window_overlap_mask(
+                    start_times=start_time, stop_times=stop_time, preview_window=preview_window
+                ):
+                    continue
+                if behavioral_time_series_name not in behavior_module.data_interfaces:
+                    continue  # no wheel sample of the experiment in the window
             behavioral_time_series = behavior_module.get(behavioral_time_series_name).time_series
             timeseries = [timeseries for timeseries in behavioral_time_series.values()]
             # PlayWaves experiment without VR mode
@@ -176,6 +210,12 @@ class LaChioma2024BehaviorInterface(BaseDataInterface):
                     mode_list = [mode_list]
                     time_ranges = [time_ranges]
                 for mode_ind, mode in enumerate(mode_list):
+                    if preview_window is not None and not get_window_overlap_mask(
+                        start_times=time_ranges[mode_ind][0],
+                        stop_times=time_ranges[mode_ind][1],
+                        preview_window=preview_window,
+                    ):
+                        continue
                     experiment_intervals.add_interval(
                         start_time=time_ranges[mode_ind][0],
                         stop_time=time_ranges[mode_ind][1],
@@ -188,7 +228,14 @@ class LaChioma2024BehaviorInterface(BaseDataInterface):
 
         nwbfile.add_time_intervals(experiment_intervals)
 
-    def add_events(self, nwbfile: NWBFile, metadata: dict):
+    def add_events(
+        self,
+        nwbfile: NWBFile,
+        metadata: dict,
+        narrow_dtypes: bool = False,
+        preview_window: Optional[tuple[float, float]] = None,
+        verbose: bool = False,
+    ):
         processed_data = self.read_data()
         if "events" not in processed_data:
             warnings.warn(f"Expected 'events' key in the file, but found: {processed_data.keys()}")
@@ -203,6 +250,10 @@ class LaChioma2024BehaviorInterface(BaseDataInterface):
                     continue
                 stimulus_names.append(name)
         sound_events_data = pd.DataFrame(sound_events_data)
+        if preview_window is not None:
+            sound_events_data = sound_events_data[
+                get_window_mask(times=sound_events_data["time"], preview_window=preview_window)
+            ]
 
         columns_metadata = metadata["Behavior"]["AudioStimulus"]
         df_name_to_nwb_name = dict()
@@ -220,6 +271,15 @@ class LaChioma2024BehaviorInterface(BaseDataInterface):
             column_name_to_description[column_metadata["standardized_name"]] = column_metadata["description"]
             colnames.append(column_metadata["standardized_name"])
             df_name_to_nwb_name[column_metadata["name"]] = column_metadata["standardized_name"]
+        if narrow_dtypes:
+            column_name_to_data.update(
+                narrow_array_dtypes(
+                    name_to_array={
+                        colname: column_name_to_data[colname] for colname in colnames if colname != "presentation_time"
+                    },
+                    verbose=verbose,
+                )
+            )
         column_name_to_data["stimulus_name"] = np.array(stimulus_names)[sound_events_data["id"].to_numpy() - 1]
         column_name_to_description["stimulus_name"] = "Name of the stimulus ex. sound01_F2000_L65_D0.1+0.005"
         colnames.append("stimulus_name")
@@ -237,7 +297,14 @@ class LaChioma2024BehaviorInterface(BaseDataInterface):
 
         nwbfile.add_stimulus(audio_stimulus_table)
 
-    def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict, verbose: bool = False):
+    def add_to_nwbfile(
+        self,
+        nwbfile: NWBFile,
+        metadata: dict,
+        narrow_dtypes: bool = False,
+        preview_window: Optional[tuple[float, float]] = None,
+        verbose: bool = False,
+    ):
         """Add behavior data to the NWBFile.
 
         Parameters
@@ -246,12 +313,31 @@ class LaChioma2024BehaviorInterface(BaseDataInterface):
             The in-memory object to add the data to.
         metadata : dict
             Metadata dictionary with information used to create the NWBFile.
+        narrow_dtypes : bool, optional
+            Whether to store the wheel data and the columns of the audio stimulus table other than times in the narrowest
+            dtype in which they round-trip exactly, by default False.
+        preview_window : tuple[float, float], optional
+            The (start, stop) in seconds of the window of the session to which the behavior is restricted: the wheel
+            samples and the sound presentations in it, and the experiments that overlap it, by default None (the whole
+            session).
         verbose: bool, optional
             Whether to print extra information during the conversion, by default False.
         """
         # Add wheel data
-        self.add_continuous_data(nwbfile=nwbfile, metadata=metadata)
+        self.add_continuous_data(
+            nwbfile=nwbfile,
+            metadata=metadata,
+            narrow_dtypes=narrow_dtypes,
+            preview_window=preview_window,
+            verbose=verbose,
+        )
         # Add experiments
-        self.add_experiments(nwbfile=nwbfile, metadata=metadata)
+        self.add_experiments(nwbfile=nwbfile, metadata=metadata, preview_window=preview_window)
         # Add sound events
-        self.add_events(nwbfile=nwbfile, metadata=metadata)
+        self.add_events(
+            nwbfile=nwbfile,
+            metadata=metadata,
+            narrow_dtypes=narrow_dtypes,
+            preview_window=preview_window,
+            verbose=verbose,
+        )
@@ -2,10 +2,12 @@
 from pathlib import Path
 from zoneinfo import ZoneInfo
 import shutil
+from typing import Literal
 from pydantic import DirectoryPath, FilePath
 
 from neuroconv.utils import load_dict_from_file, dict_deep_update
 from schneider_lab_to_nwb.la_chioma_2024 import LaChioma2024NWBConverter
+from schneider_lab_to_nwb.tools import get_buffer_gb
 
 
 def session_to_nwb(
@@ -14,8 +16,15 @@ def session_to_nwb(
     ephys_folder_path: DirectoryPath | None = None,
     ap_stream_name: str | None = None,
     stub_test: bool = False,
+    preview_window: tuple[float, float] | None = None,
+    checkpoint: bool = False,
+    memory_budget_gb: float | None = None,
+    backend: Literal["hdf5", "zarr"] = "hdf5",
+    number_of_jobs: int = 1,
+    narrow_dtypes: bool = False,
+    metadata_only: bool = False,
     verbose: bool = True,
-):
+) -> dict | None:
     """
     Convert a session to NWB format.
 
@@ -31,11 +40,39 @@ def session_to_nwb(
         Path to output directory.
     stub_test : bool, default: False
         If True, truncates data for testing.
+    preview_window : tuple[float, float], optional
+        The (start, stop) in seconds of a window of the session to which every interface is restricted, for a quick
+        preview of the NWB file in a 'nwb_preview' subdirectory of output_dir_path. The recording, the wheel data and
+        the sound presentations are restricted to the window, the experiments to those that overlap it.
+    checkpoint : bool, default: False
+        If True, writes each interface in its own checkpointed step so that a failed conversion resumes on rerun.
+    memory_budget_gb : float, optional
+        Maximum memory in GB that the conversion should use, which sizes the buffers of the recording.
+    backend : Literal["hdf5", "zarr"], default: "hdf5"
+        The backend of the NWB file. Zarr files are written to a '.nwb.zarr' directory store.
+    number_of_jobs : int, default: 1
+        Number of processes that write the chunks of the recording in parallel with the Zarr backend.
+    narrow_dtypes : bool, default: False
+        If True, stores the wheel data and the audio stimulus columns in the narrowest dtype in which they round-trip
+        exactly (ex. integer-valued floats as small integers). Times are never narrowed. The narrowed dtypes depend on
+        the values of each session, so the same dataset or column may get different dtypes in different sessions.
+    metadata_only : bool, default: False
+        If True, only resolves the metadata and the path of the NWB file, from cheap sources (file names, the editable
+        metadata and the settings.xml file of the recording), without opening any data or writing anything.
     verbose : bool, default: True
         If True, prints progress information.
+
+    Returns
+    -------
+    dict | None
+        If metadata_only is True, a dictionary with the 'nwbfile_path', the 'metadata' and the 'source_data' of the
+        session. Otherwise None.
     """
     output_dir_path = Path(output_dir_path)
-    output_dir_path.mkdir(parents=True, exist_ok=True)
+    if preview_window is not None:
+        output_dir_path = output_dir_path / "nwb_preview"
+    if not metadata_only:
+        output_dir_path.mkdir(parents=True, exist_ok=True)
 
     source_data = dict()
     conversion_options = dict()
@@ -49,14 +86,22 @@ def session_to_nwb(
             dict(Recording=dict(folder_path=ephys_folder_path, stream_name=ap_stream_name, verbose=verbose))
         )
         conversion_options.update(dict(Recording=dict(stub_test=stub_test)))
+        if memory_budget_gb is not None:
+            buffer_gb = get_buffer_gb(memory_budget_gb=memory_budget_gb, in_memory_file_paths=[behavior_file_path])
+            conversion_options["Recording"]["iterator_opts"] = dict(buffer_gb=buffer_gb)
 
     # Add Behavior
     source_data.update(dict(Behavior=dict(file_path=behavior_file_path)))
-    conversion_options.update(dict(Behavior=dict()))
+    conversion_options.update(
+        dict(Behavior=dict(narrow_dtypes=narrow_dtypes, preview_window=preview_window, verbose=verbose))
+    )
 
     # Initialize converter
     converter = LaChioma2024NWBConverter(source_data=source_data, verbose=verbose)
-    metadata = converter.get_metadata()
+    if metadata_only:
+        metadata = converter.get_session_metadata()
+    else:
+        metadata = converter.get_metadata()
 
     # Add timezone for session start time
     session_start_time = metadata["NWBFile"]["session_start_time"]
@@ -74,12 +119,20 @@ def session_to_nwb(
     metadata["NWBFile"].update(session_id=session_id)
     metadata["Subject"].update(subject_id=subject_id)
 
-    nwbfile_path = Path(output_dir_path) / f"sub-{subject_id}_ses-{session_id}.nwb"
+    nwbfile_suffix = ".nwb.zarr" if backend == "zarr" else ".nwb"
+    nwbfile_path = Path(output_dir_path) / f"sub-{subject_id}_ses-{session_id}{nwbfile_suffix}"
+    if metadata_only:
+        return dict(nwbfile_path=nwbfile_path, metadata=metadata, source_data=source_data)
+
     # Run conversion
     converter.run_conversion(
         metadata=metadata,
         nwbfile_path=nwbfile_path,
         conversion_options=conversion_options,
+        checkpoint=checkpoint,
+        backend=backend,
+        number_of_jobs=number_of_jobs,
+        preview_window=preview_window,
     )
 
 
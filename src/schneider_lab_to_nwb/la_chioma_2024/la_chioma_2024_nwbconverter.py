@@ -1,14 +1,131 @@
 """Primary NWBConverter class for this dataset."""
-from neuroconv import NWBConverter
-from neuroconv.datainterfaces import OpenEphysBinaryRecordingInterface
+from typing import Optional
+
+from neuroconv.tools.nwb_helpers import get_default_nwbfile_metadata
+from neuroconv.utils import DeepDict
+from pynwb import NWBFile
 
 from schneider_lab_to_nwb.la_chioma_2024.la_chioma_2024_behaviorinterface import LaChioma2024BehaviorInterface
+from schneider_lab_to_nwb.la_chioma_2024.la_chioma_2024_open_ephys_recording_interface import (
+    LaChioma2024OpenEphysRecordingInterface,
+    get_session_start_time_from_settings,
+)
+from schneider_lab_to_nwb.tools import (
+    LazyNWBConverter,
+    add_sample_index_columns,
+    get_electrical_series_name,
+    restrict_recording_interface,
+    run_checkpointed_conversion,
+    run_zarr_conversion,
+)
 
 
-class LaChioma2024NWBConverter(NWBConverter):
+class LaChioma2024NWBConverter(LazyNWBConverter):
     """Primary conversion class."""
 
     data_interface_classes = dict(
-        Recording=OpenEphysBinaryRecordingInterface,
+        Recording=LaChioma2024OpenEphysRecordingInterface,
         Behavior=LaChioma2024BehaviorInterface,
     )
+
+    def get_session_metadata(self) -> DeepDict:
+        """Get the session-level metadata from cheap sources only, without initializing any data interface.
+
+        The session start time is read from the settings.xml file of the recording, when there is one. The subject and
+        the session come from the name of the behavior file, as for a full conversion.
+        """
+        metadata = get_default_nwbfile_metadata()
+        if "Recording" in self.data_interface_objects:
+            folder_path = self.data_interface_objects.source_data["Recording"]["folder_path"]
+            session_start_time = get_session_start_time_from_settings(folder_path=folder_path)
+            if session_start_time is not None:
+                metadata["NWBFile"]["session_start_time"] = session_start_time
+        return metadata
+
+    def temporally_align_data_interfaces(
+        self, metadata: dict | None = None, conversion_options: dict | None = None
+    ) -> None:
+        """Restrict the recording to the preview window, for a preview.
+
+        The behavior file is already on the clock of the recording, so there is nothing to align otherwise.
+        """
+        if self.preview_window is not None and "Recording" in self.data_interface_objects:
+            restrict_recording_interface(
+                recording_interface=self.data_interface_objects["Recording"], preview_window=self.preview_window
+            )
+
+    def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict, conversion_options: Optional[dict] = None):
+        """Add the data of all the data interfaces to the NWBFile, then the sample-index columns of its tables."""
+        super().add_to_nwbfile(nwbfile=nwbfile, metadata=metadata, conversion_options=conversion_options)
+        self.add_sample_index_columns(nwbfile=nwbfile, metadata=metadata)
+
+    def add_sample_index_columns(self, nwbfile: NWBFile, metadata: dict, time_series_nwbfile: Optional[NWBFile] = None):
+        """Add the sample indices of the start and stop times of the experiments into the recording to their table.
+
+        It is called by add_to_nwbfile() once every data interface has been added, and by the split conversion once
+        both NWBFiles are built, so that the rows can be sliced from the large streams without searching their
+        timestamps.
+
+        Parameters
+        ----------
+        nwbfile : NWBFile
+            The NWBFile with the tables.
+        metadata : dict
+            Metadata dictionary with information used to create the NWBFile.
+        time_series_nwbfile : NWBFile, optional
+            The NWBFile with the series, by default None (the same NWBFile).
+        """
+        time_series_nwbfile = time_series_nwbfile or nwbfile
+        intervals_name = metadata["Behavior"]["TimeIntervals"][0]["name"]
+        electrical_series_name = get_electrical_series_name(metadata=metadata)
+        if intervals_name in nwbfile.intervals and electrical_series_name in time_series_nwbfile.acquisition:
+            add_sample_index_columns(
+                table=nwbfile.intervals[intervals_name],
+                time_series=time_series_nwbfile.acquisition[electrical_series_name],
+                time_column_names=["start_time", "stop_time"],
+            )
+
+    def run_conversion(
+        self,
+        checkpoint: bool = False,
+        number_of_jobs: int = 1,
+        preview_window: Optional[tuple[float, float]] = None,
+        **kwargs,
+    ):
+        """Run the NWB conversion over all the instantiated data interfaces.
+
+        Parameters
+        ----------
+        checkpoint : bool, optional
+            Whether to write each interface to the NWB file in its own append step and record it in a completion
+            journal, so that a rerun after a failure skips the interfaces that were already written, by default False.
+            Only supported with the HDF5 backend.
+        number_of_jobs : int, optional
+            Number of processes that write the chunks of the large datasets in parallel when backend="zarr",
+            by default 1.
+        preview_window : tuple[float, float], optional
+            The (start, stop) in seconds of the window of the session to which the recording is restricted, by default
+            None (the whole session). The behavior is restricted through its 'preview_window' conversion option.
+        **kwargs
+            Keyword arguments passed to NWBConverter.run_conversion().
+        """
+        self.preview_window = preview_window
+        if kwargs.get("backend") == "zarr":
+            if checkpoint:
+                raise ValueError("Checkpointing is only supported with the HDF5 backend.")
+            run_zarr_conversion(
+                converter=self,
+                nwbfile_path=kwargs["nwbfile_path"],
+                metadata=kwargs["metadata"],
+                conversion_options=kwargs["conversion_options"],
+                number_of_jobs=number_of_jobs,
+            )
+        elif checkpoint:
+            run_checkpointed_conversion(
+                converter=self,
+                nwbfile_path=kwargs["nwbfile_path"],
+                metadata=kwargs["metadata"],
+                conversion_options=kwargs["conversion_options"],
+            )
+        else:
+            super().run_conversion(**kwargs)
@@ -0,0 +1,56 @@
+"""Primary class for converting OpenEphys Recordings."""
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+from xml.etree import ElementTree
+from pydantic import DirectoryPath
+from pynwb.file import NWBFile
+
+from neuroconv.datainterfaces import OpenEphysBinaryRecordingInterface
+
+from schneider_lab_to_nwb.tools import add_electrodes_in_bulk, admit_new_data_chunk_iterators
+
+
+class LaChioma2024OpenEphysRecordingInterface(OpenEphysBinaryRecordingInterface):
+    """OpenEphys RecordingInterface for la_chioma_2024 conversion."""
+
+    def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict, **conversion_options):
+        """Add the recording to an NWBFile.
+
+        Parameters
+        ----------
+        nwbfile : pynwb.NWBFile
+            The in-memory object to add the data to.
+        metadata : dict
+            Metadata dictionary with information used to create the NWBFile.
+        """
+        add_electrodes_in_bulk(recording=self.recording_extractor, nwbfile=nwbfile, metadata=metadata)
+        object_ids_before = {neurodata_object.object_id for neurodata_object in nwbfile.all_children()}
+        super().add_to_nwbfile(nwbfile=nwbfile, metadata=metadata, **conversion_options)
+        admit_new_data_chunk_iterators(
+            nwbfile=nwbfile, object_ids_before=object_ids_before, path=self.source_data["folder_path"]
+        )
+
+
+def get_session_start_time_from_settings(folder_path: DirectoryPath) -> Optional[datetime]:
+    """Get the session start time from the settings.xml file of an OpenEphys binary folder, without reading any data.
+
+    This is the date that OpenEphysBinaryRecordingInterface.get_metadata() uses, without initializing the extractor.
+
+    Parameters
+    ----------
+    folder_path : DirectoryPath
+        Path to the OpenEphys binary folder (ex. 'Record Node 102').
+
+    Returns
+    -------
+    Optional[datetime]
+        The session start time, or None if there is no settings.xml file or no date in it.
+    """
+    xml_file_paths = sorted(Path(folder_path).rglob("settings.xml"))
+    if len(xml_file_paths) == 0:
+        return None
+    date_str = ElementTree.parse(xml_file_paths[0]).getroot().findtext("./INFO/DATE")
+    if date_str is None:
+        return None
+    return datetime.strptime(date_str, "%d %b %Y %H:%M:%S")
@@ -0,0 +1,221 @@
+"""Generate a synthetic session of the La Chioma 2024 dataset, laid out as the example session, for benchmarks."""
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from pydantic import DirectoryPath
+
+from schneider_lab_to_nwb.tools import (
+    generate_spike_trains,
+    generate_traces,
+    write_mat_file,
+    write_open_ephys_binary_folder,
+)
+
+SOUND_NAMES = ("sound01_F2000_L65_D0.1+0.005.wav", "sound02_F8000_L65_D0.1+0.005.wav")
+
+
+def generate_synthetic_session(
+    *,
+    data_dir_path: DirectoryPath,
+    duration: float = 60.0,
+    has_ephys: bool = True,
+    num_channels: int = 384,
+    num_units: int = 64,
+    sampling_frequency: float = 30_000.0,
+    wheel_sampling_frequency: float = 1_000.0,
+    sound_sampling_frequency: float = 96_000.0,
+    seed: int = 0,
+) -> dict:
+    """Generate the raw data of a session of subject AL240404c on 2024-04-22 in data_dir_path, as the example session.
+
+    The session has a '_syncedData.mat' file, with the wheel, the sound events and the log of two experiments (a VR
+    experiment, with two VR modes, followed by a PlayWaves experiment, which plays each sound in turn), and, optionally,
+    an OpenEphys binary record node with the AP stream of a Neuropixels 1.0 probe. All the times are on the clock of the
+    recording.
+
+    Parameters
+    ----------
+    data_dir_path : DirectoryPath
+        The path to the directory of the synthetic session.
+    duration : float, optional
+        The duration of the session, in seconds, by default 60.0.
+    has_ephys : bool, optional
+        Whether to generate the recording, by default True.
+    num_channels : int, optional
+        The number of channels of the recording, by default 384.
+    num_units : int, optional
+        The number of units whose spikes are in the recording, by default 64.
+    sampling_frequency : float, optional
+        The sampling frequency of the recording, in Hz, by default 30_000.0.
+    wheel_sampling_frequency : float, optional
+        The sampling frequency of the wheel, in Hz, by default 1_000.0.
+    sound_sampling_frequency : float, optional
+        The sampling frequency of the sounds, in Hz, by default 96_000.0.
+    seed : int, optional
+        The seed of the random generators, by default 0.
+
+    Returns
+    -------
+    dict
+        The kwargs of session_to_nwb() for the session, except output_dir_path.
+    """
+    data_dir_path = Path(data_dir_path)
+    subject_id, session_id = "AL240404c", "2024-04-22"
+    session_start_time = datetime(2024, 4, 22, 17, 45, 19)
+    behavior_file_path = data_dir_path / f"{subject_id}_{session_id}_syncedData.mat"
+    behavior = get_synthetic_behavior(
+        duration=duration,
+        wheel_sampling_frequency=wheel_sampling_frequency,
+        sound_sampling_frequency=sound_sampling_frequency,
+        seed=seed,
+    )
+    write_mat_file(file_path=behavior_file_path, variables=behavior)
+    session_to_nwb_kwargs = dict(behavior_file_path=behavior_file_path)
+    if not has_ephys:
+        return session_to_nwb_kwargs
+
+    ephys_folder_path = (
+        data_dir_path / "DataEphys" / f"{subject_id}_{session_start_time:%Y-%m-%d_%H-%M-%S}" / "Record Node 102"
+    )
+    num_samples = int(duration * sampling_frequency)
+    spike_samples, spike_units = generate_spike_trains(
+        num_samples=num_samples, num_units=num_units, sampling_frequency=sampling_frequency, seed=seed
+    )
+    write_open_ephys_binary_folder(
+        folder_path=ephys_folder_path,
+        traces=generate_traces(
+            num_samples=num_samples,
+            num_channels=num_channels,
+            spike_samples=spike_samples,
+            spike_units=spike_units,
+            seed=seed,
+        ),
+        num_channels=num_channels,
+        sampling_frequency=sampling_frequency,
+        session_start_time=session_start_time,
+    )
+    session_to_nwb_kwargs.update(
+        ephys_folder_path=ephys_folder_path, ap_stream_name="Record Node 102#Neuropix-PXI-100.ProbeA"
+    )
+    return session_to_nwb_kwargs
+
+
+def get_synthetic_behavior(
+    duration: float,
+    wheel_sampling_frequency: float = 1_000.0,
+    sound_sampling_frequency: float = 96_000.0,
+    sound_interval: float = 1.0,
+    seed: int = 0,
+) -> dict:
+    """Get the variables of a synthetic '_syncedData.mat' file, with a VR experiment and a PlayWaves experiment.
+
+    Parameters
+    ----------
+    duration : float
+        The duration of the session, in seconds.
+    wheel_sampling_frequency : float, optional
+        The sampling frequency of the wheel, in Hz, by default 1_000.0.
+    sound_sampling_frequency : float, optional
+        The sampling frequency of the sounds, in Hz, by default 96_000.0.
+    sound_interval : float, optional
+        The mean interval between two sounds, in seconds, by default 1.0.
+    seed : int, optional
+        The seed of the random generator, by default 0.
+
+    Returns
+    -------
+    dict
+        The 'continuous', 'events' and 'meta' variables, for write_mat_file().
+    """
+    rng = np.random.default_rng(seed)
+    boundaries = np.array([0.5, 0.5 + 0.6 * (duration - 1.0), duration - 0.5])
+    experiment_time_ranges = np.stack([boundaries[:-1], boundaries[1:]], axis=1)
+    radius_wheel_cm = 8.5
+
+    # Wheel, on the same clock across experiments
+    wheel_times, wheel_experiment_indices = [], []
+    for experiment_index, (start_time, stop_time) in enumerate(experiment_time_ranges):
+        times = np.arange(start_time, stop_time, 1 / wheel_sampling_frequency)
+        wheel_times.append(times)
+        wheel_experiment_indices.append(np.full(len(times), experiment_index + 1, dtype="uint8"))
+    wheel_times = np.concatenate(wheel_times)
+    rpm = np.clip(np.cumsum(rng.normal(0.0, 0.5, size=len(wheel_times))), 0.0, None)
+    cm_per_second = 2 * np.pi * radius_wheel_cm * rpm / 60
+    position = np.cumsum(np.round(rpm * 1024 / 60 / wheel_sampling_frequency))
+    wheel = dict(
+        time=wheel_times,
+        expIdx=np.concatenate(wheel_experiment_indices),
+        RPM=rpm,
+        cmPS=cm_per_second,
+        posRotaryEncoder=position,
+    )
+
+    # Sound events, with integer indices as in the lab's files: random sounds during the VR experiment, then each sound
+    # in turn during the PlayWaves experiment
+    vr_mode_boundaries = np.linspace(*experiment_time_ranges[0], 3)
+    vr_mode_time_ranges = np.stack([vr_mode_boundaries[:-1], vr_mode_boundaries[1:]], axis=1)
+    vr_modes = np.array([1, 2], dtype="uint8")
+    sound_events = dict(time=[], expIdx=[], id=[], flag_dropout=[], contextIdx=[], Mode=[], ModeIdx=[], cmPS=[])
+    for experiment_index, (start_time, stop_time) in enumerate(experiment_time_ranges):
+        sound_times = np.arange(start_time + 0.2, stop_time - 0.2, sound_interval)
+        sound_times = sound_times + rng.uniform(0.0, sound_interval / 4, size=len(sound_times))
+        if experiment_index == 0:
+            sound_ids = rng.integers(1, len(SOUND_NAMES) + 1, size=len(sound_times))
+            mode_indices = np.searchsorted(vr_mode_boundaries[1:-1], sound_times, side="right")
+            modes, mode_ids = vr_modes[mode_indices], mode_indices + 1
+        else:
+            sound_ids = np.arange(len(sound_times)) % len(SOUND_NAMES) + 1
+            modes, mode_ids = np.zeros(len(sound_times), dtype="uint8"), np.zeros(len(sound_times), dtype="int64")
+        sound_events["time"].append(sound_times)
+        sound_events["expIdx"].append(np.full(len(sound_times), experiment_index + 1, dtype="uint8"))
+        sound_events["id"].append(sound_ids.astype("uint8"))
+        sound_events["flag_dropout"].append(rng.random(len(sound_times)) < 0.02)
+        sound_events["contextIdx"].append(rng.integers(1, 3, size=len(sound_times)).astype("uint8"))
+        sound_events["Mode"].append(modes)
+        sound_events["ModeIdx"].append(mode_ids.astype("uint8"))
+        sound_events["cmPS"].append(np.interp(sound_times, wheel_times, cm_per_second))
+    sound_events = {name: np.concatenate(values) for name, values in sound_events.items()}
+
+    # Experiment log
+    sounds_data = [
+        _get_tone(frequency=frequency, sampling_frequency=sound_sampling_frequency) for frequency in (2000.0, 8000.0)
+    ]
+    sound = dict(names=list(SOUND_NAMES), data=sounds_data)
+    sound_log = dict(sounds=dict(soundFS=np.full(len(SOUND_NAMES), sound_sampling_frequency)))
+    experiment_log = [
+        dict(
+            type="VR",
+            timeRange=experiment_time_ranges[0],
+            movs=dict(radiusWheel_cm=radius_wheel_cm),
+            sound=sound,
+            vrOutAudLog=sound_log,
+            Mode=dict(timeRanges=vr_mode_time_ranges, list=vr_modes),
+        ),
+        dict(
+            type="PlayWaves",
+            timeRange=experiment_time_ranges[1],
+            movs=dict(radiusWheel_cm=radius_wheel_cm),
+            sound=sound,
+            vrOutAudLog=sound_log,
+        ),
+    ]
+    return dict(continuous=dict(wheel=wheel), events=dict(sound=sound_events), meta=dict(expLog=experiment_log))
+
+
+def _get_tone(frequency: float, sampling_frequency: float, duration: float = 0.105) -> np.ndarray:
+    """Get the 4 channels that PlayWaves logs for a tone: the tone, a copy of it and two TTL channels."""
+    times = np.arange(int(duration * sampling_frequency)) / sampling_frequency
+    ramp = np.clip(np.minimum(times, duration - times) / 0.005, 0.0, 1.0)
+    tone = 0.5 * ramp * np.sin(2 * np.pi * frequency * times)
+    ttl = (times < 0.01).astype("float64")
+    return np.stack([tone, tone, ttl, ttl], axis=1)
+
+
+if __name__ == "__main__":
+
+    # Parameters for the synthetic session
+    data_dir_path = Path("/Volumes/T7/CatalystNeuro/Schneider/SyntheticData/LaChioma")
+    duration = 600.0
+
+    print(generate_synthetic_session(data_dir_path=data_dir_path, duration=duration))
@@ -0,0 +1,145 @@
+"""Tools shared by the conversions.
+
+The public classes and functions are imported lazily, on first attribute access, so that importing the package does
+not import neuroconv, spikeinterface, pynwb and the other heavy dependencies until they are needed.
+"""
+from typing import TYPE_CHECKING
+
+from .lazy_exports import get_lazy_attribute_functions
+
+if TYPE_CHECKING:
+    from .checkpointing import ConversionJournal, run_checkpointed_conversion
+    from .work_queue import FileLockWorkQueue
+    from .memory_budget import get_buffer_gb
+    from .io_admission import configure_io_admission, io_admission, get_io_slot, load_max_readers_per_storage_root
+    from .staging import SessionStager, move_file_atomically
+    from .supervised_pool import SupervisedProcessPool, WorkerCrashedError
+    from .data_chunk_iterators import (
+        MemmapDataChunkIterator,
+        PicklableRecordingDataChunkIterator,
+        admit_new_data_chunk_iterators,
+        create_temporary_memmap,
+    )
+    from .zarr_backend import run_zarr_conversion
+    from .analysis_cache import update_analysis_cache
+    from .lazy_interfaces import LazyDataInterfaceObjects, LazyNWBConverter
+    from .worker_startup import get_preloading_mp_context, preload_modules
+    from .prefetch import prefetch_data_interfaces
+    from .video_probing import probe_video, probe_videos, validate_video_timestamps
+    from .motion_energy import MotionEnergyInterface, compute_motion_energy
+    from .video_transcoding import transcode_video
+    from .split_layout import (
+        get_companion_nwbfile_path,
+        is_companion_nwbfile_path,
+        link_companion_nwbfile,
+        run_split_conversion,
+    )
+    from .metadata_refresh import refresh_nwbfile_metadata, refresh_nwbfiles_metadata
+    from .watching import FileStabilityTracker, MtimeIndexedScanner
+    from .sample_index import (
+        add_sample_index_columns,
+        get_electrical_series_name,
+        get_sample_indices,
+        read_peri_event_windows,
+    )
+    from .dtype_narrowing import get_narrowest_dtype, narrow_array_dtypes, narrow_dtype
+    from .electrodes import add_electrodes_in_bulk, get_electrode_table_indices
+    from .verification import (
+        verify_dataset,
+        verify_value,
+        run_verification,
+        format_verification_report,
+        save_verification_report,
+    )
+    from .synthetic_data import (
+        generate_spike_trains,
+        generate_traces,
+        write_binary_traces,
+        write_open_ephys_legacy_folder,
+        write_open_ephys_binary_folder,
+        write_open_ephys_settings,
+        write_phy_folder,
+        write_video,
+        write_image,
+        write_mat_file,
+    )
+    from .preview import (
+        get_window_mask,
+        get_window_overlap_mask,
+        get_window_slice,
+        restrict_recording_interface,
+        restrict_sorting_interface,
+    )
+
+_attribute_name_to_module_name = dict(
+    ConversionJournal=".checkpointing",
+    run_checkpointed_conversion=".checkpointing",
+    FileLockWorkQueue=".work_queue",
+    get_buffer_gb=".memory_budget",
+    configure_io_admission=".io_admission",
+    io_admission=".io_admission",
+    get_io_slot=".io_admission",
+    load_max_readers_per_storage_root=".io_admission",
+    SessionStager=".staging",
+    move_file_atomically=".staging",
+    SupervisedProcessPool=".supervised_pool",
+    WorkerCrashedError=".supervised_pool",
+    MemmapDataChunkIterator=".data_chunk_iterators",
+    PicklableRecordingDataChunkIterator=".data_chunk_iterators",
+    admit_new_data_chunk_iterators=".data_chunk_iterators",
+    create_temporary_memmap=".data_chunk_iterators",
+    run_zarr_conversion=".zarr_backend",
+    update_analysis_cache=".analysis_cache",
+    LazyDataInterfaceObjects=".lazy_interfaces",
+    LazyNWBConverter=".lazy_interfaces",
+    get_preloading_mp_context=".worker_startup",
+    preload_modules=".worker_startup",
+    prefetch_data_interfaces=".prefetch",
+    probe_video=".video_probing",
+    probe_videos=".video_probing",
+    validate_video_timestamps=".video_probing",
+    MotionEnergyInterface=".motion_energy",
+    compute_motion_energy=".motion_energy",
+    transcode_video=".video_transcoding",
+    get_companion_nwbfile_path=".split_layout",
+    is_companion_nwbfile_path=".split_layout",
+    link_companion_nwbfile=".split_layout",
+    run_split_conversion=".split_layout",
+    refresh_nwbfile_metadata=".metadata_refresh",
+    refresh_nwbfiles_metadata=".metadata_refresh",
+    FileStabilityTracker=".watching",
+    MtimeIndexedScanner=".watching",
+    add_sample_index_columns=".sample_index",
+    get_electrical_series_name=".sample_index",
+    get_sample_indices=".sample_index",
+    read_peri_event_windows=".sample_index",
+    get_narrowest_dtype=".dtype_narrowing",
+    narrow_array_dtypes=".dtype_narrowing",
+    narrow_dtype=".dtype_narrowing",
+    add_electrodes_in_bulk=".electrodes",
+    get_electrode_table_indices=".electrodes",
+    verify_dataset=".verification",
+    verify_value=".verification",
+    run_verification=".verification",
+    format_verification_report=".verification",
+    save_verification_report=".verification",
+    generate_spike_trains=".synthetic_data",
+    generate_traces=".synthetic_data",
+    write_binary_traces=".synthetic_data",
+    write_open_ephys_legacy_folder=".synthetic_data",
+    write_open_ephys_binary_folder=".synthetic_data",
+    write_open_ephys_settings=".synthetic_data",
+    write_phy_folder=".synthetic_data",
+    write_video=".synthetic_data",
+    write_image=".synthetic_data",
+    write_mat_file=".synthetic_data",
+    get_window_mask=".preview",
+    get_window_overlap_mask=".preview",
+    get_window_slice=".preview",
+    restrict_recording_interface=".preview",
+    restrict_sorting_interface=".preview",
+)
+
+__all__ = list(_attribute_name_to_module_name)
+
+__getattr__, __dir__ = get_lazy_attribute_functions(globals(), _attribute_name_to_module_name)
@@ -0,0 +1,333 @@
+"""
+Script to export the tables of converted NWB files into a columnar cache for cross-session analysis.
+
+Every table of every session (trials, epochs and other time intervals, stimulus tables, events and valued events) is
+written to a Parquet dataset per table, partitioned by subject and session, along with a 'sessions' dataset that holds
+the session-level metadata. The cache is updated incrementally: only the NWB files that are new or changed since the
+last export are read again, and the partitions of deleted files are removed.
+
+Typical usage example:
+    python -m schneider_lab_to_nwb.tools.analysis_cache --folder_path nwb_output --cache_path analysis_cache
+
+The cache can then be queried across sessions without opening any NWB file, for example:
+    trials = pd.read_parquet("analysis_cache/trials", filters=[("subject_id", "==", "m53")])
+"""
+import argparse
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from hdmf.common import DynamicTable, VectorIndex
+from hdmf_zarr.nwb import NWBZarrIO
+from ndx_events import AnnotatedEventsTable, Events
+from pydantic import DirectoryPath, FilePath
+from pynwb import NWBHDF5IO, NWBFile
+
+from .split_layout import is_companion_nwbfile_path
+
+MANIFEST_FILE_NAME = "_manifest.json"  # the leading underscore keeps it out of the Parquet datasets
+PARTITION_FILE_NAME = "part-0.parquet"
+EXCLUDED_TABLE_NAMES = ("electrodes", "units")  # large or not analysis-ready, and read from the NWB files directly
+
+
+def get_partition_dir_path(cache_dir_path: DirectoryPath, table_name: str, subject_id: str, session_id: str) -> Path:
+    """Get the Hive-style partition directory of a table for one session."""
+    return Path(cache_dir_path) / table_name / f"subject_id={subject_id}" / f"session_id={session_id}"
+
+
+def _to_columnar(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """Keep the columns that can be stored in Parquet, converting ragged columns to lists.
+
+    Integer and float columns are widened to int64 and float64, so that the partitions of a table share the dtype of a
+    column even when the sessions were written with different narrowed dtypes (ex. uint8 and uint16).
+    """
+    columns = dict()
+    for column_name, values in dataframe.items():
+        if values.dtype.kind in ("i", "u"):
+            columns[column_name] = values.astype("int64")
+            continue
+        if values.dtype.kind == "f":
+            columns[column_name] = values.astype("float64")
+            continue
+        if values.dtype != object:
+            columns[column_name] = values
+            continue
+        if all(isinstance(value, (str, bytes, int, float, np.generic)) for value in values):
+            columns[column_name] = values
+        elif all(isinstance(value, (list, tuple, np.ndarray)) for value in values):
+            columns[column_name] = [np.asarray(value).tolist() for value in values]
+        # Other columns, such as references to TimeSeries, have no columnar equivalent and are dropped
+    return pd.DataFrame(columns, index=dataframe.index)
+
+
+def get_events_dataframe(events: list[Events]) -> pd.DataFrame:
+    """Get the timestamps of Events objects as a long table with one row per event."""
+    event_dataframes = [
+        pd.DataFrame(dict(event_name=event.name, timestamp=np.asarray(event.timestamps[:]))) for event in events
+    ]
+    return pd.concat(event_dataframes, ignore_index=True)
+
+
+def get_valued_events_dataframe(annotated_events_table: AnnotatedEventsTable) -> pd.DataFrame:
+    """Get an AnnotatedEventsTable as a long table with one row per event, instead of one row per event type."""
+    ragged_column_names = [
+        column_name
+        for column_name in annotated_events_table.colnames
+        if isinstance(annotated_events_table[column_name], VectorIndex)
+    ]
+    dataframe = annotated_events_table.to_dataframe().explode(ragged_column_names, ignore_index=True)
+    dataframe = dataframe.rename(columns=dict(label="event_name", event_times="timestamp"))
+    return dataframe.infer_objects()
+
+
+def get_sessions_dataframe(nwbfile: NWBFile, nwbfile_path: FilePath) -> pd.DataFrame:
+    """Get the session-level metadata of an NWBFile as a single row."""
+    session = dict(
+        identifier=nwbfile.identifier,
+        session_description=nwbfile.session_description,
+        session_start_time=pd.Timestamp(nwbfile.session_start_time),
+        experimenter=list(nwbfile.experimenter or []),
+        institution=nwbfile.institution,
+        lab=nwbfile.lab,
+        num_trials=0 if nwbfile.trials is None else len(nwbfile.trials),
+        nwbfile_path=str(nwbfile_path),
+    )
+    if nwbfile.subject is not None:
+        for field_name in ("species", "sex", "age", "genotype", "strain", "description"):
+            session[f"subject_{field_name}"] = getattr(nwbfile.subject, field_name, None)
+        if nwbfile.subject.date_of_birth is not None:
+            session["subject_date_of_birth"] = pd.Timestamp(nwbfile.subject.date_of_birth)
+    return pd.DataFrame([session])
+
+
+def get_analysis_tables(nwbfile: NWBFile, nwbfile_path: FilePath) -> dict[str, pd.DataFrame]:
+    """Get every table of an NWBFile that goes into the analysis cache, by name.
+
+    Parameters
+    ----------
+    nwbfile : NWBFile
+        The NWBFile, read from nwbfile_path.
+    nwbfile_path : FilePath
+        Path to the NWB file, recorded in the session-level metadata.
+
+    Returns
+    -------
+    dict[str, pd.DataFrame]
+        Mapping from table name to its contents.
+    """
+    tables = dict(sessions=get_sessions_dataframe(nwbfile=nwbfile, nwbfile_path=nwbfile_path))
+    events = []
+    for neurodata_object in nwbfile.all_children():
+        if isinstance(neurodata_object, Events):
+            events.append(neurodata_object)
+        elif isinstance(neurodata_object, AnnotatedEventsTable):
+            if len(neurodata_object) > 0:
+                tables[neurodata_object.name] = get_valued_events_dataframe(annotated_events_table=neurodata_object)
+        elif isinstance(neurodata_object, DynamicTable):
+            if neurodata_object.name in EXCLUDED_TABLE_NAMES or len(neurodata_object) == 0:
+                continue
+            dataframe = neurodata_object.to_dataframe(index=True).reset_index()
+            tables[neurodata_object.name] = _to_columnar(dataframe=dataframe)
+    if len(events) > 0:
+        tables["events"] = get_events_dataframe(events=events)
+    return tables
+
+
+def export_nwbfile_to_analysis_cache(nwbfile_path: FilePath, cache_dir_path: DirectoryPath) -> dict:
+    """Write the tables of one NWB file to its partitions of the analysis cache.
+
+    Each partition is written under a temporary name and then renamed into place, so readers of the cache never see
+    a partially written file.
+
+    Parameters
+    ----------
+    nwbfile_path : FilePath
+        Path to the NWB file (HDF5 or Zarr) to export.
+    cache_dir_path : DirectoryPath
+        Path to the root directory of the analysis cache.
+
+    Returns
+    -------
+    dict
+        The manifest entry of the file, with the subject and session ids and the names of the written tables.
+    """
+    nwbfile_path = Path(nwbfile_path)
+    mtime_ns, size = get_modification_signature(nwbfile_path=nwbfile_path)
+    io_class = NWBZarrIO if nwbfile_path.suffix == ".zarr" else NWBHDF5IO
+    with io_class(str(nwbfile_path), mode="r", load_namespaces=True) as io:
+        nwbfile = io.read()
+        subject_id = nwbfile.subject.subject_id if nwbfile.subject is not None else "unknown"
+        session_id = nwbfile.session_id if nwbfile.session_id is not None else nwbfile.identifier
+        tables = get_analysis_tables(nwbfile=nwbfile, nwbfile_path=nwbfile_path)
+
+    for table_name, dataframe in tables.items():
+        partition_dir_path = get_partition_dir_path(
+            cache_dir_path=cache_dir_path, table_name=table_name, subject_id=subject_id, session_id=session_id
+        )
+        partition_dir_path.mkdir(parents=True, exist_ok=True)
+        partition_file_path = partition_dir_path / PARTITION_FILE_NAME
+        temporary_file_path = partition_dir_path / f".{PARTITION_FILE_NAME}.partial"
+        dataframe.to_parquet(temporary_file_path, index=False)
+        os.replace(temporary_file_path, partition_file_path)
+    return dict(
+        mtime_ns=mtime_ns,
+        size=size,
+        subject_id=subject_id,
+        session_id=session_id,
+        table_names=sorted(tables),
+    )
+
+
+def load_manifest(cache_dir_path: DirectoryPath) -> dict:
+    """Load the manifest of the analysis cache, which maps each exported NWB file to its manifest entry."""
+    manifest_file_path = Path(cache_dir_path) / MANIFEST_FILE_NAME
+    if not manifest_file_path.exists():
+        return dict()
+    with open(manifest_file_path, mode="r") as f:
+        return json.load(f)
+
+
+def save_manifest(cache_dir_path: DirectoryPath, manifest: dict):
+    """Save the manifest of the analysis cache atomically."""
+    manifest_file_path = Path(cache_dir_path) / MANIFEST_FILE_NAME
+    temporary_file_path = manifest_file_path.with_name(manifest_file_path.name + ".partial")
+    with open(temporary_file_path, mode="w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temporary_file_path, manifest_file_path)
+
+
+def remove_session_partitions(cache_dir_path: DirectoryPath, manifest_entry: dict):
+    """Remove every partition written for a manifest entry."""
+    for table_name in manifest_entry["table_names"]:
+        partition_dir_path = get_partition_dir_path(
+            cache_dir_path=cache_dir_path,
+            table_name=table_name,
+            subject_id=manifest_entry["subject_id"],
+            session_id=manifest_entry["session_id"],
+        )
+        shutil.rmtree(partition_dir_path, ignore_errors=True)
+        try:  # remove the subject partition once its last session is gone
+            partition_dir_path.parent.rmdir()
+        except OSError:
+            pass
+
+
+def get_modification_signature(nwbfile_path: FilePath) -> tuple[int, int]:
+    """Get the modification time (in ns) and the size of an NWB file.
+
+    For an NWB-Zarr directory store, whose top-level directory is not modified when its chunks are rewritten, these are
+    the newest modification time and the total size of the files and directories of the whole tree.
+    """
+    nwbfile_path = Path(nwbfile_path)
+    stat = nwbfile_path.stat()
+    if not nwbfile_path.is_dir():
+        return stat.st_mtime_ns, stat.st_size
+    mtime_ns, size = stat.st_mtime_ns, 0
+    for dir_path, dir_names, file_names in os.walk(nwbfile_path):
+        for name in dir_names + file_names:
+            stat = os.stat(os.path.join(dir_path, name))
+            mtime_ns = max(mtime_ns, stat.st_mtime_ns)
+            if name in file_names:
+                size += stat.st_size
+    return mtime_ns, size
+
+
+def is_up_to_date(nwbfile_path: FilePath, manifest_entry: dict) -> bool:
+    """Whether an NWB file is unchanged since it was exported, according to its size and modification time."""
+    mtime_ns, size = get_modification_signature(nwbfile_path=nwbfile_path)
+    return mtime_ns == manifest_entry["mtime_ns"] and size == manifest_entry["size"]
+
+
+def update_analysis_cache(
+    nwb_folder_path: DirectoryPath,
+    cache_dir_path: DirectoryPath,
+    max_workers: int = 1,
+    verbose: bool = False,
+):
+    """Export every new or changed 'sub-*_ses-*.nwb' file of a folder to the analysis cache.
+
+    Parameters
+    ----------
+    nwb_folder_path : DirectoryPath
+        Path to the folder with the NWB files.
+    cache_dir_path : DirectoryPath
+        Path to the root directory of the analysis cache.
+    max_workers : int, optional
+        Number of files exported in parallel, by default 1.
+    verbose : bool, optional
+        Whether to print verbose output, by default False.
+    """
+    nwb_folder_path = Path(nwb_folder_path)
+    cache_dir_path = Path(cache_dir_path)
+    cache_dir_path.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(cache_dir_path=cache_dir_path)
+    nwbfile_paths = sorted(
+        nwbfile_path
+        for nwbfile_path in set(nwb_folder_path.glob("sub-*_ses-*.nwb"))
+        | set(nwb_folder_path.glob("sub-*_ses-*.nwb.zarr"))
+        if not is_companion_nwbfile_path(nwbfile_path=nwbfile_path)  # its streams are read through the session file
+    )
+    nwbfile_names = {nwbfile_path.name for nwbfile_path in nwbfile_paths}
+
+    for nwbfile_name in sorted(set(manifest) - nwbfile_names):
+        remove_session_partitions(cache_dir_path=cache_dir_path, manifest_entry=manifest.pop(nwbfile_name))
+        if verbose:
+            print(f"Removed {nwbfile_name} from the analysis cache")
+    stale_nwbfile_paths = []
+    for nwbfile_path in nwbfile_paths:
+        manifest_entry = manifest.get(nwbfile_path.name)
+        if manifest_entry is not None and is_up_to_date(nwbfile_path=nwbfile_path, manifest_entry=manifest_entry):
+            continue
+        if manifest_entry is not None:  # the session may have been renamed or may have lost a table
+            remove_session_partitions(cache_dir_path=cache_dir_path, manifest_entry=manifest.pop(nwbfile_path.name))
+        stale_nwbfile_paths.append(nwbfile_path)
+    save_manifest(cache_dir_path=cache_dir_path, manifest=manifest)
+    if verbose:
+        print(f"Exporting {len(stale_nwbfile_paths)} of {len(nwbfile_paths)} NWB files to {cache_dir_path}")
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        future_to_nwbfile_path = dict()
+        for nwbfile_path in stale_nwbfile_paths:
+            future = executor.submit(
+                export_nwbfile_to_analysis_cache, nwbfile_path=nwbfile_path, cache_dir_path=cache_dir_path
+            )
+            future_to_nwbfile_path[future] = nwbfile_path
+        for future in as_completed(future_to_nwbfile_path):
+            nwbfile_path = future_to_nwbfile_path[future]
+            exception = future.exception()
+            if exception is not None:
+                print(f"Failed to export {nwbfile_path}: {exception!r}")
+                continue
+            manifest[nwbfile_path.name] = future.result()
+            save_manifest(cache_dir_path=cache_dir_path, manifest=manifest)
+            if verbose:
+                print(f"Exported {nwbfile_path}")
+
+
+def main():
+    """
+    Command-line interface for updating the analysis cache.
+
+    Parses arguments and calls update_analysis_cache().
+    """
+    parser = argparse.ArgumentParser(description="Export the tables of NWB files to a Parquet analysis cache.")
+    parser.add_argument("--folder_path", type=str, required=True, help="Path to a folder of 'sub-*_ses-*.nwb' files.")
+    parser.add_argument("--cache_path", type=str, required=True, help="Path to the root of the analysis cache.")
+    parser.add_argument("--max_workers", type=int, default=1, help="Number of files exported in parallel.")
+    parser.add_argument("--verbose", action="store_true", help="Print detailed information.")
+    args = parser.parse_args()
+
+    update_analysis_cache(
+        nwb_folder_path=args.folder_path,
+        cache_dir_path=args.cache_path,
+        max_workers=args.max_workers,
+        verbose=args.verbose,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Interface-level checkpointing so that a failed conversion can resume instead of restarting."""
+import hashlib
+import json
+from copy import deepcopy
+from pathlib import Path
+from typing import Callable, Optional
+
+from pydantic import FilePath
+from pynwb import NWBHDF5IO, NWBFile
+from neuroconv import NWBConverter
+from neuroconv.tools.nwb_helpers import (
+    configure_backend,
+    get_default_backend_configuration,
+    make_nwbfile_from_metadata,
+)
+
+
+class ConversionJournal:
+    """Completion journal stored next to an NWB file that records which interfaces have been written to it."""
+
+    def __init__(self, nwbfile_path: FilePath):
+        """Initialize the journal.
+
+        Parameters
+        ----------
+        nwbfile_path : FilePath
+            Path to the NWB file that this journal tracks. The journal is stored at '<nwbfile_path>.journal.json'.
+        """
+        self.nwbfile_path = Path(nwbfile_path)
+        self.journal_path = self.nwbfile_path.with_name(self.nwbfile_path.name + ".journal.json")
+        self.metadata_fingerprint = None
+        self.completed_interfaces = dict()
+        if self.journal_path.exists():
+            with open(self.journal_path, mode="r") as f:
+                journal = json.load(f)
+            self.metadata_fingerprint = journal["metadata_fingerprint"]
+            self.completed_interfaces = journal["completed_interfaces"]
+
+    def save(self):
+        """Atomically write the journal to disk."""
+        journal = dict(
+            metadata_fingerprint=self.metadata_fingerprint,
+            completed_interfaces=self.completed_interfaces,
+        )
+        temporary_journal_path = self.journal_path.with_name(self.journal_path.name + ".tmp")
+        with open(temporary_journal_path, mode="w") as f:
+            json.dump(journal, f, indent=2)
+        temporary_journal_path.replace(self.journal_path)
+
+    def reset(self, metadata_fingerprint: str):
+        """Forget every completed interface and remove the (partial) NWB file.
+
+        Parameters
+        ----------
+        metadata_fingerprint : str
+            Fingerprint of the metadata used to create the new NWB file.
+        """
+        self.nwbfile_path.unlink(missing_ok=True)
+        self.metadata_fingerprint = metadata_fingerprint
+        self.completed_interfaces = dict()
+        self.save()
+
+    def is_complete(self, interface_name: str, fingerprint: str) -> bool:
+        """Whether the interface has already been written with the same source data and conversion options."""
+        entry = self.completed_interfaces.get(interface_name)
+        return entry is not None and entry["fingerprint"] == fingerprint
+
+    def mark_complete(self, interface_name: str, fingerprint: str, object_ids: list[str]):
+        """Record that the interface has been written, along with the ids of the objects it added to the file."""
+        self.completed_interfaces[interface_name] = dict(fingerprint=fingerprint, object_ids=sorted(object_ids))
+        self.save()
+
+    def validate_nwbfile(self) -> bool:
+        """Check that the NWB file can be opened and contains every object recorded in the journal."""
+        if not self.nwbfile_path.exists():
+            return False
+        try:
+            with NWBHDF5IO(str(self.nwbfile_path), mode="r", load_namespaces=True) as io:
+                nwbfile = io.read()
+                object_ids_in_file = set(nwbfile.objects)
+        except Exception:
+            return False
+        recorded_object_ids = {
+            object_id for entry in self.completed_interfaces.values() for object_id in entry["object_ids"]
+        }
+        return recorded_object_ids.issubset(object_ids_in_file)
+
+
+# The name under which the sample-index columns of the converter (see add_sample_index_columns()) are journaled
+SAMPLE_INDEX_COLUMNS_STEP_NAME = "SampleIndexColumns"
+
+# Metadata fields that are generated anew on every run (ex. the uuid4 identifier of neuroconv's default metadata)
+VOLATILE_METADATA_FIELDS = (("NWBFile", "identifier"), ("NWBFile", "file_create_date"))
+
+
+def get_fingerprint(obj) -> str:
+    """Get a stable hash of a JSON-like object (paths and other non-JSON values are hashed by their string form)."""
+    encoded_obj = json.dumps(obj, sort_keys=True, default=str)
+    return hashlib.sha256(encoded_obj.encode()).hexdigest()
+
+
+def get_metadata_fingerprint(metadata: dict) -> str:
+    """Get a stable hash of the metadata of a conversion, leaving out the fields that change on every run.
+
+    Parameters
+    ----------
+    metadata : dict
+        Metadata dictionary with information used to create the NWBFile.
+
+    Returns
+    -------
+    str
+        The hash of the metadata without its volatile fields.
+    """
+    metadata = deepcopy(metadata)
+    for section_name, field_name in VOLATILE_METADATA_FIELDS:
+        metadata.get(section_name, dict()).pop(field_name, None)
+    return get_fingerprint(metadata)
+
+
+def run_checkpointed_conversion(
+    converter: NWBConverter,
+    nwbfile_path: FilePath,
+    metadata: dict,
+    conversion_options: Optional[dict] = None,
+):
+    """Write each interface of the converter to the NWB file in its own append step, skipping completed interfaces.
+
+    A journal next to the NWB file records every interface that has been written successfully. On a rerun, interfaces
+    whose source data and conversion options are unchanged are skipped, as long as the objects they added are still
+    present in the file. The fields of the metadata that are generated on every run, such as the identifier, are left
+    out of its fingerprint. If the metadata changed, if an interface that was already written changed (its objects
+    cannot be replaced in place) or if the file cannot be validated, the file is rebuilt from scratch. Once every
+    interface is written, the sample-index columns of the converter, if it has an add_sample_index_columns() method,
+    are added to the tables of the file in a last step, journaled as SAMPLE_INDEX_COLUMNS_STEP_NAME.
+
+    Parameters
+    ----------
+    converter : NWBConverter
+        The converter whose interfaces will be written.
+    nwbfile_path : FilePath
+        Path to the NWB file.
+    metadata : dict
+        Metadata dictionary with information used to create the NWBFile.
+    conversion_options : dict, optional
+        A dictionary containing conversion options for each interface, by default None.
+    """
+    nwbfile_path = Path(nwbfile_path)
+    conversion_options = conversion_options or dict()
+    verbose = getattr(converter, "verbose", False)
+
+    converter.validate_metadata(metadata=metadata)
+    converter.validate_conversion_options(conversion_options=conversion_options)
+
+    journal = ConversionJournal(nwbfile_path=nwbfile_path)
+    metadata_fingerprint = get_metadata_fingerprint(metadata)
+    interface_name_to_fingerprint = {
+        interface_name: get_fingerprint(
+            dict(source_data=data_interface.source_data, conversion_options=conversion_options.get(interface_name))
+        )
+        for interface_name, data_interface in converter.data_interface_objects.items()
+    }
+    changed_interface_names = [
+        interface_name
+        for interface_name, fingerprint in interface_name_to_fingerprint.items()
+        if interface_name in journal.completed_interfaces
+        and not journal.is_complete(interface_name=interface_name, fingerprint=fingerprint)
+    ]
+    if (
+        journal.metadata_fingerprint != metadata_fingerprint
+        or len(changed_interface_names) > 0
+        or not journal.validate_nwbfile()
+    ):
+        if verbose and journal.journal_path.exists():
+            print(f"Rebuilding {nwbfile_path}, whose metadata or interfaces {changed_interface_names} changed.")
+        journal.reset(metadata_fingerprint=metadata_fingerprint)
+        nwbfile = make_nwbfile_from_metadata(metadata=metadata)
+        with NWBHDF5IO(str(nwbfile_path), mode="w") as io:
+            io.write(nwbfile)
+
+    # The columns index the series written by the interfaces, so they are added again whenever an interface changed
+    sample_index_columns_fingerprint = get_fingerprint(interface_name_to_fingerprint)
+    for interface_name, fingerprint in list(interface_name_to_fingerprint.items()):
+        if journal.is_complete(interface_name=interface_name, fingerprint=fingerprint):
+            if verbose:
+                print(f"Skipping {interface_name} because it has already been written to {nwbfile_path}.")
+            del interface_name_to_fingerprint[interface_name]
+
+    if len(interface_name_to_fingerprint) > 0:
+        converter.temporally_align_data_interfaces(metadata=metadata, conversion_options=conversion_options)
+    for interface_name, fingerprint in interface_name_to_fingerprint.items():
+        data_interface = converter.data_interface_objects[interface_name]
+        interface_conversion_options = conversion_options.get(interface_name, dict())
+        _append_checkpoint(
+            journal=journal,
+            step_name=interface_name,
+            fingerprint=fingerprint,
+            add_to_nwbfile=lambda nwbfile: data_interface.add_to_nwbfile(
+                nwbfile=nwbfile, metadata=metadata, **interface_conversion_options
+            ),
+            verbose=verbose,
+        )
+
+    if hasattr(converter, "add_sample_index_columns") and not journal.is_complete(
+        interface_name=SAMPLE_INDEX_COLUMNS_STEP_NAME, fingerprint=sample_index_columns_fingerprint
+    ):
+        _append_checkpoint(
+            journal=journal,
+            step_name=SAMPLE_INDEX_COLUMNS_STEP_NAME,
+            fingerprint=sample_index_columns_fingerprint,
+            add_to_nwbfile=lambda nwbfile: converter.add_sample_index_columns(nwbfile=nwbfile, metadata=metadata),
+            verbose=verbose,
+            configure_new_datasets=False,  # small columns, added to tables that are already written
+        )
+
+
+def _append_checkpoint(
+    journal: ConversionJournal,
+    step_name: str,
+    fingerprint: str,
+    add_to_nwbfile: Callable[[NWBFile], None],
+    verbose: bool,
+    configure_new_datasets: bool = True,
+):
+    # The file is only written if add_to_nwbfile succeeds, so a failure leaves the previous checkpoint intact
+    nwbfile_path = journal.nwbfile_path
+    with NWBHDF5IO(str(nwbfile_path), mode="r+", load_namespaces=True) as io:
+        nwbfile = io.read()
+        object_ids_before = {neurodata_object.object_id for neurodata_object in nwbfile.all_children()}
+        add_to_nwbfile(nwbfile)
+        if configure_new_datasets:
+            backend_configuration = get_default_backend_configuration(nwbfile=nwbfile, backend="hdf5")
+            configure_backend(nwbfile=nwbfile, backend_configuration=backend_configuration)
+        io.write(nwbfile)
+        object_ids_after = {neurodata_object.object_id for neurodata_object in nwbfile.all_children()}
+    journal.mark_complete(
+        interface_name=step_name,
+        fingerprint=fingerprint,
+        object_ids=list(object_ids_after - object_ids_before),
+    )
+    if verbose:
+        print(f"Checkpointed {step_name} in {nwbfile_path}.")
@@ -0,0 +1,430 @@
+"""
+Script to benchmark the conversions on synthetic sessions of several durations, step by step.
+
+Each conversion is run with session_to_nwb() on a synthetic session from its '_synthetic_data' module, generated with
+a fixed seed, so that two runs of the script (ex. before and after a change) convert the same bytes. Each measurement
+runs in a fresh interpreter, in which the initialization and the add_to_nwbfile() of each data interface, the temporal
+alignment, run_conversion() and the whole session_to_nwb() are timed, along with how much each of them raised the peak
+resident memory of the process. The results are saved to a JSON file with the versions of the environment, and can be
+compared with those of an earlier run.
+
+Typical usage example:
+    python -m schneider_lab_to_nwb.tools.conversion_benchmark --durations 60 600 --output_file_path after.json
+        --baseline_file_path before.json
+"""
+import argparse
+import importlib
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from functools import wraps
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Iterable, Optional
+
+from pydantic import DirectoryPath, FilePath
+
+CONVERSIONS = dict(
+    zempolich_2024=dict(
+        synthetic_data_module_name="schneider_lab_to_nwb.zempolich_2024.zempolich_2024_synthetic_data",
+        convert_session_module_name="schneider_lab_to_nwb.zempolich_2024.zempolich_2024_convert_session",
+        converter_module_name="schneider_lab_to_nwb.zempolich_2024.zempolich_2024_nwbconverter",
+        converter_class_name="Zempolich2024NWBConverter",
+    ),
+    corredera_2025=dict(
+        synthetic_data_module_name="schneider_lab_to_nwb.corredera_2025.corredera_2025_synthetic_data",
+        convert_session_module_name="schneider_lab_to_nwb.corredera_2025.corredera_2025_convert_session",
+        converter_module_name="schneider_lab_to_nwb.corredera_2025.corredera_2025_nwbconverter",
+        converter_class_name="Corredera2025NWBConverter",
+    ),
+    la_chioma_2024=dict(
+        synthetic_data_module_name="schneider_lab_to_nwb.la_chioma_2024.la_chioma_2024_synthetic_data",
+        convert_session_module_name="schneider_lab_to_nwb.la_chioma_2024.la_chioma_2024_convert_session",
+        converter_module_name="schneider_lab_to_nwb.la_chioma_2024.la_chioma_2024_nwbconverter",
+        converter_class_name="LaChioma2024NWBConverter",
+    ),
+)
+PACKAGE_NAMES = ("neuroconv", "spikeinterface", "neo", "pynwb", "hdmf", "hdmf-zarr", "h5py", "numpy", "sleap-io")
+
+_MEASUREMENT_CODE = """
+import json
+from schneider_lab_to_nwb.tools.conversion_benchmark import measure_conversion
+measurement = measure_conversion(**json.loads({arguments!r}))
+print(json.dumps(measurement))
+"""
+
+
+def get_peak_rss_mb() -> float:
+    """Get the peak resident memory of the current process so far, in MB.
+
+    Returns
+    -------
+    float
+        The peak resident set size (the peak working set on Windows), in MB.
+    """
+    try:
+        import resource
+    except ImportError:  # Windows
+        import psutil
+
+        return psutil.Process().memory_info().peak_wset / 1e6
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss / 1e6 if sys.platform == "darwin" else peak_rss * 1024 / 1e6  # bytes on macOS, KiB elsewhere
+
+
+def generate_session(
+    conversion_name: str, data_dir_path: DirectoryPath, duration: float, seed: int = 0, overwrite: bool = False
+) -> dict:
+    """Generate the synthetic session of a conversion, or reuse the one already generated in data_dir_path.
+
+    Parameters
+    ----------
+    conversion_name : str
+        The name of the conversion, a key of CONVERSIONS.
+    data_dir_path : DirectoryPath
+        The path to the directory of the synthetic sessions. Each session is generated in its own subdirectory, named
+        after the conversion, the duration and the seed, along with its session_to_nwb() kwargs in JSON.
+    duration : float
+        The duration of the session, in seconds.
+    seed : int, optional
+        The seed of the random generators, by default 0.
+    overwrite : bool, optional
+        Whether to generate the session again even if it was already generated, by default False.
+
+    Returns
+    -------
+    dict
+        The kwargs of session_to_nwb() for the session, except output_dir_path, with the paths as strings.
+    """
+    session_dir_path = Path(data_dir_path) / f"{conversion_name}_{duration:g}s_seed-{seed}"
+    kwargs_file_path = session_dir_path / "session_to_nwb_kwargs.json"
+    if kwargs_file_path.exists() and not overwrite:
+        with open(kwargs_file_path, mode="r") as file:
+            return json.load(file)
+    if session_dir_path.exists():
+        shutil.rmtree(session_dir_path)
+    synthetic_data_module = importlib.import_module(CONVERSIONS[conversion_name]["synthetic_data_module_name"])
+    session_to_nwb_kwargs = synthetic_data_module.generate_synthetic_session(
+        data_dir_path=session_dir_path, duration=duration, seed=seed
+    )
+    session_to_nwb_kwargs = {
+        name: str(value) if isinstance(value, Path) else value for name, value in session_to_nwb_kwargs.items()
+    }
+    with open(kwargs_file_path, mode="w") as file:  # written last, so that an interrupted generation is redone
+        json.dump(session_to_nwb_kwargs, file, indent=4)
+    return session_to_nwb_kwargs
+
+
+def measure_conversion(
+    conversion_name: str, session_to_nwb_kwargs: dict, output_dir_path: DirectoryPath, options: Optional[dict] = None
+) -> dict:
+    """Convert a session in the current process, timing each step and how much it raised the peak resident memory.
+
+    The steps are the initialization ('initialize[<name>]') and the add_to_nwbfile() ('add_to_nwbfile[<name>]') of
+    each data interface, the temporal alignment ('temporally_align_data_interfaces'), run_conversion() and the whole
+    session_to_nwb(), which are instrumented for the duration of the conversion only. The interfaces initialized
+    concurrently by the converter have overlapping steps, and the memory of the processes that some conversions start
+    (ex. the Zarr writers) is not counted. Run it in a fresh interpreter for the memory to be comparable across runs.
+
+    Parameters
+    ----------
+    conversion_name : str
+        The name of the conversion, a key of CONVERSIONS.
+    session_to_nwb_kwargs : dict
+        The kwargs of session_to_nwb() for the session, except output_dir_path, as returned by generate_session().
+    output_dir_path : DirectoryPath
+        The path to the directory where the NWB file is written.
+    options : dict, optional
+        Extra kwargs of session_to_nwb(), ex. dict(backend="zarr"), by default None.
+
+    Returns
+    -------
+    dict
+        The 'steps' (each with its 'name', 'seconds' and 'peak_rss_increase_mb', in the order in which they finished),
+        the 'peak_rss_mb' of the process and the 'nwbfile_size_mb' of the output.
+    """
+    from .lazy_interfaces import LazyDataInterfaceObjects
+
+    conversion = CONVERSIONS[conversion_name]
+    session_to_nwb = importlib.import_module(conversion["convert_session_module_name"]).session_to_nwb
+    converter_class = getattr(
+        importlib.import_module(conversion["converter_module_name"]), conversion["converter_class_name"]
+    )
+    steps = []
+
+    @contextmanager
+    def measure_step(name: str):
+        peak_rss_mb, start_time = get_peak_rss_mb(), time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start_time
+            steps.append(dict(name=name, seconds=seconds, peak_rss_increase_mb=get_peak_rss_mb() - peak_rss_mb))
+
+    def timed(function, name: str):
+        @wraps(function)  # the converter builds the conversion options schema from the signature of add_to_nwbfile()
+        def timed_function(*args, **kwargs):
+            with measure_step(name=name):
+                return function(*args, **kwargs)
+
+        return timed_function
+
+    get_item = LazyDataInterfaceObjects.__getitem__
+
+    def timed_get_item(self, name: str):
+        if name not in self or self.is_initialized(name=name):
+            return get_item(self, name)
+        with measure_step(name=f"initialize[{name}]"):
+            data_interface = get_item(self, name)
+        data_interface.add_to_nwbfile = timed(data_interface.add_to_nwbfile, name=f"add_to_nwbfile[{name}]")
+        return data_interface
+
+    # Patched on the class itself, since the converter calls them through self
+    patched_attributes = [
+        (LazyDataInterfaceObjects, "__getitem__", timed_get_item),
+        (
+            converter_class,
+            "temporally_align_data_interfaces",
+            timed(converter_class.temporally_align_data_interfaces, name="temporally_align_data_interfaces"),
+        ),
+        (converter_class, "run_conversion", timed(converter_class.run_conversion, name="run_conversion")),
+    ]
+    original_attributes = [(owner, name, owner.__dict__.get(name)) for owner, name, _ in patched_attributes]
+    try:
+        for owner, name, attribute in patched_attributes:
+            setattr(owner, name, attribute)
+        with measure_step(name="session_to_nwb"):
+            session_to_nwb(**session_to_nwb_kwargs, output_dir_path=output_dir_path, verbose=False, **(options or {}))
+    finally:
+        for owner, name, attribute in original_attributes:
+            if attribute is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, attribute)
+
+    nwbfile_size = sum(
+        file_path.stat().st_size for file_path in Path(output_dir_path).rglob("*") if file_path.is_file()
+    )
+    return dict(steps=steps, peak_rss_mb=get_peak_rss_mb(), nwbfile_size_mb=nwbfile_size / 1e6)
+
+
+def measure_conversion_in_subprocess(
+    conversion_name: str, session_to_nwb_kwargs: dict, options: Optional[dict] = None, repeats: int = 1
+) -> dict:
+    """Measure the conversion of a session in fresh interpreters, with measure_conversion().
+
+    Parameters
+    ----------
+    conversion_name : str
+        The name of the conversion, a key of CONVERSIONS.
+    session_to_nwb_kwargs : dict
+        The kwargs of session_to_nwb() for the session, except output_dir_path, as returned by generate_session().
+    options : dict, optional
+        Extra kwargs of session_to_nwb(), by default None.
+    repeats : int, optional
+        Number of fresh interpreters in which the conversion is measured, by default 1. The fastest one is kept, since
+        the slower ones only measure noise (ex. a cold disk cache).
+
+    Returns
+    -------
+    dict
+        The measurement of the fastest conversion, as returned by measure_conversion().
+
+    Raises
+    ------
+    subprocess.CalledProcessError
+        If a conversion fails, ex. because the dependencies of the conversion are not installed.
+    """
+    measurements = []
+    for _ in range(repeats):
+        with tempfile.TemporaryDirectory(prefix="conversion_benchmark_") as output_dir_path:
+            arguments = json.dumps(
+                dict(
+                    conversion_name=conversion_name,
+                    session_to_nwb_kwargs=session_to_nwb_kwargs,
+                    output_dir_path=output_dir_path,
+                    options=options,
+                )
+            )
+            code = _MEASUREMENT_CODE.format(arguments=arguments)
+            completed_process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        measurements.append(json.loads(completed_process.stdout.strip().splitlines()[-1]))
+    return min(
+        measurements, key=lambda measurement: _get_step(measurement=measurement, name="session_to_nwb")["seconds"]
+    )
+
+
+def get_environment() -> dict:
+    """Get the versions of the code and the packages that a benchmark ran with.
+
+    Returns
+    -------
+    dict
+        The 'git_commit' of the repository (None outside of a git checkout), the 'python' and 'platform' versions and
+        the 'packages' versions (None for the packages that are not installed).
+    """
+    try:
+        completed_process = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=Path(__file__).parent, capture_output=True, text=True, check=True
+        )
+        git_commit = completed_process.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        git_commit = None
+    package_name_to_version = dict()
+    for package_name in PACKAGE_NAMES:
+        try:
+            package_name_to_version[package_name] = version(package_name)
+        except PackageNotFoundError:
+            package_name_to_version[package_name] = None
+    return dict(
+        git_commit=git_commit,
+        python=platform.python_version(),
+        platform=platform.platform(),
+        packages=package_name_to_version,
+    )
+
+
+def run_benchmark(
+    conversion_names: Iterable[str] = tuple(CONVERSIONS),
+    durations: Iterable[float] = (60.0,),
+    data_dir_path: Optional[DirectoryPath] = None,
+    options: Optional[dict] = None,
+    repeats: int = 1,
+    seed: int = 0,
+    output_file_path: Optional[FilePath] = None,
+    baseline_file_path: Optional[FilePath] = None,
+) -> dict:
+    """Benchmark the conversions on synthetic sessions of several durations, and print the results.
+
+    Parameters
+    ----------
+    conversion_names : Iterable[str], optional
+        The names of the conversions, keys of CONVERSIONS, by default all of them.
+    durations : Iterable[float], optional
+        The durations of the synthetic sessions, in seconds, by default (60.0,).
+    data_dir_path : DirectoryPath, optional
+        The path to a directory where the synthetic sessions are generated and kept for later runs, by default None
+        (a temporary directory, deleted afterwards).
+    options : dict, optional
+        Extra kwargs of session_to_nwb() for every conversion, ex. dict(backend="zarr"), by default None.
+    repeats : int, optional
+        Number of fresh interpreters in which each conversion is measured, by default 1.
+    seed : int, optional
+        The seed of the synthetic sessions, by default 0.
+    output_file_path : FilePath, optional
+        The path of a JSON file where the results are saved, by default None.
+    baseline_file_path : FilePath, optional
+        The path of the JSON results of an earlier run, to compare with, by default None.
+
+    Returns
+    -------
+    dict
+        The 'environment' and the 'options' of the run and its 'results', with the 'conversion', the 'duration' and the
+        measurement of each session, as returned by measure_conversion().
+    """
+    baseline_results = []
+    if baseline_file_path is not None:
+        with open(baseline_file_path, mode="r") as file:
+            baseline_results = json.load(file)["results"]
+    benchmark = dict(environment=get_environment(), options=options or dict(), results=[])
+    with tempfile.TemporaryDirectory(prefix="conversion_benchmark_data_") as temporary_dir_path:
+        data_dir_path = Path(data_dir_path or temporary_dir_path)
+        for conversion_name in conversion_names:
+            for duration in durations:
+                print(f"{conversion_name} ({duration:g} s)")
+                try:
+                    session_to_nwb_kwargs = generate_session(
+                        conversion_name=conversion_name, data_dir_path=data_dir_path, duration=duration, seed=seed
+                    )
+                    measurement = measure_conversion_in_subprocess(
+                        conversion_name=conversion_name,
+                        session_to_nwb_kwargs=session_to_nwb_kwargs,
+                        options=options,
+                        repeats=repeats,
+                    )
+                except ImportError as e:  # the optional dependencies of this conversion are not installed
+                    print(f"  skipped ({e})")
+                    continue
+                except subprocess.CalledProcessError as e:
+                    print(f"  skipped ({e.stderr.strip().splitlines()[-1]})")
+                    continue
+                result = dict(conversion=conversion_name, duration=duration, **measurement)
+                benchmark["results"].append(result)
+                baseline_result = next(
+                    (
+                        baseline_result
+                        for baseline_result in baseline_results
+                        if (baseline_result["conversion"], baseline_result["duration"]) == (conversion_name, duration)
+                    ),
+                    None,
+                )
+                _print_result(result=result, baseline_result=baseline_result)
+    if output_file_path is not None:
+        with open(output_file_path, mode="w") as file:
+            json.dump(benchmark, file, indent=4)
+    return benchmark
+
+
+def _print_result(result: dict, baseline_result: Optional[dict] = None):
+    for step in result["steps"]:
+        line = f"  {step['name']:<48} {step['seconds']:>9.3f} s {step['peak_rss_increase_mb']:>+10.1f} MB"
+        baseline_step = _get_step(measurement=baseline_result, name=step["name"]) if baseline_result else None
+        if baseline_step is not None:
+            ratio = step["seconds"] / baseline_step["seconds"] if baseline_step["seconds"] > 0 else float("nan")
+            line += (
+                f"   (baseline {baseline_step['seconds']:.3f} s, x{ratio:.2f}; "
+                f"{baseline_step['peak_rss_increase_mb']:+.1f} MB)"
+            )
+        print(line)
+    line = f"  {'peak memory':<48} {result['peak_rss_mb']:>11.1f} MB"
+    if baseline_result is not None:
+        line += f"   (baseline {baseline_result['peak_rss_mb']:.1f} MB)"
+    print(line)
+    line = f"  {'NWB file size':<48} {result['nwbfile_size_mb']:>11.1f} MB"
+    if baseline_result is not None:
+        line += f"   (baseline {baseline_result['nwbfile_size_mb']:.1f} MB)"
+    print(line)
+
+
+def _get_step(measurement: dict, name: str) -> Optional[dict]:
+    return next((step for step in measurement["steps"] if step["name"] == name), None)
+
+
+def main():
+    """
+    Command-line interface for the conversion benchmark.
+
+    Parses arguments and calls run_benchmark().
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the conversions on synthetic sessions.")
+    parser.add_argument(
+        "--conversions", nargs="+", default=list(CONVERSIONS), choices=list(CONVERSIONS), help="Conversions to run."
+    )
+    parser.add_argument("--durations", nargs="+", type=float, default=[60.0], help="Session durations in seconds.")
+    parser.add_argument("--data_dir_path", type=Path, default=None, help="Directory of the reusable sessions.")
+    parser.add_argument("--options", type=json.loads, default=None, help="Extra session_to_nwb() kwargs, in JSON.")
+    parser.add_argument("--repeats", type=int, default=1, help="Number of fresh interpreters per conversion.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic sessions.")
+    parser.add_argument("--output_file_path", type=Path, default=None, help="JSON file where the results are saved.")
+    parser.add_argument("--baseline_file_path", type=Path, default=None, help="JSON results of a run to compare with.")
+    args = parser.parse_args()
+
+    run_benchmark(
+        conversion_names=args.conversions,
+        durations=args.durations,
+        data_dir_path=args.data_dir_path,
+        options=args.options,
+        repeats=args.repeats,
+        seed=args.seed,
+        output_file_path=args.output_file_path,
+        baseline_file_path=args.baseline_file_path,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""Data chunk iterators that can be pickled, so that their chunks can be written in parallel by worker processes."""
+import os
+import tempfile
+import weakref
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from hdmf.data_utils import GenericDataChunkIterator
+from neuroconv.tools.spikeinterface.spikeinterfacerecordingdatachunkiterator import (
+    SpikeInterfaceRecordingDataChunkIterator,
+)
+from pynwb import NWBFile, TimeSeries
+from spikeinterface.core.base import BaseExtractor
+
+from .io_admission import IOAdmissionMixin, IOSlot, get_io_slot
+
+
+def _remove_file(file_path: str):
+    try:
+        os.remove(file_path)
+    except OSError:  # already removed, or still mapped on Windows
+        pass
+
+
+def create_temporary_memmap(shape: tuple[int, ...], dtype: np.dtype = np.float64) -> np.memmap:
+    """Create a writable memory map backed by a temporary file that is deleted once the memory map is garbage collected.
+
+    The file is created securely in the system temporary directory. It must outlive every MemmapDataChunkIterator that
+    reads it, so keep a reference to the returned memory map until the NWB file is written.
+
+    Parameters
+    ----------
+    shape : tuple[int, ...]
+        Shape of the memory map.
+    dtype : np.dtype, optional
+        Data type of the memory map, by default np.float64.
+
+    Returns
+    -------
+    np.memmap
+        The memory map, filled with zeros.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".dat", delete=False) as file:
+        file_path = file.name
+    memmap = np.memmap(file_path, dtype=dtype, mode="w+", shape=shape)
+    weakref.finalize(memmap, _remove_file, file_path)
+    return memmap
+
+
+class _MemmapReadingDataChunkIterator(GenericDataChunkIterator):
+    """Reads the buffers of a MemmapDataChunkIterator, below IOAdmissionMixin, which holds the reader slot around it."""
+
+    def _get_data(self, selection: tuple[slice]) -> np.ndarray:
+        return np.asarray(self._data[selection])
+
+
+class MemmapDataChunkIterator(IOAdmissionMixin, _MemmapReadingDataChunkIterator):
+    """Data chunk iterator over a range of rows of a flat binary file, read through a read-only memory map."""
+
+    def __init__(
+        self,
+        file_path: str | Path,
+        dtype: np.dtype,
+        shape: tuple[int, ...],
+        start_row: int = 0,
+        stop_row: Optional[int] = None,
+        buffer_gb: Optional[float] = None,
+        buffer_shape: Optional[tuple] = None,
+        chunk_mb: Optional[float] = None,
+        chunk_shape: Optional[tuple] = None,
+        display_progress: bool = False,
+        progress_bar_options: Optional[dict] = None,
+        io_slot: Optional[IOSlot] = None,
+    ):
+        """Initialize the iterator.
+
+        Parameters
+        ----------
+        file_path : str | Path
+            Path to the binary file.
+        dtype : np.dtype
+            Data type of the values in the file.
+        shape : tuple[int, ...]
+            Shape of the whole file, with rows (time) along the first axis.
+        start_row : int, optional
+            First row to iterate over, by default 0.
+        stop_row : int, optional
+            Row at which to stop the iteration, by default None (the end of the file).
+        buffer_gb : float, optional
+            Size in GB of each buffer, by default None (1 GB). Cannot be set along with buffer_shape.
+        buffer_shape : tuple, optional
+            Shape of each buffer, by default None.
+        chunk_mb : float, optional
+            Size in MB of each chunk, by default None (10 MB). Cannot be set along with chunk_shape.
+        chunk_shape : tuple, optional
+            Shape of each chunk, by default None.
+        display_progress : bool, optional
+            Whether to display a progress bar, by default False.
+        progress_bar_options : dict, optional
+            Keyword arguments passed to tqdm, by default None.
+        io_slot : IOSlot, optional
+            The reader slot to hold while reading each buffer, by default None (no limits). See get_io_slot().
+        """
+        self.file_path = str(file_path)
+        self.io_slot = io_slot
+        self.memmap_dtype = np.dtype(dtype)
+        self.memmap_shape = tuple(shape)
+        self.start_row = start_row
+        self.stop_row = self.memmap_shape[0] if stop_row is None else stop_row
+        memmap = np.memmap(self.file_path, dtype=self.memmap_dtype, mode="r", shape=self.memmap_shape)
+        self._data = memmap[self.start_row : self.stop_row]
+        super().__init__(
+            buffer_gb=buffer_gb,
+            buffer_shape=buffer_shape,
+            chunk_mb=chunk_mb,
+            chunk_shape=chunk_shape,
+            display_progress=display_progress,
+            progress_bar_options=progress_bar_options,
+        )
+
+    def _get_dtype(self) -> np.dtype:
+        return self.memmap_dtype
+
+    def _get_maxshape(self) -> tuple[int, ...]:
+        return self._data.shape
+
+    def _to_dict(self) -> dict:
+        return dict(
+            file_path=self.file_path,
+            dtype=self.memmap_dtype.str,
+            shape=self.memmap_shape,
+            start_row=self.start_row,
+            stop_row=self.stop_row,
+            buffer_shape=self.buffer_shape,
+            chunk_shape=self.chunk_shape,
+            io_slot=None if self.io_slot is None else self.io_slot.to_dict(),
+        )
+
+    @staticmethod
+    def _from_dict(dictionary: dict) -> "MemmapDataChunkIterator":
+        dictionary = dict(dictionary)
+        io_slot = dictionary.pop("io_slot", None)
+        return MemmapDataChunkIterator(io_slot=None if io_slot is None else IOSlot(**io_slot), **dictionary)
+
+
+class PicklableRecordingDataChunkIterator(IOAdmissionMixin, SpikeInterfaceRecordingDataChunkIterator):
+    """SpikeInterfaceRecordingDataChunkIterator that is pickled through the dictionary of its recording extractor."""
+
+    def __init__(self, *args, io_slot: Optional[IOSlot] = None, **kwargs):
+        """Initialize the iterator.
+
+        Parameters
+        ----------
+        *args, **kwargs
+            Passed to SpikeInterfaceRecordingDataChunkIterator.
+        io_slot : IOSlot, optional
+            The reader slot to hold while reading each buffer, by default None (no limits). See get_io_slot().
+        """
+        self.io_slot = io_slot
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def from_iterator(
+        cls, iterator: SpikeInterfaceRecordingDataChunkIterator, io_slot: Optional[IOSlot] = None
+    ) -> "PicklableRecordingDataChunkIterator":
+        """Make a picklable iterator over the same recording, segment, buffers and chunks as another iterator."""
+        return cls(
+            recording=iterator.recording,
+            segment_index=iterator.segment_index,
+            return_scaled=iterator.return_scaled,
+            buffer_shape=iterator.buffer_shape,
+            chunk_shape=iterator.chunk_shape,
+            display_progress=iterator.display_progress,
+            io_slot=io_slot,
+        )
+
+    def _to_dict(self) -> dict:
+        return dict(
+            recording=self.recording.to_dict(include_annotations=True, include_properties=True),
+            segment_index=self.segment_index,
+            return_scaled=self.return_scaled,
+            buffer_shape=self.buffer_shape,
+            chunk_shape=self.chunk_shape,
+            io_slot=None if self.io_slot is None else self.io_slot.to_dict(),
+        )
+
+    @staticmethod
+    def _from_dict(dictionary: dict) -> "PicklableRecordingDataChunkIterator":
+        dictionary = dict(dictionary)
+        recording = BaseExtractor.from_dict(dictionary.pop("recording"))
+        io_slot = dictionary.pop("io_slot", None)
+        return PicklableRecordingDataChunkIterator(
+            recording=recording, io_slot=None if io_slot is None else IOSlot(**io_slot), **dictionary
+        )
+
+
+def admit_new_data_chunk_iterators(nwbfile: NWBFile, object_ids_before: set[str], path: str | Path):
+    """Make the recordings of every TimeSeries added to the NWBFile since a snapshot hold a reader slot while streaming.
+
+    The recording iterators made by neuroconv are replaced by PicklableRecordingDataChunkIterator with the reader slot
+    of the storage root of the path, so the limits also apply when the iterators are pickled for parallel writes.
+
+    Parameters
+    ----------
+    nwbfile : NWBFile
+        The in-memory NWBFile.
+    object_ids_before : set[str]
+        Object ids of the NWBFile taken before the TimeSeries were added.
+    path : str | Path
+        Path to the file or folder that the new TimeSeries read from.
+    """
+    io_slot = get_io_slot(path=path)
+    if io_slot is None:
+        return
+    for neurodata_object in nwbfile.all_children():
+        if neurodata_object.object_id in object_ids_before or not isinstance(neurodata_object, TimeSeries):
+            continue
+        if isinstance(neurodata_object.data, SpikeInterfaceRecordingDataChunkIterator):
+            # The data of a TimeSeries cannot be set again, so the field is replaced directly
+            neurodata_object.fields["data"] = PicklableRecordingDataChunkIterator.from_iterator(
+                iterator=neurodata_object.data, io_slot=io_slot
+            )
@@ -0,0 +1,121 @@
+"""Lossless narrowing of the dtype of in-memory arrays before they are written."""
+import numpy as np
+
+# Integer-valued floats beyond this magnitude are kept as floats, since they may not fit in an int64
+_MAX_INTEGER_MAGNITUDE = 2**63 - 1024
+
+
+def get_narrowest_dtype(array: np.ndarray) -> np.dtype:
+    """Get the narrowest dtype in which an array round-trips exactly.
+
+    Integer arrays get the smallest integer dtype that holds their range. Float arrays whose values are all integers
+    (finite, without negative zeros) get the smallest integer dtype too, and other float64 arrays get float32 when every
+    value, NaNs included, is exactly representable in it. Any other array (bool, text, complex, empty, ...) keeps its
+    dtype.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        The array.
+
+    Returns
+    -------
+    np.dtype
+        The narrowest dtype, which is the dtype of the array when it cannot be narrowed.
+    """
+    array = np.asarray(array)
+    if array.size == 0 or array.dtype.kind not in ("i", "u", "f"):
+        return array.dtype
+    if array.dtype.kind == "f":
+        is_integer = np.all(np.isfinite(array)) and np.all(array == np.trunc(array))
+        is_integer = is_integer and not np.any((array == 0) & np.signbit(array))
+        if is_integer and np.max(np.abs(array)) <= _MAX_INTEGER_MAGNITUDE:
+            return _get_narrowest_integer_dtype(minimum=int(array.min()), maximum=int(array.max()))
+        if array.dtype.itemsize > 4:
+            with np.errstate(over="ignore"):
+                if np.array_equal(array.astype(np.float32), array, equal_nan=True):
+                    return np.dtype(np.float32)
+        return array.dtype
+    narrowest_dtype = _get_narrowest_integer_dtype(minimum=int(array.min()), maximum=int(array.max()))
+    return narrowest_dtype if narrowest_dtype.itemsize < array.dtype.itemsize else array.dtype
+
+
+def narrow_dtype(array: np.ndarray) -> np.ndarray:
+    """Cast an array to the narrowest dtype in which it round-trips exactly, see get_narrowest_dtype().
+
+    Parameters
+    ----------
+    array : np.ndarray
+        The array.
+
+    Returns
+    -------
+    np.ndarray
+        The narrowed copy of the array, or the array itself when it cannot be narrowed.
+    """
+    array = np.asarray(array)
+    narrowest_dtype = get_narrowest_dtype(array)
+    return array if narrowest_dtype == array.dtype else array.astype(narrowest_dtype)
+
+
+def narrow_array_dtypes(
+    name_to_array: dict[str, np.ndarray], common_dtype: bool = False, verbose: bool = False
+) -> dict[str, np.ndarray]:
+    """Narrow the dtypes of several arrays, see get_narrowest_dtype(), and report the savings.
+
+    Only data should be narrowed: timestamps and other times are better left in float64, where their precision does not
+    depend on how long the session was.
+
+    Parameters
+    ----------
+    name_to_array : dict[str, np.ndarray]
+        The arrays, by a name used in the report, ex. the name of their dataset.
+    common_dtype : bool, optional
+        Whether to cast all the arrays to the narrowest dtype in which every one of them round-trips exactly, for arrays
+        written to the same dataset (ex. the values of the event types of a ragged column), by default False.
+    verbose : bool, optional
+        Whether to print the dtype and size before and after of each narrowed array, and the total savings of several
+        arrays, by default False.
+
+    Returns
+    -------
+    dict[str, np.ndarray]
+        The narrowed arrays, by name.
+    """
+    name_to_array = {name: np.asarray(array) for name, array in name_to_array.items()}
+    arrays = list(name_to_array.values())
+    common_narrowest_dtype = None  # the arrays are kept as they are if they are not all numeric
+    if common_dtype and len(arrays) > 0 and all(array.dtype.kind in ("i", "u", "f") for array in arrays):
+        dtype = np.result_type(*arrays)
+        common_narrowest_dtype = get_narrowest_dtype(np.concatenate([array.ravel().astype(dtype) for array in arrays]))
+    name_to_narrowed_array = dict()
+    num_bytes_before, num_bytes_after = 0, 0
+    for name, array in name_to_array.items():
+        if common_dtype:
+            is_narrowed = common_narrowest_dtype is not None and array.dtype != common_narrowest_dtype
+            narrowed_array = array.astype(common_narrowest_dtype) if is_narrowed else array
+        else:
+            narrowed_array = narrow_dtype(array)
+        name_to_narrowed_array[name] = narrowed_array
+        num_bytes_before += array.nbytes
+        num_bytes_after += narrowed_array.nbytes
+        if verbose and narrowed_array.dtype != array.dtype:
+            print(
+                f"Stored {name} as {narrowed_array.dtype} instead of {array.dtype} "
+                f"({_format_size(array.nbytes)} -> {_format_size(narrowed_array.nbytes)})"
+            )
+    if verbose and len(name_to_array) > 1 and num_bytes_before > num_bytes_after:
+        print(f"Narrowing saved {_format_size(num_bytes_before - num_bytes_after)} in total")
+    return name_to_narrowed_array
+
+
+def _get_narrowest_integer_dtype(minimum: int, maximum: int) -> np.dtype:
+    return np.result_type(np.min_scalar_type(minimum), np.min_scalar_type(maximum))
+
+
+def _format_size(num_bytes: int) -> str:
+    if num_bytes >= 1e6:
+        return f"{num_bytes / 1e6:.1f} MB"
+    if num_bytes >= 1e3:
+        return f"{num_bytes / 1e3:.1f} kB"
+    return f"{num_bytes} B"
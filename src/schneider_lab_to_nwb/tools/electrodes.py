@@ -0,0 +1,209 @@
+"""Columnar construction of the electrodes table from the channel properties of a recording."""
+from typing import Any, Optional
+
+import numpy as np
+from neuroconv.tools.spikeinterface import (
+    add_devices_to_nwbfile,
+    add_electrode_groups_to_nwbfile,
+    add_electrodes_to_nwbfile,
+)
+from pynwb import NWBFile
+from pynwb.file import ElectrodeTable
+from spikeinterface import BaseRecording
+
+# The channel properties that are not written as columns of the electrodes table, as in neuroconv
+SPECIAL_PROPERTY_NAMES = (
+    "offset_to_uV",
+    "gain_to_uV",
+    "contact_vector",
+    "channel_name",
+    "channel_names",
+    "group_name",
+    "group",
+)
+
+
+def add_electrodes_in_bulk(
+    recording: BaseRecording,
+    nwbfile: NWBFile,
+    metadata: Optional[dict] = None,
+    exclude: tuple = (),
+    null_values_for_properties: Optional[dict[str, Any]] = None,
+) -> np.ndarray:
+    """Add the devices, the electrode groups and the electrodes of a recording to the NWBFile, one column at a time.
+
+    The columns are those that neuroconv writes (the channel properties, with 'brain_area' as 'location' and the
+    channel locations as 'rel_x', 'rel_y' and 'rel_z'), but each column is assembled as an array and extended once,
+    instead of adding the electrodes one row at a time. Electrodes are identified by their (group_name, channel_name),
+    as in neuroconv, through a dictionary of the rows of the table, so a recording whose electrodes are already in the
+    table (ex. the processed recording of the same probe as a raw recording) adds no rows and gets the same indices.
+    Since every electrode of the recording is then in the table, adding its ElectricalSeries with neuroconv afterwards
+    only creates the region of these rows.
+
+    Recordings with ragged channel properties, and tables with ragged columns, are added with neuroconv instead.
+
+    Parameters
+    ----------
+    recording : BaseRecording
+        The recording, with its channel properties set.
+    nwbfile : NWBFile
+        The in-memory NWBFile.
+    metadata : dict, optional
+        Metadata dictionary with the 'Device', 'ElectrodeGroup' and 'Electrodes' (column descriptions) of
+        metadata['Ecephys'], by default None.
+    exclude : tuple, optional
+        The channel properties that are not written, by default ().
+    null_values_for_properties : dict[str, Any], optional
+        The values of the columns for the rows that do not have them (the rows of other recordings for a new column, or
+        the new rows for a column of other recordings), by default None (NaN for floats and "" for strings).
+
+    Returns
+    -------
+    np.ndarray
+        The indices of the rows of the electrodes of the recording, in the order of its channels.
+    """
+    null_values_for_properties = null_values_for_properties or dict()
+    add_devices_to_nwbfile(nwbfile=nwbfile, metadata=metadata)
+    add_electrode_groups_to_nwbfile(recording=recording, nwbfile=nwbfile, metadata=metadata)
+    columns = _get_electrode_columns(recording=recording, nwbfile=nwbfile, metadata=metadata, exclude=exclude)
+    channel_names, group_names = columns["channel_name"]["data"], columns["group_name"]["data"]
+    table = nwbfile.electrodes
+    is_ragged = any(
+        column["data"].ndim > 1 or column["data"].dtype == object for name, column in columns.items() if name != "group"
+    )
+    if table is not None:
+        is_ragged = is_ragged or any(not isinstance(table[name].data, list) for name in table.colnames)
+    if is_ragged:
+        add_electrodes_to_nwbfile(
+            recording=recording,
+            nwbfile=nwbfile,
+            metadata=metadata,
+            exclude=exclude,
+            null_values_for_properties=null_values_for_properties,
+        )
+        return get_electrode_table_indices(nwbfile=nwbfile, channel_names=channel_names, group_names=group_names)
+
+    if table is None:
+        nwbfile.electrodes = table = ElectrodeTable()
+    key_to_row_index = _get_key_to_row_index(table=table)
+    new_channel_indices, new_keys = [], set()
+    for channel_index, key in enumerate(zip(group_names, channel_names)):
+        if key not in key_to_row_index and key not in new_keys:
+            new_channel_indices.append(channel_index)
+            new_keys.add(key)
+    num_rows, num_new_rows = len(table), len(new_channel_indices)
+    if num_new_rows > 0:
+        for name in table.colnames:
+            if name in columns:
+                values = columns[name]["data"][new_channel_indices].tolist()
+            else:
+                null_value = _get_null_value(
+                    name=name, sample=table[name].data[0], null_values_for_properties=null_values_for_properties
+                )
+                values = [null_value] * num_new_rows
+            table[name].extend(values)
+        first_id = max(table.id.data) + 1 if num_rows > 0 else 0
+        table.id.extend(list(range(first_id, first_id + num_new_rows)))
+        for name, column in columns.items():
+            if name in table.colnames:
+                continue
+            values = column["data"][new_channel_indices].tolist()
+            null_value = _get_null_value(
+                name=name, sample=values[0], null_values_for_properties=null_values_for_properties
+            )
+            table.add_column(name=name, description=column["description"], data=[null_value] * num_rows + values)
+    return get_electrode_table_indices(nwbfile=nwbfile, channel_names=channel_names, group_names=group_names)
+
+
+def get_electrode_table_indices(nwbfile: NWBFile, channel_names: np.ndarray, group_names: np.ndarray) -> np.ndarray:
+    """Get the rows of the electrodes table of channels, from their channel and group names.
+
+    Parameters
+    ----------
+    nwbfile : NWBFile
+        The in-memory NWBFile.
+    channel_names : np.ndarray
+        The 'channel_name' of each channel.
+    group_names : np.ndarray
+        The 'group_name' of each channel.
+
+    Returns
+    -------
+    np.ndarray
+        The index of the row of each channel, ex. for nwbfile.create_electrode_table_region().
+
+    Raises
+    ------
+    KeyError
+        If a channel is not in the electrodes table.
+    """
+    key_to_row_index = _get_key_to_row_index(table=nwbfile.electrodes)
+    return np.array(
+        [
+            key_to_row_index[key]
+            for key in zip(np.asarray(group_names, dtype=str), np.asarray(channel_names, dtype=str))
+        ],
+        dtype="int64",
+    )
+
+
+def _get_electrode_columns(
+    recording: BaseRecording, nwbfile: NWBFile, metadata: Optional[dict], exclude: tuple
+) -> dict[str, dict]:
+    """Get the description and the data of each column of the electrodes of a recording, as neuroconv names them."""
+    electrodes_metadata = (metadata or dict()).get("Ecephys", dict()).get("Electrodes", [])
+    name_to_description = {column["name"]: column["description"] for column in electrodes_metadata}
+    columns = dict()
+    excluded_property_names = set(exclude) | set(SPECIAL_PROPERTY_NAMES)
+    for name in recording.get_property_keys():
+        if name not in excluded_property_names:
+            data = np.asarray(recording.get_property(name))
+            columns[name] = dict(description=name_to_description.get(name, "no description"), data=data)
+
+    channel_names = recording.get_property("channel_name")
+    if channel_names is None:
+        channel_names = recording.get_channel_ids()
+    columns["channel_name"] = dict(description="unique channel reference", data=np.asarray(channel_names, dtype=str))
+    group_names = recording.get_property("group_name")
+    if group_names is None:
+        group_names = recording.get_channel_groups()
+    if group_names is None:  # recordings without groups are in the default group, as in neuroconv
+        group_names = np.full(recording.get_num_channels(), fill_value="ElectrodeGroup")
+    group_names = np.asarray(group_names, dtype=str).copy()
+    group_names[group_names == ""] = "ElectrodeGroup"
+    columns["group_name"] = dict(description="group_name", data=group_names)
+
+    if "location" in columns:  # the channel locations, as rel_x, rel_y and rel_z
+        locations = columns.pop("location")["data"]
+        for axis_index, name in enumerate(("rel_x", "rel_y", "rel_z")[: locations.shape[1]]):
+            columns[name] = dict(description=name, data=locations[:, axis_index].astype("float64"))
+    if "brain_area" in columns:
+        columns["location"] = dict(description="location", data=columns.pop("brain_area")["data"].astype(str))
+    else:
+        columns["location"] = dict(description="location", data=np.full(len(group_names), "unknown"))
+    columns["group"] = dict(
+        description="the ElectrodeGroup object",
+        data=np.array([nwbfile.electrode_groups[group_name] for group_name in group_names], dtype=object).reshape(-1),
+    )
+    return columns
+
+
+def _get_key_to_row_index(table) -> dict[tuple[str, str], int]:
+    if table is None or "channel_name" not in table.colnames:
+        return dict()
+    keys = zip(map(str, table["group_name"].data), map(str, table["channel_name"].data))
+    return {key: row_index for row_index, key in enumerate(keys)}
+
+
+def _get_null_value(name: str, sample: Any, null_values_for_properties: dict[str, Any]) -> Any:
+    if name in null_values_for_properties:
+        return null_values_for_properties[name]
+    sample = sample.item() if isinstance(sample, np.generic) else sample
+    if isinstance(sample, str):
+        return ""
+    if isinstance(sample, float):
+        return np.nan
+    raise ValueError(
+        f"There is no default null value for the electrodes column '{name}' of type {type(sample)}: set one in "
+        "null_values_for_properties."
+    )
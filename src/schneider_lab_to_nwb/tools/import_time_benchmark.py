@@ -0,0 +1,180 @@
+"""
+Script to benchmark the import time of the conversion packages and guard their lazy imports against regressions.
+
+Importing a conversion package (ex. schneider_lab_to_nwb.zempolich_2024) must not import any heavy dependency, which
+is only imported when a class of the package is first used. Each import is measured in a fresh interpreter, so that
+nothing is cached in sys.modules. The script exits with an error if a package imports a heavy dependency, or if a
+full import (of a converter and its dependencies) takes longer than --max_seconds.
+
+Typical usage example:
+    python -m schneider_lab_to_nwb.tools.import_time_benchmark --max_seconds 10
+"""
+import argparse
+import json
+import subprocess
+import sys
+from typing import Iterable, Optional
+
+LAZY_MODULE_NAMES = (
+    "schneider_lab_to_nwb.tools",
+    "schneider_lab_to_nwb.zempolich_2024",
+    "schneider_lab_to_nwb.corredera_2025",
+    "schneider_lab_to_nwb.la_chioma_2024",
+)
+# The top-level modules of the optional dependencies of each conversion (its extra in pyproject.toml)
+FULL_MODULE_NAME_TO_OPTIONAL_DEPENDENCY_NAMES = {
+    "schneider_lab_to_nwb.zempolich_2024.zempolich_2024_nwbconverter": (
+        "neuroconv",
+        "hdmf",
+        "numcodecs",
+        "ndx_events",
+        "spikeinterface",
+        "PIL",
+    ),
+    "schneider_lab_to_nwb.corredera_2025.corredera_2025_nwbconverter": (
+        "neuroconv",
+        "spikeinterface",
+        "ndx_events",
+        "ndx_pose",
+        "sleap_io",
+        "matplotlib",
+    ),
+    "schneider_lab_to_nwb.la_chioma_2024.la_chioma_2024_nwbconverter": ("neuroconv", "pyopenephys", "ndx_events"),
+}
+FULL_MODULE_NAMES = tuple(FULL_MODULE_NAME_TO_OPTIONAL_DEPENDENCY_NAMES)
+HEAVY_MODULE_NAMES = (
+    "neuroconv",
+    "spikeinterface",
+    "pynwb",
+    "hdmf",
+    "hdmf_zarr",
+    "ndx_events",
+    "ndx_pose",
+    "h5py",
+    "pandas",
+    "cv2",
+    "PIL",
+)
+
+_MEASUREMENT_CODE = """
+import json, sys, time
+start_time = time.perf_counter()
+try:
+    import {module_name}
+except ImportError as e:  # reported, so that a missing optional dependency can be told apart from a broken import
+    print(json.dumps(dict(missing_module_name=e.name, error=f"{{type(e).__name__}}: {{e}}")))
+    raise
+import_seconds = time.perf_counter() - start_time
+heavy_module_names = [name for name in {heavy_module_names!r} if name in sys.modules]
+print(json.dumps(dict(import_seconds=import_seconds, heavy_module_names=heavy_module_names)))
+"""
+
+
+class ImportFailedError(Exception):
+    """Raised when a module cannot be imported in the fresh interpreter of a measurement."""
+
+    def __init__(self, module_name: str, missing_module_name: Optional[str], error: str):
+        super().__init__(f"Importing {module_name} failed with {error}")
+        self.missing_module_name = missing_module_name
+        self.error = error
+
+
+def measure_import(module_name: str, heavy_module_names: Iterable[str] = HEAVY_MODULE_NAMES, repeats: int = 3) -> dict:
+    """Measure the import of a module in fresh interpreters.
+
+    Parameters
+    ----------
+    module_name : str
+        Fully qualified name of the module to import.
+    heavy_module_names : Iterable[str], optional
+        Names of the heavy top-level modules to look for after the import, by default HEAVY_MODULE_NAMES.
+    repeats : int, optional
+        Number of fresh interpreters in which the import is measured, by default 3. The fastest one is kept, since
+        the slower ones only measure noise (ex. a cold disk cache).
+
+    Returns
+    -------
+    dict
+        The 'import_seconds' of the module and the 'heavy_module_names' that it imported.
+
+    Raises
+    ------
+    ImportFailedError
+        If the import fails. Its 'missing_module_name' is the name of the module that could not be imported (or from
+        which a name could not be imported), or None if the import failed with another error.
+    """
+    code = _MEASUREMENT_CODE.format(module_name=module_name, heavy_module_names=tuple(heavy_module_names))
+    measurements = []
+    for _ in range(repeats):
+        completed_process = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        output_lines = completed_process.stdout.strip().splitlines()
+        if completed_process.returncode != 0:
+            report = json.loads(output_lines[-1]) if len(output_lines) > 0 else dict()
+            stderr_lines = completed_process.stderr.strip().splitlines() or ["unknown error"]
+            raise ImportFailedError(
+                module_name=module_name,
+                missing_module_name=report.get("missing_module_name"),
+                error=report.get("error", stderr_lines[-1]),
+            )
+        measurements.append(json.loads(output_lines[-1]))
+    return min(measurements, key=lambda measurement: measurement["import_seconds"])
+
+
+def run_benchmark(repeats: int = 3, max_seconds: Optional[float] = None) -> bool:
+    """Measure the import of every conversion package and converter module, and print the results.
+
+    Parameters
+    ----------
+    repeats : int, optional
+        Number of fresh interpreters in which each import is measured, by default 3.
+    max_seconds : float, optional
+        Maximum import time in seconds of a converter module, by default None (no limit).
+
+    Returns
+    -------
+    bool
+        Whether every package stayed lazy and every converter module imported in time. A converter module is skipped
+        if one of the optional dependencies of its conversion is missing or incompatible, and fails on any other error.
+    """
+    is_passing = True
+    for module_name in LAZY_MODULE_NAMES:
+        measurement = measure_import(module_name=module_name, repeats=repeats)
+        heavy_module_names = measurement["heavy_module_names"]
+        status = "ok" if len(heavy_module_names) == 0 else f"FAIL (imports {', '.join(heavy_module_names)})"
+        is_passing &= len(heavy_module_names) == 0
+        print(f"{module_name:<70} {measurement['import_seconds']:>7.3f} s  {status}")
+    for module_name, optional_dependency_names in FULL_MODULE_NAME_TO_OPTIONAL_DEPENDENCY_NAMES.items():
+        try:
+            measurement = measure_import(module_name=module_name, repeats=repeats)
+        except ImportFailedError as e:
+            missing_top_level_name = (e.missing_module_name or "").split(".")[0]
+            if missing_top_level_name in optional_dependency_names:  # the extra of this conversion is not installed
+                print(f"{module_name:<70} {'-':>7}    skipped ({e.error})")
+            else:
+                is_passing = False
+                print(f"{module_name:<70} {'-':>7}    FAIL ({e.error})")
+            continue
+        is_too_slow = max_seconds is not None and measurement["import_seconds"] > max_seconds
+        status = f"FAIL (more than {max_seconds} s)" if is_too_slow else "ok"
+        is_passing &= not is_too_slow
+        print(f"{module_name:<70} {measurement['import_seconds']:>7.3f} s  {status}")
+    return is_passing
+
+
+def main():
+    """
+    Command-line interface for the import time benchmark.
+
+    Parses arguments, calls run_benchmark() and exits with status 1 on regressions.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the import time of the conversion packages.")
+    parser.add_argument("--repeats", type=int, default=3, help="Number of fresh interpreters per import.")
+    parser.add_argument("--max_seconds", type=float, default=None, help="Maximum import time of a converter module.")
+    args = parser.parse_args()
+
+    is_passing = run_benchmark(repeats=args.repeats, max_seconds=args.max_seconds)
+    sys.exit(0 if is_passing else 1)
+
+
+if __name__ == "__main__":
+    main()
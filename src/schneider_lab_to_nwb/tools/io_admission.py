@@ -0,0 +1,211 @@
+"""Cross-process admission control for heavy sequential reads from shared storage."""
+import hashlib
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from neuroconv.utils import load_dict_from_file
+from pydantic import DirectoryPath, FilePath
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+# Environment variable with the path of the configuration file read by load_max_readers_per_storage_root()
+IO_ADMISSION_FILE_ENVIRONMENT_VARIABLE = "SCHNEIDER_LAB_TO_NWB_IO_ADMISSION_FILE"
+
+_max_readers_per_storage_root = dict()
+_lock_dir_path = None
+
+
+def configure_io_admission(
+    max_readers_per_storage_root: Optional[dict[str, int]] = None, lock_dir_path: Optional[DirectoryPath] = None
+):
+    """Configure how many heavy readers may stream from each storage root at once, for this process.
+
+    All processes on a machine that use the same lock directory share the same slots, so this function is meant to be
+    called in the main process and, through the initializer of the process pool, in every worker process. The slots
+    are held through operating system file locks, which are released automatically if a process dies.
+
+    Parameters
+    ----------
+    max_readers_per_storage_root : dict[str, int], optional
+        Mapping from a storage root (ex. a network share mount point) to the maximum number of concurrent heavy
+        readers of files under it. Files outside of every storage root are read without limits. By default None, which
+        disables admission control.
+    lock_dir_path : DirectoryPath, optional
+        Directory where the slot lock files are stored, by default a folder in the system temporary directory.
+    """
+    global _max_readers_per_storage_root, _lock_dir_path
+    _max_readers_per_storage_root = {
+        os.path.normcase(os.path.abspath(storage_root)): max_readers
+        for storage_root, max_readers in (max_readers_per_storage_root or dict()).items()
+    }
+    if lock_dir_path is None:
+        lock_dir_path = Path(tempfile.gettempdir()) / "schneider_lab_to_nwb_io_admission"
+    _lock_dir_path = Path(lock_dir_path)
+    _lock_dir_path.mkdir(parents=True, exist_ok=True)
+
+
+def get_storage_root(path: str | Path) -> Optional[str]:
+    """Get the most specific configured storage root that contains the path, or None if there is no such root."""
+    path = os.path.normcase(os.path.abspath(path))
+    matching_storage_roots = [
+        storage_root
+        for storage_root in _max_readers_per_storage_root
+        if path == storage_root or path.startswith(storage_root.rstrip(os.sep) + os.sep)
+    ]
+    if len(matching_storage_roots) == 0:
+        return None
+    return max(matching_storage_roots, key=len)
+
+
+class IOSlot:
+    """One of the limited reader slots of a storage root, held through an exclusive lock on a slot file."""
+
+    def __init__(
+        self,
+        storage_root: str,
+        max_readers: Optional[int] = None,
+        lock_dir_path: Optional[DirectoryPath] = None,
+        poll_interval: float = 0.5,
+    ):
+        """Initialize the slot.
+
+        Parameters
+        ----------
+        storage_root : str
+            A storage root configured with configure_io_admission().
+        max_readers : int, optional
+            Maximum number of concurrent readers of the storage root, by default None (as configured in this process).
+        lock_dir_path : DirectoryPath, optional
+            Directory where the slot lock files are stored, by default None (as configured in this process).
+        poll_interval : float, optional
+            Number of seconds to wait between attempts when every slot is taken, by default 0.5.
+        """
+        self.storage_root = storage_root
+        self.max_readers = _max_readers_per_storage_root[storage_root] if max_readers is None else max_readers
+        self.lock_dir_path = Path(_lock_dir_path if lock_dir_path is None else lock_dir_path)
+        self.poll_interval = poll_interval
+        storage_root_hash = hashlib.sha1(storage_root.encode()).hexdigest()[:12]
+        self.slot_paths = [self.lock_dir_path / f"{storage_root_hash}.slot{i}.lock" for i in range(self.max_readers)]
+        self._file = None
+
+    def to_dict(self) -> dict:
+        """Get the arguments that recreate the slot, unheld, in another process (ex. a Zarr writer process)."""
+        return dict(
+            storage_root=self.storage_root,
+            max_readers=self.max_readers,
+            lock_dir_path=str(self.lock_dir_path),
+            poll_interval=self.poll_interval,
+        )
+
+    def acquire(self):
+        """Block until one of the slots of the storage root is free, and take it."""
+        if self._file is not None:
+            return
+        while True:
+            for slot_path in self.slot_paths:
+                file = open(slot_path, mode="a+b")
+                try:
+                    if os.name == "nt":
+                        file.seek(0)
+                        msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+                    else:
+                        fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    file.close()
+                    continue
+                self._file = file
+                return
+            time.sleep(self.poll_interval)
+
+    def release(self):
+        """Give the slot back. Releasing a slot that is not held does nothing."""
+        if self._file is None:
+            return
+        if os.name == "nt":
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+
+@contextmanager
+def io_admission(path: str | Path):
+    """Hold a reader slot of the storage root that contains the path for the duration of the context.
+
+    Parameters
+    ----------
+    path : str | Path
+        Path to the file or folder that will be read. If it is not under a configured storage root, no slot is taken.
+    """
+    storage_root = get_storage_root(path=path)
+    if storage_root is None:
+        yield
+        return
+    slot = IOSlot(storage_root=storage_root)
+    slot.acquire()
+    try:
+        yield
+    finally:
+        slot.release()
+
+
+def get_io_slot(path: str | Path) -> Optional[IOSlot]:
+    """Get a reader slot of the storage root that contains the path, or None if it is not under a storage root."""
+    storage_root = get_storage_root(path=path)
+    if storage_root is None:
+        return None
+    return IOSlot(storage_root=storage_root)
+
+
+def load_max_readers_per_storage_root(file_path: Optional[FilePath] = None) -> Optional[dict[str, int]]:
+    """Load the maximum number of readers of each storage root from a configuration file.
+
+    The file (YAML or JSON) maps each storage root to its maximum number of concurrent readers, ex. `"Z:\\": 4`.
+
+    Parameters
+    ----------
+    file_path : FilePath, optional
+        Path to the configuration file, by default None, in which case the path is read from the
+        SCHNEIDER_LAB_TO_NWB_IO_ADMISSION_FILE environment variable.
+
+    Returns
+    -------
+    Optional[dict[str, int]]
+        The maximum number of readers of each storage root, or None if no configuration file is set.
+    """
+    if file_path is None:
+        file_path = os.environ.get(IO_ADMISSION_FILE_ENVIRONMENT_VARIABLE)
+    if file_path is None:
+        return None
+    max_readers_per_storage_root = load_dict_from_file(file_path=Path(file_path))
+    return {str(storage_root): int(max_readers) for storage_root, max_readers in max_readers_per_storage_root.items()}
+
+
+class IOAdmissionMixin:
+    """Mixin for data chunk iterators that hold a reader slot of the storage root of their source while reading.
+
+    The slot is taken for each buffer that is read, which happens when the dataset is written, so only the streaming
+    phase of the conversion is limited. The slot is part of the pickled iterator, so the limits also apply in the
+    processes that write Zarr chunks in parallel, which do not call configure_io_admission().
+    """
+
+    io_slot: Optional[IOSlot] = None
+
+    def _get_data(self, selection: tuple[slice]) -> np.ndarray:
+        if self.io_slot is None:
+            return super()._get_data(selection=selection)
+        self.io_slot.acquire()
+        try:
+            return super()._get_data(selection=selection)
+        finally:
+            self.io_slot.release()
@@ -0,0 +1,36 @@
+"""Module-level __getattr__ and __dir__ (PEP 562) shared by the packages whose public names are imported lazily."""
+import importlib
+from typing import Any, Callable
+
+
+def get_lazy_attribute_functions(
+    module_globals: dict, attribute_name_to_module_name: dict[str, str]
+) -> tuple[Callable[[str], Any], Callable[[], list[str]]]:
+    """Get the __getattr__ and __dir__ functions of a package whose public names are imported on first access.
+
+    Parameters
+    ----------
+    module_globals : dict
+        The globals() of the package, where each imported name is cached so that later accesses skip __getattr__.
+    attribute_name_to_module_name : dict[str, str]
+        The name of the (relative) submodule of the package that defines each public name.
+
+    Returns
+    -------
+    tuple[Callable[[str], Any], Callable[[], list[str]]]
+        The __getattr__ and __dir__ functions of the package.
+    """
+    package_name = module_globals["__name__"]
+
+    def __getattr__(name: str):
+        if name not in attribute_name_to_module_name:
+            raise AttributeError(f"module {package_name!r} has no attribute {name!r}")
+        module = importlib.import_module(attribute_name_to_module_name[name], package=package_name)
+        value = getattr(module, name)
+        module_globals[name] = value  # later accesses skip __getattr__
+        return value
+
+    def __dir__():
+        return sorted(set(module_globals) | set(attribute_name_to_module_name))
+
+    return __getattr__, __dir__
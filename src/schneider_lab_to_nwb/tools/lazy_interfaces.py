@@ -0,0 +1,110 @@
+"""Lazy initialization of the data interfaces of a converter."""
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from neuroconv import NWBConverter
+from neuroconv.basedatainterface import BaseDataInterface
+from neuroconv.baseextractorinterface import BaseExtractorInterface
+
+
+class LazyDataInterfaceObjects(Mapping):
+    """Mapping from interface name to data interface, in which each interface is only initialized when first accessed.
+
+    Initializing an interface often opens and scans its files (ex. the extractors of a recording or the readers of a
+    video), so converters that only need the metadata of a few cheap interfaces should not pay for the others.
+    Iterating over the values or the items, as NWBConverter.get_metadata() and run_conversion() do, still initializes
+    every interface, with the pending ones initialized at the same time in a thread pool, since each of them mostly
+    waits on I/O (ex. probing videos, loading SLEAP files or scanning recordings).
+    """
+
+    def __init__(self, data_interface_classes: dict[str, type[BaseDataInterface]], source_data: dict[str, dict]):
+        """Initialize the mapping.
+
+        Parameters
+        ----------
+        data_interface_classes : dict[str, type[BaseDataInterface]]
+            The data interface classes of the converter, by name.
+        source_data : dict[str, dict]
+            The source data of the converter. Interfaces without source data are left out.
+        """
+        self.data_interface_classes = data_interface_classes
+        self.source_data = source_data
+        self._names = [name for name in data_interface_classes if name in source_data]
+        self._data_interface_objects = dict()
+
+    def __getitem__(self, name: str) -> BaseDataInterface:
+        if name not in self._names:
+            raise KeyError(name)
+        if name not in self._data_interface_objects:
+            data_interface_class = self.data_interface_classes[name]
+            self._data_interface_objects[name] = data_interface_class(**self.source_data[name])
+        return self._data_interface_objects[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._names
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def values(self):
+        self.initialize_all()
+        return super().values()
+
+    def items(self):
+        self.initialize_all()
+        return super().items()
+
+    def initialize_all(self, max_workers: Optional[int] = None):
+        """Initialize every pending interface at the same time, in a thread pool.
+
+        Parameters
+        ----------
+        max_workers : int, optional
+            The maximum number of threads, by default one per pending interface.
+
+        Raises
+        ------
+        Exception
+            The first exception raised by an interface, in the order of the interface classes, once every
+            initialization has finished.
+        """
+        pending_names = [name for name in self._names if not self.is_initialized(name=name)]
+        if len(pending_names) <= 1:
+            for name in pending_names:
+                self[name]
+            return
+        # Extractor interfaces import their extractor module on initialization, and a module that is being imported by
+        # another thread can be seen partially initialized, so the extractor classes are resolved beforehand, in turn
+        for name in pending_names:
+            data_interface_class = self.data_interface_classes[name]
+            if issubclass(data_interface_class, BaseExtractorInterface):
+                data_interface_class.get_extractor()
+        with ThreadPoolExecutor(max_workers=max_workers or len(pending_names)) as executor:
+            futures = [executor.submit(self.__getitem__, name) for name in pending_names]
+        for future in futures:
+            future.result()
+
+    def is_initialized(self, name: str) -> bool:
+        """Whether the interface has already been initialized."""
+        return name in self._data_interface_objects
+
+
+class LazyNWBConverter(NWBConverter):
+    """NWBConverter whose data interfaces are initialized lazily, see LazyDataInterfaceObjects."""
+
+    def __init__(self, source_data: dict[str, dict], verbose: bool = True):
+        """Validate source_data against source_schema and prepare the data interfaces, which are initialized lazily.
+
+        Each data interface is only initialized (which opens and scans its files) when it is first accessed, so that
+        get_session_metadata() stays cheap.
+        """
+        self.verbose = verbose
+        self.preview_window = None
+        self._validate_source_data(source_data=source_data, verbose=self.verbose)
+        self.data_interface_objects = LazyDataInterfaceObjects(
+            data_interface_classes=self.data_interface_classes, source_data=source_data
+        )
@@ -0,0 +1,58 @@
+"""Per-worker memory budget that sizes the buffers of the data chunk iterators."""
+import os
+import warnings
+from pathlib import Path
+from typing import Iterable
+
+BASELINE_MEMORY_GB = 1.0  # interpreter, libraries, metadata and small tables
+MAT_FILE_EXPANSION_FACTOR = 4.0  # size in memory of a file read in full relative to its (compressed) size on disk
+MIN_BUFFER_GB = 0.1
+MAX_BUFFER_GB = 4.0  # larger buffers do not make the writes faster, they only hold more memory
+
+
+def estimate_in_memory_gb(file_paths: Iterable[str | Path]) -> float:
+    """Estimate the memory needed to hold files that are read in full, such as the .mat files read with read_mat.
+
+    Parameters
+    ----------
+    file_paths : Iterable[str | Path]
+        Paths to the files that are read in full during the conversion.
+
+    Returns
+    -------
+    float
+        The estimated memory in GB.
+    """
+    num_bytes = sum(os.path.getsize(file_path) for file_path in file_paths if file_path is not None)
+    return num_bytes * MAT_FILE_EXPANSION_FACTOR / 1e9
+
+
+def get_buffer_gb(memory_budget_gb: float, in_memory_file_paths: Iterable[str | Path] = ()) -> float:
+    """Get the buffer size of the data chunk iterators that keeps a conversion under its memory budget.
+
+    Datasets are written one after the other, so a single buffer is in memory at a time, along with the copy of it
+    made by the writer. The rest of the budget goes to the baseline of the worker and to the files read in full, and
+    the buffers never exceed MAX_BUFFER_GB, however large the budget. A warning is raised if the budget cannot even fit
+    the smallest buffer, in which case the conversion will likely exceed it.
+
+    Parameters
+    ----------
+    memory_budget_gb : float
+        The maximum memory in GB that the conversion should use.
+    in_memory_file_paths : Iterable[str | Path], optional
+        Paths to the files that are read in full during the conversion, by default ().
+
+    Returns
+    -------
+    float
+        The buffer size in GB to pass to the data chunk iterators.
+    """
+    fixed_gb = BASELINE_MEMORY_GB + estimate_in_memory_gb(file_paths=in_memory_file_paths)
+    buffer_gb = min((memory_budget_gb - fixed_gb) / 2, MAX_BUFFER_GB)
+    if buffer_gb < MIN_BUFFER_GB:
+        warnings.warn(
+            f"The memory budget of {memory_budget_gb:.1f} GB cannot fit this session, which needs about "
+            f"{fixed_gb + 2 * MIN_BUFFER_GB:.1f} GB. Falling back to buffers of {MIN_BUFFER_GB} GB."
+        )
+        buffer_gb = MIN_BUFFER_GB
+    return buffer_gb
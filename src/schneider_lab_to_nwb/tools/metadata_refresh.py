@@ -0,0 +1,151 @@
+"""In-place update of the metadata of written NWB files, without reconverting their data."""
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Optional
+
+import h5py
+import numpy as np
+from pydantic import FilePath
+
+
+def refresh_nwbfile_metadata(nwbfile_path: FilePath, updates: list[dict], dry_run: bool = False) -> list[dict]:
+    """Patch the attributes, text datasets and small table cells of an NWB (HDF5) file whose value changed.
+
+    Each update is a dictionary with the 'path' of an object of the file, the new 'value' and either:
+
+    - 'attribute': the name of an attribute of the object, ex. dict(path="units", attribute="description", ...).
+    - nothing else: the object is a text dataset, scalar or 1D, ex. dict(path="general/keywords", ...).
+    - 'column' and 'row_key': the object is a DynamicTable whose cell in 'column' is set on the row where the column
+      row_key[0] equals row_key[1], ex. dict(path=".../valued_events_table", column="event_description",
+      row_key=("label", "tuningTones"), ...).
+
+    Objects that are missing from the file are skipped, as are objects reached through an external link, which belong
+    to another file (a shared or companion file is refreshed on its own). Only values that differ are written, so a
+    refresh with unchanged metadata does not modify the file.
+
+    Parameters
+    ----------
+    nwbfile_path : FilePath
+        Path to the NWB file.
+    updates : list[dict]
+        The updates, as described above.
+    dry_run : bool, optional
+        Whether to only list the changes, without writing them, by default False.
+
+    Returns
+    -------
+    list[dict]
+        The changes, each with the 'path', the 'field' (attribute or column name, None for a dataset), the 'old_value'
+        and the 'new_value'.
+    """
+    changes = []
+    with h5py.File(nwbfile_path, mode="r" if dry_run else "r+") as file:
+        for update in updates:
+            path = update["path"]
+            if path not in file or file[path].file.filename != file.filename:
+                continue
+            neurodata_object = file[path]
+            new_value = update["value"]
+            if "attribute" in update:
+                field = update["attribute"]
+                old_value = _decode(neurodata_object.attrs.get(field))
+                if old_value == new_value:
+                    continue
+                if not dry_run:
+                    neurodata_object.attrs[field] = new_value
+            elif "column" in update:
+                field = update["column"]
+                key_column_name, key_value = update["row_key"]
+                if field not in neurodata_object or key_column_name not in neurodata_object:
+                    continue
+                row_indices = np.flatnonzero(np.asarray(_decode(neurodata_object[key_column_name][:])) == key_value)
+                if len(row_indices) == 0:
+                    continue
+                column = neurodata_object[field]
+                old_value = _decode(column[row_indices[0]])
+                if old_value == new_value:
+                    continue
+                if not dry_run:
+                    for row_index in row_indices:
+                        column[row_index] = new_value
+            else:
+                field = None
+                old_value = _decode(neurodata_object[()])
+                if isinstance(old_value, np.ndarray):
+                    old_value = old_value.tolist()
+                if old_value == new_value:
+                    continue
+                if not dry_run:
+                    _replace_text_dataset(file=file, path=path, value=new_value)
+            changes.append(dict(path=path, field=field, old_value=old_value, new_value=new_value))
+    return changes
+
+
+def refresh_nwbfiles_metadata(
+    nwbfile_path_to_updates: dict[FilePath, list[dict]],
+    max_workers: int = 1,
+    dry_run: bool = False,
+    verbose: bool = True,
+) -> dict[Path, list[dict]]:
+    """Run refresh_nwbfile_metadata() on several NWB files, in parallel processes.
+
+    Parameters
+    ----------
+    nwbfile_path_to_updates : dict[FilePath, list[dict]]
+        The updates of each NWB file.
+    max_workers : int, optional
+        The maximum number of files patched at the same time, by default 1.
+    dry_run : bool, optional
+        Whether to only list the changes, without writing them, by default False.
+    verbose : bool, optional
+        Whether to print the changes of each file, by default True.
+
+    Returns
+    -------
+    dict[Path, list[dict]]
+        The changes of each NWB file.
+    """
+    nwbfile_paths = [Path(nwbfile_path) for nwbfile_path in nwbfile_path_to_updates]
+    updates_per_file = list(nwbfile_path_to_updates.values())
+    dry_run_per_file = [dry_run] * len(nwbfile_paths)
+    if max_workers == 1:
+        changes_per_file = list(map(refresh_nwbfile_metadata, nwbfile_paths, updates_per_file, dry_run_per_file))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            changes_per_file = list(
+                executor.map(refresh_nwbfile_metadata, nwbfile_paths, updates_per_file, dry_run_per_file)
+            )
+    nwbfile_path_to_changes = dict(zip(nwbfile_paths, changes_per_file))
+    if verbose:
+        for nwbfile_path, changes in nwbfile_path_to_changes.items():
+            for change in changes:
+                field = "" if change["field"] is None else f" ({change['field']})"
+                print(
+                    f"{nwbfile_path.name}: {change['path']}{field}: {change['old_value']!r} -> {change['new_value']!r}"
+                )
+        num_changed = sum(len(changes) > 0 for changes in nwbfile_path_to_changes.values())
+        action = "would be updated" if dry_run else "updated"
+        print(f"{num_changed}/{len(nwbfile_path_to_changes)} NWB files {action}")
+    return nwbfile_path_to_changes
+
+
+def _replace_text_dataset(file: h5py.File, path: str, value: Any):
+    """Write a text dataset, recreating it (with its attributes) if the value does not fit its shape or type."""
+    dataset = file[path]
+    new_shape = np.shape(value)
+    string_dtype = h5py.check_string_dtype(dataset.dtype)
+    if dataset.shape == new_shape and string_dtype is not None and string_dtype.length is None:
+        dataset[()] = value
+        return
+    attributes = dict(dataset.attrs)
+    del file[path]
+    new_dataset = file.create_dataset(path, data=value, dtype=h5py.string_dtype())
+    new_dataset.attrs.update(attributes)
+
+
+def _decode(value: Optional[Any]) -> Optional[Any]:
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    if isinstance(value, np.ndarray) and value.dtype.kind in ("O", "S"):
+        return np.array([_decode(element) for element in value.ravel()], dtype=object).reshape(value.shape)
+    return value
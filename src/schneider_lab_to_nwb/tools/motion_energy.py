@@ -0,0 +1,235 @@
+"""Primary class for converting the motion energy of behavior videos."""
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import cv2
+import numpy as np
+from neuroconv.basedatainterface import BaseDataInterface
+from neuroconv.tools import nwb_helpers
+from neuroconv.utils import DeepDict, get_base_schema
+from pydantic import FilePath
+from pynwb.base import TimeSeries
+from pynwb.file import NWBFile
+
+from .preview import get_window_slice
+from .video_probing import probe_video
+
+
+def compute_motion_energy(
+    file_path: FilePath,
+    roi: Optional[tuple[int, int, int, int]] = None,
+    num_frames: Optional[int] = None,
+    number_of_jobs: int = 1,
+    start_frame: int = 0,
+) -> tuple[np.ndarray, Optional[np.ndarray]]:
+    """Compute the motion energy of every frame of a video, decoding contiguous ranges of frames in parallel.
+
+    The motion energy of a frame is the mean absolute difference between its grayscale pixels and those of the
+    previous frame, so it is NaN for the first frame of the video. The video is split into one range of frames per
+    job, and each job seeks to the frame before its range and decodes the range once.
+
+    Parameters
+    ----------
+    file_path : FilePath
+        Path to the video file.
+    roi : tuple[int, int, int, int], optional
+        The (x, y, width, height) in pixels of a region of interest, whose motion energy is also computed, by default
+        None.
+    num_frames : int, optional
+        The number of frames to compute the motion energy of, from start_frame, by default every frame from it.
+    number_of_jobs : int, optional
+        Number of processes that decode the video, by default 1.
+    start_frame : int, optional
+        The index of the first frame to compute the motion energy of, by default 0.
+
+    Returns
+    -------
+    tuple[np.ndarray, Optional[np.ndarray]]
+        The motion energy of the whole frames, and that of the region of interest (None without roi).
+    """
+    if num_frames is None:
+        num_frames = probe_video(file_path=file_path)["num_frames"] - start_frame
+    frame_range_bounds = start_frame + np.linspace(0, num_frames, min(number_of_jobs, num_frames) + 1).astype(int)
+    frame_ranges = [(int(start), int(stop)) for start, stop in zip(frame_range_bounds[:-1], frame_range_bounds[1:])]
+    if number_of_jobs == 1:
+        results = [_compute_motion_energy_in_range(file_path, roi, *frame_range) for frame_range in frame_ranges]
+    else:
+        with ProcessPoolExecutor(max_workers=number_of_jobs) as executor:
+            futures = [
+                executor.submit(_compute_motion_energy_in_range, file_path, roi, *frame_range)
+                for frame_range in frame_ranges
+            ]
+            results = [future.result() for future in futures]
+    motion_energy = np.concatenate([result[0] for result in results]) if results else np.empty(0)
+    roi_motion_energy = np.concatenate([result[1] for result in results]) if roi is not None and results else None
+    return motion_energy, roi_motion_energy
+
+
+def _compute_motion_energy_in_range(
+    file_path: FilePath,
+    roi: Optional[tuple[int, int, int, int]],
+    start_frame: int,
+    stop_frame: int,
+) -> tuple[np.ndarray, np.ndarray]:
+    motion_energy = np.full(stop_frame - start_frame, np.nan, dtype=np.float32)
+    roi_motion_energy = np.full(stop_frame - start_frame, np.nan, dtype=np.float32)
+    video_capture = cv2.VideoCapture(str(file_path))
+    try:
+        # Start from the frame before the range, whose difference with the first frame of the range is needed
+        first_frame = max(start_frame - 1, 0)
+        video_capture.set(cv2.CAP_PROP_POS_FRAMES, first_frame)
+        previous_frame = None
+        for frame_index in range(first_frame, stop_frame):
+            is_read, frame = video_capture.read()
+            if not is_read:
+                break
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY).astype(np.float32)
+            if previous_frame is not None:
+                absolute_difference = np.abs(frame - previous_frame)
+                motion_energy[frame_index - start_frame] = absolute_difference.mean()
+                if roi is not None:
+                    x, y, width, height = roi
+                    roi_motion_energy[frame_index - start_frame] = absolute_difference[
+                        y : y + height, x : x + width
+                    ].mean()
+            previous_frame = frame
+    finally:
+        video_capture.release()
+    return motion_energy, roi_motion_energy
+
+
+class MotionEnergyInterface(BaseDataInterface):
+    """Motion energy interface for the behavior videos of the schneider lab conversions"""
+
+    keywords = ("behavior", "video", "motion energy")
+
+    def __init__(
+        self,
+        file_path: FilePath,
+        metadata_key_name: str = "MotionEnergy",
+        roi: Optional[tuple[int, int, int, int]] = None,
+    ):
+        """Initialize the motion energy interface.
+
+        Parameters
+        ----------
+        file_path : FilePath
+            Path to the video file.
+        metadata_key_name : str, optional
+            The key of the metadata of the motion energy in metadata["Behavior"], by default "MotionEnergy".
+        roi : tuple[int, int, int, int], optional
+            The (x, y, width, height) in pixels of a region of interest, whose motion energy is added as a second
+            TimeSeries, by default None.
+        """
+        super().__init__(file_path=file_path, metadata_key_name=metadata_key_name, roi=roi)
+        self.timestamps = None
+
+    def get_metadata(self) -> DeepDict:
+        metadata = super().get_metadata()
+        metadata_key_name = self.source_data["metadata_key_name"]
+        metadata["Behavior"][metadata_key_name] = dict(
+            name=metadata_key_name,
+            description="Mean absolute difference between the grayscale pixels of each frame and the previous frame.",
+        )
+        roi = self.source_data["roi"]
+        if roi is not None:
+            metadata["Behavior"][f"{metadata_key_name}ROI"] = dict(
+                name=f"{metadata_key_name}ROI",
+                description=(
+                    "Mean absolute difference between the grayscale pixels of each frame and the previous frame, in "
+                    f"the region of interest at x={roi[0]}, y={roi[1]} of width={roi[2]} and height={roi[3]} pixels."
+                ),
+            )
+        return metadata
+
+    def get_metadata_schema(self) -> dict:
+        metadata_schema = super().get_metadata_schema()
+        metadata_schema["properties"]["Behavior"] = get_base_schema(tag="Behavior")
+        time_series_schema = dict(
+            type="object",
+            properties=dict(name=dict(type="string"), description=dict(type="string")),
+        )
+        metadata_key_name = self.source_data["metadata_key_name"]
+        metadata_schema["properties"]["Behavior"]["properties"][metadata_key_name] = time_series_schema
+        if self.source_data["roi"] is not None:
+            metadata_schema["properties"]["Behavior"]["properties"][f"{metadata_key_name}ROI"] = time_series_schema
+        return metadata_schema
+
+    def get_timestamps(self) -> np.ndarray:
+        return self.timestamps
+
+    def set_aligned_timestamps(self, aligned_timestamps: np.ndarray):
+        """Set the timestamps of the frames of the video, already aligned to the session start time.
+
+        Parameters
+        ----------
+        aligned_timestamps : np.ndarray
+            The timestamp of every frame of the video.
+        """
+        self.timestamps = np.asarray(aligned_timestamps)
+
+    def add_to_nwbfile(
+        self,
+        nwbfile: NWBFile,
+        metadata: dict,
+        stub_test: bool = False,
+        number_of_jobs: int = 1,
+        preview_window: Optional[tuple[float, float]] = None,
+    ):
+        """Decode the video once to add its motion energy to the NWBFile.
+
+        Parameters
+        ----------
+        nwbfile : NWBFile
+            The NWBFile to which the motion energy will be added.
+        metadata : dict
+            Metadata dictionary with the motion energy metadata.
+        stub_test : bool, optional
+            Whether to only compute the motion energy of the first 100 frames, by default False.
+        number_of_jobs : int, optional
+            Number of processes that decode the video, by default 1.
+        preview_window : tuple[float, float], optional
+            The (start, stop) in seconds of the window of the session to which the motion energy is restricted, only
+            the frames in it being decoded, by default None (every frame).
+        """
+        if self.timestamps is None:
+            raise ValueError("The timestamps of the video must be set with set_aligned_timestamps() first.")
+        if preview_window is not None:
+            frame_slice = get_window_slice(timestamps=self.timestamps, preview_window=preview_window)
+        else:
+            frame_slice = slice(0, len(self.timestamps))
+        start_frame = frame_slice.start
+        num_frames = frame_slice.stop - start_frame
+        if stub_test:
+            num_frames = min(num_frames, 100)
+
+        # Read Data
+        motion_energy, roi_motion_energy = compute_motion_energy(
+            file_path=self.source_data["file_path"],
+            roi=self.source_data["roi"],
+            num_frames=num_frames,
+            number_of_jobs=number_of_jobs,
+            start_frame=start_frame,
+        )
+
+        # Add Data to NWBFile
+        module_metadata = metadata["Behavior"].get("Module", dict(name="behavior", description="Behavioral data."))
+        behavior_module = nwb_helpers.get_module(
+            nwbfile=nwbfile, name=module_metadata["name"], description=module_metadata["description"]
+        )
+        metadata_key_name = self.source_data["metadata_key_name"]
+        motion_energy_series = TimeSeries(
+            data=motion_energy,
+            timestamps=self.timestamps[start_frame : start_frame + num_frames],
+            unit="a.u.",
+            **metadata["Behavior"][metadata_key_name],
+        )
+        behavior_module.add(motion_energy_series)
+        if roi_motion_energy is not None:
+            roi_motion_energy_series = TimeSeries(
+                data=roi_motion_energy,
+                timestamps=motion_energy_series,  # same frames, so the timestamps are linked rather than copied
+                unit="a.u.",
+                **metadata["Behavior"][f"{metadata_key_name}ROI"],
+            )
+            behavior_module.add(roi_motion_energy_series)
@@ -0,0 +1,33 @@
+"""Concurrent reading of the source data of independent data interfaces."""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+from neuroconv.basedatainterface import BaseDataInterface
+
+
+def prefetch_data_interfaces(data_interfaces: Iterable[BaseDataInterface], max_workers: Optional[int] = None):
+    """Run the read_data() method of several data interfaces at the same time, in a thread pool.
+
+    Interfaces that define read_data() cache what it returns (ex. a parsed .mat file or decoded images) and use it in
+    add_to_nwbfile(), so running it beforehand overlaps their reads, which mostly wait on I/O, while the data is still
+    added to the NWBFile one interface after the other, in the usual order. Interfaces without read_data() are skipped.
+
+    Parameters
+    ----------
+    data_interfaces : Iterable[BaseDataInterface]
+        The data interfaces whose data should be read.
+    max_workers : int, optional
+        The maximum number of threads, by default one per interface.
+
+    Raises
+    ------
+    Exception
+        The first exception raised by read_data(), in the order of the interfaces, once every read has finished.
+    """
+    data_interfaces = [data_interface for data_interface in data_interfaces if hasattr(data_interface, "read_data")]
+    if len(data_interfaces) == 0:
+        return
+    with ThreadPoolExecutor(max_workers=max_workers or len(data_interfaces)) as executor:
+        futures = [executor.submit(data_interface.read_data) for data_interface in data_interfaces]
+    for future in futures:
+        future.result()
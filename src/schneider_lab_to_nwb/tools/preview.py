@@ -0,0 +1,125 @@
+"""Restriction of the data interfaces of a conversion to a short window of the session, for a quick preview."""
+import numpy as np
+
+
+def get_window_mask(times: np.ndarray, preview_window: tuple[float, float]) -> np.ndarray:
+    """Get which times are in a preview window.
+
+    Parameters
+    ----------
+    times : np.ndarray
+        The times, in seconds, on the timeline of the NWB file.
+    preview_window : tuple[float, float]
+        The (start, stop) of the window, in seconds, on the timeline of the NWB file. Both ends are in the window.
+
+    Returns
+    -------
+    np.ndarray
+        Whether each time is in the window, as a boolean array. NaN times are not.
+    """
+    times = np.asarray(times, dtype="float64")
+    start_time, stop_time = preview_window
+    return (times >= start_time) & (times <= stop_time)
+
+
+def get_window_overlap_mask(
+    start_times: np.ndarray, stop_times: np.ndarray, preview_window: tuple[float, float]
+) -> np.ndarray:
+    """Get which intervals (ex. trials or experiments) overlap a preview window, even if they start before it.
+
+    Parameters
+    ----------
+    start_times : np.ndarray
+        The start times of the intervals, in seconds, on the timeline of the NWB file.
+    stop_times : np.ndarray
+        The stop times of the intervals, in seconds, on the timeline of the NWB file.
+    preview_window : tuple[float, float]
+        The (start, stop) of the window, in seconds, on the timeline of the NWB file.
+
+    Returns
+    -------
+    np.ndarray
+        Whether each interval overlaps the window, as a boolean array. Intervals with a NaN time do not.
+    """
+    start_times, stop_times = np.asarray(start_times, dtype="float64"), np.asarray(stop_times, dtype="float64")
+    start_time, stop_time = preview_window
+    return (start_times <= stop_time) & (stop_times >= start_time)
+
+
+def get_window_slice(timestamps: np.ndarray, preview_window: tuple[float, float]) -> slice:
+    """Get the slice of sorted timestamps (ex. of the frames of a video) that are in a preview window.
+
+    Only the two timestamps at the ends of the window are searched for, so memory-mapped timestamps are not read in
+    full.
+
+    Parameters
+    ----------
+    timestamps : np.ndarray
+        The sorted timestamps, in seconds, on the timeline of the NWB file.
+    preview_window : tuple[float, float]
+        The (start, stop) of the window, in seconds, on the timeline of the NWB file.
+
+    Returns
+    -------
+    slice
+        The slice of the timestamps in the window, which is empty when none is.
+    """
+    start_time, stop_time = preview_window
+    start_index = int(np.searchsorted(timestamps, start_time, side="left"))
+    stop_index = int(np.searchsorted(timestamps, stop_time, side="right"))
+    return slice(start_index, max(start_index, stop_index))
+
+
+def restrict_recording_interface(recording_interface, preview_window: tuple[float, float]):
+    """Restrict the recording extractor of a recording interface to the samples in a preview window, in place.
+
+    The restricted recording keeps the times of its samples (its starting time or its timestamps), so it is written
+    where it would be in the full NWB file. The window is on the current timeline of the interface, that of the NWB
+    file once the interface is aligned, and it must be restricted before it is added to the NWBFile.
+
+    Parameters
+    ----------
+    recording_interface : BaseRecordingExtractorInterface
+        The recording interface, with a single segment.
+    preview_window : tuple[float, float]
+        The (start, stop) of the window, in seconds, on the timeline of the interface.
+
+    Raises
+    ------
+    ValueError
+        If no sample of the recording is in the window.
+    """
+    recording = recording_interface.recording_extractor
+    num_samples = recording.get_num_samples(segment_index=0)
+    start_time, stop_time = preview_window
+    # To within a sample, for the recordings with a starting time and those with timestamps alike
+    start_frame = int(np.clip(recording.time_to_sample_index(start_time, segment_index=0), 0, num_samples))
+    stop_frame = int(np.clip(recording.time_to_sample_index(stop_time, segment_index=0) + 1, 0, num_samples))
+    if start_frame >= stop_frame:
+        raise ValueError(f"No sample of the recording is in the preview window {preview_window}.")
+    recording_interface.recording_extractor = recording.frame_slice(start_frame=start_frame, end_frame=stop_frame)
+
+
+def restrict_sorting_interface(sorting_interface, preview_window: tuple[float, float]):
+    """Restrict the sorting extractor of a sorting interface to the spikes in a preview window, in place.
+
+    The units are all kept, even those without spikes in the window, and the spikes keep their times. The window is on
+    the current timeline of the interface, that of the NWB file once the interface is aligned, and it must be
+    restricted before it is added to the NWBFile.
+
+    Parameters
+    ----------
+    sorting_interface : BaseSortingExtractorInterface
+        The sorting interface, with a single segment and no registered recording.
+    preview_window : tuple[float, float]
+        The (start, stop) of the window, in seconds, on the timeline of the interface.
+    """
+    sorting = sorting_interface.sorting_extractor
+    sampling_frequency = sorting.get_sampling_frequency()
+    starting_time = sorting._sorting_segments[0]._t_start or 0.0  # as neuroconv aligns the sortings
+    start_time, stop_time = preview_window
+    start_frame = max(int(np.ceil((start_time - starting_time) * sampling_frequency)), 0)
+    stop_frame = max(int(np.floor((stop_time - starting_time) * sampling_frequency)) + 1, start_frame + 1)
+    sorting_interface.sorting_extractor = sorting.frame_slice(start_frame=start_frame, end_frame=stop_frame)
+    # The spike frames of the restricted sorting count from the start of the window
+    sorting_interface.set_aligned_starting_time(starting_time + start_frame / sampling_frequency)
@@ -0,0 +1,343 @@
+"""
+Script to repack finished NWB files into cloud-optimized HDF5.
+
+The file is rewritten with paged aggregation, so that its metadata is gathered into a few large pages that remote
+readers (fsspec, ros3) can fetch in a handful of requests, and its large datasets are rechunked along time, so that
+reading a time window over all channels touches as few chunks as possible. Datasets are streamed through a bounded
+buffer, one at a time. Objects linked from other files (ex. the '_desc-ecephys.nwb' companion of a split layout) stay
+external links. If the repacked file would be larger than the original, the original is kept.
+
+Typical usage example:
+    python -m schneider_lab_to_nwb.tools.repack --folder_path nwb_output --max_workers 4
+"""
+import argparse
+import math
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional
+
+import h5py
+import numpy as np
+from hdmf.backends.hdf5 import H5DataIO
+from hdmf.container import Data
+from neuroconv.tools.hdmf import SliceableDataChunkIterator
+from pydantic import DirectoryPath, FilePath
+from pynwb import NWBHDF5IO, TimeSeries
+
+from .split_layout import is_companion_nwbfile_path
+
+
+def get_time_chunk_shape(shape: tuple[int, ...], dtype: np.dtype, target_chunk_mb: float) -> tuple[int, ...]:
+    """Get a chunk shape that spans every column and as many rows (time points) as fit in the target size.
+
+    Parameters
+    ----------
+    shape : tuple[int, ...]
+        Shape of the dataset, with time along the first axis.
+    dtype : np.dtype
+        Data type of the dataset.
+    target_chunk_mb : float
+        Target size of each chunk in MB.
+
+    Returns
+    -------
+    tuple[int, ...]
+        The chunk shape.
+    """
+    row_num_bytes = np.dtype(dtype).itemsize * math.prod(shape[1:])
+    num_rows = max(1, min(shape[0], int(target_chunk_mb * 1e6 // row_num_bytes)))
+    return (num_rows, *shape[1:])
+
+
+def get_page_size(file_size: int, max_page_size_mb: float = 8.0) -> int:
+    """Get a file space page size suited to a file, so that small files are not padded to a few large pages.
+
+    The page size is the power of two closest to 1/256th of the file size, between 64 KiB and max_page_size_mb.
+
+    Parameters
+    ----------
+    file_size : int
+        Size of the file in bytes.
+    max_page_size_mb : float, optional
+        Maximum page size in MB (MiB), by default 8.0.
+
+    Returns
+    -------
+    int
+        The page size in bytes.
+    """
+    min_page_size = 64 * 2**10
+    max_page_size = int(max_page_size_mb * 2**20)
+    page_size = 2 ** round(math.log2(max(file_size, 1) / 256))
+    return int(min(max(page_size, min_page_size), max_page_size))
+
+
+def _configure_rechunking(
+    neurodata_object,
+    dataset_name: str,
+    target_chunk_mb: float,
+    min_dataset_mb: float,
+    buffer_gb: float,
+    source_file_path: Path,
+) -> bool:
+    dataset = neurodata_object.data if dataset_name is None else neurodata_object.fields.get(dataset_name)
+    if not isinstance(dataset, h5py.Dataset) or dataset.ndim == 0 or dataset.dtype.kind not in "biuf":
+        return False
+    if Path(dataset.file.filename).resolve() != source_file_path.resolve():  # linked from another file
+        return False
+    if dataset.size * dataset.dtype.itemsize < min_dataset_mb * 1e6:
+        return False
+    chunk_shape = get_time_chunk_shape(shape=dataset.shape, dtype=dataset.dtype, target_chunk_mb=target_chunk_mb)
+    data_io_kwargs = dict(chunks=chunk_shape, compression=dataset.compression, shuffle=dataset.shuffle)
+    if dataset.compression is not None:
+        data_io_kwargs["compression_opts"] = dataset.compression_opts
+    data_chunk_iterator_kwargs = dict(chunk_shape=chunk_shape, buffer_gb=buffer_gb, display_progress=False)
+    if dataset_name is None:
+        neurodata_object.set_data_io(
+            data_io_class=H5DataIO,
+            data_io_kwargs=data_io_kwargs,
+            data_chunk_iterator_class=SliceableDataChunkIterator,
+            data_chunk_iterator_kwargs=data_chunk_iterator_kwargs,
+        )
+    else:
+        neurodata_object.set_data_io(
+            dataset_name=dataset_name,
+            data_io_class=H5DataIO,
+            data_io_kwargs=data_io_kwargs,
+            data_chunk_iterator_class=SliceableDataChunkIterator,
+            data_chunk_iterator_kwargs=data_chunk_iterator_kwargs,
+        )
+    # Otherwise the export writes the builder cached when the file was read, with the original layout
+    neurodata_object.set_modified()
+    return True
+
+
+def _rebase_external_links(file_path: Path, original_dir_path: Path):
+    """Make the relative external links of a copied HDF5 file point to the same files as from its original folder."""
+
+    def rebase_group(group: h5py.Group):
+        for name in list(group):
+            link = group.get(name, getlink=True)
+            if isinstance(link, h5py.ExternalLink) and not os.path.isabs(link.filename):
+                target_file_path = (original_dir_path / link.filename).resolve()
+                del group[name]
+                group[name] = h5py.ExternalLink(os.path.relpath(target_file_path, file_path.parent), link.path)
+            elif isinstance(link, h5py.HardLink) and isinstance(group[name], h5py.Group):
+                rebase_group(group=group[name])
+
+    with h5py.File(file_path, mode="a") as file:
+        rebase_group(group=file)
+
+
+def repack_nwbfile(
+    nwbfile_path: FilePath,
+    output_file_path: Optional[FilePath] = None,
+    page_size_mb: Optional[float] = None,
+    target_chunk_mb: float = 10.0,
+    min_dataset_mb: float = 10.0,
+    buffer_gb: float = 1.0,
+    max_size_increase: float = 0.05,
+    verbose: bool = False,
+) -> bool:
+    """Rewrite an NWB file with paged aggregation and time-oriented chunks.
+
+    Parameters
+    ----------
+    nwbfile_path : FilePath
+        Path to the NWB file to repack.
+    output_file_path : FilePath, optional
+        Path to write the repacked file to, by default None (replace the original file).
+    page_size_mb : float, optional
+        Size of the file space pages in MB, by default None (chosen from the size of the file, up to 8 MB, see
+        get_page_size()). Metadata is aggregated into blocks of the same size.
+    target_chunk_mb : float, optional
+        Target size in MB of the chunks of the rechunked datasets, by default 10.0.
+    min_dataset_mb : float, optional
+        Datasets smaller than this (in MB) keep their layout, by default 10.0.
+    buffer_gb : float, optional
+        Maximum amount of data in GB held in memory while a dataset is copied, by default 1.0.
+    max_size_increase : float, optional
+        Fraction by which the repacked file may be larger than the original, by default 0.05. Rechunked datasets may
+        compress slightly differently, and pages pad the file.
+    verbose : bool, optional
+        Whether to print the rechunked datasets and the size of the repacked file, by default False.
+
+    Returns
+    -------
+    bool
+        Whether the file was repacked, False if the repacked file was too large, in which case the original is kept (and
+        copied to output_file_path, with its relative external links updated).
+    """
+    nwbfile_path = Path(nwbfile_path)
+    output_file_path = nwbfile_path if output_file_path is None else Path(output_file_path)
+    output_file_path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_file_path = output_file_path.with_name(output_file_path.name + ".partial")
+    original_file_size = nwbfile_path.stat().st_size
+    if page_size_mb is None:
+        page_size = get_page_size(file_size=original_file_size)
+    else:
+        page_size = int(page_size_mb * 2**20)
+
+    with NWBHDF5IO(str(nwbfile_path), mode="r", load_namespaces=True) as read_io:
+        nwbfile = read_io.read()
+        for neurodata_object in nwbfile.all_children():
+            if isinstance(neurodata_object, TimeSeries):
+                for dataset_name in ("data", "timestamps"):
+                    if isinstance(neurodata_object.fields.get(dataset_name), TimeSeries):  # linked to another series
+                        continue
+                    is_rechunked = _configure_rechunking(
+                        neurodata_object=neurodata_object,
+                        dataset_name=dataset_name,
+                        target_chunk_mb=target_chunk_mb,
+                        min_dataset_mb=min_dataset_mb,
+                        buffer_gb=buffer_gb,
+                        source_file_path=nwbfile_path,
+                    )
+                    if is_rechunked and verbose:
+                        print(f"Rechunking {neurodata_object.name}/{dataset_name}")
+            elif isinstance(neurodata_object, Data):
+                is_rechunked = _configure_rechunking(
+                    neurodata_object=neurodata_object,
+                    dataset_name=None,
+                    target_chunk_mb=target_chunk_mb,
+                    min_dataset_mb=min_dataset_mb,
+                    buffer_gb=buffer_gb,
+                    source_file_path=nwbfile_path,
+                )
+                if is_rechunked and verbose:
+                    print(f"Rechunking {neurodata_object.name}")
+
+        with h5py.File(
+            temporary_file_path,
+            mode="w",
+            fs_strategy="page",
+            fs_persist=True,
+            fs_page_size=page_size,
+            meta_block_size=page_size,
+        ) as file:
+            # Datasets of the file are copied, while those linked from other files stay external links
+            with NWBHDF5IO(path=str(temporary_file_path), mode="w", file=file) as export_io:
+                export_io.export(src_io=read_io, nwbfile=nwbfile, write_args=dict(link_data=True))
+
+    repacked_file_size = temporary_file_path.stat().st_size
+    if repacked_file_size > original_file_size * (1 + max_size_increase):
+        if verbose:
+            print(
+                f"Kept {nwbfile_path}, because the repacked file ({repacked_file_size / 1e9:.2f} GB) is larger than the "
+                f"original ({original_file_size / 1e9:.2f} GB)"
+            )
+        if output_file_path == nwbfile_path:
+            temporary_file_path.unlink()
+        else:
+            shutil.copyfile(nwbfile_path, temporary_file_path)
+            _rebase_external_links(file_path=temporary_file_path, original_dir_path=nwbfile_path.parent)
+            os.replace(temporary_file_path, output_file_path)
+        return False
+    os.replace(temporary_file_path, output_file_path)
+    if verbose:
+        print(f"Repacked {nwbfile_path} to {output_file_path} ({repacked_file_size / 1e9:.2f} GB)")
+    return True
+
+
+def repack_folder(
+    folder_path: DirectoryPath,
+    output_folder_path: Optional[DirectoryPath] = None,
+    max_workers: int = 1,
+    verbose: bool = False,
+    **repack_kwargs,
+):
+    """Repack every 'sub-*_ses-*.nwb' file in a folder, several files at a time.
+
+    Parameters
+    ----------
+    folder_path : DirectoryPath
+        Path to the folder with the NWB files.
+    output_folder_path : DirectoryPath, optional
+        Path to the folder to write the repacked files to, by default None (replace the original files).
+    max_workers : int, optional
+        Number of files repacked in parallel, by default 1.
+    verbose : bool, optional
+        Whether to print verbose output, by default False.
+    **repack_kwargs
+        Keyword arguments passed to repack_nwbfile().
+    """
+    folder_path = Path(folder_path)
+    if output_folder_path is not None:
+        output_folder_path = Path(output_folder_path)
+        output_folder_path.mkdir(parents=True, exist_ok=True)
+    nwbfile_paths = sorted(
+        nwbfile_path
+        for nwbfile_path in folder_path.glob("sub-*_ses-*.nwb")
+        if not is_companion_nwbfile_path(nwbfile_path=nwbfile_path)  # kept as written, with its session file's links
+    )
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        future_to_nwbfile_path = dict()
+        for nwbfile_path in nwbfile_paths:
+            output_file_path = None if output_folder_path is None else output_folder_path / nwbfile_path.name
+            future = executor.submit(
+                repack_nwbfile,
+                nwbfile_path=nwbfile_path,
+                output_file_path=output_file_path,
+                verbose=verbose,
+                **repack_kwargs,
+            )
+            future_to_nwbfile_path[future] = nwbfile_path
+        for future in as_completed(future_to_nwbfile_path):
+            exception = future.exception()
+            if exception is not None:
+                print(f"Failed to repack {future_to_nwbfile_path[future]}: {exception!r}")
+
+
+def main():
+    """
+    Command-line interface for repacking NWB files.
+
+    Parses arguments and calls repack_folder() or repack_nwbfile().
+    """
+    parser = argparse.ArgumentParser(description="Repack NWB files into cloud-optimized HDF5.")
+    parser.add_argument("--folder_path", type=str, help="Path to a folder of 'sub-*_ses-*.nwb' files to repack.")
+    parser.add_argument("--file_path", type=str, help="Path to a single NWB file to repack.")
+    parser.add_argument("--output_path", type=str, help="Output folder (or file), instead of replacing the input.")
+    parser.add_argument("--max_workers", type=int, default=1, help="Number of files repacked in parallel.")
+    parser.add_argument(
+        "--page_size_mb", type=float, help="Size of the file space pages in MB (by default, from the file size)."
+    )
+    parser.add_argument("--target_chunk_mb", type=float, default=10.0, help="Target chunk size in MB.")
+    parser.add_argument("--min_dataset_mb", type=float, default=10.0, help="Minimum size in MB of rechunked datasets.")
+    parser.add_argument("--buffer_gb", type=float, default=1.0, help="Maximum buffer size in GB per dataset copy.")
+    parser.add_argument(
+        "--max_size_increase",
+        type=float,
+        default=0.05,
+        help="Fraction by which a repacked file may grow, else skip it.",
+    )
+    parser.add_argument("--verbose", action="store_true", help="Print detailed information.")
+    args = parser.parse_args()
+
+    repack_kwargs = dict(
+        page_size_mb=args.page_size_mb,
+        target_chunk_mb=args.target_chunk_mb,
+        min_dataset_mb=args.min_dataset_mb,
+        buffer_gb=args.buffer_gb,
+        max_size_increase=args.max_size_increase,
+    )
+    if args.file_path is not None:
+        repack_nwbfile(
+            nwbfile_path=args.file_path, output_file_path=args.output_path, verbose=args.verbose, **repack_kwargs
+        )
+    elif args.folder_path is not None:
+        repack_folder(
+            folder_path=args.folder_path,
+            output_folder_path=args.output_path,
+            max_workers=args.max_workers,
+            verbose=args.verbose,
+            **repack_kwargs,
+        )
+    else:
+        parser.error("Either --folder_path or --file_path is required.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""Sample indices of the events of a table into a continuous series, and coalesced reads of the windows around them."""
+from typing import Optional
+
+import numpy as np
+from hdmf.data_utils import GenericDataChunkIterator
+from hdmf.common import DynamicTable
+from pynwb import TimeSeries
+
+from .data_chunk_iterators import MemmapDataChunkIterator
+
+TIMESTAMPS_CHUNK_LENGTH = 1_000_000  # 8 MB of float64 timestamps read at once when they are not memory-mapped
+
+
+def get_sample_indices(times: np.ndarray, time_series: TimeSeries) -> np.ndarray:
+    """Get the index of the first sample of a series at or after each time.
+
+    Regular series (with a rate) are indexed arithmetically; series with timestamps are indexed by binary search, which
+    only pages in the few timestamps it visits when they are memory-mapped. Other timestamps (ex. a data chunk iterator
+    or a dataset of a file) are read TIMESTAMPS_CHUNK_LENGTH at a time, so they are never held in memory all at once.
+
+    Parameters
+    ----------
+    times : np.ndarray
+        The times, in seconds, on the same clock as the series.
+    time_series : TimeSeries
+        The series, as added to the in-memory NWBFile (its data and timestamps may still be data chunk iterators).
+
+    Returns
+    -------
+    np.ndarray
+        The sample indices, as int64, clipped to [0, number of samples]. A time after the last sample gets the number
+        of samples (an empty window at the end) and a NaN time gets -1.
+    """
+    times = np.asarray(times, dtype="float64")
+    num_samples = _get_num_samples(data=time_series.data)
+    if time_series.rate is not None:
+        starting_time = time_series.starting_time or 0.0
+        # The tolerance keeps a time that falls on a sample, up to the rounding of the rate, on that sample
+        sample_indices = np.ceil((times - starting_time) * time_series.rate - 1e-6)
+    else:
+        timestamps = time_series.timestamps
+        if isinstance(timestamps, MemmapDataChunkIterator):
+            timestamps = timestamps._data
+        if isinstance(timestamps, (np.ndarray, list)):
+            sample_indices = np.searchsorted(timestamps, times, side="left").astype("float64")
+        else:
+            sample_indices = _search_timestamps_in_chunks(timestamps=timestamps, times=times).astype("float64")
+    sample_indices[np.isnan(times)] = np.nan
+    sample_indices = np.clip(sample_indices, 0, num_samples)
+    return np.where(np.isnan(sample_indices), -1, sample_indices).astype("int64")
+
+
+def add_sample_index_columns(
+    table: DynamicTable,
+    time_series: TimeSeries,
+    time_column_names: list[str],
+    series_description: Optional[str] = None,
+) -> list[str]:
+    """Add a column of the sample indices of a series to a table, for each of its time columns.
+
+    The column of 'start_time' into the series 'ElectricalSeries' is named 'ElectricalSeries_start_index', so that the
+    samples of each row can be sliced directly, ex. data[start_index:stop_index], instead of searching the timestamps
+    of the series for every row.
+
+    Parameters
+    ----------
+    table : DynamicTable
+        The table, ex. the trials or a stimulus table, with all its rows already added.
+    time_series : TimeSeries
+        The series to index, as added to the in-memory NWBFile.
+    time_column_names : list[str]
+        The names of the time columns of the table to index, ex. ["start_time", "stop_time"]. Missing columns are
+        skipped.
+    series_description : str, optional
+        How the series is referred to in the descriptions of the columns, by default None (its name).
+
+    Returns
+    -------
+    list[str]
+        The names of the added columns.
+    """
+    series_description = series_description or time_series.name
+    column_names = []
+    for time_column_name in time_column_names:
+        if time_column_name not in table.colnames:
+            continue
+        column_name = f"{time_series.name}_{time_column_name.removesuffix('_time')}_index"
+        sample_indices = get_sample_indices(times=table[time_column_name].data[:], time_series=time_series)
+        table.add_column(
+            name=column_name,
+            description=(
+                f"Index of the first sample of {series_description} at or after {time_column_name}, "
+                "or -1 if it is undefined."
+            ),
+            data=sample_indices,
+        )
+        column_names.append(column_name)
+    return column_names
+
+
+def read_peri_event_windows(
+    data,
+    sample_indices: np.ndarray,
+    num_samples_before: int,
+    num_samples_after: int,
+    max_gap_samples: Optional[int] = None,
+    max_read_samples: Optional[int] = None,
+    fill_value: float = np.nan,
+) -> np.ndarray:
+    """Read the windows of samples around events, coalescing the windows that are close in time into single reads.
+
+    Reading each window on its own costs one read (and, for a chunked and compressed dataset, one decompression of
+    every chunk it touches) per event, and the chunks shared by neighbouring windows are read again for each of them.
+    Here, the windows are sorted and merged into runs, separated by more than max_gap_samples, that are each read with
+    a single contiguous slice, and the windows are then gathered from the runs in memory.
+
+    Parameters
+    ----------
+    data : h5py.Dataset, zarr.Array or np.ndarray
+        The data of the series, with time along the first axis, ex. nwbfile.acquisition["ElectricalSeries"].data.
+    sample_indices : np.ndarray
+        The sample index of each event, ex. a column added by add_sample_index_columns(). Events with a negative index
+        get windows filled with fill_value.
+    num_samples_before : int
+        The number of samples of each window before its event.
+    num_samples_after : int
+        The number of samples of each window from its event on.
+    max_gap_samples : int, optional
+        The largest gap between two windows that is read rather than split into two reads, by default None (the length
+        of a window).
+    max_read_samples : int, optional
+        The largest number of samples of a single read, to bound the memory of a run of dense events, by default None
+        (64 windows). A window is never split, so a read can exceed it by the length of one window.
+    fill_value : float, optional
+        The value of the samples of the windows that fall outside of the data, by default NaN. The windows keep the
+        dtype of the data when no sample needs to be filled.
+
+    Returns
+    -------
+    np.ndarray
+        The windows, of shape (number of events, num_samples_before + num_samples_after, *data.shape[1:]), in the order
+        of sample_indices.
+    """
+    sample_indices = np.asarray(sample_indices, dtype="int64")
+    window_length = num_samples_before + num_samples_after
+    max_gap_samples = window_length if max_gap_samples is None else max_gap_samples
+    max_read_samples = 64 * window_length if max_read_samples is None else max_read_samples
+    num_samples = data.shape[0]
+
+    is_valid = sample_indices >= 0
+    window_starts = sample_indices - num_samples_before
+    window_stops = window_starts + window_length
+    needs_fill = ~is_valid | (window_starts < 0) | (window_stops > num_samples)
+    windows_shape = (len(sample_indices), window_length, *data.shape[1:])
+    if np.any(needs_fill):
+        dtype = np.result_type(data.dtype, np.min_scalar_type(fill_value))
+        windows = np.full(windows_shape, fill_value, dtype=dtype)
+    else:
+        windows = np.empty(windows_shape, dtype=data.dtype)
+
+    event_indices = np.flatnonzero(is_valid)
+    event_indices = event_indices[np.argsort(window_starts[event_indices], kind="stable")]
+    read_starts = np.clip(window_starts[event_indices], 0, num_samples)
+    read_stops = np.clip(window_stops[event_indices], 0, num_samples)  # sorted too, since the windows have one length
+    run_first = 0
+    for position in range(1, len(event_indices) + 1):
+        if position < len(event_indices):
+            is_close = read_starts[position] - read_stops[position - 1] <= max_gap_samples
+            if is_close and read_stops[position] - read_starts[run_first] <= max_read_samples:
+                continue
+        _gather_run(
+            data=data,
+            windows=windows,
+            event_indices=event_indices[run_first:position],
+            window_starts=window_starts,
+            window_length=window_length,
+            run_start=read_starts[run_first],
+            run_stop=read_stops[position - 1],
+        )
+        run_first = position
+    return windows
+
+
+def get_electrical_series_name(metadata: dict, es_key: str = "ElectricalSeries") -> Optional[str]:
+    """Get the name of an ElectricalSeries from the metadata of a conversion.
+
+    The editable metadata lists the series, as the yaml files do, while the metadata of the recording interfaces, into
+    which it is merged during a conversion, holds a single series as a dict.
+
+    Parameters
+    ----------
+    metadata : dict
+        Metadata dictionary with information used to create the NWBFile.
+    es_key : str, optional
+        The key of the series in metadata["Ecephys"], by default "ElectricalSeries".
+
+    Returns
+    -------
+    str, optional
+        The name of the series, or None if the metadata has none.
+    """
+    electrical_series_metadata = metadata.get("Ecephys", dict()).get(es_key)
+    if isinstance(electrical_series_metadata, list):
+        electrical_series_metadata = electrical_series_metadata[0] if electrical_series_metadata else None
+    if not electrical_series_metadata:
+        return None
+    return electrical_series_metadata.get("name")
+
+
+def _gather_run(
+    data,
+    windows: np.ndarray,
+    event_indices: np.ndarray,
+    window_starts: np.ndarray,
+    window_length: int,
+    run_start: int,
+    run_stop: int,
+):
+    if run_stop <= run_start:  # every window of the run is outside of the data
+        return
+    run = data[run_start:run_stop]
+    offsets = window_starts[event_indices, np.newaxis] - run_start + np.arange(window_length)
+    is_inside = (offsets >= 0) & (offsets < len(run))
+    if np.all(is_inside):
+        windows[event_indices] = run[offsets]
+        return
+    for event_index, event_offsets, event_is_inside in zip(event_indices, offsets, is_inside):
+        windows[event_index, event_is_inside] = run[event_offsets[event_is_inside]]
+
+
+def _search_timestamps_in_chunks(timestamps, times: np.ndarray, chunk_length: int = TIMESTAMPS_CHUNK_LENGTH):
+    """Search sorted timestamps one chunk at a time, as np.searchsorted(timestamps, times, side="left") would.
+
+    The timestamps are sorted, so the number of timestamps before a time is the sum of those before it in each chunk.
+    """
+    num_timestamps = _get_num_samples(data=timestamps)
+    sample_indices = np.zeros(len(times), dtype="int64")
+    for start in range(0, num_timestamps, chunk_length):
+        stop = min(start + chunk_length, num_timestamps)
+        if isinstance(timestamps, GenericDataChunkIterator):
+            chunk = timestamps._get_data(selection=(slice(start, stop),))
+        else:
+            chunk = timestamps[start:stop]
+        sample_indices += np.searchsorted(chunk, times, side="left")
+    return sample_indices
+
+
+def _get_num_samples(data) -> int:
+    if isinstance(data, GenericDataChunkIterator):
+        return data.maxshape[0]
+    return len(data)
@@ -0,0 +1,216 @@
+"""Conversion to a small NWB file with the large streams in a companion NWB file, joined by HDF5 external links."""
+import threading
+from copy import deepcopy
+from pathlib import Path
+from typing import Optional
+from uuid import uuid4
+
+import h5py
+from neuroconv import NWBConverter
+from neuroconv.tools.nwb_helpers import (
+    configure_backend,
+    get_default_backend_configuration,
+    make_nwbfile_from_metadata,
+)
+from pydantic import FilePath
+from pynwb import NWBHDF5IO, NWBFile
+
+# The groups whose missing children are linked from the small file to the companion file
+LINKED_GROUP_PATHS = ("acquisition", "processing", "general/devices", "general/extracellular_ephys")
+
+
+def get_companion_nwbfile_path(nwbfile_path: FilePath, description: str = "ecephys") -> Path:
+    """Get the path of the companion file of an NWB file, ex. 'sub-m53_ses-231029_desc-ecephys.nwb'.
+
+    Parameters
+    ----------
+    nwbfile_path : FilePath
+        Path to the NWB file, ending with '.nwb'.
+    description : str, optional
+        The BIDS-like 'desc' entity of the companion file, by default "ecephys".
+
+    Returns
+    -------
+    Path
+        The path of the companion file, next to the NWB file.
+    """
+    nwbfile_path = Path(nwbfile_path)
+    return nwbfile_path.with_name(f"{nwbfile_path.name.removesuffix('.nwb')}_desc-{description}.nwb")
+
+
+def is_companion_nwbfile_path(nwbfile_path: FilePath) -> bool:
+    """Whether the path is that of a companion file (see get_companion_nwbfile_path), rather than of a session file."""
+    return "_desc-" in Path(nwbfile_path).name
+
+
+def run_split_conversion(
+    converter: NWBConverter,
+    nwbfile_path: FilePath,
+    metadata: dict,
+    companion_interface_names: list[str],
+    conversion_options: Optional[dict] = None,
+    parallel: bool = True,
+):
+    """Write the large streams of a converter to a companion NWB file, and everything else to a small NWB file.
+
+    The interfaces are temporally aligned once, as for a single file, and both NWBFiles are built in memory before
+    either is written, so that the converter can index the streams of the companion file from the tables of the small
+    file (see add_sample_index_columns() of the converters). The small file (trials, events, behavior, units, stimulus
+    tables, ...) is written while the companion file is, and can be used as soon as it is closed. The companion file
+    '<name>_desc-ecephys.nwb' holds the interfaces of companion_interface_names, with the electrodes and devices they
+    create, and is a complete NWB file with the same session metadata but its own identifier. Once both are written,
+    every object of the companion file missing from the small file is added to it as an HDF5 external link, by relative
+    path, so that the small file reads as the whole session as long as both files stay in the same directory.
+
+    Parameters
+    ----------
+    converter : NWBConverter
+        The converter whose interfaces will be written.
+    nwbfile_path : FilePath
+        Path to the small NWB file. Existing files are overwritten.
+    metadata : dict
+        Metadata dictionary with information used to create both NWBFiles.
+    companion_interface_names : list[str]
+        The names of the interfaces written to the companion file, ex. the recordings and the audio.
+    conversion_options : dict, optional
+        A dictionary containing conversion options for each interface, by default None.
+    parallel : bool, optional
+        Whether to write the companion file in a background thread while the small file is written, by default True.
+    """
+    conversion_options = conversion_options or dict()
+    nwbfile_path = Path(nwbfile_path)
+    companion_nwbfile_path = get_companion_nwbfile_path(nwbfile_path=nwbfile_path)
+    converter.validate_metadata(metadata=metadata)
+    converter.validate_conversion_options(conversion_options=conversion_options)
+    converter.temporally_align_data_interfaces(metadata=metadata, conversion_options=conversion_options)
+
+    interface_names = [name for name in converter.data_interface_objects if name not in companion_interface_names]
+    companion_interface_names = [name for name in companion_interface_names if name in converter.data_interface_objects]
+    write_kwargs = [
+        dict(interface_names=companion_interface_names, nwbfile_path=companion_nwbfile_path),
+        dict(interface_names=interface_names, nwbfile_path=nwbfile_path),
+    ]
+    for kwargs in write_kwargs:
+        kwargs["nwbfile_path"].unlink(missing_ok=True)  # never link to the companion file of a previous conversion
+        # Each file gets its own copy of the metadata, since the interfaces may fill in the metadata they are given
+        file_metadata = deepcopy(metadata)
+        if kwargs["nwbfile_path"] == companion_nwbfile_path:  # identifiers are unique to each file
+            file_metadata["NWBFile"]["identifier"] = str(uuid4())
+        kwargs["nwbfile"] = _build_nwbfile(
+            converter=converter,
+            interface_names=kwargs.pop("interface_names"),
+            metadata=file_metadata,
+            conversion_options=conversion_options,
+        )
+    companion_nwbfile, nwbfile = write_kwargs[0]["nwbfile"], write_kwargs[1]["nwbfile"]
+    if hasattr(converter, "add_sample_index_columns"):  # the tables of the small file index the companion streams
+        converter.add_sample_index_columns(nwbfile=nwbfile, metadata=metadata, time_series_nwbfile=companion_nwbfile)
+    verbose = getattr(converter, "verbose", False)
+    if parallel:
+        exceptions = []
+        companion_thread = threading.Thread(
+            target=_write_nwbfile_or_record_exception,
+            kwargs=dict(**write_kwargs[0], exceptions=exceptions, verbose=verbose),
+        )
+        companion_thread.start()
+        try:
+            _write_nwbfile(**write_kwargs[1], verbose=verbose)
+        finally:
+            companion_thread.join()
+        if exceptions:
+            raise exceptions[0]
+    else:
+        for kwargs in reversed(write_kwargs):  # the small file first
+            _write_nwbfile(**kwargs, verbose=verbose)
+
+    link_companion_nwbfile(nwbfile_path=nwbfile_path, companion_nwbfile_path=companion_nwbfile_path)
+
+
+def link_companion_nwbfile(nwbfile_path: FilePath, companion_nwbfile_path: FilePath) -> list[str]:
+    """Add the objects of a companion NWB file that are missing from an NWB file to it, as HDF5 external links.
+
+    Only the children of LINKED_GROUP_PATHS are linked. Processing modules present in both files are merged by linking
+    their missing children; any other object present in both files is kept as it is in the NWB file.
+
+    Parameters
+    ----------
+    nwbfile_path : FilePath
+        Path to the NWB file that receives the links.
+    companion_nwbfile_path : FilePath
+        Path to the companion NWB file, in the same directory.
+
+    Returns
+    -------
+    list[str]
+        The paths of the linked objects.
+    """
+    nwbfile_path = Path(nwbfile_path)
+    companion_nwbfile_path = Path(companion_nwbfile_path)
+    if companion_nwbfile_path.parent.resolve() != nwbfile_path.parent.resolve():
+        raise ValueError("The companion NWB file must be in the same directory as the NWB file.")
+    linked_object_paths = []
+    with h5py.File(nwbfile_path, mode="a") as file, h5py.File(companion_nwbfile_path, mode="r") as companion_file:
+        for group_path in LINKED_GROUP_PATHS:
+            if group_path not in companion_file:
+                continue
+            if group_path not in file:
+                file[group_path] = h5py.ExternalLink(companion_nwbfile_path.name, f"/{group_path}")
+                linked_object_paths.append(group_path)
+                continue
+            linked_object_paths.extend(
+                _link_missing_children(
+                    group=file[group_path],
+                    companion_group=companion_file[group_path],
+                    companion_file_name=companion_nwbfile_path.name,
+                )
+            )
+    return linked_object_paths
+
+
+def _link_missing_children(group: h5py.Group, companion_group: h5py.Group, companion_file_name: str) -> list[str]:
+    linked_object_paths = []
+    for name, companion_object in companion_group.items():
+        if name not in group:
+            group[name] = h5py.ExternalLink(companion_file_name, companion_object.name)
+            linked_object_paths.append(companion_object.name.lstrip("/"))
+        elif (
+            isinstance(companion_object, h5py.Group)
+            and isinstance(group[name], h5py.Group)
+            and group[name].attrs.get("neurodata_type") == "ProcessingModule"
+        ):
+            linked_object_paths.extend(
+                _link_missing_children(
+                    group=group[name], companion_group=companion_object, companion_file_name=companion_file_name
+                )
+            )
+    return linked_object_paths
+
+
+def _build_nwbfile(
+    converter: NWBConverter,
+    interface_names: list[str],
+    metadata: dict,
+    conversion_options: dict,
+) -> NWBFile:
+    nwbfile = make_nwbfile_from_metadata(metadata=metadata)
+    for name in interface_names:
+        converter.data_interface_objects[name].add_to_nwbfile(
+            nwbfile=nwbfile, metadata=metadata, **conversion_options.get(name, dict())
+        )
+    return nwbfile
+
+
+def _write_nwbfile(nwbfile: NWBFile, nwbfile_path: Path, verbose: bool):
+    backend_configuration = get_default_backend_configuration(nwbfile=nwbfile, backend="hdf5")
+    configure_backend(nwbfile=nwbfile, backend_configuration=backend_configuration)
+    with NWBHDF5IO(nwbfile_path, mode="w") as io:
+        io.write(nwbfile)
+    if verbose:
+        print(f"NWB file saved at {nwbfile_path}!")
+
+
+def _write_nwbfile_or_record_exception(exceptions: list, **kwargs):
+    try:
+        _write_nwbfile(**kwargs)
+    except Exception as exception:
+        exceptions.append(exception)
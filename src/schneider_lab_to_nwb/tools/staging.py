@@ -0,0 +1,176 @@
+"""Staging of session inputs from network storage to a bounded local scratch directory."""
+import os
+import shutil
+import threading
+import warnings
+from multiprocessing.managers import SyncManager
+from pathlib import Path
+from typing import Optional
+
+from pydantic import DirectoryPath, FilePath
+
+from .io_admission import io_admission
+
+
+class SessionStager:
+    """Copies the inputs of each session to a local scratch directory while keeping the scratch space bounded.
+
+    Each staged path keeps its parent folder name, because the conversions derive metadata from it (ex. the session
+    description from 'A1_EphysBehavioralFiles' or the start time mapping from 'm53/Day1_A1').
+    """
+
+    def __init__(
+        self,
+        scratch_dir_path: DirectoryPath,
+        max_scratch_gb: float = 100.0,
+        max_staged_sessions: int = 2,
+        manager: Optional[SyncManager] = None,
+    ):
+        """Initialize the stager.
+
+        Parameters
+        ----------
+        scratch_dir_path : DirectoryPath
+            Path to a directory on fast local storage where inputs are staged.
+        max_scratch_gb : float, optional
+            Maximum total size of staged inputs in GB, by default 100.0. A session that is larger than this on its own
+            is still staged once nothing else is, so that it cannot block the pipeline.
+        max_staged_sessions : int, optional
+            Maximum number of sessions that are staged at the same time, by default 2.
+        manager : SyncManager, optional
+            A started multiprocessing manager that holds the bookkeeping of the staged sessions, so that the stager can
+            be passed to worker processes and stage their sessions there, by default None (threads of one process).
+        """
+        self.scratch_dir_path = Path(scratch_dir_path)
+        self.scratch_dir_path.mkdir(parents=True, exist_ok=True)
+        self.max_scratch_bytes = int(max_scratch_gb * 1e9)
+        self.max_staged_sessions = max_staged_sessions
+        if manager is None:
+            self._session_name_to_num_bytes = dict()
+            self._condition = threading.Condition()
+        else:
+            self._session_name_to_num_bytes = manager.dict()
+            self._condition = manager.Condition()
+
+    def _has_room_for(self, num_bytes: int) -> bool:
+        num_staged_sessions = len(self._session_name_to_num_bytes)
+        if num_staged_sessions == 0:
+            return True
+        num_staged_bytes = sum(self._session_name_to_num_bytes.values())
+        return num_staged_sessions < self.max_staged_sessions and num_staged_bytes + num_bytes <= self.max_scratch_bytes
+
+    def get_session_dir_path(self, session_name: str) -> Path:
+        """Get the scratch directory of a session."""
+        return self.scratch_dir_path / session_name
+
+    def stage(self, session_name: str, source_paths: dict[str, Path], patterns: Optional[dict] = None) -> dict:
+        """Copy the inputs of a session to scratch, waiting until there is enough room.
+
+        Parameters
+        ----------
+        session_name : str
+            Unique name of the session, used as the name of its scratch directory. Staging a session that is already
+            staged replaces its previous entry.
+        source_paths : dict[str, Path]
+            Mapping from an argument name to the file or folder that should be staged.
+        patterns : dict[str, list[str]], optional
+            Mapping from an argument name to glob patterns that select which files of a folder are staged.
+            Folders without patterns are staged completely.
+
+        Returns
+        -------
+        dict[str, Path]
+            Mapping from each argument name to its staged path.
+        """
+        patterns = patterns or dict()
+        name_to_file_paths = dict()
+        for name, source_path in source_paths.items():
+            source_path = Path(source_path)
+            if source_path.is_file():
+                name_to_file_paths[name] = [source_path]
+            elif name in patterns:
+                name_to_file_paths[name] = sorted(
+                    {file_path for pattern in patterns[name] for file_path in source_path.glob(pattern)}
+                )
+            else:
+                name_to_file_paths[name] = sorted(path for path in source_path.rglob("*") if path.is_file())
+        num_bytes = sum(
+            file_path.stat().st_size for file_paths in name_to_file_paths.values() for file_path in file_paths
+        )
+        if num_bytes > self.max_scratch_bytes:
+            warnings.warn(
+                f"Session {session_name} ({num_bytes / 1e9:.1f} GB) is larger than the scratch space "
+                f"({self.max_scratch_bytes / 1e9:.1f} GB), so it will be staged on its own."
+            )
+
+        with self._condition:
+            # A session that is staged again (ex. a task retried after its worker was killed, before its release) no
+            # longer holds its previous space, which would otherwise count against itself
+            if self._session_name_to_num_bytes.pop(session_name, None) is not None:
+                self._condition.notify_all()
+            self._condition.wait_for(lambda: self._has_room_for(num_bytes=num_bytes))
+            self._session_name_to_num_bytes[session_name] = num_bytes
+
+        session_dir_path = self.get_session_dir_path(session_name=session_name)
+        staged_paths = dict()
+        for name, source_path in source_paths.items():
+            source_path = Path(source_path)
+            staged_path = session_dir_path / name / source_path.parent.name / source_path.name
+            for file_path in name_to_file_paths[name]:
+                if source_path.is_file():
+                    staged_file_path = staged_path
+                else:
+                    staged_file_path = staged_path / file_path.relative_to(source_path)
+                staged_file_path.parent.mkdir(parents=True, exist_ok=True)
+                with io_admission(path=file_path):
+                    shutil.copy2(file_path, staged_file_path)
+            if source_path.is_dir():
+                staged_path.mkdir(parents=True, exist_ok=True)
+            staged_paths[name] = staged_path
+        return staged_paths
+
+    def release(self, session_name: str):
+        """Delete the scratch directory of a session and free its space for the next session."""
+        shutil.rmtree(self.get_session_dir_path(session_name=session_name), ignore_errors=True)
+        with self._condition:
+            self._session_name_to_num_bytes.pop(session_name, None)
+            self._condition.notify_all()
+
+
+def move_file_atomically(source_file_path: FilePath, destination_file_path: FilePath):
+    """Move a file, possibly across file systems, so that the destination never holds a partially written file.
+
+    The file is first copied next to its destination under a temporary name and then renamed into place. Directories,
+    such as NWB-Zarr stores, are moved the same way, except that an existing destination is first renamed aside and
+    only deleted once the new directory is in place, so that the destination always holds a complete store.
+
+    Parameters
+    ----------
+    source_file_path : FilePath
+        Path to the file (or directory) to move.
+    destination_file_path : FilePath
+        Path to move the file (or directory) to.
+    """
+    source_file_path = Path(source_file_path)
+    destination_file_path = Path(destination_file_path)
+    destination_file_path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_file_path = destination_file_path.with_name(destination_file_path.name + ".partial")
+    if source_file_path.is_dir():
+        shutil.rmtree(temporary_file_path, ignore_errors=True)
+        shutil.copytree(source_file_path, temporary_file_path)
+        old_file_path = destination_file_path.with_name(destination_file_path.name + ".old")
+        shutil.rmtree(old_file_path, ignore_errors=True)
+        if destination_file_path.exists():
+            os.replace(destination_file_path, old_file_path)
+        try:
+            os.replace(temporary_file_path, destination_file_path)
+        except OSError:
+            if old_file_path.exists():  # put the previous directory back
+                os.replace(old_file_path, destination_file_path)
+            raise
+        shutil.rmtree(old_file_path, ignore_errors=True)
+        shutil.rmtree(source_file_path)
+        return
+    shutil.copyfile(source_file_path, temporary_file_path)
+    os.replace(temporary_file_path, destination_file_path)
+    source_file_path.unlink()
@@ -0,0 +1,323 @@
+"""Supervised process pool that survives worker crashes and adapts its concurrency to memory pressure."""
+import atexit
+import collections
+import multiprocessing
+import signal
+import threading
+import time
+import traceback
+import weakref
+from concurrent.futures import Future
+from multiprocessing.connection import wait
+from typing import Callable, Optional
+
+_live_pools = weakref.WeakSet()
+
+
+class WorkerCrashedError(RuntimeError):
+    """Raised for a task whose worker process died while running it."""
+
+
+class RemoteTraceback(Exception):
+    """Traceback of an exception raised in a worker process, attached as the cause of the re-raised exception."""
+
+    def __init__(self, traceback_text: str):
+        super().__init__(traceback_text)
+        self.traceback_text = traceback_text
+
+    def __str__(self):
+        return f'\n"""\n{self.traceback_text}"""'
+
+
+def _run_worker(connection, initializer: Optional[Callable], initargs: tuple):
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        fn, args, kwargs = message
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            traceback_text = traceback.format_exc()
+            try:
+                connection.send(("exception", e, traceback_text))
+            except Exception:  # the exception cannot be pickled
+                connection.send(("exception", RuntimeError(repr(e)), traceback_text))
+            continue
+        connection.send(("result", result, None))
+
+
+def get_available_memory_fraction() -> Optional[float]:
+    """Get the fraction of the system memory that is available, or None if it cannot be determined."""
+    try:
+        with open("/proc/meminfo", mode="r") as f:
+            meminfo = {line.split(":")[0]: int(line.split()[1]) for line in f}
+        return meminfo["MemAvailable"] / meminfo["MemTotal"]
+    except (OSError, KeyError, ValueError, IndexError):
+        return None
+
+
+class _Task:
+    def __init__(self, fn: Callable, args: tuple, kwargs: dict):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.num_attempts = 0
+
+
+class _Worker:
+    def __init__(self, context, initializer: Optional[Callable], initargs: tuple):
+        self.connection, child_connection = context.Pipe()
+        # Not a daemon, as in ProcessPoolExecutor, so that a task can start processes of its own (ex. a nested pool)
+        self.process = context.Process(target=_run_worker, args=(child_connection, initializer, initargs))
+        self.process.start()
+        child_connection.close()
+        self.task = None
+
+    def stop(self, timeout: float = 10.0):
+        try:
+            self.connection.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=timeout)
+        if self.process.is_alive():
+            self.terminate()
+        self.connection.close()
+
+    def terminate(self):
+        self.process.terminate()
+        self.process.join()
+        self.connection.close()
+
+
+class SupervisedProcessPool:
+    """Process pool, similar to ProcessPoolExecutor, in which a crashed worker only fails its own task.
+
+    Each worker is a long-lived process that runs one task at a time. When a worker dies, only the future of its task
+    is affected and the worker is replaced. A death by SIGKILL (which is how the OOM killer ends a process) or a
+    MemoryError is considered memory-related: the concurrency is halved and the task is retried, first in line, with
+    fewer neighbours. Once no memory-related failure has happened for `ramp_up_interval` seconds and enough system
+    memory is available, the concurrency is raised again by one worker at a time, up to `max_workers`.
+
+    The workers are not daemon processes, so a task can run a pool of its own. They are stopped by shutdown(), when the
+    supervision fails, and at interpreter exit for a pool that was not shut down.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        initializer: Optional[Callable] = None,
+        initargs: tuple = (),
+        max_retries: int = 2,
+        ramp_up_interval: float = 300.0,
+        min_available_memory_fraction: float = 0.25,
+        mp_context=None,
+    ):
+        """Initialize the pool.
+
+        Parameters
+        ----------
+        max_workers : int
+            The maximum number of tasks that run at the same time.
+        initializer : Callable, optional
+            A callable run at the start of each worker process, by default None.
+        initargs : tuple, optional
+            The arguments passed to the initializer, by default ().
+        max_retries : int, optional
+            The maximum number of times a task is retried after memory-related failures, by default 2.
+        ramp_up_interval : float, optional
+            The number of seconds without memory-related failures before the concurrency is raised by one,
+            by default 300.0.
+        min_available_memory_fraction : float, optional
+            The minimum fraction of the system memory that must be available to raise the concurrency, by default 0.25.
+            It is ignored where the available memory cannot be read (ex. outside of Linux).
+        mp_context : multiprocessing.context.BaseContext, optional
+            The multiprocessing context used to start the workers, by default the default context.
+        """
+        self.max_workers = max_workers
+        self.concurrency = max_workers
+        self.initializer = initializer
+        self.initargs = initargs
+        self.max_retries = max_retries
+        self.ramp_up_interval = ramp_up_interval
+        self.min_available_memory_fraction = min_available_memory_fraction
+        self._context = mp_context or multiprocessing.get_context()
+        self._pending_tasks = collections.deque()
+        self._idle_workers = []
+        self._busy_workers = []
+        self._lock = threading.RLock()  # futures run their callbacks under it
+        self._is_shutdown = False
+        self._last_concurrency_change = time.monotonic()
+        self._supervisor_thread = threading.Thread(target=self._supervise, daemon=True)
+        self._supervisor_thread.start()
+        _live_pools.add(self)
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        """Schedule fn(*args, **kwargs) to run in a worker process and return a Future for its result."""
+        with self._lock:
+            if self._is_shutdown:
+                raise RuntimeError("Cannot submit a task after shutdown.")
+            task = _Task(fn=fn, args=args, kwargs=kwargs)
+            self._pending_tasks.append(task)
+        return task.future
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting tasks, and stop the workers once every submitted task has finished."""
+        with self._lock:
+            self._is_shutdown = True
+        if wait:
+            self._supervisor_thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown(wait=True)
+        return False
+
+    def _start_pending_tasks(self):
+        with self._lock:
+            while len(self._pending_tasks) > 0 and len(self._busy_workers) < self.concurrency:
+                task = self._pending_tasks.popleft()
+                if task.num_attempts == 0 and not task.future.set_running_or_notify_cancel():
+                    continue
+                if len(self._idle_workers) > 0:
+                    worker = self._idle_workers.pop()
+                else:
+                    try:
+                        worker = _Worker(context=self._context, initializer=self.initializer, initargs=self.initargs)
+                    except BaseException as e:
+                        task.future.set_exception(e)
+                        raise
+                worker.task = task
+                task.num_attempts += 1
+                self._busy_workers.append(worker)
+                try:
+                    worker.connection.send((task.fn, task.args, task.kwargs))
+                except OSError:  # the worker died while idle; its death is handled by the supervisor loop
+                    pass
+                except Exception as e:  # the task cannot be pickled
+                    self._busy_workers.remove(worker)
+                    self._idle_workers.append(worker)
+                    worker.task = None
+                    task.future.set_exception(e)
+
+    def _reduce_concurrency(self):
+        self.concurrency = max(1, self.concurrency // 2)
+        self._last_concurrency_change = time.monotonic()
+
+    def _maybe_increase_concurrency(self):
+        if self.concurrency >= self.max_workers or len(self._pending_tasks) == 0:
+            return
+        if time.monotonic() - self._last_concurrency_change < self.ramp_up_interval:
+            return
+        available_memory_fraction = get_available_memory_fraction()
+        if available_memory_fraction is not None and available_memory_fraction < self.min_available_memory_fraction:
+            return
+        self.concurrency += 1
+        self._last_concurrency_change = time.monotonic()
+
+    def _fail_or_retry(self, task: _Task, exception: BaseException, is_memory_related: bool):
+        if is_memory_related:
+            self._reduce_concurrency()
+            if task.num_attempts <= self.max_retries:
+                self._pending_tasks.appendleft(task)
+                return
+        task.future.set_exception(exception)
+
+    def _handle_message(self, worker: _Worker):
+        task = worker.task
+        status, value, traceback_text = worker.connection.recv()
+        self._busy_workers.remove(worker)
+        worker.task = None
+        if status == "result":
+            self._idle_workers.append(worker)
+            task.future.set_result(value)
+            return
+        value.__cause__ = RemoteTraceback(traceback_text=traceback_text)
+        is_memory_related = isinstance(value, MemoryError)
+        if is_memory_related:  # the worker may hold on to fragmented memory, so replace it
+            worker.stop()
+        else:
+            self._idle_workers.append(worker)
+        self._fail_or_retry(task=task, exception=value, is_memory_related=is_memory_related)
+
+    def _handle_death(self, worker: _Worker):
+        task = worker.task
+        self._busy_workers.remove(worker)
+        worker.process.join()
+        worker.connection.close()
+        exitcode = worker.process.exitcode
+        is_memory_related = exitcode == -getattr(signal, "SIGKILL", 9)
+        reason = " (killed, likely by the out-of-memory killer)" if is_memory_related else ""
+        exception = WorkerCrashedError(
+            f"The worker process died with exit code {exitcode}{reason} after {task.num_attempts} attempt(s)."
+        )
+        self._fail_or_retry(task=task, exception=exception, is_memory_related=is_memory_related)
+
+    def _supervise(self):
+        try:
+            self._run_supervision_loop()
+        except BaseException as e:
+            with self._lock:
+                self._is_shutdown = True
+                for worker in self._busy_workers:
+                    worker.terminate()
+                    if not worker.task.future.done():
+                        worker.task.future.set_exception(e)
+                self._busy_workers = []
+                while len(self._pending_tasks) > 0:
+                    task = self._pending_tasks.popleft()
+                    if not task.future.done():
+                        task.future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                for worker in self._idle_workers:
+                    worker.stop()
+                self._idle_workers = []
+
+    def _run_supervision_loop(self):
+        while True:
+            self._start_pending_tasks()
+            with self._lock:
+                if self._is_shutdown and len(self._pending_tasks) == 0 and len(self._busy_workers) == 0:
+                    break
+                busy_workers = list(self._busy_workers)
+            waitables = [worker.connection for worker in busy_workers] + [
+                worker.process.sentinel for worker in busy_workers
+            ]
+            if len(waitables) > 0:
+                ready = wait(waitables, timeout=0.5)
+            else:
+                ready = []
+                time.sleep(0.5)
+            with self._lock:
+                for worker in busy_workers:
+                    if worker.connection in ready:
+                        try:
+                            self._handle_message(worker=worker)
+                            continue
+                        except (EOFError, OSError):
+                            pass
+                    if worker.connection in ready or worker.process.sentinel in ready:
+                        self._handle_death(worker=worker)
+                while len(self._idle_workers) > max(self.concurrency - len(self._busy_workers), 0):
+                    self._idle_workers.pop().stop()
+                self._maybe_increase_concurrency()
+
+
+def _shutdown_live_pools():
+    # Registered after multiprocessing's own exit handler, so it runs first: the workers are stopped before it joins
+    # every non-daemon child process.
+    for pool in list(_live_pools):
+        pool.shutdown(wait=True)
+
+
+atexit.register(_shutdown_live_pools)
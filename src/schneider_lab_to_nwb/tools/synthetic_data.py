@@ -0,0 +1,657 @@
+"""Writers of synthetic raw data, in the file formats that the conversions read, for benchmarks and local runs.
+
+The raw data of the conversions lives on the lab share, so these writers produce realistic stand-ins of any size: the
+traces are written one chunk at a time and never held in memory, and every generator is seeded, so that the same
+parameters always produce the same bytes (ex. to compare a conversion before and after a change on identical inputs).
+"""
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+from xml.etree import ElementTree
+
+import numpy as np
+from pydantic import DirectoryPath, FilePath
+
+OPEN_EPHYS_LEGACY_HEADER_SIZE = 1024
+OPEN_EPHYS_LEGACY_RECORD_SIZE = 1024
+_OPEN_EPHYS_LEGACY_RECORD_DTYPE = np.dtype(
+    [
+        ("timestamp", "<i8"),
+        ("num_samples", "<u2"),
+        ("recording_number", "<u2"),
+        ("samples", ">i2", OPEN_EPHYS_LEGACY_RECORD_SIZE),
+        ("markers", "u1", 10),
+    ]
+)
+_OPEN_EPHYS_LEGACY_MARKERS = np.array([0, 1, 2, 3, 4, 5, 6, 7, 8, 255], dtype="u1")
+
+
+def generate_spike_trains(
+    num_samples: int,
+    num_units: int,
+    sampling_frequency: float,
+    min_firing_rate: float = 1.0,
+    max_firing_rate: float = 20.0,
+    refractory_period: float = 0.002,
+    seed: int = 0,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Generate the Poisson spike trains of several units, with a refractory period.
+
+    Parameters
+    ----------
+    num_samples : int
+        The number of samples of the recording.
+    num_units : int
+        The number of units.
+    sampling_frequency : float
+        The sampling frequency of the recording, in Hz.
+    min_firing_rate : float, optional
+        The firing rate of the slowest unit, in Hz, by default 1.0.
+    max_firing_rate : float, optional
+        The firing rate of the fastest unit, in Hz, by default 20.0. The rates of the units are spread log-uniformly
+        between the two.
+    refractory_period : float, optional
+        The minimum interval between two spikes of a unit, in seconds, by default 0.002.
+    seed : int, optional
+        The seed of the random generator, by default 0.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        The sample index of every spike (int64, sorted) and the index of its unit (int32), as in a Phy folder.
+    """
+    rng = np.random.default_rng(seed)
+    duration = num_samples / sampling_frequency
+    firing_rates = np.exp(rng.uniform(np.log(min_firing_rate), np.log(max_firing_rate), size=num_units))
+    refractory_samples = int(np.ceil(refractory_period * sampling_frequency))
+    spike_samples_per_unit, spike_units_per_unit = [], []
+    for unit_index, firing_rate in enumerate(firing_rates):
+        num_spikes = rng.poisson(firing_rate * duration)
+        intervals = rng.exponential(sampling_frequency / firing_rate, size=num_spikes) + refractory_samples
+        spike_samples = np.cumsum(intervals).astype("int64")
+        spike_samples = spike_samples[spike_samples < num_samples]
+        spike_samples_per_unit.append(spike_samples)
+        spike_units_per_unit.append(np.full(len(spike_samples), unit_index, dtype="int32"))
+    spike_samples = np.concatenate(spike_samples_per_unit)
+    spike_units = np.concatenate(spike_units_per_unit)
+    order = np.argsort(spike_samples, kind="stable")
+    return spike_samples[order], spike_units[order]
+
+
+def generate_traces(
+    num_samples: int,
+    num_channels: int,
+    spike_samples: Optional[np.ndarray] = None,
+    spike_units: Optional[np.ndarray] = None,
+    noise_level: float = 20.0,
+    spike_amplitude: float = 150.0,
+    chunk_length: int = 30_720,
+    seed: int = 0,
+) -> Iterator[np.ndarray]:
+    """Generate the int16 traces of a recording, one chunk at a time: Gaussian noise with the spikes of the units.
+
+    Each unit spikes on a few neighbouring channels, around a channel of its own, with a biphasic waveform that is
+    largest on that channel.
+
+    Parameters
+    ----------
+    num_samples : int
+        The number of samples of the recording.
+    num_channels : int
+        The number of channels.
+    spike_samples : np.ndarray, optional
+        The sample index of every spike, sorted, as returned by generate_spike_trains(), by default None (noise only).
+    spike_units : np.ndarray, optional
+        The index of the unit of every spike, by default None.
+    noise_level : float, optional
+        The standard deviation of the noise, in bits, by default 20.0.
+    spike_amplitude : float, optional
+        The amplitude of the trough of the waveforms on the channel of their unit, in bits, by default 150.0.
+    chunk_length : int, optional
+        The number of samples of each chunk, by default 30_720 (a multiple of the OpenEphys record size).
+    seed : int, optional
+        The seed of the random generator, by default 0.
+
+    Yields
+    ------
+    np.ndarray
+        The chunks of the traces, of shape (number of samples of the chunk, num_channels) and dtype int16.
+    """
+    rng = np.random.default_rng(seed)
+    waveform = _get_spike_waveform()
+    if spike_samples is None:
+        spike_samples, spike_units = np.array([], dtype="int64"), np.array([], dtype="int32")
+    num_units = int(spike_units.max()) + 1 if len(spike_units) > 0 else 0
+    unit_channels = rng.integers(0, num_channels, size=num_units)
+    channel_offsets = np.arange(-2, 3)
+    channel_gains = np.exp(-np.abs(channel_offsets))
+    for chunk_start in range(0, num_samples, chunk_length):
+        chunk_stop = min(chunk_start + chunk_length, num_samples)
+        chunk = rng.normal(0.0, noise_level, size=(chunk_stop - chunk_start, num_channels)).astype("float32")
+        first, last = np.searchsorted(spike_samples, [chunk_start, chunk_stop - len(waveform)])
+        for spike_sample, spike_unit in zip(spike_samples[first:last], spike_units[first:last]):
+            channels = np.clip(unit_channels[spike_unit] + channel_offsets, 0, num_channels - 1)
+            offset = spike_sample - chunk_start
+            chunk[offset : offset + len(waveform), channels] += spike_amplitude * np.outer(waveform, channel_gains)
+        yield np.clip(np.round(chunk), -32768, 32767).astype("int16")
+
+
+def write_binary_traces(file_path: FilePath, traces: Iterable[np.ndarray], header_size: int = 0) -> Path:
+    """Write traces to a flat binary file, with time along the first axis (ex. a continuous.dat or a WhiteMatter .bin).
+
+    Parameters
+    ----------
+    file_path : FilePath
+        The path of the file.
+    traces : Iterable[np.ndarray]
+        The chunks of the traces, ex. from generate_traces().
+    header_size : int, optional
+        The number of zero bytes written before the traces, by default 0.
+
+    Returns
+    -------
+    Path
+        The path of the file.
+    """
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(file_path, mode="wb") as file:
+        file.write(bytes(header_size))
+        for chunk in traces:
+            file.write(np.ascontiguousarray(chunk).tobytes())
+    return file_path
+
+
+def write_open_ephys_legacy_folder(
+    folder_path: DirectoryPath,
+    traces: Iterable[np.ndarray],
+    num_channels: int,
+    sampling_frequency: float,
+    session_start_time: datetime,
+    processor_id: int = 100,
+    bit_volts: float = 0.195,
+) -> list[Path]:
+    """Write traces to a folder in the legacy OpenEphys format, with one '.continuous' file per channel.
+
+    Each file has a 1024-byte text header (with the 'date_created' of the session) followed by records of 1024 samples,
+    so only whole records are written: the samples of a last partial record are dropped. A settings.xml file is also
+    written, as the OpenEphys GUI does.
+
+    Parameters
+    ----------
+    folder_path : DirectoryPath
+        The path of the folder.
+    traces : Iterable[np.ndarray]
+        The chunks of the int16 traces, ex. from generate_traces().
+    num_channels : int
+        The number of channels.
+    sampling_frequency : float
+        The sampling frequency, in Hz.
+    session_start_time : datetime
+        The start time of the session.
+    processor_id : int, optional
+        The identifier of the source processor, which prefixes the file names, by default 100.
+    bit_volts : float, optional
+        The gain of the samples, in microvolts per bit, by default 0.195.
+
+    Returns
+    -------
+    list[Path]
+        The paths of the '.continuous' files, in the order of the channels.
+    """
+    folder_path = Path(folder_path)
+    folder_path.mkdir(parents=True, exist_ok=True)
+    file_paths = [
+        folder_path / f"{processor_id}_CH{channel_index + 1}.continuous" for channel_index in range(num_channels)
+    ]
+    files = [open(file_path, mode="wb") for file_path in file_paths]
+    try:
+        for channel_index, file in enumerate(files):
+            header = _get_open_ephys_legacy_header(
+                channel_name=f"CH{channel_index + 1}",
+                sampling_frequency=sampling_frequency,
+                session_start_time=session_start_time,
+                bit_volts=bit_volts,
+            )
+            file.write(header)
+        pending = np.empty((0, num_channels), dtype="int16")
+        first_timestamp = 0
+        for chunk in traces:
+            pending = np.concatenate([pending, chunk]) if len(pending) > 0 else chunk
+            num_records = len(pending) // OPEN_EPHYS_LEGACY_RECORD_SIZE
+            if num_records == 0:
+                continue
+            num_record_samples = num_records * OPEN_EPHYS_LEGACY_RECORD_SIZE
+            records = np.zeros(num_records, dtype=_OPEN_EPHYS_LEGACY_RECORD_DTYPE)
+            records["timestamp"] = first_timestamp + OPEN_EPHYS_LEGACY_RECORD_SIZE * np.arange(num_records)
+            records["num_samples"] = OPEN_EPHYS_LEGACY_RECORD_SIZE
+            records["markers"] = _OPEN_EPHYS_LEGACY_MARKERS
+            record_samples = pending[:num_record_samples].reshape(num_records, OPEN_EPHYS_LEGACY_RECORD_SIZE, -1)
+            for channel_index, file in enumerate(files):
+                records["samples"] = record_samples[:, :, channel_index]
+                file.write(records.tobytes())
+            first_timestamp += num_record_samples
+            pending = pending[num_record_samples:]
+    finally:
+        for file in files:
+            file.close()
+    write_open_ephys_settings(
+        file_path=folder_path / "settings.xml",
+        session_start_time=session_start_time,
+        version="0.4.6",
+        processor_name="Sources/Rhythm FPGA",
+    )
+    return file_paths
+
+
+def write_open_ephys_binary_folder(
+    folder_path: DirectoryPath,
+    traces: Iterable[np.ndarray],
+    num_channels: int,
+    sampling_frequency: float,
+    session_start_time: datetime,
+    stream_folder_name: str = "Neuropix-PXI-100.ProbeA",
+    bit_volts: float = 0.195,
+) -> Path:
+    """Write traces to a record node folder in the OpenEphys binary format, with a Neuropixels 1.0 settings.xml file.
+
+    The folder holds the settings.xml file (with the date of the session and the probe, whose first num_channels
+    electrodes are recorded) and 'experiment1/recording1', with its structure.oebin file and the continuous.dat,
+    sample_numbers.npy and timestamps.npy files of the stream.
+
+    Parameters
+    ----------
+    folder_path : DirectoryPath
+        The path of the record node folder, ex. '.../Record Node 102'.
+    traces : Iterable[np.ndarray]
+        The chunks of the int16 traces, ex. from generate_traces().
+    num_channels : int
+        The number of channels, at most 384.
+    sampling_frequency : float
+        The sampling frequency, in Hz.
+    session_start_time : datetime
+        The start time of the session.
+    stream_folder_name : str, optional
+        The name of the folder of the stream, by default "Neuropix-PXI-100.ProbeA". The stream is named
+        '<record node>#<stream_folder_name>', ex. "Record Node 102#Neuropix-PXI-100.ProbeA".
+    bit_volts : float, optional
+        The gain of the samples, in microvolts per bit, by default 0.195.
+
+    Returns
+    -------
+    Path
+        The path of the record node folder.
+    """
+    folder_path = Path(folder_path)
+    recording_folder_path = folder_path / "experiment1" / "recording1"
+    stream_folder_path = recording_folder_path / "continuous" / stream_folder_name
+    stream_folder_path.mkdir(parents=True, exist_ok=True)
+    num_samples = 0
+    with open(stream_folder_path / "continuous.dat", mode="wb") as file:
+        for chunk in traces:
+            file.write(np.ascontiguousarray(chunk).tobytes())
+            num_samples += len(chunk)
+    sample_numbers = np.lib.format.open_memmap(
+        stream_folder_path / "sample_numbers.npy", mode="w+", dtype="int64", shape=(num_samples,)
+    )
+    timestamps = np.lib.format.open_memmap(
+        stream_folder_path / "timestamps.npy", mode="w+", dtype="float64", shape=(num_samples,)
+    )
+    chunk_length = 10_000_000
+    for start in range(0, num_samples, chunk_length):
+        stop = min(start + chunk_length, num_samples)
+        sample_numbers[start:stop] = np.arange(start, stop)
+        timestamps[start:stop] = np.arange(start, stop) / sampling_frequency
+    sample_numbers.flush()
+    timestamps.flush()
+    del sample_numbers, timestamps
+
+    processor_name, stream_name = stream_folder_name.rsplit(".", maxsplit=1)
+    source_processor_name, source_processor_id = processor_name.rsplit("-", maxsplit=1)
+    structure = {
+        "GUI version": "0.6.7",
+        "continuous": [
+            dict(
+                folder_name=f"{stream_folder_name}/",
+                sample_rate=sampling_frequency,
+                source_processor_name=source_processor_name,
+                source_processor_id=int(source_processor_id),
+                stream_name=stream_name,
+                recorded_processor="Record Node",
+                recorded_processor_id=int(folder_path.name.split(" ")[-1]) if folder_path.name[-1].isdigit() else 0,
+                num_channels=num_channels,
+                channels=[
+                    dict(
+                        channel_name=f"CH{channel_index + 1}",
+                        description="Neuropixels AP channel",
+                        identifier="",
+                        history="",
+                        bit_volts=bit_volts,
+                        units="uV",
+                        source_processor_index=channel_index,
+                        recorded_processor_index=channel_index,
+                    )
+                    for channel_index in range(num_channels)
+                ],
+            )
+        ],
+        "events": [],
+        "spikes": [],
+    }
+    with open(recording_folder_path / "structure.oebin", mode="w", encoding="utf8") as file:
+        json.dump(structure, file, indent=4)
+    write_open_ephys_settings(
+        file_path=folder_path / "settings.xml",
+        session_start_time=session_start_time,
+        version="0.6.7",
+        processor_name=source_processor_name,
+        num_neuropixels_channels=num_channels,
+        stream_name=stream_name,
+    )
+    return folder_path
+
+
+def write_open_ephys_settings(
+    file_path: FilePath,
+    session_start_time: datetime,
+    version: str = "0.6.7",
+    processor_name: str = "Neuropix-PXI",
+    num_neuropixels_channels: Optional[int] = None,
+    stream_name: str = "ProbeA",
+) -> Path:
+    """Write a minimal OpenEphys settings.xml file, with the date of the session and, optionally, a Neuropixels probe.
+
+    Parameters
+    ----------
+    file_path : FilePath
+        The path of the file.
+    session_start_time : datetime
+        The start time of the session, written to INFO/DATE.
+    version : str, optional
+        The version of the OpenEphys GUI, by default "0.6.7".
+    processor_name : str, optional
+        The name of the source processor, by default "Neuropix-PXI".
+    num_neuropixels_channels : int, optional
+        The number of recorded channels of a Neuropixels 1.0 probe (bank 0), whose electrode positions are written to
+        the NP_PROBE element of the processor, by default None (no probe).
+    stream_name : str, optional
+        The name of the stream of the probe, by default "ProbeA".
+
+    Returns
+    -------
+    Path
+        The path of the file.
+    """
+    root = ElementTree.Element("SETTINGS")
+    info = ElementTree.SubElement(root, "INFO")
+    ElementTree.SubElement(info, "VERSION").text = version
+    ElementTree.SubElement(info, "PLUGIN_API_VERSION").text = "8"
+    ElementTree.SubElement(info, "DATE").text = session_start_time.strftime("%d %b %Y %H:%M:%S")
+    ElementTree.SubElement(info, "OS").text = "Windows 10"
+    ElementTree.SubElement(info, "MACHINE", name="SYNTHETIC", cpu_model="", cpu_num_cores="8")
+    signal_chain = ElementTree.SubElement(root, "SIGNALCHAIN")
+    processor = ElementTree.SubElement(
+        signal_chain, "PROCESSOR", name=processor_name, type="1", nodeId="100", libraryVersion="0.4.0"
+    )
+    if num_neuropixels_channels is not None:
+        ElementTree.SubElement(processor, "STREAM", name=stream_name, sample_rate="30000.0", channel_count="384")
+        editor = ElementTree.SubElement(processor, "EDITOR")
+        np_probe = ElementTree.SubElement(
+            editor,
+            "NP_PROBE",
+            slot="2",
+            port="1",
+            dock="0",
+            probe_serial_number="18194814141",
+            headstage_serial_number="0",
+            headstage_part_number="NP2_HS_30",
+            flex_version="3.0",
+            flex_part_number="NP2_FLEX_0",
+            probe_part_number="PRB_1_4_0480_1",
+            probe_name="Neuropixels 1.0",
+            apGainValue="500x",
+            lfpGainValue="250x",
+            isEnabled="1",
+        )
+        channel_indices = range(num_neuropixels_channels)
+        # Neuropixels 1.0 electrodes are staggered in 4 columns, 2 electrodes per row 20 um apart
+        x_positions = [(27, 59, 11, 43)[channel_index % 4] for channel_index in channel_indices]
+        y_positions = [20 * (channel_index // 2) for channel_index in channel_indices]
+        ElementTree.SubElement(np_probe, "CHANNELS", {f"CH{channel_index}": "0" for channel_index in channel_indices})
+        ElementTree.SubElement(
+            np_probe,
+            "ELECTRODE_XPOS",
+            {f"CH{channel_index}": str(x) for channel_index, x in zip(channel_indices, x_positions)},
+        )
+        ElementTree.SubElement(
+            np_probe,
+            "ELECTRODE_YPOS",
+            {f"CH{channel_index}": str(y) for channel_index, y in zip(channel_indices, y_positions)},
+        )
+    ElementTree.SubElement(signal_chain, "PROCESSOR", name="Record Node", type="4", nodeId="102")
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    ElementTree.ElementTree(root).write(file_path, encoding="utf-8", xml_declaration=True)
+    return file_path
+
+
+def write_phy_folder(
+    folder_path: DirectoryPath,
+    spike_samples: np.ndarray,
+    spike_units: np.ndarray,
+    sampling_frequency: float,
+    num_channels: int,
+    seed: int = 0,
+) -> Path:
+    """Write spike trains to a Phy folder, as Kilosort and Phy leave it after a manual curation.
+
+    Parameters
+    ----------
+    folder_path : DirectoryPath
+        The path of the folder, which may also hold the recording (ex. a legacy OpenEphys folder).
+    spike_samples : np.ndarray
+        The sample index of every spike, sorted, as returned by generate_spike_trains().
+    spike_units : np.ndarray
+        The index of the unit of every spike.
+    sampling_frequency : float
+        The sampling frequency of the recording, in Hz.
+    num_channels : int
+        The number of channels of the recording.
+    seed : int, optional
+        The seed of the random generator of the curation labels and the peak channels, by default 0.
+
+    Returns
+    -------
+    Path
+        The path of the folder.
+    """
+    rng = np.random.default_rng(seed)
+    folder_path = Path(folder_path)
+    folder_path.mkdir(parents=True, exist_ok=True)
+    np.save(folder_path / "spike_times.npy", np.asarray(spike_samples, dtype="uint64"))
+    np.save(folder_path / "spike_clusters.npy", np.asarray(spike_units, dtype="int32"))
+    np.save(folder_path / "spike_templates.npy", np.asarray(spike_units, dtype="int32"))
+    params = dict(
+        dat_path="'recording.dat'",
+        n_channels_dat=num_channels,
+        dtype="'int16'",
+        offset=0,
+        sample_rate=sampling_frequency,
+        hp_filtered="True",
+    )
+    with open(folder_path / "params.py", mode="w") as file:
+        file.writelines(f"{name} = {value}\n" for name, value in params.items())
+
+    num_units = int(np.max(spike_units)) + 1 if len(spike_units) > 0 else 0
+    groups = rng.choice(["good", "mua", "noise"], size=num_units, p=[0.5, 0.35, 0.15])
+    num_spikes = np.bincount(spike_units, minlength=num_units)
+    duration = (int(spike_samples[-1]) + 1) / sampling_frequency if len(spike_samples) > 0 else 1.0
+    with open(folder_path / "cluster_group.tsv", mode="w") as file:
+        file.write("cluster_id\tgroup\n")
+        file.writelines(f"{unit_index}\t{group}\n" for unit_index, group in enumerate(groups))
+    with open(folder_path / "cluster_info.tsv", mode="w") as file:
+        file.write("cluster_id\tAmplitude\tContamPct\tKSLabel\tamp\tch\tdepth\tfr\tgroup\tn_spikes\tsh\n")
+        for unit_index, group in enumerate(groups):
+            channel = int(rng.integers(0, num_channels))
+            file.write(
+                f"{unit_index}\t{rng.uniform(20, 200):.1f}\t{rng.uniform(0, 100):.1f}\t{group}\t"
+                f"{rng.uniform(20, 200):.3f}\t{channel}\t{20.0 * channel:.1f}\t{num_spikes[unit_index] / duration:.4f}\t"
+                f"{group}\t{num_spikes[unit_index]}\t0\n"
+            )
+    return folder_path
+
+
+def write_video(
+    file_path: FilePath,
+    num_frames: int,
+    frame_rate: float = 30.0,
+    frame_shape: tuple[int, int] = (120, 160),
+    fourcc: str = "mp4v",
+    seed: int = 0,
+) -> Path:
+    """Write a grayscale video of a blurry blob moving over a noisy background, with OpenCV.
+
+    Parameters
+    ----------
+    file_path : FilePath
+        The path of the video, whose container (ex. '.mp4' or '.avi') must suit the codec.
+    num_frames : int
+        The number of frames.
+    frame_rate : float, optional
+        The frame rate in the header of the video, in Hz, by default 30.0.
+    frame_shape : tuple[int, int], optional
+        The (height, width) of the frames, in pixels, by default (120, 160).
+    fourcc : str, optional
+        The four character code of the codec, by default "mp4v" (ex. "MJPG" for an '.avi').
+    seed : int, optional
+        The seed of the random generator, by default 0.
+
+    Returns
+    -------
+    Path
+        The path of the video.
+    """
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    height, width = frame_shape
+    video_writer = cv2.VideoWriter(str(file_path), cv2.VideoWriter_fourcc(*fourcc), frame_rate, (width, height))
+    if not video_writer.isOpened():
+        raise ValueError(f"Could not open a video writer for '{file_path}' with the codec '{fourcc}'.")
+    background = rng.integers(40, 80, size=frame_shape).astype("float32")
+    rows, columns = np.mgrid[:height, :width]
+    position = np.array([height / 2, width / 2])
+    try:
+        for _ in range(num_frames):
+            position = np.clip(position + rng.normal(0.0, 2.0, size=2), 0, [height - 1, width - 1])
+            distances = (rows - position[0]) ** 2 + (columns - position[1]) ** 2
+            frame = background + 150 * np.exp(-distances / (2 * (min(frame_shape) / 10) ** 2))
+            frame = np.clip(frame + rng.normal(0.0, 3.0, size=frame_shape), 0, 255).astype("uint8")
+            video_writer.write(cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR))
+    finally:
+        video_writer.release()
+    return file_path
+
+
+def write_image(file_path: FilePath, image_shape: tuple[int, int] = (512, 512), seed: int = 0) -> Path:
+    """Write an RGB image of a vessel-like pattern, with Pillow (the format follows the extension, ex. '.jpg').
+
+    Parameters
+    ----------
+    file_path : FilePath
+        The path of the image.
+    image_shape : tuple[int, int], optional
+        The (height, width) of the image, in pixels, by default (512, 512).
+    seed : int, optional
+        The seed of the random generator, by default 0.
+
+    Returns
+    -------
+    Path
+        The path of the image.
+    """
+    from PIL import Image
+
+    rng = np.random.default_rng(seed)
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    height, width = image_shape
+    rows, columns = np.mgrid[:height, :width] / max(image_shape)
+    image = np.full((height, width), 0.6)
+    for _ in range(12):
+        frequency, phase, angle = rng.uniform(2, 8), rng.uniform(0, 2 * np.pi), rng.uniform(0, np.pi)
+        wave = np.sin(frequency * (np.cos(angle) * rows + np.sin(angle) * columns) * 2 * np.pi + phase)
+        image -= 0.25 * np.exp(-(wave**2) / 0.01)
+    image = np.clip(image + rng.normal(0.0, 0.02, size=image.shape), 0, 1)
+    colors = np.array([0.9, 0.5, 0.4])  # reddish, as under the red light of intrinsic imaging
+    Image.fromarray((255 * image[:, :, np.newaxis] * colors).astype("uint8")).save(file_path)
+    return file_path
+
+
+def write_mat_file(file_path: FilePath, variables: dict) -> Path:
+    """Write variables to a MATLAB (v5) .mat file, which pymatreader reads as the MATLAB files of the lab.
+
+    Dictionaries are written as structs, lists as cell arrays and other values as numeric or char arrays, so that
+    read_mat() returns them as dictionaries, lists and (squeezed) arrays.
+
+    Parameters
+    ----------
+    file_path : FilePath
+        The path of the file.
+    variables : dict
+        The variables, by name.
+
+    Returns
+    -------
+    Path
+        The path of the file.
+    """
+    from scipy.io import savemat
+
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    savemat(file_path, _to_mat_value(variables), long_field_names=True, do_compression=False)
+    return file_path
+
+
+def _to_mat_value(value):
+    if isinstance(value, dict):
+        return {key: _to_mat_value(element) for key, element in value.items()}
+    if isinstance(value, (list, tuple)):
+        cell = np.empty(len(value), dtype=object)
+        for index, element in enumerate(value):
+            cell[index] = _to_mat_value(element)
+        return cell
+    return value
+
+
+def _get_spike_waveform(num_samples: int = 48) -> np.ndarray:
+    times = np.arange(num_samples) - num_samples // 3
+    trough = -np.exp(-(times**2) / 8.0)
+    peak = 0.4 * np.exp(-((times - 8) ** 2) / 32.0)
+    return (trough + peak).astype("float32")
+
+
+def _get_open_ephys_legacy_header(
+    channel_name: str, sampling_frequency: float, session_start_time: datetime, bit_volts: float
+) -> bytes:
+    date_created = session_start_time.strftime("%d-%b-%Y %H%M%S")
+    lines = [
+        "header.format = 'Open Ephys Data Format';",
+        "header.version = 0.4;",
+        f"header.header_bytes = {OPEN_EPHYS_LEGACY_HEADER_SIZE};",
+        "header.description = 'each record contains one 64-bit timestamp, one 16-bit sample count (N), 1 uint16 "
+        "recordingNumber, N 16-bit samples, and one 10-byte record marker (0 1 2 3 4 5 6 7 8 255)';",
+        f"header.date_created = '{date_created}';",
+        f"header.channel = '{channel_name}';",
+        "header.channelType = 'Continuous';",
+        f"header.sampleRate = {sampling_frequency:g};",
+        f"header.blockLength = {OPEN_EPHYS_LEGACY_RECORD_SIZE};",
+        f"header.bufferSize = {OPEN_EPHYS_LEGACY_RECORD_SIZE};",
+        f"header.bitVolts = {bit_volts};",
+    ]
+    header = "\n".join(lines).encode("latin-1")
+    return header.ljust(OPEN_EPHYS_LEGACY_HEADER_SIZE, b" ")
@@ -0,0 +1,306 @@
+"""Round-trip verification of the datasets of written NWB files against their sources."""
+import json
+import time
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Union
+
+import numpy as np
+from pydantic import FilePath
+
+DEFAULT_CHUNK_MB = 64.0
+
+
+def verify_dataset(
+    *,
+    name: str,
+    nwbfile_path: FilePath,
+    nwb_dataset_path: str,
+    read_source_rows: Callable[[int, int], np.ndarray],
+    num_rows: int,
+    source_offset: float = 0.0,
+    apply_conversion: bool = False,
+    rtol: float = 0.0,
+    atol: float = 0.0,
+    chunk_mb: float = DEFAULT_CHUNK_MB,
+) -> dict:
+    """Compare a dataset of an NWB file with its source, chunk by chunk, holding at most one chunk of each in memory.
+
+    Parameters
+    ----------
+    name : str
+        The name of the check, for the report.
+    nwbfile_path : FilePath
+        Path to the NWB file (HDF5 or Zarr).
+    nwb_dataset_path : str
+        Path to the dataset in the NWB file, ex. "acquisition/ElectricalSeries/data".
+    read_source_rows : Callable[[int, int], np.ndarray]
+        Function that reads the rows [start, stop) of the source. It must be picklable (ex. a functools.partial of a
+        module-level function) for the check to run in another process.
+    num_rows : int
+        The number of rows of the source.
+    source_offset : float, optional
+        Offset added to the source before comparing, ex. the opposite of the starting time subtracted to align
+        timestamps, by default 0.0.
+    apply_conversion : bool, optional
+        Whether to apply the declared 'conversion', 'offset' and 'channel_conversion' of the NWB TimeSeries to the
+        dataset before comparing, when the source is in physical units, by default False (raw values).
+    rtol : float, optional
+        The relative tolerance of the comparison, by default 0.0 (exact).
+    atol : float, optional
+        The absolute tolerance of the comparison, by default 0.0 (exact).
+    chunk_mb : float, optional
+        The size in MB of the chunks of rows compared at once, by default 64.0.
+
+    Returns
+    -------
+    dict
+        The 'name', the 'nwb_dataset_path', the 'status' ("pass" or "fail"), the 'num_rows', the 'num_mismatches',
+        the 'max_abs_error', the 'message', the 'mb' compared, the 'seconds' and the 'mb_per_second' of the check.
+    """
+    start_time = time.perf_counter()
+    num_mismatches, max_abs_error, num_bytes, message = 0, 0.0, 0, ""
+    with _open_nwbfile_store(nwbfile_path=nwbfile_path) as store:
+        dataset = store[nwb_dataset_path]
+        if dataset.shape[0] != num_rows:
+            message = f"The dataset has {dataset.shape[0]} rows, but the source has {num_rows}."
+        else:
+            scale, offset = 1.0, 0.0
+            if apply_conversion:
+                scale, offset = _get_declared_conversion(store=store, nwb_dataset_path=nwb_dataset_path)
+            row_mb = max(dataset.dtype.itemsize * int(np.prod(dataset.shape[1:])), 1) / 1e6
+            chunk_rows = max(int(chunk_mb / row_mb), 1)
+            for start in range(0, num_rows, chunk_rows):
+                stop = min(start + chunk_rows, num_rows)
+                actual = np.asarray(dataset[start:stop])
+                expected = np.asarray(read_source_rows(start, stop))
+                num_bytes += actual.nbytes + expected.nbytes
+                if apply_conversion:
+                    actual = actual * scale + offset
+                if source_offset != 0.0:
+                    expected = expected + source_offset
+                if actual.shape != expected.shape:
+                    message = f"Rows {start}-{stop} have shape {actual.shape}, but the source has {expected.shape}."
+                    break
+                is_close = _is_close(actual=actual, expected=expected, rtol=rtol, atol=atol)
+                num_mismatches += int(np.count_nonzero(~is_close))
+                if not np.all(is_close):
+                    errors = np.abs(actual.astype(np.float64) - expected.astype(np.float64))[~is_close]
+                    errors[np.isnan(errors)] = np.inf  # NaN on one side only
+                    max_abs_error = max(max_abs_error, float(np.max(errors)))
+    if num_mismatches > 0:
+        message = f"{num_mismatches} values differ from the source."
+    return _get_check_report(
+        name=name,
+        nwb_dataset_path=nwb_dataset_path,
+        is_passed=message == "",
+        num_rows=num_rows,
+        num_mismatches=num_mismatches,
+        max_abs_error=max_abs_error,
+        message=message,
+        num_bytes=num_bytes,
+        seconds=time.perf_counter() - start_time,
+    )
+
+
+def verify_value(
+    *,
+    name: str,
+    nwbfile_path: FilePath,
+    nwb_dataset_path: str,
+    expected_value: Any,
+    rtol: float = 0.0,
+    atol: float = 0.0,
+) -> dict:
+    """Compare a scalar of an NWB file with its expected value, ex. the aligned starting time of a TimeSeries.
+
+    Parameters
+    ----------
+    name : str
+        The name of the check, for the report.
+    nwbfile_path : FilePath
+        Path to the NWB file (HDF5 or Zarr).
+    nwb_dataset_path : str
+        Path to the scalar dataset in the NWB file, ex. "acquisition/ElectricalSeries/starting_time".
+    expected_value : Any
+        The expected value.
+    rtol : float, optional
+        The relative tolerance of the comparison, by default 0.0 (exact).
+    atol : float, optional
+        The absolute tolerance of the comparison, by default 0.0 (exact).
+
+    Returns
+    -------
+    dict
+        The report of the check, with the same fields as verify_dataset().
+    """
+    start_time = time.perf_counter()
+    with _open_nwbfile_store(nwbfile_path=nwbfile_path) as store:
+        actual_value = np.asarray(store[nwb_dataset_path][()])
+    expected_value = np.asarray(expected_value)
+    is_passed = bool(np.all(_is_close(actual=actual_value, expected=expected_value, rtol=rtol, atol=atol)))
+    max_abs_error = float(np.max(np.abs(actual_value.astype(np.float64) - expected_value.astype(np.float64))))
+    return _get_check_report(
+        name=name,
+        nwb_dataset_path=nwb_dataset_path,
+        is_passed=is_passed,
+        num_rows=1,
+        num_mismatches=int(not is_passed),
+        max_abs_error=0.0 if is_passed else max_abs_error,
+        message="" if is_passed else f"The value is {actual_value}, but {expected_value} was expected.",
+        num_bytes=actual_value.nbytes + expected_value.nbytes,
+        seconds=time.perf_counter() - start_time,
+    )
+
+
+def run_verification(checks: list[partial], max_workers: int = 1) -> list[dict]:
+    """Run checks made with verify_dataset() or verify_value(), several at the same time in a process pool.
+
+    A check that raises (ex. a dataset missing from the NWB file) fails with the exception as its message, rather
+    than stopping the other checks.
+
+    Parameters
+    ----------
+    checks : list[functools.partial]
+        The checks, as partials of verify_dataset() or verify_value() with every keyword argument set.
+    max_workers : int, optional
+        The maximum number of processes, by default 1 (the checks run one after the other in this process).
+
+    Returns
+    -------
+    list[dict]
+        The report of each check, in the order of checks.
+    """
+    if max_workers == 1:
+        return [_run_check(check=check) for check in checks]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_run_check, checks))
+
+
+def format_verification_report(report: list[dict]) -> str:
+    """Format the report of run_verification() as a table, with a final summary line.
+
+    Parameters
+    ----------
+    report : list[dict]
+        The reports of the checks.
+
+    Returns
+    -------
+    str
+        One line per check, with its status, name, number of rows, throughput and failure message.
+    """
+    lines = []
+    for check_report in report:
+        lines.append(
+            f"{check_report['status'].upper():<5}{check_report['name']:<60}{check_report['num_rows']:>14,} rows"
+            f"{check_report['mb_per_second']:>10.1f} MB/s  {check_report['message']}".rstrip()
+        )
+    num_failed = sum(check_report["status"] == "fail" for check_report in report)
+    total_mb = sum(check_report["mb"] for check_report in report)
+    total_seconds = sum(check_report["seconds"] for check_report in report)
+    lines.append(f"{len(report) - num_failed}/{len(report)} checks passed ({total_mb:.1f} MB in {total_seconds:.1f} s)")
+    return "\n".join(lines)
+
+
+def save_verification_report(report: Union[list[dict], dict[str, list[dict]]], file_path: FilePath):
+    """Save the report of run_verification(), or the reports of several NWB files keyed by their name, as JSON.
+
+    Parameters
+    ----------
+    report : Union[list[dict], dict[str, list[dict]]]
+        The reports of the checks, or the reports of the checks of each NWB file.
+    file_path : FilePath
+        Path to the JSON file.
+    """
+    Path(file_path).write_text(json.dumps(report, indent=2, default=str))
+
+
+def read_array_rows(array: np.ndarray, start: int, stop: int) -> np.ndarray:
+    """Read the rows [start, stop) of an in-memory array, as a source for verify_dataset()."""
+    return array[start:stop]
+
+
+def read_memmap_rows(
+    file_path: FilePath, dtype: str, shape: tuple[int, ...], start_row: int, start: int, stop: int
+) -> np.ndarray:
+    """Read the rows [start_row + start, start_row + stop) of a flat binary file, as a source for verify_dataset()."""
+    memmap = np.memmap(file_path, dtype=dtype, mode="r", shape=shape)
+    return np.array(memmap[start_row + start : start_row + stop])
+
+
+def _run_check(check: partial) -> dict:
+    try:
+        return check()
+    except Exception as exception:
+        return _get_check_report(
+            name=check.keywords["name"],
+            nwb_dataset_path=check.keywords["nwb_dataset_path"],
+            is_passed=False,
+            num_rows=0,
+            num_mismatches=0,
+            max_abs_error=0.0,
+            message=f"{type(exception).__name__}: {exception}",
+            num_bytes=0,
+            seconds=0.0,
+        )
+
+
+def _get_check_report(
+    *,
+    name: str,
+    nwb_dataset_path: str,
+    is_passed: bool,
+    num_rows: int,
+    num_mismatches: int,
+    max_abs_error: float,
+    message: str,
+    num_bytes: int,
+    seconds: float,
+) -> dict:
+    mb = num_bytes / 1e6
+    return dict(
+        name=name,
+        nwb_dataset_path=nwb_dataset_path,
+        status="pass" if is_passed else "fail",
+        num_rows=num_rows,
+        num_mismatches=num_mismatches,
+        max_abs_error=max_abs_error,
+        message=message,
+        mb=mb,
+        seconds=seconds,
+        mb_per_second=mb / seconds if seconds > 0 else 0.0,
+    )
+
+
+def _is_close(actual: np.ndarray, expected: np.ndarray, rtol: float, atol: float) -> np.ndarray:
+    if not (np.issubdtype(actual.dtype, np.inexact) or np.issubdtype(expected.dtype, np.inexact)):
+        return actual == expected
+    return np.isclose(actual, expected, rtol=rtol, atol=atol, equal_nan=True)
+
+
+def _get_declared_conversion(store, nwb_dataset_path: str) -> tuple[Any, float]:
+    dataset = store[nwb_dataset_path]
+    scale = float(dataset.attrs.get("conversion", 1.0))
+    offset = float(dataset.attrs.get("offset", 0.0))
+    time_series_path = nwb_dataset_path.rsplit("/", 1)[0]
+    if "channel_conversion" in store[time_series_path]:
+        scale = scale * np.asarray(store[f"{time_series_path}/channel_conversion"][:])
+    return scale, offset
+
+
+@contextmanager
+def _open_nwbfile_store(nwbfile_path: FilePath):
+    """Open an NWB file for reading with h5py, or with zarr for a '.zarr' directory store."""
+    nwbfile_path = Path(nwbfile_path)
+    if nwbfile_path.suffix == ".zarr":
+        import zarr
+
+        yield zarr.open(str(nwbfile_path), mode="r")
+        return
+    import h5py
+
+    with h5py.File(nwbfile_path, mode="r") as file:
+        yield file
@@ -0,0 +1,105 @@
+"""Fast probing of the frame counts of videos, and their validation against the aligned timestamps."""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import cv2
+import numpy as np
+from pydantic import FilePath
+
+
+def probe_video(file_path: FilePath) -> dict:
+    """Get the number of frames, the frame rate and the duration of a video from its container, without decoding it.
+
+    The number of frames in the container header is checked by seeking to the last frame it announces, and grabbing
+    one frame past it. Only when this check fails (ex. a truncated or variable frame rate file) are the frames counted
+    by grabbing every one of them, which reads the whole file.
+
+    Parameters
+    ----------
+    file_path : FilePath
+        Path to the video file.
+
+    Returns
+    -------
+    dict
+        The 'file_path', the 'num_frames', the 'fps' and the 'duration' (in seconds, from the frame rate) of the
+        video, and whether the number of frames was read from the header ('is_from_header').
+    """
+    video_capture = cv2.VideoCapture(str(file_path))
+    if not video_capture.isOpened():
+        raise ValueError(f"Could not open the video file '{file_path}'.")
+    try:
+        num_frames = int(video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = video_capture.get(cv2.CAP_PROP_FPS)
+        is_from_header = num_frames > 0 and _is_last_frame(video_capture=video_capture, frame_index=num_frames - 1)
+        if not is_from_header:
+            video_capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            num_frames = 0
+            while video_capture.grab():
+                num_frames += 1
+    finally:
+        video_capture.release()
+    duration = num_frames / fps if fps > 0 else np.nan
+    return dict(file_path=file_path, num_frames=num_frames, fps=fps, duration=duration, is_from_header=is_from_header)
+
+
+def _is_last_frame(video_capture: cv2.VideoCapture, frame_index: int) -> bool:
+    video_capture.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+    return video_capture.grab() and not video_capture.grab()
+
+
+def probe_videos(file_paths: list[FilePath], max_workers: Optional[int] = None) -> list[dict]:
+    """Probe several videos at the same time, in a thread pool.
+
+    Parameters
+    ----------
+    file_paths : list[FilePath]
+        Paths to the video files.
+    max_workers : int, optional
+        The maximum number of threads, by default one per video.
+
+    Returns
+    -------
+    list[dict]
+        The result of probe_video() for each video, in the order of file_paths.
+    """
+    if len(file_paths) == 0:
+        return []
+    with ThreadPoolExecutor(max_workers=max_workers or len(file_paths)) as executor:
+        return list(executor.map(probe_video, file_paths))
+
+
+def validate_video_timestamps(
+    file_path_to_timestamps: dict[FilePath, np.ndarray],
+    max_workers: Optional[int] = None,
+) -> list[dict]:
+    """Check that every video has as many frames as it has aligned timestamps, before any video is written.
+
+    Parameters
+    ----------
+    file_path_to_timestamps : dict[FilePath, np.ndarray]
+        The aligned timestamps of each video file.
+    max_workers : int, optional
+        The maximum number of threads used to probe the videos, by default one per video.
+
+    Returns
+    -------
+    list[dict]
+        The result of probe_video() for each video.
+
+    Raises
+    ------
+    ValueError
+        If the number of frames of any video differs from its number of timestamps, listing every such video.
+    """
+    file_paths = list(file_path_to_timestamps)
+    video_infos = probe_videos(file_paths=file_paths, max_workers=max_workers)
+    mismatches = []
+    for video_info, timestamps in zip(video_infos, file_path_to_timestamps.values()):
+        if video_info["num_frames"] != len(timestamps):
+            mismatches.append(
+                f"'{video_info['file_path']}' has {video_info['num_frames']} frames but {len(timestamps)} timestamps"
+            )
+    if len(mismatches) > 0:
+        raise ValueError("The videos do not match their aligned timestamps:\n" + "\n".join(mismatches))
+    return video_infos
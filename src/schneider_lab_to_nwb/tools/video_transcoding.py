@@ -0,0 +1,175 @@
+"""Transcoding of behavior videos to H.264 in parallel frame-range segments."""
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+from pydantic import FilePath
+
+from .video_probing import probe_video
+
+
+def transcode_video(
+    input_file_path: FilePath,
+    output_file_path: FilePath,
+    number_of_jobs: int = 1,
+    crf: int = 18,
+    preset: str = "medium",
+    verbose: bool = True,
+) -> dict:
+    """Re-encode a video to H.264 in an .mp4 file, in contiguous frame-range segments encoded in parallel.
+
+    Each job decodes its range of frames with OpenCV and pipes them to an ffmpeg (libx264) process, so that every
+    segment holds exactly the frames of its range. The segments are then joined without re-encoding by the ffmpeg
+    concat demuxer. The output is written to a temporary file first and only moved into place once it has exactly as
+    many frames as the input, so that a partial or mismatched file never replaces a good one. If the output already
+    exists with as many frames as the input, it is kept as is.
+
+    Parameters
+    ----------
+    input_file_path : FilePath
+        Path to the video to transcode.
+    output_file_path : FilePath
+        Path to the transcoded .mp4 file.
+    number_of_jobs : int, optional
+        Number of segments encoded at the same time, by default 1.
+    crf : int, optional
+        The constant rate factor of libx264, where lower is better quality, by default 18 (visually lossless).
+    preset : str, optional
+        The libx264 preset, which trades encoding speed for file size, by default "medium".
+    verbose : bool, optional
+        Whether to print the size reduction, by default True.
+
+    Returns
+    -------
+    dict
+        The 'input_file_path', the 'output_file_path', the 'num_frames', the 'input_size' and 'output_size' in bytes
+        and the 'size_reduction' (fraction of the input size that was saved).
+
+    Raises
+    ------
+    FileNotFoundError
+        If ffmpeg is not on the PATH.
+    ValueError
+        If the transcoded video does not have as many frames as the input.
+    """
+    if shutil.which("ffmpeg") is None:
+        raise FileNotFoundError("Transcoding videos requires ffmpeg to be installed and on the PATH.")
+    input_file_path = Path(input_file_path)
+    output_file_path = Path(output_file_path)
+    input_video_info = probe_video(file_path=input_file_path)
+    num_frames = input_video_info["num_frames"]
+
+    is_up_to_date = (
+        output_file_path.exists()
+        and os.stat(output_file_path).st_mtime >= os.stat(input_file_path).st_mtime
+        and probe_video(file_path=output_file_path)["num_frames"] == num_frames
+    )
+    if not is_up_to_date:
+        output_file_path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=output_file_path.parent, prefix=".transcoding_") as temporary_dir_path:
+            temporary_dir_path = Path(temporary_dir_path)
+            frame_range_bounds = np.linspace(0, num_frames, max(min(number_of_jobs, num_frames), 1) + 1).astype(int)
+            segment_file_paths = [
+                temporary_dir_path / f"segment_{segment_index:04d}.mp4"
+                for segment_index in range(len(frame_range_bounds) - 1)
+            ]
+            segment_kwargs = [
+                dict(
+                    input_file_path=input_file_path,
+                    segment_file_path=segment_file_path,
+                    start_frame=int(start_frame),
+                    stop_frame=int(stop_frame),
+                    fps=input_video_info["fps"],
+                    crf=crf,
+                    preset=preset,
+                )
+                for segment_file_path, start_frame, stop_frame in zip(
+                    segment_file_paths, frame_range_bounds[:-1], frame_range_bounds[1:]
+                )
+            ]
+            if number_of_jobs == 1:
+                for kwargs in segment_kwargs:
+                    _encode_segment(**kwargs)
+            else:
+                with ProcessPoolExecutor(max_workers=number_of_jobs) as executor:
+                    futures = [executor.submit(_encode_segment, **kwargs) for kwargs in segment_kwargs]
+                    for future in futures:
+                        future.result()
+
+            concat_list_file_path = temporary_dir_path / "segments.txt"
+            concat_list_file_path.write_text(  # relative to the list file
+                "".join(f"file '{segment_file_path.name}'\n" for segment_file_path in segment_file_paths)
+            )
+            temporary_output_file_path = temporary_dir_path / output_file_path.name
+            _run_ffmpeg(
+                "-f", "concat", "-safe", "0", "-i", str(concat_list_file_path),
+                "-c", "copy", "-movflags", "+faststart", str(temporary_output_file_path),
+            )  # fmt: skip
+            num_output_frames = probe_video(file_path=temporary_output_file_path)["num_frames"]
+            if num_output_frames != num_frames:
+                raise ValueError(
+                    f"The transcoded video has {num_output_frames} frames, but '{input_file_path}' has {num_frames}."
+                )
+            os.replace(temporary_output_file_path, output_file_path)
+
+    input_size = os.path.getsize(input_file_path)
+    output_size = os.path.getsize(output_file_path)
+    size_reduction = 1 - output_size / input_size
+    if verbose:
+        print(
+            f"Transcoded '{input_file_path.name}' ({num_frames} frames, all verified): {input_size / 1e9:.2f} GB -> "
+            f"{output_size / 1e9:.2f} GB ({size_reduction:.0%} smaller)"
+        )
+    return dict(
+        input_file_path=input_file_path,
+        output_file_path=output_file_path,
+        num_frames=num_frames,
+        input_size=input_size,
+        output_size=output_size,
+        size_reduction=size_reduction,
+    )
+
+
+def _encode_segment(
+    input_file_path: Path,
+    segment_file_path: Path,
+    start_frame: int,
+    stop_frame: int,
+    fps: float,
+    crf: int,
+    preset: str,
+):
+    video_capture = cv2.VideoCapture(str(input_file_path))
+    width = int(video_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(video_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    ffmpeg_process = subprocess.Popen(
+        [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+            "-c:v", "libx264", "-crf", str(crf), "-preset", preset, "-pix_fmt", "yuv420p",
+            str(segment_file_path),
+        ],
+        stdin=subprocess.PIPE,
+    )  # fmt: skip
+    try:
+        video_capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        for frame_index in range(start_frame, stop_frame):
+            is_read, frame = video_capture.read()
+            if not is_read:
+                raise ValueError(f"Could not read frame {frame_index} of '{input_file_path}'.")
+            ffmpeg_process.stdin.write(frame.tobytes())
+    finally:
+        video_capture.release()
+        ffmpeg_process.stdin.close()
+        return_code = ffmpeg_process.wait()
+    if return_code != 0:
+        raise subprocess.CalledProcessError(returncode=return_code, cmd=f"ffmpeg (segment '{segment_file_path}')")
+
+
+def _run_ffmpeg(*args: str):
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", *args], check=True)
@@ -0,0 +1,129 @@
+"""Cheap polling of data roots for new files, and detection of files that are still being written."""
+import os
+import time
+from pathlib import Path
+from typing import Iterable
+
+from pydantic import DirectoryPath, FilePath
+
+
+class MtimeIndexedScanner:
+    """Poll directory trees for added or removed entries, listing only the directories whose mtime changed.
+
+    Adding, removing or renaming an entry updates the mtime of its directory, so after the first scan each poll costs
+    one stat per directory instead of a listing of every directory and a stat of every file. Files that grow in place
+    do not update the mtime of their directory; use a FileStabilityTracker to wait for them to be complete.
+    """
+
+    def __init__(self, root_paths: Iterable[DirectoryPath]):
+        """Initialize the scanner. Nothing is read until the first scan.
+
+        Parameters
+        ----------
+        root_paths : Iterable[DirectoryPath]
+            The roots of the directory trees to poll. Roots that do not exist yet are polled until they appear.
+        """
+        self.root_paths = [Path(root_path) for root_path in root_paths]
+        self._dir_path_to_mtime = dict()
+        self._dir_path_to_subdir_paths = dict()
+
+    def scan(self) -> bool:
+        """Stat every known directory and list again those whose mtime changed.
+
+        Returns
+        -------
+        bool
+            Whether any directory was added, removed or changed since the previous scan (always True on the first).
+        """
+        is_changed = False
+        visited_dir_paths = set()
+        dir_paths = list(self.root_paths)
+        while dir_paths:
+            dir_path = dir_paths.pop()
+            try:
+                mtime = os.stat(dir_path).st_mtime_ns
+                if self._dir_path_to_mtime.get(dir_path) != mtime:
+                    is_changed = True
+                    with os.scandir(dir_path) as entries:
+                        subdir_paths = [Path(entry.path) for entry in entries if entry.is_dir()]
+            except FileNotFoundError:
+                continue  # forgotten below, along with its subdirectories
+            visited_dir_paths.add(dir_path)
+            if self._dir_path_to_mtime.get(dir_path) != mtime:
+                self._dir_path_to_mtime[dir_path] = mtime
+                self._dir_path_to_subdir_paths[dir_path] = subdir_paths
+            dir_paths.extend(self._dir_path_to_subdir_paths[dir_path])
+
+        removed_dir_paths = set(self._dir_path_to_mtime) - visited_dir_paths
+        for dir_path in removed_dir_paths:
+            del self._dir_path_to_mtime[dir_path]
+            del self._dir_path_to_subdir_paths[dir_path]
+        return is_changed or len(removed_dir_paths) > 0
+
+    @property
+    def num_dirs(self) -> int:
+        """The number of directories indexed by the last scan."""
+        return len(self._dir_path_to_mtime)
+
+
+class FileStabilityTracker:
+    """Tell when files have stopped changing, from their size and mtime across successive polls."""
+
+    def __init__(self, stable_seconds: float = 300.0):
+        """Initialize the tracker.
+
+        Parameters
+        ----------
+        stable_seconds : float, optional
+            How long the size and the mtime of a file must stay the same for it to be considered complete, by default
+            300.0. It should exceed the longest pause of the copies from the rigs.
+        """
+        self.stable_seconds = stable_seconds
+        self._file_path_to_state = dict()
+
+    def are_stable(self, file_paths: Iterable[FilePath]) -> bool:
+        """Whether all the files exist and have not changed for stable_seconds.
+
+        Each call stats the files, so the files must be polled repeatedly, ex. once per scan.
+
+        Parameters
+        ----------
+        file_paths : Iterable[FilePath]
+            The files to check.
+
+        Returns
+        -------
+        bool
+            Whether every file is stable. Returns False if there are no files.
+        """
+        now = time.monotonic()
+        are_stable = True
+        num_files = 0
+        for file_path in file_paths:
+            num_files += 1
+            file_path = Path(file_path)
+            try:
+                stat_result = os.stat(file_path)
+            except FileNotFoundError:
+                self._file_path_to_state.pop(file_path, None)
+                are_stable = False
+                continue
+            signature = (stat_result.st_size, stat_result.st_mtime_ns)
+            previous_signature, unchanged_since = self._file_path_to_state.get(file_path, (None, now))
+            if signature != previous_signature:
+                unchanged_since = now
+            self._file_path_to_state[file_path] = (signature, unchanged_since)
+            if now - unchanged_since < self.stable_seconds:
+                are_stable = False
+        return are_stable and num_files > 0
+
+    def forget(self, file_paths: Iterable[FilePath]):
+        """Stop tracking files, ex. once their session has been queued for conversion.
+
+        Parameters
+        ----------
+        file_paths : Iterable[FilePath]
+            The files to forget.
+        """
+        for file_path in file_paths:
+            self._file_path_to_state.pop(Path(file_path), None)
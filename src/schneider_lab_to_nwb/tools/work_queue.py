@@ -0,0 +1,226 @@
+"""File-lock work queue that lets several processes or machines share one list of sessions without a central service."""
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable, Literal, Optional
+
+from pydantic import DirectoryPath
+
+
+def _is_process_alive(pid: int) -> bool:
+    if os.name == "nt":  # signal 0 would terminate the process on Windows, so rely on the heartbeats there
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_owner(lock_path: Path) -> Optional[dict]:
+    """Read the owner of a lock, or None if the lock does not exist or is being written."""
+    try:
+        with open(lock_path, mode="r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+class FileLockWorkQueue:
+    """Work queue in which tasks are claimed by atomically creating lock files in a shared directory.
+
+    Every process that runs the same list of tasks against the same queue directory (for example, a network share
+    mounted on several machines) claims a task before working on it, so each task is processed exactly once. While a
+    task is claimed, a background thread refreshes the modification time of its lock file (the heartbeat). A lock whose
+    heartbeat is older than `stale_timeout` belongs to a process that died, and may be taken over by another process.
+    Finished tasks leave a '<task_name>.done' or '<task_name>.failed' marker behind so that they are not claimed again.
+    A process that could not claim a task should come back to it until it is finished, since its owner may die first.
+
+    Only one process at a time may take over a stale lock, and it judges the lock again before replacing it. A process
+    only reports a claim once the lock holds its own token, and a process whose lock was taken over anyway (for
+    example, after a long pause of its heartbeats) stops its heartbeats and calls its `on_ownership_lost` callback, so
+    that it can stop working on the task.
+
+    Note that staleness is judged by comparing the lock's modification time, as reported by the file server, to the
+    local clock, so `stale_timeout` should be much larger than both `heartbeat_interval` and any clock skew between
+    machines.
+    """
+
+    def __init__(self, queue_dir_path: DirectoryPath, heartbeat_interval: float = 30.0, stale_timeout: float = 600.0):
+        """Initialize the work queue.
+
+        Parameters
+        ----------
+        queue_dir_path : DirectoryPath
+            Path to the shared directory where the lock files and markers are stored.
+        heartbeat_interval : float, optional
+            Number of seconds between heartbeats of a claimed task, by default 30.0.
+        stale_timeout : float, optional
+            Number of seconds without a heartbeat after which a lock is considered stale, by default 600.0.
+        """
+        if stale_timeout <= heartbeat_interval:
+            raise ValueError(
+                f"stale_timeout ({stale_timeout}) must be larger than heartbeat_interval ({heartbeat_interval})."
+            )
+        self.queue_dir_path = Path(queue_dir_path)
+        self.queue_dir_path.mkdir(parents=True, exist_ok=True)
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_timeout = stale_timeout
+        self._task_name_to_token = dict()
+        self._task_name_to_stop_event = dict()
+
+    def _get_lock_path(self, task_name: str) -> Path:
+        return self.queue_dir_path / f"{task_name}.lock"
+
+    def _get_marker_path(self, task_name: str, status: Literal["done", "failed"]) -> Path:
+        return self.queue_dir_path / f"{task_name}.{status}"
+
+    def is_finished(self, task_name: str) -> bool:
+        """Whether the task has already been processed (successfully or not) by any process."""
+        return any(self._get_marker_path(task_name=task_name, status=status).exists() for status in ("done", "failed"))
+
+    def is_claimed(self, task_name: str) -> bool:
+        """Whether the task is locked by a process that is still sending heartbeats, so it cannot be claimed yet."""
+        return self._get_lock_path(task_name=task_name).exists() and not self.is_stale(task_name=task_name)
+
+    def is_stale(self, task_name: str) -> bool:
+        """Whether the task is locked by a process that stopped sending heartbeats or that died on this machine."""
+        return self._get_stale_owner(lock_path=self._get_lock_path(task_name=task_name)) is not None
+
+    def _get_stale_owner(self, lock_path: Path) -> Optional[dict]:
+        """Get the owner of a stale lock (an empty dict if it cannot be read), or None if the lock is not stale."""
+        try:
+            last_heartbeat = lock_path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+        owner = _read_owner(lock_path=lock_path)
+        if time.time() - last_heartbeat > self.stale_timeout:
+            return owner or dict()
+        if owner is None:  # the lock is being created or removed
+            return None
+        if owner["hostname"] == socket.gethostname() and not _is_process_alive(pid=owner["pid"]):
+            return owner
+        return None
+
+    def _replace_stale_lock(self, task_name: str, owner: dict) -> bool:
+        """Replace the lock of the task with a lock of this process, if it is stale, and whether it was replaced.
+
+        Takeovers are serialized by a '<task_name>.lock.takeover' file: its holder judges the lock again, so a lock
+        that another process took over in the meantime is left alone, and replaces it atomically, so the lock never
+        disappears for a process that would create a fresh one.
+        """
+        lock_path = self._get_lock_path(task_name=task_name)
+        takeover_path = lock_path.with_name(f"{lock_path.name}.takeover")
+        try:
+            if time.time() - takeover_path.stat().st_mtime > self.stale_timeout:  # left by a process that died
+                takeover_path.unlink(missing_ok=True)
+        except FileNotFoundError:
+            pass
+        try:
+            os.close(os.open(takeover_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:  # another process is taking over the lock
+            return False
+        try:
+            if self._get_stale_owner(lock_path=lock_path) is None:
+                return False
+            new_lock_path = lock_path.with_name(f"{lock_path.name}.{owner['token']}")
+            with open(new_lock_path, mode="w") as f:
+                json.dump(owner, f)
+            os.replace(new_lock_path, lock_path)
+            return True
+        finally:
+            takeover_path.unlink(missing_ok=True)
+
+    def claim(self, task_name: str, on_ownership_lost: Optional[Callable[[], None]] = None) -> bool:
+        """Try to claim the task for this process.
+
+        Parameters
+        ----------
+        task_name : str
+            Unique name of the task, used as the stem of its lock file.
+        on_ownership_lost : Callable[[], None], optional
+            Called from the heartbeat thread if the lock of the task is taken over by another process while it is
+            claimed, by default None. For example, _thread.interrupt_main stops the work of the main thread.
+
+        Returns
+        -------
+        bool
+            True if the task was claimed and heartbeats were started, False if the task is finished or claimed by
+            another live process.
+        """
+        if self.is_finished(task_name=task_name):
+            return False
+        lock_path = self._get_lock_path(task_name=task_name)
+        token = uuid.uuid4().hex
+        owner = dict(hostname=socket.gethostname(), pid=os.getpid(), token=token, claimed_at=time.time())
+        if self.is_stale(task_name=task_name):
+            if not self._replace_stale_lock(task_name=task_name, owner=owner):
+                return False
+        else:
+            try:
+                file_descriptor = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                return False
+            with os.fdopen(file_descriptor, mode="w") as f:
+                json.dump(owner, f)
+        self._task_name_to_token[task_name] = token
+        if self.is_finished(task_name=task_name):  # finished between the first check and the lock creation
+            self._task_name_to_token.pop(task_name)
+            lock_path.unlink(missing_ok=True)
+            return False
+        if not self.owns(task_name=task_name):  # replaced by a process that judged the lock stale in the meantime
+            self._task_name_to_token.pop(task_name)
+            return False
+
+        stop_event = threading.Event()
+        self._task_name_to_stop_event[task_name] = stop_event
+        heartbeat_thread = threading.Thread(
+            target=self._send_heartbeats,
+            kwargs=dict(task_name=task_name, stop_event=stop_event, on_ownership_lost=on_ownership_lost),
+            daemon=True,
+        )
+        heartbeat_thread.start()
+        return True
+
+    def owns(self, task_name: str) -> bool:
+        """Whether the lock of the task still belongs to this process (it may have been taken over as stale)."""
+        token = self._task_name_to_token.get(task_name)
+        owner = _read_owner(lock_path=self._get_lock_path(task_name=task_name))
+        return token is not None and owner is not None and owner.get("token") == token
+
+    def _send_heartbeats(
+        self, task_name: str, stop_event: threading.Event, on_ownership_lost: Optional[Callable[[], None]] = None
+    ):
+        while not stop_event.wait(timeout=self.heartbeat_interval):
+            if not self.owns(task_name=task_name):
+                if on_ownership_lost is not None and not stop_event.is_set():
+                    on_ownership_lost()
+                return
+            os.utime(self._get_lock_path(task_name=task_name))
+
+    def release(self, task_name: str, status: Optional[Literal["done", "failed"]] = "done"):
+        """Stop the heartbeats of a claimed task, mark it as finished, and remove its lock.
+
+        Parameters
+        ----------
+        task_name : str
+            Unique name of the task.
+        status : Literal["done", "failed"], optional
+            Whether the task succeeded or failed, by default "done". Failed tasks are not retried by other processes;
+            delete their '.failed' marker to requeue them. None gives the task back unfinished, so that it can be
+            claimed again. Nothing is marked if the lock was taken over by another process, which then owns the task.
+        """
+        stop_event = self._task_name_to_stop_event.pop(task_name, None)
+        if stop_event is not None:
+            stop_event.set()
+        if self.owns(task_name=task_name):
+            if status is not None:
+                self._get_marker_path(task_name=task_name, status=status).touch()
+            self._get_lock_path(task_name=task_name).unlink(missing_ok=True)
+        self._task_name_to_token.pop(task_name, None)
@@ -0,0 +1,41 @@
+"""Fast startup of worker processes through preloaded imports."""
+import importlib
+import multiprocessing
+from typing import Iterable
+
+
+def preload_modules(module_names: Iterable[str]):
+    """Import modules, so that the tasks that run afterwards in the same process find them already imported.
+
+    Parameters
+    ----------
+    module_names : Iterable[str]
+        Fully qualified names of the modules to import.
+    """
+    for module_name in module_names:
+        importlib.import_module(module_name)
+
+
+def get_preloading_mp_context(module_names: Iterable[str]) -> multiprocessing.context.BaseContext:
+    """Get a multiprocessing context whose worker processes start with the given modules already imported.
+
+    Where the 'forkserver' start method is available (Linux and macOS), the modules are imported once in the fork
+    server, and every worker is forked from it with the modules already in memory. Elsewhere, the 'spawn' start
+    method is returned, and each worker should import the modules at startup with preload_modules() as (part of) the
+    initializer of the pool, so that the imports happen once per worker rather than during its first task.
+
+    Parameters
+    ----------
+    module_names : Iterable[str]
+        Fully qualified names of the modules to preload.
+
+    Returns
+    -------
+    multiprocessing.context.BaseContext
+        The context to pass as the mp_context of the process pool.
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(list(module_names))
+    return context
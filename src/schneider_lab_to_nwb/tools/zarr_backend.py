@@ -0,0 +1,77 @@
+"""Conversion to NWB-Zarr with the chunks of the large datasets written in parallel."""
+from pathlib import Path
+from typing import Optional
+
+from hdmf.data_utils import GenericDataChunkIterator
+from hdmf_zarr.nwb import NWBZarrIO
+from neuroconv import NWBConverter
+from neuroconv.tools.nwb_helpers import (
+    configure_backend,
+    get_default_backend_configuration,
+    make_nwbfile_from_metadata,
+)
+from neuroconv.tools.spikeinterface.spikeinterfacerecordingdatachunkiterator import (
+    SpikeInterfaceRecordingDataChunkIterator,
+)
+from pydantic import FilePath
+from pynwb import TimeSeries
+
+from .data_chunk_iterators import PicklableRecordingDataChunkIterator
+
+
+def run_zarr_conversion(
+    converter: NWBConverter,
+    nwbfile_path: FilePath,
+    metadata: dict,
+    conversion_options: Optional[dict] = None,
+    number_of_jobs: int = 1,
+):
+    """Write the converter's interfaces to an NWB-Zarr directory store, writing chunks with several processes.
+
+    NWBConverter.run_conversion() writes Zarr with a single process, so the file is written here with
+    NWBZarrIO.write(number_of_jobs=...) instead. The default Zarr backend configuration is applied, as for HDF5.
+    Only datasets backed by picklable data chunk iterators are written in parallel, so the recording iterators made by
+    neuroconv are replaced by picklable iterators over the same recordings. The reader slots of the iterators (see
+    admit_new_data_chunk_iterators()) are pickled along with them, so the writer processes respect the I/O admission
+    limits.
+
+    Parameters
+    ----------
+    converter : NWBConverter
+        The converter whose interfaces will be written.
+    nwbfile_path : FilePath
+        Path to the NWB-Zarr directory store, typically ending with '.nwb.zarr'. An existing store is overwritten.
+    metadata : dict
+        Metadata dictionary with information used to create the NWBFile.
+    conversion_options : dict, optional
+        A dictionary containing conversion options for each interface, by default None.
+    number_of_jobs : int, optional
+        Number of processes that write chunks in parallel, by default 1.
+    """
+    conversion_options = conversion_options or dict()
+    converter.validate_metadata(metadata=metadata)
+    converter.validate_conversion_options(conversion_options=conversion_options)
+    converter.temporally_align_data_interfaces(metadata=metadata, conversion_options=conversion_options)
+
+    nwbfile = make_nwbfile_from_metadata(metadata=metadata)
+    converter.add_to_nwbfile(nwbfile=nwbfile, metadata=metadata, conversion_options=conversion_options)
+    for neurodata_object in nwbfile.all_children():
+        if isinstance(neurodata_object, TimeSeries) and type(neurodata_object.data) is (
+            SpikeInterfaceRecordingDataChunkIterator
+        ):
+            # The data of a TimeSeries cannot be set again, so the field is replaced directly
+            neurodata_object.fields["data"] = PicklableRecordingDataChunkIterator.from_iterator(
+                iterator=neurodata_object.data
+            )
+
+    # Chunks written by different processes must not share a Zarr chunk, so the Zarr chunks must match the iterators'
+    backend_configuration = get_default_backend_configuration(nwbfile=nwbfile, backend="zarr")
+    for dataset_configuration in backend_configuration.dataset_configurations.values():
+        neurodata_object = nwbfile.objects[dataset_configuration.object_id]
+        dataset = getattr(neurodata_object, dataset_configuration.dataset_name)
+        if isinstance(dataset, GenericDataChunkIterator):
+            dataset_configuration.chunk_shape = dataset.chunk_shape
+            dataset_configuration.buffer_shape = dataset.buffer_shape
+    configure_backend(nwbfile=nwbfile, backend_configuration=backend_configuration)
+    with NWBZarrIO(str(Path(nwbfile_path)), mode="w") as io:
+        io.write(nwbfile, number_of_jobs=number_of_jobs)
@@ -1,5 +1,27 @@
-from .zempolich_2024_behaviorinterface import Zempolich2024BehaviorInterface
-from .zempolich_2024_optogeneticinterface import Zempolich2024OptogeneticInterface
-from .zempolich_2024_intrinsic_signal_imaging_interface import Zempolich2024IntrinsicSignalOpticalImagingInterface
-from .zempolich_2024_open_ephys_recording_interface import Zempolich2024OpenEphysRecordingInterface
-from .zempolich_2024_nwbconverter import Zempolich2024NWBConverter
+"""Conversion of the Zempolich 2024 dataset.
+
+The public classes are imported lazily, on first attribute access, so that importing the package does not import
+neuroconv, spikeinterface, pynwb and the other heavy dependencies until they are needed.
+"""
+from typing import TYPE_CHECKING
+
+from schneider_lab_to_nwb.tools.lazy_exports import get_lazy_attribute_functions
+
+if TYPE_CHECKING:
+    from .zempolich_2024_behaviorinterface import Zempolich2024BehaviorInterface
+    from .zempolich_2024_optogeneticinterface import Zempolich2024OptogeneticInterface
+    from .zempolich_2024_intrinsic_signal_imaging_interface import Zempolich2024IntrinsicSignalOpticalImagingInterface
+    from .zempolich_2024_open_ephys_recording_interface import Zempolich2024OpenEphysRecordingInterface
+    from .zempolich_2024_nwbconverter import Zempolich2024NWBConverter
+
+_attribute_name_to_module_name = dict(
+    Zempolich2024BehaviorInterface=".zempolich_2024_behaviorinterface",
+    Zempolich2024OptogeneticInterface=".zempolich_2024_optogeneticinterface",
+    Zempolich2024IntrinsicSignalOpticalImagingInterface=".zempolich_2024_intrinsic_signal_imaging_interface",
+    Zempolich2024OpenEphysRecordingInterface=".zempolich_2024_open_ephys_recording_interface",
+    Zempolich2024NWBConverter=".zempolich_2024_nwbconverter",
+)
+
+__all__ = list(_attribute_name_to_module_name)
+
+__getattr__, __dir__ = get_lazy_attribute_functions(globals(), _attribute_name_to_module_name)
@@ -1,6 +1,7 @@
 """Primary class for converting experiment-specific behavior."""
 from pynwb.file import NWBFile
 from pydantic import FilePath
+from typing import Optional
 import numpy as np
 from pymatreader import read_mat
 from pynwb.behavior import BehavioralTimeSeries, TimeSeries
@@ -11,6 +12,8 @@ from neuroconv.basedatainterface import BaseDataInterface
 from neuroconv.utils import get_base_schema
 from neuroconv.tools import nwb_helpers
 
+from schneider_lab_to_nwb.tools import get_window_mask, get_window_overlap_mask, narrow_array_dtypes
+
 
 class Zempolich2024BehaviorInterface(BaseDataInterface):
     """Behavior interface for schneider_2024 conversion"""
@@ -26,6 +29,13 @@ class Zempolich2024BehaviorInterface(BaseDataInterface):
             Path to the behavior .mat file.
         """
         super().__init__(file_path=file_path)
+        self._mat_file = None
+
+    def read_data(self) -> dict:
+        """Read the behavior .mat file, once. The returned dictionary is shared, so it must not be modified in place."""
+        if self._mat_file is None:
+            self._mat_file = read_mat(self.source_data["file_path"])
+        return self._mat_file
 
     def get_metadata_schema(self) -> dict:
         metadata_schema = super().get_metadata_schema()
@@ -90,7 +100,13 @@ class Zempolich2024BehaviorInterface(BaseDataInterface):
         return metadata_schema
 
     def add_to_nwbfile(
-        self, nwbfile: NWBFile, metadata: dict, normalize_timestamps: bool = False, verbose: bool = False
+        self,
+        nwbfile: NWBFile,
+        metadata: dict,
+        normalize_timestamps: bool = False,
+        narrow_dtypes: bool = False,
+        preview_window: Optional[tuple[float, float]] = None,
+        verbose: bool = False,
     ):
         """Add behavior data to the NWBFile.
 
@@ -102,13 +118,20 @@ class Zempolich2024BehaviorInterface(BaseDataInterface):
             Metadata dictionary with information used to create the NWBFile.
         normalize_timestamps : bool, optional
             Whether to normalize the timestamps to the start of the first behavioral time series, by default False
+        narrow_dtypes : bool, optional
+            Whether to store the values of the behavioral time series, the valued events and the trial columns other than
+            times in the narrowest dtype in which they round-trip exactly (ex. encoder positions as integers), by default
+            False.
+        preview_window : tuple[float, float], optional
+            The (start, stop) in seconds of the window of the session to which the behavior is restricted: the samples
+            and the events in it, and the trials that overlap it, by default None (the whole session).
         verbose: bool, optional
             Whether to print extra information during the conversion, by default False.
         """
         # Read Data
-        file_path = self.source_data["file_path"]
-        file = read_mat(file_path)
-        behavioral_time_series, name_to_times, name_to_values, name_to_trial_array = [], dict(), dict(), dict()
+        file = self.read_data()
+        name_to_timestamps, name_to_data = dict(), dict()
+        name_to_times, name_to_values, name_to_trial_array = dict(), dict(), dict()
         starting_timestamp = get_starting_timestamp(file)
         for time_series_dict in metadata["Behavior"]["TimeSeries"]:
             name = time_series_dict["name"]
@@ -118,14 +141,8 @@ class Zempolich2024BehaviorInterface(BaseDataInterface):
             data = np.array(file["continuous"][name]["value"]).squeeze()
             if data.dtype == np.complex128:
                 data = data.real.astype(np.float64)
-            time_series = TimeSeries(
-                name=name,
-                timestamps=timestamps,
-                data=data,
-                unit="a.u.",
-                description=time_series_dict["description"],
-            )
-            behavioral_time_series.append(time_series)
+            name_to_timestamps[name] = timestamps
+            name_to_data[name] = data
         for event_dict in metadata["Behavior"]["Events"]:
             name = event_dict["name"]
             times = np.array(file["events"][name]["time"]).squeeze()
@@ -141,6 +158,7 @@ class Zempolich2024BehaviorInterface(BaseDataInterface):
             name_to_times[name] = times
             name_to_values[name] = values
 
+        trial_time_names = ["time_reward_s", "opto_time", "opto_time_end"]
         trial_start_times = np.array(file["events"]["push"]["time"]).squeeze()
         trial_stop_times = np.array(file["events"]["push"]["time_end"]).squeeze()
         trial_is_nan = np.isnan(trial_start_times) | np.isnan(trial_stop_times)
@@ -156,10 +174,43 @@ class Zempolich2024BehaviorInterface(BaseDataInterface):
             if dtype == "bool":
                 trial_array[np.isnan(trial_array)] = False
             trial_array = np.asarray(trial_array, dtype=dtype)  # Can't cast to dtype right away bc bool(nan) = True
-            if normalize_timestamps and name in ["time_reward_s", "opto_time", "opto_time_end"]:
+            if normalize_timestamps and name in trial_time_names:
                 trial_array = trial_array - starting_timestamp
             name_to_trial_array[name] = trial_array[~trial_is_nan]
 
+        if preview_window is not None:
+            for name, timestamps in name_to_timestamps.items():
+                is_in_window = get_window_mask(times=timestamps, preview_window=preview_window)
+                name_to_timestamps[name], name_to_data[name] = (
+                    timestamps[is_in_window],
+                    name_to_data[name][is_in_window],
+                )
+            for name, times in name_to_times.items():
+                is_in_window = get_window_mask(times=times, preview_window=preview_window)
+                name_to_times[name] = times[is_in_window]
+                if name in name_to_values:
+                    name_to_values[name] = name_to_values[name][is_in_window]
+            is_in_window = get_window_overlap_mask(
+                start_times=trial_start_times, stop_times=trial_stop_times, preview_window=preview_window
+            )
+            trial_start_times, trial_stop_times = trial_start_times[is_in_window], trial_stop_times[is_in_window]
+            name_to_trial_array = {name: trial_array[is_in_window] for name, trial_array in name_to_trial_array.items()}
+
+        if narrow_dtypes:
+            name_to_data = narrow_array_dtypes(name_to_array=name_to_data, verbose=verbose)
+            # The values of all the valued events are written to one ragged column
+            name_to_values = narrow_array_dtypes(name_to_array=name_to_values, common_dtype=True, verbose=verbose)
+            name_to_trial_array.update(
+                narrow_array_dtypes(
+                    name_to_array={
+                        name: trial_array
+                        for name, trial_array in name_to_trial_array.items()
+                        if name not in trial_time_names
+                    },
+                    verbose=verbose,
+                )
+            )
+
         # Add Data to NWBFile
         behavior_module = nwb_helpers.get_module(
             nwbfile=nwbfile,
@@ -168,6 +219,16 @@ class Zempolich2024BehaviorInterface(BaseDataInterface):
         )
 
         # Add BehavioralTimeSeries
+        behavioral_time_series = [
+            TimeSeries(
+                name=time_series_dict["name"],
+                timestamps=name_to_timestamps[time_series_dict["name"]],
+                data=name_to_data[time_series_dict["name"]],
+                unit="a.u.",
+                description=time_series_dict["description"],
+            )
+            for time_series_dict in metadata["Behavior"]["TimeSeries"]
+        ]
         behavioral_time_series = BehavioralTimeSeries(
             time_series=behavioral_time_series,
             name="behavioral_time_series",
@@ -214,15 +275,18 @@ class Zempolich2024BehaviorInterface(BaseDataInterface):
             behavior_module.add(valued_events_table)
 
         # Add Trials Table
+        has_trials = len(trial_start_times) > 0  # always, unless no trial overlaps the preview window
         for start_time, stop_time in zip(trial_start_times, trial_stop_times):
             nwbfile.add_trial(start_time=start_time, stop_time=stop_time)
-        for trials_dict in metadata["Behavior"]["Trials"]:
-            name = trials_dict["name"]
-            trial_array = name_to_trial_array[name]
-            nwbfile.add_trial_column(name=name, description=trials_dict["description"], data=trial_array)
+        if has_trials:
+            for trials_dict in metadata["Behavior"]["Trials"]:
+                name = trials_dict["name"]
+                trial_array = name_to_trial_array[name]
+                nwbfile.add_trial_column(name=name, description=trials_dict["description"], data=trial_array)
 
         # Add Epochs Table
-        nwbfile.add_epoch(start_time=trial_start_times[0], stop_time=trial_stop_times[-1], tags=["Active Behavior"])
+        if has_trials:
+            nwbfile.add_epoch(start_time=trial_start_times[0], stop_time=trial_stop_times[-1], tags=["Active Behavior"])
         if len(valued_events_table) > 0:
             tuning_tone_times = valued_events_table[0].event_times[0]
             nwbfile.add_epoch(
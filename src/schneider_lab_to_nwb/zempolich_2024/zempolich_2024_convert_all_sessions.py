@@ -1,13 +1,35 @@
 """Primary script to run to convert all sessions in a dataset using session_to_nwb."""
 from pathlib import Path
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import Future, as_completed
 from pprint import pformat
+import time
 import traceback
+import _thread
 from tqdm import tqdm
 import shutil
+from typing import Optional, Literal
 from pydantic import FilePath, DirectoryPath
 
 from schneider_lab_to_nwb.zempolich_2024.zempolich_2024_convert_session import session_to_nwb
+from schneider_lab_to_nwb.zempolich_2024.zempolich_2024_verify_session import verify_session
+from schneider_lab_to_nwb.tools import (
+    FileLockWorkQueue,
+    SessionStager,
+    move_file_atomically,
+    configure_io_admission,
+    load_max_readers_per_storage_root,
+    SupervisedProcessPool,
+    update_analysis_cache,
+    get_preloading_mp_context,
+    preload_modules,
+    save_verification_report,
+)
+
+# Modules imported by every worker before its first task, which pull in neuroconv, spikeinterface, pynwb and the rest
+WORKER_PRELOAD_MODULE_NAMES = (
+    "schneider_lab_to_nwb.zempolich_2024.zempolich_2024_nwbconverter",
+    "schneider_lab_to_nwb.zempolich_2024.zempolich_2024_convert_session",
+)
 
 
 def dataset_to_nwb(
@@ -15,8 +37,21 @@ def dataset_to_nwb(
     data_dir_path: DirectoryPath,
     output_dir_path: DirectoryPath,
     max_workers: int = 1,
+    checkpoint: bool = False,
+    queue_dir_path: Optional[DirectoryPath] = None,
+    scratch_dir_path: Optional[DirectoryPath] = None,
+    max_scratch_gb: float = 100.0,
+    max_readers_per_storage_root: Optional[dict[str, int]] = None,
+    memory_budget_gb: Optional[float] = None,
+    backend: Literal["hdf5", "zarr"] = "hdf5",
+    number_of_jobs: int = 1,
+    shared_images_dir_path: Optional[DirectoryPath] = None,
+    split_ecephys: bool = False,
+    analysis_cache_dir_path: Optional[DirectoryPath] = None,
+    verify: bool = False,
+    dry_run: bool = False,
     verbose: bool = True,
-):
+) -> Optional[list[dict]]:
     """Convert the entire dataset to NWB.
 
     Parameters
@@ -26,30 +61,402 @@ def dataset_to_nwb(
     output_dir_path : DirectoryPath
         The path to the directory where the NWB files will be saved.
     max_workers : int, optional
-        The number of workers to use for parallel processing, by default 1
+        The maximum number of workers to use for parallel processing, by default 1. If a worker is killed for lack of
+        memory, the number of workers is lowered and its session is retried, then raised again once memory frees up.
+        Sessions whose worker crashed get their own ERROR file. Each worker imports the conversion modules once, when
+        it starts (from a fork server that preloads them, where available), rather than during its first session.
+    checkpoint : bool, optional
+        Whether to checkpoint each interface so that rerunning the dataset resumes failed sessions and skips
+        completed ones instead of restarting them, by default False
+    queue_dir_path : DirectoryPath, optional
+        The path to a shared directory used to coordinate several dataset_to_nwb processes, on one machine or on
+        several machines with the same mount. Each session is claimed through an atomic lock file before it is
+        converted, so every session is converted exactly once. Sessions claimed by other processes are checked again
+        until they are finished, and converted here if their owner stops sending heartbeats (ex. because it died).
+        By default None (no coordination).
+    scratch_dir_path : DirectoryPath, optional
+        The path to a directory on fast local storage. If provided, each worker copies the inputs of its session there
+        once it has claimed the session, writes the NWB file there, and then moves the finished file to output_dir_path
+        atomically. Videos are linked externally and are therefore never staged. A session whose inputs cannot be
+        copied gets its own ERROR file. Note that checkpoints are deleted along with the scratch directory of a
+        session. By default None (no staging).
+    max_scratch_gb : float, optional
+        The maximum size in GB of the inputs staged in scratch_dir_path at any time, by default 100.0
+    max_readers_per_storage_root : dict[str, int], optional
+        A mapping from a storage root (ex. "Z:\\") to the maximum number of workers that may stream recordings, audio
+        or staged copies from it at the same time. Metadata, behavior and table building are never limited, and files
+        outside of every storage root are read without limits. By default None (no limits).
+    memory_budget_gb : float, optional
+        The maximum memory in GB that each worker should use, which sizes the buffers of each conversion. A warning is
+        raised for sessions that cannot fit. By default None (default buffer sizes).
+    backend : Literal["hdf5", "zarr"], optional
+        The backend of the NWB files, by default "hdf5"
+    number_of_jobs : int, optional
+        The number of processes that each worker uses to write chunks in parallel with the Zarr backend, by default 1
+    shared_images_dir_path : DirectoryPath, optional
+        The path to a directory where the intrinsic signal optical images of each subject are stored once and linked
+        to by the NWB files of its sessions, instead of being stored in every NWB file, by default None. The NWB files
+        link to it by relative path, so it cannot be combined with scratch_dir_path.
+    split_ecephys : bool, optional
+        Whether to write the recording of each session to a companion '_desc-ecephys.nwb' file linked from its NWB
+        file, by default False. See session_to_nwb(). It cannot be combined with scratch_dir_path.
+    analysis_cache_dir_path : DirectoryPath, optional
+        The path to a directory where the trials, events, stimulus tables and session metadata of every NWB file in
+        output_dir_path are exported as Parquet datasets partitioned by subject and session, once all sessions are
+        converted. Only new or changed files are exported again. By default None (no export).
+    verify : bool, optional
+        Whether to verify every converted NWB file against its source data once all sessions are converted, by default
+        False. The report of each file is printed and saved to 'verification_report.json' in output_dir_path. See
+        zempolich_2024_verify_session.verify_session().
+    dry_run : bool, optional
+        Whether to only list the sessions of the dataset, with the metadata resolved from cheap sources, instead of
+        converting them, by default False. No data is opened and nothing is written.
     verbose : bool, optional
         Whether to print verbose output, by default True
+
+    Returns
+    -------
+    Optional[list[dict]]
+        With dry_run=True, the inventory of the dataset, as returned by get_dataset_inventory(). Otherwise None.
     """
     data_dir_path = Path(data_dir_path)
     output_dir_path = Path(output_dir_path)
     session_to_nwb_kwargs_per_session = get_session_to_nwb_kwargs_per_session(data_dir_path=data_dir_path)
+    if dry_run:
+        return get_dataset_inventory(
+            session_to_nwb_kwargs_per_session=session_to_nwb_kwargs_per_session,
+            output_dir_path=output_dir_path,
+            backend=backend,
+            verbose=verbose,
+        )
+    if shared_images_dir_path is not None and scratch_dir_path is not None:
+        raise ValueError("shared_images_dir_path cannot be combined with scratch_dir_path.")
+    if split_ecephys and scratch_dir_path is not None:
+        raise ValueError("split_ecephys cannot be combined with scratch_dir_path.")
+    if queue_dir_path is not None:
+        work_queue = FileLockWorkQueue(queue_dir_path=queue_dir_path)
+    mp_context = get_preloading_mp_context(module_names=WORKER_PRELOAD_MODULE_NAMES)
+    stager = None
+    if scratch_dir_path is not None:
+        # The workers stage their own sessions once they have claimed them, so the bookkeeping of the staged sessions
+        # is shared through a manager process
+        manager = mp_context.Manager()
+        stager = SessionStager(
+            scratch_dir_path=scratch_dir_path,
+            max_scratch_gb=max_scratch_gb,
+            max_staged_sessions=max_workers,
+            manager=manager,
+        )
 
-    futures = []
-    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+    configure_io_admission(max_readers_per_storage_root=max_readers_per_storage_root)
+
+    future_to_kwargs = dict()
+    verify_session_kwargs_per_nwbfile_name = dict()
+    with SupervisedProcessPool(
+        max_workers=max_workers,
+        initializer=initialize_worker,
+        initargs=(max_readers_per_storage_root,),
+        mp_context=mp_context,
+    ) as executor:
         for session_to_nwb_kwargs in session_to_nwb_kwargs_per_session:
             session_to_nwb_kwargs["output_dir_path"] = output_dir_path
+            session_to_nwb_kwargs["checkpoint"] = checkpoint
+            session_to_nwb_kwargs["memory_budget_gb"] = memory_budget_gb
+            session_to_nwb_kwargs["backend"] = backend
+            session_to_nwb_kwargs["number_of_jobs"] = number_of_jobs
+            session_to_nwb_kwargs["shared_images_dir_path"] = shared_images_dir_path
+            session_to_nwb_kwargs["split_ecephys"] = split_ecephys
             session_to_nwb_kwargs["verbose"] = verbose
             nwbfile_name = get_nwbfile_name_from_kwargs(session_to_nwb_kwargs)
             exception_file_path = output_dir_path / f"ERROR_{nwbfile_name}.txt"
-            futures.append(
-                executor.submit(
-                    safe_session_to_nwb,
+            if queue_dir_path is not None and work_queue.is_finished(task_name=nwbfile_name):
+                continue
+            verify_session_kwargs_per_nwbfile_name[nwbfile_name] = dict(  # the sources, not their staged copies
+                behavior_file_path=session_to_nwb_kwargs["behavior_file_path"],
+                ephys_folder_path=session_to_nwb_kwargs.get("ephys_folder_path"),
+                has_opto=session_to_nwb_kwargs.get("has_opto", False),
+            )
+            future = submit_session(
+                executor=executor,
+                session_to_nwb_kwargs=session_to_nwb_kwargs,
+                exception_file_path=exception_file_path,
+                queue_dir_path=queue_dir_path,
+                stager=stager,
+            )
+            future_to_kwargs[future] = (session_to_nwb_kwargs, exception_file_path)
+        claimed_elsewhere = []  # sessions that another process had claimed
+        for future in tqdm(as_completed(future_to_kwargs), total=len(future_to_kwargs)):
+            session_to_nwb_kwargs, exception_file_path = future_to_kwargs[future]
+            record_worker_crash(
+                future=future, session_to_nwb_kwargs=session_to_nwb_kwargs, exception_file_path=exception_file_path
+            )
+            if future.exception() is None and not future.result():
+                claimed_elsewhere.append((session_to_nwb_kwargs, exception_file_path))
+
+        # The owner of a session may die before finishing it, so its session is taken over once its lock goes stale
+        while len(claimed_elsewhere) > 0:
+            time.sleep(work_queue.heartbeat_interval)
+            future_to_kwargs = dict()
+            still_claimed_elsewhere = []
+            for session_to_nwb_kwargs, exception_file_path in claimed_elsewhere:
+                nwbfile_name = get_nwbfile_name_from_kwargs(session_to_nwb_kwargs)
+                if work_queue.is_finished(task_name=nwbfile_name):
+                    continue
+                if work_queue.is_claimed(task_name=nwbfile_name):
+                    still_claimed_elsewhere.append((session_to_nwb_kwargs, exception_file_path))
+                    continue
+                future = submit_session(
+                    executor=executor,
                     session_to_nwb_kwargs=session_to_nwb_kwargs,
                     exception_file_path=exception_file_path,
+                    queue_dir_path=queue_dir_path,
+                    stager=stager,
+                )
+                future_to_kwargs[future] = (session_to_nwb_kwargs, exception_file_path)
+            for future in as_completed(future_to_kwargs):
+                session_to_nwb_kwargs, exception_file_path = future_to_kwargs[future]
+                record_worker_crash(
+                    future=future, session_to_nwb_kwargs=session_to_nwb_kwargs, exception_file_path=exception_file_path
                 )
+                if future.exception() is None and not future.result():
+                    still_claimed_elsewhere.append((session_to_nwb_kwargs, exception_file_path))
+            claimed_elsewhere = still_claimed_elsewhere
+    if stager is not None:
+        manager.shutdown()
+
+    if verify:
+        verify_sessions(
+            output_dir_path=output_dir_path,
+            verify_session_kwargs_per_nwbfile_name=verify_session_kwargs_per_nwbfile_name,
+            max_workers=max_workers,
+            verbose=verbose,
+        )
+
+    if analysis_cache_dir_path is not None:
+        update_analysis_cache(
+            nwb_folder_path=output_dir_path,
+            cache_dir_path=analysis_cache_dir_path,
+            max_workers=max_workers,
+            verbose=verbose,
+        )
+
+
+def verify_sessions(
+    *,
+    output_dir_path: DirectoryPath,
+    verify_session_kwargs_per_nwbfile_name: dict[str, dict],
+    max_workers: int = 1,
+    verbose: bool = True,
+) -> dict[str, list[dict]]:
+    """Verify the converted NWB files against their source data and save the reports.
+
+    Sessions without an NWB file, or with an ERROR file, are skipped.
+
+    Parameters
+    ----------
+    output_dir_path : DirectoryPath
+        The path to the directory where the NWB files are saved.
+    verify_session_kwargs_per_nwbfile_name : dict[str, dict]
+        The arguments for verify_session of each NWB file, except its path, keyed by the name of the file.
+    max_workers : int, optional
+        The maximum number of processes that run the checks of each file, by default 1
+    verbose : bool, optional
+        Whether to print the report of each file, by default True
+
+    Returns
+    -------
+    dict[str, list[dict]]
+        The report of each verified NWB file, keyed by the name of the file.
+    """
+    output_dir_path = Path(output_dir_path)
+    report_per_nwbfile_name = dict()
+    for nwbfile_name, verify_session_kwargs in verify_session_kwargs_per_nwbfile_name.items():
+        nwbfile_path = output_dir_path / nwbfile_name
+        if not nwbfile_path.exists() or (output_dir_path / f"ERROR_{nwbfile_name}.txt").exists():
+            continue
+        report_per_nwbfile_name[nwbfile_name] = verify_session(
+            nwbfile_path=nwbfile_path, **verify_session_kwargs, max_workers=max_workers, verbose=verbose
+        )
+    save_verification_report(report=report_per_nwbfile_name, file_path=output_dir_path / "verification_report.json")
+    num_failed = sum(
+        any(check_report["status"] == "fail" for check_report in report) for report in report_per_nwbfile_name.values()
+    )
+    if num_failed > 0:
+        print(
+            f"{num_failed}/{len(report_per_nwbfile_name)} NWB files failed verification, see verification_report.json"
+        )
+    return report_per_nwbfile_name
+
+
+def submit_session(
+    *,
+    executor: SupervisedProcessPool,
+    session_to_nwb_kwargs: dict,
+    exception_file_path: FilePath,
+    queue_dir_path: Optional[DirectoryPath] = None,
+    stager: Optional[SessionStager] = None,
+) -> Future:
+    """Submit safe_session_to_nwb for a session to the process pool.
+
+    Parameters
+    ----------
+    executor : SupervisedProcessPool
+        The process pool.
+    session_to_nwb_kwargs : dict
+        The arguments for session_to_nwb of the session.
+    exception_file_path : FilePath
+        The path to the file where the exception messages will be saved.
+    queue_dir_path : DirectoryPath, optional
+        The path to the shared work queue directory, by default None.
+    stager : SessionStager, optional
+        The stager of a local scratch directory, by default None. The scratch space of the session is released once
+        its future is done, including when its worker crashed.
+
+    Returns
+    -------
+    Future
+        The future of safe_session_to_nwb.
+    """
+    future = executor.submit(
+        safe_session_to_nwb,
+        session_to_nwb_kwargs=session_to_nwb_kwargs,
+        exception_file_path=exception_file_path,
+        queue_dir_path=queue_dir_path,
+        stager=stager,
+    )
+    if stager is not None:
+        session_name = get_nwbfile_name_from_kwargs(session_to_nwb_kwargs)
+        future.add_done_callback(lambda _: stager.release(session_name=session_name))
+    return future
+
+
+def record_worker_crash(*, future: Future, session_to_nwb_kwargs: dict, exception_file_path: FilePath):
+    """Record the crash of the worker that ran safe_session_to_nwb, which could not record it itself.
+
+    Parameters
+    ----------
+    future : Future
+        The finished future of safe_session_to_nwb. Nothing is recorded if it did not raise.
+    session_to_nwb_kwargs : dict
+        The arguments for session_to_nwb of the session.
+    exception_file_path : FilePath
+        The path to the file where the exception messages will be saved.
+    """
+    if future.exception() is None:
+        return
+    with open(exception_file_path, mode="w") as f:
+        f.write(f"session_to_nwb_kwargs: \n {pformat(session_to_nwb_kwargs)}\n\n")
+        f.write("".join(traceback.format_exception(future.exception())))
+
+
+def initialize_worker(max_readers_per_storage_root: Optional[dict[str, int]] = None):
+    """Prepare a worker process: configure its I/O admission control and import the conversion modules.
+
+    Parameters
+    ----------
+    max_readers_per_storage_root : dict[str, int], optional
+        Passed to configure_io_admission(), by default None.
+    """
+    configure_io_admission(max_readers_per_storage_root=max_readers_per_storage_root)
+    preload_modules(module_names=WORKER_PRELOAD_MODULE_NAMES)  # already imported if the worker was forked
+
+
+def get_dataset_inventory(
+    *,
+    session_to_nwb_kwargs_per_session: list[dict],
+    output_dir_path: DirectoryPath,
+    backend: Literal["hdf5", "zarr"] = "hdf5",
+    verbose: bool = True,
+) -> list[dict]:
+    """List the sessions of the dataset with their metadata, resolved without opening any data.
+
+    Parameters
+    ----------
+    session_to_nwb_kwargs_per_session : list[dict]
+        The arguments for session_to_nwb for each session.
+    output_dir_path : DirectoryPath
+        The path to the directory where the NWB files are saved.
+    backend : Literal["hdf5", "zarr"], optional
+        The backend of the NWB files, by default "hdf5"
+    verbose : bool, optional
+        Whether to print the inventory, by default True
+
+    Returns
+    -------
+    list[dict]
+        One dictionary per session with the 'nwbfile_path', the 'subject_id', the 'session_id', the
+        'session_start_time' and the 'session_description' of the session, whether it 'is_converted' already, and the
+        'error' raised while resolving its metadata, if any.
+    """
+    output_dir_path = Path(output_dir_path)
+    inventory = []
+    for session_to_nwb_kwargs in session_to_nwb_kwargs_per_session:
+        nwbfile_name = get_nwbfile_name_from_kwargs(dict(session_to_nwb_kwargs, backend=backend))
+        session_info = dict(nwbfile_path=output_dir_path / nwbfile_name, error=None)
+        try:
+            session = session_to_nwb(
+                **session_to_nwb_kwargs,
+                output_dir_path=output_dir_path,
+                backend=backend,
+                metadata_only=True,
+                verbose=False,
             )
-        for _ in tqdm(as_completed(futures), total=len(futures)):
-            pass
+            metadata = session["metadata"]
+            session_info.update(
+                nwbfile_path=session["nwbfile_path"],
+                subject_id=metadata["Subject"]["subject_id"],
+                session_id=metadata["NWBFile"]["session_id"],
+                session_start_time=metadata["NWBFile"]["session_start_time"],
+                session_description=metadata["NWBFile"]["session_description"],
+            )
+        except Exception as e:
+            session_info["error"] = repr(e)
+        session_info["is_converted"] = session_info["nwbfile_path"].exists()
+        inventory.append(session_info)
+
+    if verbose:
+        for session_info in inventory:
+            status = "converted" if session_info["is_converted"] else "pending"
+            if session_info["error"] is not None:
+                status = f"error: {session_info['error']}"
+            start_time = session_info.get("session_start_time")
+            print(f"{session_info['nwbfile_path'].name}\t{start_time}\t{status}")
+        num_converted = sum(session_info["is_converted"] for session_info in inventory)
+        print(f"{len(inventory)} sessions, {num_converted} converted")
+    return inventory
+
+
+def stage_session_inputs(*, stager: SessionStager, session_to_nwb_kwargs: dict, session_name: str) -> dict:
+    """Copy the inputs of a session to local scratch and point the session_to_nwb kwargs at the staged copies.
+
+    Parameters
+    ----------
+    stager : SessionStager
+        The stager that manages the scratch directory.
+    session_to_nwb_kwargs : dict
+        The arguments for session_to_nwb.
+    session_name : str
+        The unique name of the session.
+
+    Returns
+    -------
+    dict
+        The arguments for session_to_nwb with the inputs and the output directory on local scratch.
+    """
+    # Videos are linked externally by the NWB file, so they must stay at their final location
+    source_paths = dict(behavior_file_path=session_to_nwb_kwargs["behavior_file_path"])
+    if "ephys_folder_path" in session_to_nwb_kwargs:
+        source_paths["ephys_folder_path"] = session_to_nwb_kwargs["ephys_folder_path"]
+    isoi_folder_path = session_to_nwb_kwargs.get("intrinsic_signal_optical_imaging_folder_path")
+    if isoi_folder_path is not None and Path(isoi_folder_path).exists():
+        source_paths["intrinsic_signal_optical_imaging_folder_path"] = isoi_folder_path
+    patterns = dict(intrinsic_signal_optical_imaging_folder_path=["Overlaid.jpg", "Target.jpg"])
+    staged_paths = stager.stage(session_name=session_name, source_paths=source_paths, patterns=patterns)
+
+    staged_session_to_nwb_kwargs = session_to_nwb_kwargs.copy()
+    staged_session_to_nwb_kwargs.update(staged_paths)
+    staged_session_to_nwb_kwargs["output_dir_path"] = stager.get_session_dir_path(session_name=session_name) / "output"
+    return staged_session_to_nwb_kwargs
 
 
 def get_nwbfile_name_from_kwargs(session_to_nwb_kwargs: dict) -> str:
@@ -68,11 +475,18 @@ def get_nwbfile_name_from_kwargs(session_to_nwb_kwargs: dict) -> str:
     behavior_file_path = session_to_nwb_kwargs["behavior_file_path"]
     subject_id = behavior_file_path.name.split("_")[1]
     session_id = behavior_file_path.name.split("_")[2]
-    nwbfile_name = f"sub-{subject_id}_ses-{session_id}.nwb"
+    nwbfile_suffix = ".nwb.zarr" if session_to_nwb_kwargs.get("backend", "hdf5") == "zarr" else ".nwb"
+    nwbfile_name = f"sub-{subject_id}_ses-{session_id}{nwbfile_suffix}"
     return nwbfile_name
 
 
-def safe_session_to_nwb(*, session_to_nwb_kwargs: dict, exception_file_path: FilePath):
+def safe_session_to_nwb(
+    *,
+    session_to_nwb_kwargs: dict,
+    exception_file_path: FilePath,
+    queue_dir_path: Optional[DirectoryPath] = None,
+    stager: Optional[SessionStager] = None,
+) -> bool:
     """Convert a session to NWB while handling any errors by recording error messages to the exception_file_path.
 
     Parameters
@@ -81,14 +495,70 @@ def safe_session_to_nwb(*, session_to_nwb_kwargs: dict, exception_file_path: Fil
         The arguments for session_to_nwb.
     exception_file_path : FilePath
         The path to the file where the exception messages will be saved.
+    queue_dir_path : DirectoryPath, optional
+        The path to the shared work queue directory. If provided, the session is only converted if it can be claimed
+        from the queue, by default None. The conversion is interrupted if another process takes over the claim.
+    stager : SessionStager, optional
+        The stager of a local scratch directory. If provided, the inputs of the session are copied there once the
+        session is claimed, the NWB file is written there, and it is then moved to the output directory of
+        session_to_nwb_kwargs atomically once the conversion succeeds, by default None. Errors while copying the inputs
+        are recorded like conversion errors.
+
+    Returns
+    -------
+    bool
+        False if the session was left to another process of the work queue, because it had claimed the session or
+        took it over, True otherwise (including when the conversion failed).
+
+    Raises
+    ------
+    MemoryError
+        If the session runs out of memory, so that the process pool lowers its concurrency and retries the session.
+        The claim of the session is given back unfinished.
     """
     exception_file_path = Path(exception_file_path)
+    if queue_dir_path is not None:
+        task_name = get_nwbfile_name_from_kwargs(session_to_nwb_kwargs)
+        work_queue = FileLockWorkQueue(queue_dir_path=queue_dir_path)
+        if not work_queue.claim(task_name=task_name, on_ownership_lost=_thread.interrupt_main):
+            return work_queue.is_finished(task_name=task_name)
+    status = "done"
     try:
-        session_to_nwb(**session_to_nwb_kwargs)
+        if stager is None:
+            session_to_nwb(**session_to_nwb_kwargs)
+        else:
+            nwbfile_name = get_nwbfile_name_from_kwargs(session_to_nwb_kwargs)
+            staged_session_to_nwb_kwargs = stage_session_inputs(
+                stager=stager, session_to_nwb_kwargs=session_to_nwb_kwargs, session_name=nwbfile_name
+            )
+            session_to_nwb(**staged_session_to_nwb_kwargs)
+            if queue_dir_path is not None and not work_queue.owns(task_name=task_name):
+                return False  # another process took over the session, so its file is the one to keep
+            move_file_atomically(
+                source_file_path=Path(staged_session_to_nwb_kwargs["output_dir_path"]) / nwbfile_name,
+                destination_file_path=Path(session_to_nwb_kwargs["output_dir_path"]) / nwbfile_name,
+            )
+    except KeyboardInterrupt:
+        status = None
+        if queue_dir_path is None or work_queue.owns(task_name=task_name):
+            raise
+        # Interrupted by the heartbeat thread because another process took over the session
+        return False
+    except MemoryError:
+        # Raised to the process pool, which lowers the number of workers and retries the session
+        status = None
+        raise
     except Exception as e:
+        status = "failed"
         with open(exception_file_path, mode="w") as f:
             f.write(f"session_to_nwb_kwargs: \n {pformat(session_to_nwb_kwargs)}\n\n")
             f.write(traceback.format_exc())
+    else:
+        exception_file_path.unlink(missing_ok=True)  # left by a previous run that failed, before it was resumed
+    finally:
+        if queue_dir_path is not None:
+            work_queue.release(task_name=task_name, status=status)
+    return True
 
 
 def get_session_to_nwb_kwargs_per_session(*, data_dir_path: DirectoryPath):
@@ -214,7 +684,16 @@ if __name__ == "__main__":
     data_dir_path = Path("Z:\\Users\\Grant\\New Project Data for Conversion")
     output_dir_path = Path("Z:\\Users\\Grant\\New Project Data for Conversion\\SavedOutput")
     max_workers = 16
-    if output_dir_path.exists():
+    checkpoint = True  # rerunning this script resumes the failed sessions and skips the completed ones
+    queue_dir_path = None  # set to a shared directory to run this script on several machines at once
+    scratch_dir_path = None  # set to a directory on a local disk to prefetch inputs from the network share
+    # Read from the YAML file set in the SCHNEIDER_LAB_TO_NWB_IO_ADMISSION_FILE environment variable, ex. "Z:\\": 4
+    max_readers_per_storage_root = load_max_readers_per_storage_root()
+    analysis_cache_dir_path = Path("Z:\\Users\\Grant\\New Project Data for Conversion\\AnalysisCache")
+    verify = True  # compare every NWB file with its source data once all sessions are converted
+    dry_run = False  # set to True to list the sessions and their metadata without converting them
+    # Checkpoint journals live next to the NWB files, so the output is only cleared when there is nothing to resume
+    if output_dir_path.exists() and queue_dir_path is None and not checkpoint and not dry_run:
         shutil.rmtree(
             output_dir_path, ignore_errors=True
         )  # ignore errors due to MacOS race condition (https://github.com/python/cpython/issues/81441)
@@ -223,5 +702,12 @@ if __name__ == "__main__":
         data_dir_path=data_dir_path,
         output_dir_path=output_dir_path,
         max_workers=max_workers,
+        checkpoint=checkpoint,
+        queue_dir_path=queue_dir_path,
+        scratch_dir_path=scratch_dir_path,
+        max_readers_per_storage_root=max_readers_per_storage_root,
+        analysis_cache_dir_path=analysis_cache_dir_path,
+        verify=verify,
+        dry_run=dry_run,
         verbose=False,
     )
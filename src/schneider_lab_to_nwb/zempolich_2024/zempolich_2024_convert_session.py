@@ -8,6 +8,7 @@ from pydantic import FilePath, DirectoryPath
 
 from neuroconv.utils import load_dict_from_file, dict_deep_update
 from schneider_lab_to_nwb.zempolich_2024 import Zempolich2024NWBConverter
+from schneider_lab_to_nwb.tools import get_buffer_gb
 
 
 def session_to_nwb(
@@ -19,8 +20,19 @@ def session_to_nwb(
     has_opto: bool = False,
     brain_region: Literal["A1", "M2"] = "A1",
     stub_test: bool = False,
+    preview_window: Optional[tuple[float, float]] = None,
+    checkpoint: bool = False,
+    memory_budget_gb: Optional[float] = None,
+    backend: Literal["hdf5", "zarr"] = "hdf5",
+    number_of_jobs: int = 1,
+    shared_images_dir_path: Optional[DirectoryPath] = None,
+    motion_energy: bool = False,
+    motion_energy_roi: Optional[tuple[int, int, int, int]] = None,
+    split_ecephys: bool = False,
+    narrow_dtypes: bool = False,
+    metadata_only: bool = False,
     verbose: bool = True,
-):
+) -> Optional[dict]:
     """Convert a session of data to NWB format.
 
     Parameters
@@ -41,8 +53,55 @@ def session_to_nwb(
         Brain region of interest, by default "A1".
     stub_test : bool, optional
         Whether to run in stub test mode, by default False.
+    preview_window : Optional[tuple[float, float]], optional
+        The (start, stop) in seconds of a window of the session to which every interface is restricted, for a quick
+        preview of the NWB file in a 'nwb_preview' subdirectory of output_dir_path, by default None (the whole
+        session). The recording, the spikes, the behavioral time series, the events and the motion energy are
+        restricted to the window, the trials and the optogenetic stimulation to those that overlap it. The videos are
+        still linked in full, with all their timestamps, and the images have no time.
+    checkpoint : bool, optional
+        Whether to write each interface in its own checkpointed step so that a failed conversion resumes on rerun,
+        by default False.
+    memory_budget_gb : Optional[float], optional
+        Maximum memory in GB that the conversion should use, which sizes the buffers of the recording, by default None
+        (default buffer sizes).
+    backend : Literal["hdf5", "zarr"], optional
+        The backend of the NWB file, by default "hdf5". Zarr files are written to a '.nwb.zarr' directory store.
+    number_of_jobs : int, optional
+        Number of processes that write the chunks of the recording in parallel with the Zarr backend, and that decode
+        each video to compute its motion energy, by default 1.
+    shared_images_dir_path : Optional[DirectoryPath], optional
+        Path to a directory where the intrinsic signal optical images of each subject are stored once, in a
+        'sub-<subject_id>_isoi-images.nwb' file to which the NWB files of its sessions link, by default None (the
+        images are stored in each NWB file). Only supported with the HDF5 backend. The images are external links
+        relative to the NWB file, so the directory must be moved or shared along with the NWB files.
+    motion_energy : bool, optional
+        Whether to decode each video to add the motion energy of every frame, on the aligned camera timestamps, by
+        default False.
+    motion_energy_roi : Optional[tuple[int, int, int, int]], optional
+        The (x, y, width, height) in pixels of a region of interest of the videos, whose motion energy is also added
+        when motion_energy is True, by default None.
+    split_ecephys : bool, optional
+        Whether to write the recording to a companion 'sub-<subject_id>_ses-<session_id>_desc-ecephys.nwb' file, with
+        its electrodes, so that the NWB file only holds the behavior, trials, units and metadata and links to the
+        recording by HDF5 external links, by default False. The NWB file is written first. Only supported with the
+        HDF5 backend.
+    narrow_dtypes : bool, optional
+        Whether to store the behavioral data in the narrowest dtype in which it round-trips exactly (ex. integer-valued
+        floats as small integers, float64 values that are exact in float32 as float32), by default False. Timestamps are
+        never narrowed. The narrowed dtypes depend on the values of each session, so the same dataset or column may get
+        different dtypes in different sessions (ex. in the partitions of the analysis cache).
+    metadata_only : bool, optional
+        Whether to only resolve the metadata and the path of the NWB file, from cheap sources (file names, the
+        editable metadata and file headers), without opening any data or writing anything, by default False.
     verbose : bool, optional
         Whether to print verbose output, by default True.
+
+    Returns
+    -------
+    Optional[dict]
+        With metadata_only=True, a dictionary with the 'nwbfile_path', the 'metadata' and the 'source_data' of the
+        session. Otherwise None.
     """
     behavior_file_path = Path(behavior_file_path)
     video_folder_path = Path(video_folder_path)
@@ -54,7 +113,10 @@ def session_to_nwb(
     video_file_paths = sorted(video_file_paths)
     if stub_test:
         output_dir_path = output_dir_path / "nwb_stub"
-    output_dir_path.mkdir(parents=True, exist_ok=True)
+    if preview_window is not None:
+        output_dir_path = output_dir_path / "nwb_preview"
+    if not metadata_only:
+        output_dir_path.mkdir(parents=True, exist_ok=True)
     if ephys_folder_path is None:
         has_ephys = False
     else:
@@ -70,35 +132,55 @@ def session_to_nwb(
         source_data.update(
             dict(Recording=dict(folder_path=ephys_folder_path, stream_name=stream_name, verbose=verbose))
         )
-        conversion_options.update(dict(Recording=dict(stub_test=stub_test, brain_region=brain_region)))
+        conversion_options.update(
+            dict(Recording=dict(stub_test=stub_test, brain_region=brain_region, preview_window=preview_window))
+        )
+        if memory_budget_gb is not None:
+            buffer_gb = get_buffer_gb(memory_budget_gb=memory_budget_gb, in_memory_file_paths=[behavior_file_path])
+            conversion_options["Recording"]["iterator_opts"] = dict(buffer_gb=buffer_gb)
 
         source_data.update(dict(Sorting=dict(folder_path=ephys_folder_path, verbose=verbose)))
         conversion_options.update(dict(Sorting=dict()))
 
     # Add Behavior
     source_data.update(dict(Behavior=dict(file_path=behavior_file_path)))
-    conversion_options.update(dict(Behavior=dict()))
+    conversion_options.update(
+        dict(Behavior=dict(narrow_dtypes=narrow_dtypes, preview_window=preview_window, verbose=verbose))
+    )
 
     # Add Video(s)
     for i, video_file_path in enumerate(video_file_paths):
         metadata_key_name = f"VideoCamera{i+1}"
         source_data.update({metadata_key_name: dict(file_paths=[video_file_path], metadata_key_name=metadata_key_name)})
         conversion_options.update({metadata_key_name: dict()})
+        if motion_energy:
+            motion_energy_key_name = f"MotionEnergyCamera{i+1}"
+            source_data[motion_energy_key_name] = dict(
+                file_path=video_file_path, metadata_key_name=motion_energy_key_name, roi=motion_energy_roi
+            )
+            conversion_options[motion_energy_key_name] = dict(
+                stub_test=stub_test, number_of_jobs=number_of_jobs, preview_window=preview_window
+            )
 
     # Add Optogenetic
     if has_opto:
         source_data.update(dict(Optogenetic=dict(file_path=behavior_file_path)))
-        conversion_options.update(dict(Optogenetic=dict(brain_region=brain_region, normalize_timestamps=True)))
+        conversion_options.update(
+            dict(Optogenetic=dict(brain_region=brain_region, normalize_timestamps=True, preview_window=preview_window))
+        )
         conversion_options["Behavior"]["normalize_timestamps"] = True
 
     # Add Intrinsic Signal Optical Imaging
     overlaid_image_path = intrinsic_signal_optical_imaging_folder_path / "Overlaid.jpg"
     target_image_path = intrinsic_signal_optical_imaging_folder_path / "Target.jpg"
     source_data.update(dict(ISOI=dict(overlaid_image_path=overlaid_image_path, target_image_path=target_image_path)))
-    conversion_options.update(dict(ISOI=dict()))
+    conversion_options.update(dict(ISOI=dict(backend=backend)))
 
     converter = Zempolich2024NWBConverter(source_data=source_data, verbose=verbose)
-    metadata = converter.get_metadata()
+    if metadata_only:
+        metadata = converter.get_session_metadata()
+    else:
+        metadata = converter.get_metadata()
 
     # Update default metadata with the editable in the corresponding yaml file
     editable_metadata_path = Path(__file__).parent / "zempolich_2024_metadata.yaml"
@@ -130,16 +212,32 @@ def session_to_nwb(
 
     subject_id = behavior_file_path.name.split("_")[1]
     session_id = behavior_file_path.name.split("_")[2]
-    nwbfile_path = output_dir_path / f"sub-{subject_id}_ses-{session_id}.nwb"
+    nwbfile_suffix = ".nwb.zarr" if backend == "zarr" else ".nwb"
+    nwbfile_path = output_dir_path / f"sub-{subject_id}_ses-{session_id}{nwbfile_suffix}"
     metadata["NWBFile"]["session_id"] = session_id
     metadata["Subject"]["subject_id"] = subject_id
+    if shared_images_dir_path is not None:
+        shared_images_file_path = Path(shared_images_dir_path) / f"sub-{subject_id}_isoi-images.nwb"
+        conversion_options["ISOI"]["shared_images_file_path"] = shared_images_file_path
 
     # Add subject info to metadata
     metadata["Subject"]["sex"] = metadata["SubjectMaps"]["subject_id_to_sex"][subject_id]
     metadata["Subject"]["genotype"] = metadata["SubjectMaps"]["subject_id_to_genotype"][subject_id]
 
+    if metadata_only:
+        return dict(nwbfile_path=nwbfile_path, metadata=metadata, source_data=source_data)
+
     # Run conversion
-    converter.run_conversion(metadata=metadata, nwbfile_path=nwbfile_path, conversion_options=conversion_options)
+    converter.run_conversion(
+        metadata=metadata,
+        nwbfile_path=nwbfile_path,
+        conversion_options=conversion_options,
+        checkpoint=checkpoint,
+        backend=backend,
+        number_of_jobs=number_of_jobs,
+        companion_interface_names=["Recording"] if split_ecephys and has_ephys else None,
+        preview_window=preview_window,
+    )
 
 
 def add_session_start_time_to_metadata(
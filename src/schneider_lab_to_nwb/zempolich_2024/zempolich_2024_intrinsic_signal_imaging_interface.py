@@ -1,4 +1,15 @@
 """Primary class for converting intrinsic signal optical imaging."""
+import os
+import warnings
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Literal, Optional
+from uuid import uuid4
+
+import h5py
+from hdmf.backends.hdf5 import H5DataIO
+from pynwb import NWBHDF5IO
 from pynwb.file import NWBFile
 from pynwb.base import Images
 from pynwb.image import RGBImage
@@ -6,11 +17,116 @@ from pynwb.device import Device
 from pydantic import FilePath
 import numpy as np
 from PIL import Image
-from pathlib import Path
 
 from neuroconv.basedatainterface import BaseDataInterface
 from neuroconv.tools import nwb_helpers
 
+# Decoded images of the most recent subjects, shared by the sessions converted in the same process
+SUBJECT_IMAGE_CACHE_SIZE = 4
+IMAGE_CHUNK_LENGTH = 256
+IMAGE_COMPRESSION_LEVEL = 4
+
+
+def read_subject_images(overlaid_image_path: FilePath, target_image_path: FilePath) -> tuple[np.ndarray, np.ndarray]:
+    """Decode the overlaid and the target images of a subject, through a cache shared by the sessions of the process.
+
+    Every session of a subject uses the same images, so they are decoded once per process (ex. per worker of
+    convert_all_sessions) rather than once per session. The cache is keyed on the modification time and the size of
+    the files, so that updated images are decoded again. The cached arrays are read-only.
+
+    Parameters
+    ----------
+    overlaid_image_path : FilePath
+        Path to the intrinsic signal optical imaging overlaid image file.
+    target_image_path : FilePath
+        Path to the intrinsic signal optical imaging target image file.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        The overlaid and the target images as arrays.
+    """
+    image_paths = (str(Path(overlaid_image_path).resolve()), str(Path(target_image_path).resolve()))
+    return _read_subject_images(image_paths=image_paths, file_stamps=_get_file_stamps(file_paths=image_paths))
+
+
+@lru_cache(maxsize=SUBJECT_IMAGE_CACHE_SIZE)
+def _read_subject_images(image_paths: tuple[str, str], file_stamps: tuple) -> tuple[np.ndarray, np.ndarray]:
+    image_arrays = []
+    for image_path in image_paths:
+        with Image.open(image_path) as image:
+            image_array = np.array(image)
+        image_array.setflags(write=False)
+        image_arrays.append(image_array)
+    return tuple(image_arrays)
+
+
+def _get_file_stamps(file_paths: tuple[str, ...]) -> tuple:
+    file_stats = [os.stat(file_path) for file_path in file_paths]
+    return tuple((file_stat.st_mtime_ns, file_stat.st_size) for file_stat in file_stats)
+
+
+def _get_image_chunk_shape(image_shape: tuple[int, ...]) -> tuple[int, ...]:
+    return tuple(min(axis_length, IMAGE_CHUNK_LENGTH) for axis_length in image_shape[:2]) + tuple(image_shape[2:])
+
+
+def write_shared_images_file(
+    file_path: FilePath,
+    images: Images,
+    module_metadata: dict,
+    source_file_paths: tuple[FilePath, ...],
+) -> Path:
+    """Write the images of a subject once to an NWB file that the NWB files of its sessions link to.
+
+    The file is only rewritten when a source image is newer than it, and it is written to a temporary file first and
+    moved into place, so that sessions of the same subject converted at the same time never link to a partial file.
+    An existing file that cannot be replaced because another conversion has it open (which Windows forbids) is reused
+    as is, and rewritten by a later session. Its session start time is the time at which the first source image was
+    last modified.
+
+    Parameters
+    ----------
+    file_path : FilePath
+        Path to the shared NWB file.
+    images : Images
+        The images of the subject.
+    module_metadata : dict
+        The name and the description of the processing module that holds the images.
+    source_file_paths : tuple[FilePath, ...]
+        Paths to the source files of the images.
+
+    Returns
+    -------
+    Path
+        The path to the shared NWB file.
+    """
+    file_path = Path(file_path)
+    source_file_mtimes = [os.stat(source_file_path).st_mtime for source_file_path in source_file_paths]
+    if file_path.exists() and os.stat(file_path).st_mtime >= max(source_file_mtimes):
+        return file_path
+
+    nwbfile = NWBFile(
+        session_description="Intrinsic signal optical images shared by the sessions of a subject.",
+        identifier=str(uuid4()),
+        session_start_time=datetime.fromtimestamp(min(source_file_mtimes), tz=timezone.utc),
+    )
+    module = nwb_helpers.get_module(
+        nwbfile=nwbfile, name=module_metadata["name"], description=module_metadata["description"]
+    )
+    module.add(images)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_file_path = file_path.with_name(f".{file_path.name}.{os.getpid()}.partial")
+    with NWBHDF5IO(temporary_file_path, mode="w") as io:
+        io.write(nwbfile)
+    try:
+        os.replace(temporary_file_path, file_path)
+    except PermissionError:
+        temporary_file_path.unlink()
+        if not file_path.exists():
+            raise
+        warnings.warn(f"{file_path} is open in another process, so it is reused without being rewritten.")
+    return file_path
+
 
 class Zempolich2024IntrinsicSignalOpticalImagingInterface(BaseDataInterface):
     """Intrinsic signal optical imaging interface for schneider_2024 conversion"""
@@ -28,6 +144,23 @@ class Zempolich2024IntrinsicSignalOpticalImagingInterface(BaseDataInterface):
             Path to the intrinsic signal optical imaging target image file.
         """
         super().__init__(overlaid_image_path=overlaid_image_path, target_image_path=target_image_path)
+        self._image_arrays = None
+        self._shared_images_file = None
+
+    def read_data(self) -> tuple[np.ndarray, np.ndarray]:
+        """Decode the overlaid and the target images, once per subject (see read_subject_images).
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            The overlaid and the target images as read-only arrays.
+        """
+        if self._image_arrays is None:
+            self._image_arrays = read_subject_images(
+                overlaid_image_path=self.source_data["overlaid_image_path"],
+                target_image_path=self.source_data["target_image_path"],
+            )
+        return self._image_arrays
 
     def get_metadata_schema(self) -> dict:
         metadata_schema = super().get_metadata_schema()
@@ -60,14 +193,33 @@ class Zempolich2024IntrinsicSignalOpticalImagingInterface(BaseDataInterface):
         }
         return metadata_schema
 
-    def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict):
+    def add_to_nwbfile(
+        self,
+        nwbfile: NWBFile,
+        metadata: dict,
+        backend: Literal["hdf5", "zarr"] = "hdf5",
+        shared_images_file_path: Optional[FilePath] = None,
+    ):
+        """Add the intrinsic signal optical images to the NWBFile.
+
+        Parameters
+        ----------
+        nwbfile : NWBFile
+            The NWBFile to which the images will be added.
+        metadata : dict
+            Metadata dictionary with the intrinsic signal optical imaging metadata.
+        backend : Literal["hdf5", "zarr"], optional
+            The backend of the NWB file, which sets how the images are chunked and compressed, by default "hdf5".
+        shared_images_file_path : Optional[FilePath], optional
+            Path to an NWB file in which the images of the subject are stored once, and to which the images of the
+            NWB file are external links, by default None (the images are stored in the NWB file). The file is written
+            if it does not exist or is out of date. Only supported with the HDF5 backend. The file stays open until
+            close() is called, once the NWB file has been written. The external links store the path of the file
+            relative to the NWB file, so the NWB files and the shared file must be moved or shared together, keeping
+            their relative location, or the images can no longer be read.
+        """
         # Read Data
-        overlaid_image_path = Path(self.source_data["overlaid_image_path"])
-        target_image_path = Path(self.source_data["target_image_path"])
-        with Image.open(overlaid_image_path) as image:
-            overlaid_image_array = np.array(image)
-        with Image.open(target_image_path) as image:
-            target_image_array = np.array(image)
+        overlaid_image_array, target_image_array = self.read_data()
 
         # Add Data to NWBFile
         isoi_metadata = metadata["IntrinsicSignalOpticalImaging"]
@@ -76,14 +228,66 @@ class Zempolich2024IntrinsicSignalOpticalImagingInterface(BaseDataInterface):
             name=isoi_metadata["Module"]["name"],
             description=isoi_metadata["Module"]["description"],
         )
+        if shared_images_file_path is not None:
+            if backend != "hdf5":
+                raise ValueError("Shared images files are only supported with the HDF5 backend.")
+            shared_images_file_path = write_shared_images_file(
+                file_path=shared_images_file_path,
+                images=self._get_images(
+                    isoi_metadata=isoi_metadata,
+                    overlaid_image_array=overlaid_image_array,
+                    target_image_array=target_image_array,
+                    backend=backend,
+                ),
+                module_metadata=isoi_metadata["Module"],
+                source_file_paths=(self.source_data["overlaid_image_path"], self.source_data["target_image_path"]),
+            )
+            # The file stays open until the NWB file is written, in which the images are external links to it
+            self.close()
+            self._shared_images_file = h5py.File(shared_images_file_path, mode="r")
+            shared_images_group = self._shared_images_file["processing"][isoi_metadata["Module"]["name"]]
+            shared_images_group = shared_images_group[isoi_metadata["Images"]["name"]]
+            images = self._get_images(
+                isoi_metadata=isoi_metadata,
+                overlaid_image_array=shared_images_group[isoi_metadata["OverlaidImage"]["name"]],
+                target_image_array=shared_images_group[isoi_metadata["TargetImage"]["name"]],
+                backend=backend,
+            )
+        else:
+            images = self._get_images(
+                isoi_metadata=isoi_metadata,
+                overlaid_image_array=overlaid_image_array,
+                target_image_array=target_image_array,
+                backend=backend,
+            )
+        isoi_module.add(images)
+
+        # Add Devices
+        for device_kwargs in isoi_metadata["Devices"]:
+            device = Device(**device_kwargs)
+            nwbfile.add_device(device)
+
+    def close(self):
+        """Close the shared images file opened by add_to_nwbfile(), once the NWB file that links to it is written."""
+        if self._shared_images_file is not None:
+            self._shared_images_file.close()
+            self._shared_images_file = None
+
+    def _get_images(
+        self,
+        isoi_metadata: dict,
+        overlaid_image_array: np.ndarray | h5py.Dataset,
+        target_image_array: np.ndarray | h5py.Dataset,
+        backend: Literal["hdf5", "zarr"],
+    ) -> Images:
         overlaid_image = RGBImage(
             name=isoi_metadata["OverlaidImage"]["name"],
-            data=overlaid_image_array,
+            data=self._get_compressed_data(image_array=overlaid_image_array, backend=backend),
             description=isoi_metadata["OverlaidImage"]["description"],
         )
         target_image = RGBImage(
             name=isoi_metadata["TargetImage"]["name"],
-            data=target_image_array,
+            data=self._get_compressed_data(image_array=target_image_array, backend=backend),
             description=isoi_metadata["TargetImage"]["description"],
         )
         images = Images(
@@ -91,9 +295,23 @@ class Zempolich2024IntrinsicSignalOpticalImagingInterface(BaseDataInterface):
             description=isoi_metadata["Images"]["description"],
             images=[overlaid_image, target_image],
         )
-        isoi_module.add(images)
+        return images
 
-        # Add Devices
-        for device_kwargs in isoi_metadata["Devices"]:
-            device = Device(**device_kwargs)
-            nwbfile.add_device(device)
+    @staticmethod
+    def _get_compressed_data(image_array: np.ndarray | h5py.Dataset, backend: Literal["hdf5", "zarr"]):
+        """Wrap an image for lossless, chunked compression, since the default backend configuration skips images."""
+        if isinstance(image_array, h5py.Dataset):
+            return H5DataIO(data=image_array, link_data=True)
+        chunk_shape = _get_image_chunk_shape(image_shape=image_array.shape)
+        if backend == "zarr":
+            from hdmf_zarr import ZarrDataIO
+            from numcodecs import GZip
+
+            return ZarrDataIO(data=image_array, chunks=chunk_shape, compressor=GZip(level=IMAGE_COMPRESSION_LEVEL))
+        return H5DataIO(
+            data=image_array,
+            chunks=chunk_shape,
+            compression="gzip",
+            compression_opts=IMAGE_COMPRESSION_LEVEL,
+            shuffle=True,
+        )
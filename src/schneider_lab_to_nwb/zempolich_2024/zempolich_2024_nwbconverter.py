@@ -1,11 +1,12 @@
 """Primary NWBConverter class for this dataset."""
-from pathlib import Path
-from pymatreader import read_mat
-from neuroconv import NWBConverter
+from typing import Optional
+from neuroconv.tools.nwb_helpers import get_default_nwbfile_metadata
+from neuroconv.utils import DeepDict
 from neuroconv.datainterfaces import (
     PhySortingInterface,
     VideoInterface,
 )
+from pynwb import NWBFile
 
 from schneider_lab_to_nwb.zempolich_2024 import (
     Zempolich2024OpenEphysRecordingInterface,
@@ -14,9 +15,24 @@ from schneider_lab_to_nwb.zempolich_2024 import (
     Zempolich2024IntrinsicSignalOpticalImagingInterface,
 )
 from schneider_lab_to_nwb.zempolich_2024.zempolich_2024_behaviorinterface import get_starting_timestamp
+from schneider_lab_to_nwb.zempolich_2024.zempolich_2024_open_ephys_recording_interface import (
+    get_session_start_time_from_header,
+)
+from schneider_lab_to_nwb.tools import (
+    add_sample_index_columns,
+    get_electrical_series_name,
+    LazyNWBConverter,
+    MotionEnergyInterface,
+    prefetch_data_interfaces,
+    restrict_sorting_interface,
+    run_checkpointed_conversion,
+    run_split_conversion,
+    run_zarr_conversion,
+    validate_video_timestamps,
+)
 
 
-class Zempolich2024NWBConverter(NWBConverter):
+class Zempolich2024NWBConverter(LazyNWBConverter):
     """Primary conversion class."""
 
     data_interface_classes = dict(
@@ -27,31 +43,167 @@ class Zempolich2024NWBConverter(NWBConverter):
         VideoCamera2=VideoInterface,
         Optogenetic=Zempolich2024OptogeneticInterface,
         ISOI=Zempolich2024IntrinsicSignalOpticalImagingInterface,
+        MotionEnergyCamera1=MotionEnergyInterface,
+        MotionEnergyCamera2=MotionEnergyInterface,
     )
 
-    def temporally_align_data_interfaces(self) -> None:
+    def get_session_metadata(self) -> DeepDict:
+        """Get the session-level metadata from cheap sources only, without initializing any data interface.
+
+        The session start time is read from the header of the recording, when there is one. The subject, the session
+        and the descriptions come from the file names and the editable metadata, as for a full conversion.
+        """
+        metadata = get_default_nwbfile_metadata()
+        if "Recording" in self.data_interface_objects:
+            folder_path = self.data_interface_objects.source_data["Recording"]["folder_path"]
+            session_start_time = get_session_start_time_from_header(folder_path=folder_path)
+            if session_start_time is not None:
+                metadata["NWBFile"]["session_start_time"] = session_start_time
+        return metadata
+
+    def temporally_align_data_interfaces(
+        self, metadata: dict | None = None, conversion_options: dict | None = None
+    ) -> None:
         """Align timestamps between data interfaces.
 
         It is called by run_conversion() after the data interfaces have been initialized but before the data is added
         to the NWB file.
         In its current implementation, this method aligns timestamps between the behavior and video data interfaces.
+        It first reads the behavior file and decodes the images at the same time, and shares the parsed behavior file
+        with the optogenetic interface, which reads the same file.
+        The frame counts of the videos are then checked against their aligned timestamps, from the video headers.
+        For a preview, the sorting is finally restricted to the preview window. The recording is restricted when it is
+        added, once its times start at 0.
         """
         behavior_interface = self.data_interface_objects["Behavior"]
-        behavior_file_path = Path(behavior_interface.source_data["file_path"])
-        file = read_mat(behavior_file_path)
+        prefetch_data_interfaces(
+            data_interfaces=[
+                data_interface for name, data_interface in self.data_interface_objects.items() if name != "Optogenetic"
+            ]
+        )
+        file = behavior_interface.read_data()
+        if "Optogenetic" in self.data_interface_objects:
+            self.data_interface_objects["Optogenetic"].set_mat_file(
+                mat_file=file, file_path=behavior_interface.source_data["file_path"]
+            )
         cam1_timestamps, cam2_timestamps = file["continuous"]["cam"]["time"]
         if self.conversion_options["Behavior"].get("normalize_timestamps", False):
+            # Not in place, since the parsed file is shared with the behavior interface
             starting_timestamp = get_starting_timestamp(mat_file=file)
-            cam1_timestamps -= starting_timestamp
-            cam2_timestamps -= starting_timestamp
-        if "VideoCamera1" in self.data_interface_objects:
-            self.data_interface_objects["VideoCamera1"].set_aligned_timestamps([cam1_timestamps])
-        if "VideoCamera2" in self.data_interface_objects:
-            self.data_interface_objects["VideoCamera2"].set_aligned_timestamps([cam2_timestamps])
+            cam1_timestamps = cam1_timestamps - starting_timestamp
+            cam2_timestamps = cam2_timestamps - starting_timestamp
+        file_path_to_timestamps = dict()
+        for name, timestamps in zip(("MotionEnergyCamera1", "MotionEnergyCamera2"), (cam1_timestamps, cam2_timestamps)):
+            if name in self.data_interface_objects:
+                self.data_interface_objects[name].set_aligned_timestamps(timestamps)
+        for name, timestamps in zip(("VideoCamera1", "VideoCamera2"), (cam1_timestamps, cam2_timestamps)):
+            if name in self.data_interface_objects:
+                self.data_interface_objects[name].set_aligned_timestamps([timestamps])
+                (file_path,) = self.data_interface_objects.source_data[name]["file_paths"]
+                file_path_to_timestamps[file_path] = timestamps
+        validate_video_timestamps(file_path_to_timestamps=file_path_to_timestamps)
+        if self.preview_window is not None and "Sorting" in self.data_interface_objects:
+            restrict_sorting_interface(
+                sorting_interface=self.data_interface_objects["Sorting"], preview_window=self.preview_window
+            )
+
+    def add_to_nwbfile(self, nwbfile: NWBFile, metadata: dict, conversion_options: Optional[dict] = None):
+        """Add the data of all the data interfaces to the NWBFile, then the sample-index columns of its tables."""
+        super().add_to_nwbfile(nwbfile=nwbfile, metadata=metadata, conversion_options=conversion_options)
+        self.add_sample_index_columns(nwbfile=nwbfile, metadata=metadata)
+
+    def add_sample_index_columns(self, nwbfile: NWBFile, metadata: dict, time_series_nwbfile: Optional[NWBFile] = None):
+        """Add the sample indices of the start and stop times of the trials into the recording to the trials table.
+
+        It is called by add_to_nwbfile() once every data interface has been added, and by the split conversion once
+        both NWBFiles are built, so that the rows can be sliced from the large streams without searching their
+        timestamps.
+
+        Parameters
+        ----------
+        nwbfile : NWBFile
+            The NWBFile with the tables.
+        metadata : dict
+            Metadata dictionary with information used to create the NWBFile.
+        time_series_nwbfile : NWBFile, optional
+            The NWBFile with the series, by default None (the same NWBFile).
+        """
+        time_series_nwbfile = time_series_nwbfile or nwbfile
+        if nwbfile.trials is None or "Ecephys" not in metadata:
+            return
+        electrical_series_name = get_electrical_series_name(metadata=metadata)
+        if electrical_series_name in time_series_nwbfile.acquisition:
+            add_sample_index_columns(
+                table=nwbfile.trials,
+                time_series=time_series_nwbfile.acquisition[electrical_series_name],
+                time_column_names=["start_time", "stop_time"],
+            )
 
     # NOTE: passing in conversion_options as an attribute is a temporary solution until the neuroconv library is updated
     #  to allow for easier customization of the conversion process
     # (see https://github.com/catalystneuro/neuroconv/pull/1162).
-    def run_conversion(self, **kwargs):
+    def run_conversion(
+        self,
+        checkpoint: bool = False,
+        number_of_jobs: int = 1,
+        companion_interface_names: Optional[list[str]] = None,
+        preview_window: Optional[tuple[float, float]] = None,
+        **kwargs,
+    ):
+        """Run the NWB conversion over all the instantiated data interfaces.
+
+        Parameters
+        ----------
+        checkpoint : bool, optional
+            Whether to write each interface to the NWB file in its own append step and record it in a completion
+            journal, so that a rerun after a failure skips the interfaces that were already written, by default False.
+            Only supported with the HDF5 backend.
+        number_of_jobs : int, optional
+            Number of processes that write the chunks of the large datasets in parallel when backend="zarr",
+            by default 1.
+        companion_interface_names : list[str], optional
+            The names of the interfaces to write to a companion '<name>_desc-ecephys.nwb' file, linked from the NWB
+            file by HDF5 external links, by default None (a single file). Only supported with the HDF5 backend,
+            without checkpointing.
+        preview_window : tuple[float, float], optional
+            The (start, stop) in seconds of the window of the session to which the sorting is restricted once aligned,
+            by default None (the whole session). The other interfaces are restricted through their 'preview_window'
+            conversion option.
+        **kwargs
+            Keyword arguments passed to NWBConverter.run_conversion().
+        """
         self.conversion_options = kwargs["conversion_options"]
-        super().run_conversion(**kwargs)
+        self.preview_window = preview_window
+        try:
+            if companion_interface_names is not None:
+                if kwargs.get("backend") == "zarr" or checkpoint:
+                    raise ValueError("Companion files are only supported with the HDF5 backend, without checkpointing.")
+                run_split_conversion(
+                    converter=self,
+                    nwbfile_path=kwargs["nwbfile_path"],
+                    metadata=kwargs["metadata"],
+                    companion_interface_names=companion_interface_names,
+                    conversion_options=kwargs["conversion_options"],
+                )
+            elif kwargs.get("backend") == "zarr":
+                if checkpoint:
+                    raise ValueError("Checkpointing is only supported with the HDF5 backend.")
+                run_zarr_conversion(
+                    converter=self,
+                    nwbfile_path=kwargs["nwbfile_path"],
+                    metadata=kwargs["metadata"],
+                    conversion_options=kwargs["conversion_options"],
+                    number_of_jobs=number_of_jobs,
+                )
+            elif checkpoint:
+                run_checkpointed_conversion(
+                    converter=self,
+                    nwbfile_path=kwargs["nwbfile_path"],
+                    metadata=kwargs["metadata"],
+                    conversion_options=kwargs["conversion_options"],
+                )
+            else:
+                super().run_conversion(**kwargs)
+        finally:
+            if "ISOI" in self.data_interface_objects and self.data_interface_objects.is_initialized(name="ISOI"):
+                self.data_interface_objects["ISOI"].close()  # the NWB file that links to the shared images is written
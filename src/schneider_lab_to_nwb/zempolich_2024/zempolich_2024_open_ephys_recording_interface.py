@@ -1,16 +1,25 @@
 """Primary class for converting OpenEphys Recordings."""
+import re
+from datetime import datetime
+from pathlib import Path
 from pynwb.file import NWBFile
 import numpy as np
-from typing import Literal
+from typing import Literal, Optional
+from pydantic import DirectoryPath
 
 from neuroconv.datainterfaces import OpenEphysLegacyRecordingInterface
-from spikeinterface.extractors import OpenEphysLegacyRecordingExtractor
+
+from schneider_lab_to_nwb.tools import (
+    add_electrodes_in_bulk,
+    admit_new_data_chunk_iterators,
+    restrict_recording_interface,
+)
 
 
 class Zempolich2024OpenEphysRecordingInterface(OpenEphysLegacyRecordingInterface):
     """OpenEphys RecordingInterface for zempolich_2024 conversion."""
 
-    Extractor = OpenEphysLegacyRecordingExtractor
+    ExtractorName = "OpenEphysLegacyRecordingExtractor"  # imported on first use, not with this module
 
     def get_metadata(self) -> dict:
         metadata = super().get_metadata()
@@ -18,7 +27,12 @@ class Zempolich2024OpenEphysRecordingInterface(OpenEphysLegacyRecordingInterface
         return metadata
 
     def add_to_nwbfile(
-        self, nwbfile: NWBFile, metadata: dict, brain_region: Literal["A1", "M2"] = "A1", **conversion_options
+        self,
+        nwbfile: NWBFile,
+        metadata: dict,
+        brain_region: Literal["A1", "M2"] = "A1",
+        preview_window: Optional[tuple[float, float]] = None,
+        **conversion_options,
     ):
         """Add the recording to an NWBFile.
 
@@ -30,6 +44,9 @@ class Zempolich2024OpenEphysRecordingInterface(OpenEphysLegacyRecordingInterface
             Metadata dictionary with information used to create the NWBFile.
         brain_region : Literal["A1", "M2"], optional
             The brain region from which the recording was taken, by default "A1".
+        preview_window : tuple[float, float], optional
+            The (start, stop) in seconds of the window of the session to which the recording is restricted, by default
+            None (the whole recording).
         """
         folder_path = self.source_data["folder_path"]
         channel_positions = np.load(folder_path / "channel_positions.npy")
@@ -42,5 +59,41 @@ class Zempolich2024OpenEphysRecordingInterface(OpenEphysLegacyRecordingInterface
         self.recording_extractor.set_channel_locations(channel_ids=channel_ids, locations=channel_positions)
         self.recording_extractor.set_property(key="brain_area", ids=channel_ids, values=[location] * len(channel_ids))
         self.recording_extractor._recording_segments[0].t_start = 0.0
+        if preview_window is not None:
+            restrict_recording_interface(recording_interface=self, preview_window=preview_window)
 
+        add_electrodes_in_bulk(recording=self.recording_extractor, nwbfile=nwbfile, metadata=metadata)
+        object_ids_before = {neurodata_object.object_id for neurodata_object in nwbfile.all_children()}
         super().add_to_nwbfile(nwbfile=nwbfile, metadata=metadata, **conversion_options)
+        admit_new_data_chunk_iterators(nwbfile=nwbfile, object_ids_before=object_ids_before, path=folder_path)
+
+
+def get_session_start_time_from_header(folder_path: DirectoryPath) -> Optional[datetime]:
+    """Get the session start time from the text header of the first '.continuous' file, without reading any data.
+
+    This is the 'date_created' field that OpenEphysLegacyRecordingInterface.get_metadata() uses, parsed the same way,
+    but read from the first 1024 bytes of a single file instead of through the extractor, which scans every file.
+
+    Parameters
+    ----------
+    folder_path : DirectoryPath
+        Path to the OpenEphys legacy folder.
+
+    Returns
+    -------
+    Optional[datetime]
+        The session start time, or None if there is no '.continuous' file or no 'date_created' field.
+    """
+    continuous_file_paths = sorted(Path(folder_path).glob("*.continuous"))
+    if len(continuous_file_paths) == 0:
+        return None
+    with open(continuous_file_paths[0], mode="rb") as f:
+        header = f.read(1024).decode("latin-1")
+    match = re.search(r"header\.date_created = '([^']*)'", header)
+    if match is None:
+        return None
+    date_created = match.group(1)
+    extracted_date, extracted_timestamp = date_created.split(" ")
+    if len(extracted_timestamp) != len("%H%M%S"):  # ambiguous timestamp, so only the date is used
+        return datetime.strptime(extracted_date, "%d-%b-%Y")
+    return datetime.strptime(date_created, "%d-%b-%Y %H%M%S")
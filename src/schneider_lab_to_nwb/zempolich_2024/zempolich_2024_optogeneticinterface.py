@@ -1,7 +1,8 @@
 """Primary class for converting optogenetic stimulation."""
+from pathlib import Path
 from pynwb.file import NWBFile
 from pydantic import FilePath
-from typing import Literal
+from typing import Literal, Optional
 import numpy as np
 from pymatreader import read_mat
 from pynwb.device import Device
@@ -9,6 +10,8 @@ from pynwb.ogen import OptogeneticSeries, OptogeneticStimulusSite
 
 from neuroconv.basedatainterface import BaseDataInterface
 
+from schneider_lab_to_nwb.tools import get_window_overlap_mask
+
 from .zempolich_2024_behaviorinterface import get_starting_timestamp
 
 
@@ -26,6 +29,28 @@ class Zempolich2024OptogeneticInterface(BaseDataInterface):
             Path to the .mat file containing the optogenetic stimulation data.
         """
         super().__init__(file_path=file_path)
+        self._mat_file = None
+
+    def read_data(self) -> dict:
+        """Read the .mat file, once. The returned dictionary is shared, so it must not be modified in place."""
+        if self._mat_file is None:
+            self._mat_file = read_mat(self.source_data["file_path"])
+        return self._mat_file
+
+    def set_mat_file(self, mat_file: dict, file_path: FilePath):
+        """Use the contents of the .mat file that were already read (ex. by the behavior interface) instead of reading
+        the file again.
+
+        Parameters
+        ----------
+        mat_file : dict
+            The contents of the .mat file at file_path, as returned by read_mat().
+        file_path : FilePath
+            Path to the .mat file that was read. The contents are only used if it is the file of this interface.
+        """
+        if Path(file_path).resolve() != Path(self.source_data["file_path"]).resolve():
+            return
+        self._mat_file = mat_file
 
     def add_to_nwbfile(
         self,
@@ -33,6 +58,7 @@ class Zempolich2024OptogeneticInterface(BaseDataInterface):
         metadata: dict,
         brain_region: Literal["A1", "M2"] = "A1",
         normalize_timestamps: bool = False,
+        preview_window: Optional[tuple[float, float]] = None,
     ):
         """Add optogenetic stimulation data to the NWBFile.
 
@@ -46,10 +72,12 @@ class Zempolich2024OptogeneticInterface(BaseDataInterface):
             Brain region for which the optogenetic stimulation data will be added, by default "A1".
         normalize_timestamps : bool, optional
             Whether to normalize the timestamps to the start of the first behavioral time series, by default False
+        preview_window : tuple[float, float], optional
+            The (start, stop) in seconds of the window of the session to which the stimulation is restricted: the
+            stimulation intervals that overlap it, by default None (the whole session).
         """
         # Read Data
-        file_path = self.source_data["file_path"]
-        file = read_mat(file_path)
+        file = self.read_data()
         onset_times = file["events"]["push"]["opto_time"]
         is_opto_trial = np.logical_not(np.isnan(onset_times))
         onset_times = onset_times[is_opto_trial]
@@ -63,6 +91,11 @@ class Zempolich2024OptogeneticInterface(BaseDataInterface):
         if normalize_timestamps:
             onset_times = onset_times - starting_timestamp
             offset_times = offset_times - starting_timestamp
+        if preview_window is not None:
+            is_in_window = get_window_overlap_mask(
+                start_times=onset_times, stop_times=offset_times, preview_window=preview_window
+            )
+            onset_times, offset_times = onset_times[is_in_window], offset_times[is_in_window]
 
         timestamps, data = [], []
         for onset_time, offset_time in zip(onset_times, offset_times):
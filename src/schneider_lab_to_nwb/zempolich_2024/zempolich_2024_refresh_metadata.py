@@ -0,0 +1,212 @@
+"""Primary script to run to update the metadata of the converted sessions in place, without reconverting their data."""
+from pathlib import Path
+from typing import Optional
+
+from pydantic import DirectoryPath
+
+from schneider_lab_to_nwb.tools import get_companion_nwbfile_path, refresh_nwbfiles_metadata
+from schneider_lab_to_nwb.zempolich_2024.zempolich_2024_convert_all_sessions import (
+    get_session_to_nwb_kwargs_per_session,
+)
+from schneider_lab_to_nwb.zempolich_2024.zempolich_2024_convert_session import session_to_nwb
+
+
+def refresh_dataset_metadata(
+    *,
+    data_dir_path: DirectoryPath,
+    output_dir_path: DirectoryPath,
+    shared_images_dir_path: Optional[DirectoryPath] = None,
+    max_workers: int = 1,
+    dry_run: bool = False,
+    verbose: bool = True,
+) -> dict[Path, list[dict]]:
+    """Update the descriptions and other text metadata of every converted session from zempolich_2024_metadata.yaml.
+
+    The metadata of each session is resolved as in session_to_nwb() (with metadata_only=True, so no data is opened),
+    and only the attributes, text datasets and table cells whose value changed are patched in the existing NWB files,
+    along with their '_desc-ecephys' companion files and the shared intrinsic signal images files, if any. Timestamps,
+    data and table rows are never modified: a change to anything else (ex. the session start time or the electrode
+    locations) still requires a reconversion. Only HDF5 files are supported.
+
+    Parameters
+    ----------
+    data_dir_path : DirectoryPath
+        The path to the directory containing the raw data.
+    output_dir_path : DirectoryPath
+        The path to the directory where the NWB files are saved.
+    shared_images_dir_path : DirectoryPath, optional
+        The path to the directory of the shared intrinsic signal images files, if the sessions were converted with
+        one, by default None.
+    max_workers : int, optional
+        The maximum number of files patched at the same time, by default 1.
+    dry_run : bool, optional
+        Whether to only list the changes, without writing them, by default False.
+    verbose : bool, optional
+        Whether to print the changes, by default True.
+
+    Returns
+    -------
+    dict[Path, list[dict]]
+        The changes of each NWB file, as returned by refresh_nwbfile_metadata().
+    """
+    nwbfile_path_to_updates = dict()
+    for session_to_nwb_kwargs in get_session_to_nwb_kwargs_per_session(data_dir_path=Path(data_dir_path)):
+        session = session_to_nwb(
+            **session_to_nwb_kwargs, output_dir_path=output_dir_path, metadata_only=True, verbose=False
+        )
+        nwbfile_path = session["nwbfile_path"]
+        if not nwbfile_path.exists():
+            continue
+        updates = get_metadata_updates(metadata=session["metadata"])
+        nwbfile_path_to_updates[nwbfile_path] = updates
+        companion_nwbfile_path = get_companion_nwbfile_path(nwbfile_path=nwbfile_path)
+        if companion_nwbfile_path.exists():
+            nwbfile_path_to_updates[companion_nwbfile_path] = updates
+        if shared_images_dir_path is not None:
+            subject_id = session["metadata"]["Subject"]["subject_id"]
+            shared_images_file_path = Path(shared_images_dir_path) / f"sub-{subject_id}_isoi-images.nwb"
+            if shared_images_file_path.exists():
+                nwbfile_path_to_updates[shared_images_file_path] = get_isoi_metadata_updates(
+                    metadata=session["metadata"]
+                )
+    return refresh_nwbfiles_metadata(
+        nwbfile_path_to_updates=nwbfile_path_to_updates, max_workers=max_workers, dry_run=dry_run, verbose=verbose
+    )
+
+
+def get_metadata_updates(metadata: dict) -> list[dict]:
+    """Get the updates of the text metadata of an NWB file of the session, for refresh_nwbfile_metadata().
+
+    Parameters
+    ----------
+    metadata : dict
+        The metadata of the session, as resolved by session_to_nwb().
+
+    Returns
+    -------
+    list[dict]
+        The updates of the file-level metadata, the subject, the devices and the descriptions of the ecephys, behavior,
+        video, sorting, optogenetic and intrinsic signal imaging objects.
+    """
+    nwbfile_metadata = metadata["NWBFile"]
+    updates = [dict(path="session_description", value=nwbfile_metadata["session_description"])]
+    for name in ("experiment_description", "institution", "lab", "keywords", "experimenter"):
+        if name in nwbfile_metadata:
+            value = nwbfile_metadata[name]
+            updates.append(dict(path=f"general/{name}", value=list(value) if isinstance(value, list) else value))
+    for name in ("species", "age", "description", "strain", "sex", "genotype"):
+        if name in metadata["Subject"]:
+            updates.append(dict(path=f"general/subject/{name}", value=metadata["Subject"][name]))
+
+    # Ecephys
+    ecephys_metadata = metadata.get("Ecephys", dict())
+    updates.extend(_get_device_updates(device_metadata_list=ecephys_metadata.get("Device", [])))
+    for electrode_group_metadata in ecephys_metadata.get("ElectrodeGroup", []):
+        path = f"general/extracellular_ephys/{electrode_group_metadata['name']}"
+        updates.append(dict(path=path, attribute="description", value=electrode_group_metadata["description"]))
+    for electrical_series_metadata in ecephys_metadata.get("ElectricalSeries", []):
+        path = f"acquisition/{electrical_series_metadata['name']}"
+        updates.append(dict(path=path, attribute="description", value=electrical_series_metadata["description"]))
+    if "Sorting" in metadata:
+        updates.append(dict(path="units", attribute="description", value=metadata["Sorting"]["units_description"]))
+
+    # Behavior
+    behavior_metadata = metadata["Behavior"]
+    module_path = f"processing/{behavior_metadata['Module']['name']}"
+    updates.append(dict(path=module_path, attribute="description", value=behavior_metadata["Module"]["description"]))
+    for time_series_metadata in behavior_metadata["TimeSeries"]:
+        path = f"{module_path}/behavioral_time_series/{time_series_metadata['name']}"
+        updates.append(dict(path=path, attribute="description", value=time_series_metadata["description"]))
+    for event_metadata in behavior_metadata["Events"]:
+        path = f"{module_path}/{event_metadata['name']}"
+        updates.append(dict(path=path, attribute="description", value=event_metadata["description"]))
+    for event_metadata in behavior_metadata["ValuedEvents"]:
+        updates.append(
+            dict(
+                path=f"{module_path}/valued_events_table",
+                column="event_description",
+                row_key=("label", event_metadata["name"]),
+                value=event_metadata["description"],
+            )
+        )
+    for trials_metadata in behavior_metadata["Trials"]:
+        path = f"intervals/trials/{trials_metadata['name']}"
+        updates.append(dict(path=path, attribute="description", value=trials_metadata["description"]))
+    updates.extend(_get_device_updates(device_metadata_list=behavior_metadata["Devices"]))
+    for metadata_key_name in ("VideoCamera1", "VideoCamera2"):
+        for video_metadata in behavior_metadata.get(metadata_key_name, []):
+            path = f"acquisition/{video_metadata['name']}"
+            updates.append(dict(path=path, attribute="description", value=video_metadata["description"]))
+
+    # Optogenetics
+    optogenetics_metadata = metadata["Optogenetics"]
+    updates.extend(_get_device_updates(device_metadata_list=[optogenetics_metadata["Device"]]))
+    site_metadata = optogenetics_metadata["OptogeneticStimulusSite"]
+    # The description of an OptogeneticStimulusSite is a dataset, unlike that of most neurodata types
+    updates.append(
+        dict(path=f"general/optogenetics/{site_metadata['name']}/description", value=site_metadata["description"])
+    )
+    series_metadata = optogenetics_metadata["OptogeneticSeries"]
+    updates.append(
+        dict(
+            path=f"stimulus/presentation/{series_metadata['name']}",
+            attribute="description",
+            value=series_metadata["description"],
+        )
+    )
+
+    updates.extend(get_isoi_metadata_updates(metadata=metadata))
+    updates.extend(_get_device_updates(device_metadata_list=metadata["IntrinsicSignalOpticalImaging"]["Devices"]))
+    return updates
+
+
+def get_isoi_metadata_updates(metadata: dict) -> list[dict]:
+    """Get the updates of the descriptions of the intrinsic signal optical imaging module and images.
+
+    Parameters
+    ----------
+    metadata : dict
+        The metadata of the session, as resolved by session_to_nwb().
+
+    Returns
+    -------
+    list[dict]
+        The updates, for refresh_nwbfile_metadata().
+    """
+    isoi_metadata = metadata["IntrinsicSignalOpticalImaging"]
+    module_path = f"processing/{isoi_metadata['Module']['name']}"
+    images_path = f"{module_path}/{isoi_metadata['Images']['name']}"
+    updates = [
+        dict(path=module_path, attribute="description", value=isoi_metadata["Module"]["description"]),
+        dict(path=images_path, attribute="description", value=isoi_metadata["Images"]["description"]),
+    ]
+    for image_key in ("OverlaidImage", "TargetImage"):
+        path = f"{images_path}/{isoi_metadata[image_key]['name']}"
+        updates.append(dict(path=path, attribute="description", value=isoi_metadata[image_key]["description"]))
+    return updates
+
+
+def _get_device_updates(device_metadata_list: list[dict]) -> list[dict]:
+    updates = []
+    for device_metadata in device_metadata_list:
+        for field in ("description", "manufacturer"):
+            if field in device_metadata:
+                path = f"general/devices/{device_metadata['name']}"
+                updates.append(dict(path=path, attribute=field, value=device_metadata[field]))
+    return updates
+
+
+if __name__ == "__main__":
+
+    # Parameters for the metadata refresh
+    data_dir_path = Path("Z:\\Users\\Grant\\New Project Data for Conversion")
+    output_dir_path = Path("Z:\\Users\\Grant\\New Project Data for Conversion\\SavedOutput")
+    max_workers = 16
+    dry_run = True  # set to False to write the changes listed by a dry run
+
+    refresh_dataset_metadata(
+        data_dir_path=data_dir_path,
+        output_dir_path=output_dir_path,
+        max_workers=max_workers,
+        dry_run=dry_run,
+    )
@@ -0,0 +1,252 @@
+"""Generate a synthetic session of the Zempolich 2024 dataset, laid out as on the lab share, for benchmarks."""
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from pydantic import DirectoryPath
+
+from schneider_lab_to_nwb.tools import (
+    generate_spike_trains,
+    generate_traces,
+    write_image,
+    write_mat_file,
+    write_open_ephys_legacy_folder,
+    write_phy_folder,
+    write_video,
+)
+
+
+def generate_synthetic_session(
+    *,
+    data_dir_path: DirectoryPath,
+    duration: float = 60.0,
+    has_ephys: bool = True,
+    brain_region: str = "A1",
+    num_channels: int = 128,
+    num_units: int = 32,
+    sampling_frequency: float = 30_000.0,
+    behavior_sampling_frequency: float = 2_000.0,
+    video_frame_rate: float = 30.0,
+    frame_shape: tuple[int, int] = (120, 160),
+    image_shape: tuple[int, int] = (512, 512),
+    seed: int = 0,
+) -> dict:
+    """Generate the raw data of a session of subject m53 on 2023-10-29 in data_dir_path, in the layout of the dataset.
+
+    The session has a behavior .mat file (with the encoder, lick and camera times, the tone, target and valve events, the
+    tuning tones and the push trials), two videos whose frame counts match the camera times, the intrinsic signal
+    optical imaging images and, for an ephys session, a legacy OpenEphys folder with the channel positions and a Phy
+    sorting. Sessions without ephys are optogenetics sessions, with stimulation on some of the trials. All the times of
+    the behavior file are on the clock of the recording.
+
+    Parameters
+    ----------
+    data_dir_path : DirectoryPath
+        The path to the directory of the synthetic dataset, laid out as the one read by dataset_to_nwb().
+    duration : float, optional
+        The duration of the session, in seconds, by default 60.0.
+    has_ephys : bool, optional
+        Whether to generate an ephys session rather than an optogenetics session, by default True.
+    brain_region : str, optional
+        The brain region of the session, "A1" or "M2", by default "A1".
+    num_channels : int, optional
+        The number of channels of the recording, by default 128 (as the Masmanidis probes).
+    num_units : int, optional
+        The number of units of the sorting, by default 32.
+    sampling_frequency : float, optional
+        The sampling frequency of the recording, in Hz, by default 30_000.0.
+    behavior_sampling_frequency : float, optional
+        The sampling frequency of the encoder and the lickometer, in Hz, by default 2_000.0.
+    video_frame_rate : float, optional
+        The frame rate of the cameras, in Hz, by default 30.0.
+    frame_shape : tuple[int, int], optional
+        The (height, width) of the frames of the videos, in pixels, by default (120, 160).
+    image_shape : tuple[int, int], optional
+        The (height, width) of the intrinsic signal optical imaging images, in pixels, by default (512, 512).
+    seed : int, optional
+        The seed of the random generators, by default 0.
+
+    Returns
+    -------
+    dict
+        The kwargs of session_to_nwb() for the session, except output_dir_path, as get_session_to_nwb_kwargs_per_session()
+        returns them.
+    """
+    data_dir_path = Path(data_dir_path)
+    subject_id, date = "m53", "231029"
+    session_start_time = datetime(2023, 10, 29, 16, 56, 1)
+    session_type = "Ephys" if has_ephys else "Opto"
+    behavior_file_path = (
+        data_dir_path / f"{brain_region}_{session_type}BehavioralFiles" / f"raw_{subject_id}_{date}_001.mat"
+    )
+    video_folder_path = data_dir_path / "Videos" / f"{brain_region}{session_type}Videos" / subject_id / date
+    intrinsic_signal_optical_imaging_folder_path = data_dir_path / "Intrinsic Imaging Data" / subject_id
+
+    behavior = get_synthetic_behavior(
+        duration=duration,
+        has_opto=not has_ephys,
+        behavior_sampling_frequency=behavior_sampling_frequency,
+        video_frame_rate=video_frame_rate,
+        seed=seed,
+    )
+    write_mat_file(file_path=behavior_file_path, variables=behavior)
+    for camera_index, camera_timestamps in enumerate(behavior["continuous"]["cam"]["time"]):
+        write_video(
+            file_path=video_folder_path / f"{subject_id}_{date}_cam{camera_index + 1}.mp4",
+            num_frames=len(camera_timestamps),
+            frame_rate=video_frame_rate,
+            frame_shape=frame_shape,
+            seed=seed + camera_index,
+        )
+    for image_index, image_name in enumerate(("Overlaid.jpg", "Target.jpg")):
+        write_image(
+            file_path=intrinsic_signal_optical_imaging_folder_path / image_name,
+            image_shape=image_shape,
+            seed=seed + image_index,
+        )
+    session_to_nwb_kwargs = dict(
+        behavior_file_path=behavior_file_path,
+        brain_region=brain_region,
+        intrinsic_signal_optical_imaging_folder_path=intrinsic_signal_optical_imaging_folder_path,
+        video_folder_path=video_folder_path,
+    )
+    if not has_ephys:
+        session_to_nwb_kwargs["has_opto"] = True
+        return session_to_nwb_kwargs
+
+    ephys_folder_path = data_dir_path / f"{brain_region}_EphysFiles" / subject_id / f"Day1_{brain_region}"
+    num_samples = int(duration * sampling_frequency)
+    spike_samples, spike_units = generate_spike_trains(
+        num_samples=num_samples, num_units=num_units, sampling_frequency=sampling_frequency, seed=seed
+    )
+    traces = generate_traces(
+        num_samples=num_samples,
+        num_channels=num_channels,
+        spike_samples=spike_samples,
+        spike_units=spike_units,
+        seed=seed,
+    )
+    write_open_ephys_legacy_folder(
+        folder_path=ephys_folder_path,
+        traces=traces,
+        num_channels=num_channels,
+        sampling_frequency=sampling_frequency,
+        session_start_time=session_start_time,
+    )
+    write_phy_folder(
+        folder_path=ephys_folder_path,
+        spike_samples=spike_samples,
+        spike_units=spike_units,
+        sampling_frequency=sampling_frequency,
+        num_channels=num_channels,
+        seed=seed,
+    )
+    # 4 shanks 200 um apart, with 2 staggered columns of electrodes 20 um apart on each
+    channel_indices = np.arange(num_channels)
+    shank_indices, electrode_indices = np.divmod(channel_indices, int(np.ceil(num_channels / 4)))
+    channel_positions = np.stack(
+        [200.0 * shank_indices + 20.0 * (electrode_indices % 2), 20.0 * (electrode_indices // 2)], axis=1
+    )
+    np.save(ephys_folder_path / "channel_positions.npy", channel_positions.astype("float32"))
+    session_to_nwb_kwargs["ephys_folder_path"] = ephys_folder_path
+    return session_to_nwb_kwargs
+
+
+def get_synthetic_behavior(
+    duration: float,
+    has_opto: bool,
+    behavior_sampling_frequency: float = 2_000.0,
+    video_frame_rate: float = 30.0,
+    trial_interval: float = 5.0,
+    seed: int = 0,
+) -> dict:
+    """Get the variables of a synthetic behavior .mat file, as the lab's acquisition code saves them.
+
+    Parameters
+    ----------
+    duration : float
+        The duration of the session, in seconds.
+    has_opto : bool
+        Whether a third of the trials have optogenetic stimulation.
+    behavior_sampling_frequency : float, optional
+        The sampling frequency of the encoder and the lickometer, in Hz, by default 2_000.0.
+    video_frame_rate : float, optional
+        The frame rate of the cameras, in Hz, by default 30.0.
+    trial_interval : float, optional
+        The mean interval between the starts of the push trials, in seconds, by default 5.0.
+    seed : int, optional
+        The seed of the random generator, by default 0.
+
+    Returns
+    -------
+    dict
+        The 'continuous' and 'events' variables, for write_mat_file().
+    """
+    rng = np.random.default_rng(seed)
+    start_time, stop_time = 0.5, duration - 0.5
+
+    # Continuous
+    behavior_times = np.arange(start_time, stop_time, 1 / behavior_sampling_frequency)
+    encoder_values = np.cumsum(rng.choice([-1.0, 0.0, 1.0], size=len(behavior_times), p=[0.05, 0.8, 0.15]))
+    is_licking = rng.random(len(behavior_times)) < 0.02
+    camera_times = [
+        start_time + offset + np.arange(0.0, stop_time - start_time - offset, 1 / video_frame_rate)
+        for offset in (0.001, 0.003)
+    ]
+
+    # Trials
+    trial_start_times = np.arange(start_time + 1.0, stop_time - 3.0, trial_interval)
+    trial_start_times = trial_start_times + rng.uniform(0.0, 1.0, size=len(trial_start_times))
+    num_trials = len(trial_start_times)
+    if num_trials < 2:  # single events are read back as scalars
+        raise ValueError(f"The session must be long enough for 2 trials, more than {trial_interval + 5.0:g} s.")
+    trial_stop_times = trial_start_times + rng.uniform(0.5, 2.0, size=num_trials)
+    is_aborted = rng.random(num_trials) < 0.05
+    is_aborted[:2] = False
+    trial_start_times[is_aborted & (rng.random(num_trials) < 0.5)] = np.nan
+    trial_stop_times[is_aborted] = np.nan
+    is_rewarded = ~is_aborted & (rng.random(num_trials) < 0.7)
+    is_rewarded[:2] = True
+    reward_times = np.where(is_rewarded, trial_stop_times + 0.05, np.nan)
+    is_opto_trial = ~is_aborted & (rng.random(num_trials) < 1 / 3) if has_opto else np.zeros(num_trials, dtype=bool)
+    opto_times = np.where(is_opto_trial, trial_start_times, np.nan)
+    opto_stop_times = np.where(is_opto_trial, trial_start_times + 1.0, np.nan)
+    push = dict(
+        time=trial_start_times,
+        time_end=trial_stop_times,
+        rewarded=np.where(is_aborted, np.nan, is_rewarded.astype("float64")),
+        time_reward_s=reward_times,
+        opto_trial=is_opto_trial.astype("float64"),
+        opto_time=opto_times,
+        opto_time_end=opto_stop_times,
+        ITI_respect=np.where(is_aborted, np.nan, (rng.random(num_trials) < 0.9).astype("float64")),
+        ThresholdVector=rng.choice([3.0, 4.0, 5.0], size=num_trials),
+        endZone_ThresholdVector=rng.choice([6.0, 7.0, 8.0], size=num_trials),
+    )
+
+    # Events
+    is_complete = ~is_aborted
+    tuning_tone_times = np.linspace(stop_time - 2.0, stop_time - 0.5, 16)
+    events = dict(
+        push=push,
+        toneIN=dict(time=trial_start_times[is_complete]),
+        targetOUT=dict(time=(trial_start_times + 0.3)[is_complete]),
+        toneOUT=dict(time=trial_stop_times[is_complete]),
+        valve=dict(time=reward_times[is_rewarded]),
+        tuningTones=dict(time=tuning_tone_times, value=rng.choice([4000.0, 8000.0, 16000.0], size=16)),
+    )
+    continuous = dict(
+        encoder=dict(time=behavior_times, value=encoder_values),
+        lick=dict(time=behavior_times, value=is_licking.astype("float64")),
+        cam=dict(time=camera_times),
+    )
+    return dict(continuous=continuous, events=events)
+
+
+if __name__ == "__main__":
+
+    # Parameters for the synthetic session
+    data_dir_path = Path("/Volumes/T7/CatalystNeuro/Schneider/SyntheticData/Zempolich")
+    duration = 600.0
+
+    print(generate_synthetic_session(data_dir_path=data_dir_path, duration=duration))
@@ -0,0 +1,198 @@
+"""Primary script to verify a converted session against its source data."""
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from neuroconv.utils import load_dict_from_file
+from pydantic import DirectoryPath, FilePath
+from pymatreader import read_mat
+
+from schneider_lab_to_nwb.tools.verification import (
+    format_verification_report,
+    read_array_rows,
+    run_verification,
+    verify_dataset,
+    verify_value,
+)
+from schneider_lab_to_nwb.zempolich_2024.zempolich_2024_behaviorinterface import get_starting_timestamp
+
+
+def verify_session(
+    *,
+    nwbfile_path: FilePath,
+    behavior_file_path: FilePath,
+    ephys_folder_path: Optional[DirectoryPath] = None,
+    has_opto: bool = False,
+    max_workers: int = 1,
+    verbose: bool = True,
+) -> list[dict]:
+    """Verify that the recording, behavior and trials of a converted session match the source data.
+
+    The recording is compared chunk by chunk with the '.continuous' files, after applying the declared conversion of
+    the ElectricalSeries. The behavioral time series, the events and the trials are compared with the behavior .mat
+    file, after the same normalization of the timestamps as in session_to_nwb().
+
+    Parameters
+    ----------
+    nwbfile_path : FilePath
+        Path to the NWB file of the session.
+    behavior_file_path : FilePath
+        Path to the behavior .mat file.
+    ephys_folder_path : Optional[DirectoryPath], optional
+        Path to the folder containing electrophysiology data, by default None.
+    has_opto : bool, optional
+        Whether the session includes optogenetic data, in which case its timestamps are normalized, by default False.
+    max_workers : int, optional
+        The maximum number of processes that run the checks, by default 1.
+    verbose : bool, optional
+        Whether to print the report, by default True.
+
+    Returns
+    -------
+    list[dict]
+        The report of each check, as returned by run_verification().
+    """
+    checks = get_behavior_checks(nwbfile_path=nwbfile_path, behavior_file_path=behavior_file_path, has_opto=has_opto)
+    if ephys_folder_path is not None:
+        checks.extend(get_recording_checks(nwbfile_path=nwbfile_path, ephys_folder_path=ephys_folder_path))
+    report = run_verification(checks=checks, max_workers=max_workers)
+    if verbose:
+        print(f"Verification of {Path(nwbfile_path).name}:")
+        print(format_verification_report(report))
+    return report
+
+
+def get_behavior_checks(nwbfile_path: FilePath, behavior_file_path: FilePath, has_opto: bool) -> list[partial]:
+    """Get the checks of the behavioral time series, the events and the trials against the behavior .mat file."""
+    editable_metadata = load_dict_from_file(Path(__file__).parent / "zempolich_2024_metadata.yaml")
+    behavior_metadata = editable_metadata["Behavior"]
+    module_name = behavior_metadata["Module"]["name"]
+    file = read_mat(behavior_file_path)
+    time_offset = -get_starting_timestamp(mat_file=file) if has_opto else 0.0  # normalized along with optogenetics
+
+    checks = []
+    for time_series_dict in behavior_metadata["TimeSeries"]:
+        name = time_series_dict["name"]
+        time_series_path = f"processing/{module_name}/behavioral_time_series/{name}"
+        data = np.array(file["continuous"][name]["value"]).squeeze()
+        if data.dtype == np.complex128:
+            data = data.real.astype(np.float64)
+        timestamps = np.array(file["continuous"][name]["time"]).squeeze()
+        checks.append(_get_array_check(name=f"{name} data", path=f"{time_series_path}/data", array=data))
+        checks.append(
+            _get_array_check(
+                name=f"{name} timestamps",
+                path=f"{time_series_path}/timestamps",
+                array=timestamps,
+                source_offset=time_offset,
+            )
+        )
+    for event_dict in behavior_metadata["Events"]:
+        name = event_dict["name"]
+        times = np.array(file["events"][name]["time"]).squeeze()
+        if np.all(np.isnan(times)):
+            continue  # not written
+        checks.append(
+            _get_array_check(
+                name=f"{name} timestamps",
+                path=f"processing/{module_name}/{name}/timestamps",
+                array=times,
+                source_offset=time_offset,
+            )
+        )
+
+    trial_start_times = np.array(file["events"]["push"]["time"]).squeeze()
+    trial_stop_times = np.array(file["events"]["push"]["time_end"]).squeeze()
+    trial_is_nan = np.isnan(trial_start_times) | np.isnan(trial_stop_times)
+    for name, times in (("start_time", trial_start_times), ("stop_time", trial_stop_times)):
+        checks.append(
+            _get_array_check(
+                name=f"trials {name}",
+                path=f"intervals/trials/{name}",
+                array=times[~trial_is_nan],
+                source_offset=time_offset,
+            )
+        )
+    for trials_dict in behavior_metadata["Trials"]:
+        name = trials_dict["name"]
+        trial_array = np.array(file["events"]["push"][name]).squeeze()
+        if trials_dict["dtype"] == "bool":
+            trial_array[np.isnan(trial_array)] = False
+        trial_array = np.asarray(trial_array, dtype=trials_dict["dtype"])[~trial_is_nan]
+        is_time = name in ["time_reward_s", "opto_time", "opto_time_end"]
+        checks.append(
+            _get_array_check(
+                name=f"trials {name}",
+                path=f"intervals/trials/{name}",
+                array=trial_array,
+                source_offset=time_offset if is_time else 0.0,
+            )
+        )
+    return [partial(check, nwbfile_path=nwbfile_path) for check in checks]
+
+
+def get_recording_checks(nwbfile_path: FilePath, ephys_folder_path: DirectoryPath) -> list[partial]:
+    """Get the checks of the ElectricalSeries against the '.continuous' files, in volts after the declared conversion."""
+    stream_name = "Signals CH"
+    recording = _get_recording(folder_path=str(ephys_folder_path), stream_name=stream_name)
+    checks = [
+        partial(
+            verify_dataset,
+            name="ElectricalSeries data",
+            nwbfile_path=nwbfile_path,
+            nwb_dataset_path="acquisition/ElectricalSeries/data",
+            read_source_rows=partial(read_recording_rows, str(ephys_folder_path), stream_name),
+            num_rows=recording.get_num_samples(),
+            apply_conversion=True,
+            rtol=1e-5,
+        ),
+        partial(
+            verify_value,
+            name="ElectricalSeries starting_time",
+            nwbfile_path=nwbfile_path,
+            nwb_dataset_path="acquisition/ElectricalSeries/starting_time",
+            expected_value=0.0,  # the recording is not shifted, see Zempolich2024OpenEphysRecordingInterface
+        ),
+    ]
+    return checks
+
+
+def read_recording_rows(folder_path: str, stream_name: str, start: int, stop: int) -> np.ndarray:
+    """Read the samples [start, stop) of the recording, in volts."""
+    recording = _get_recording(folder_path=folder_path, stream_name=stream_name)
+    return recording.get_traces(start_frame=start, end_frame=stop, return_scaled=True) * 1e-6
+
+
+@lru_cache(maxsize=1)
+def _get_recording(folder_path: str, stream_name: str):
+    from schneider_lab_to_nwb.zempolich_2024 import Zempolich2024OpenEphysRecordingInterface
+
+    interface = Zempolich2024OpenEphysRecordingInterface(folder_path=folder_path, stream_name=stream_name)
+    return interface.recording_extractor
+
+
+def _get_array_check(name: str, path: str, array: np.ndarray, source_offset: float = 0.0) -> partial:
+    return partial(
+        verify_dataset,
+        name=name,
+        nwb_dataset_path=path,
+        read_source_rows=partial(read_array_rows, array),
+        num_rows=len(array),
+        source_offset=source_offset,
+        rtol=1e-12,
+    )
+
+
+if __name__ == "__main__":
+    # Parameters for verification
+    data_dir_path = Path("Z:\\Users\\Grant\\New Project Data for Conversion")
+    output_dir_path = Path("Z:\\Users\\Grant\\New Project Data for Conversion\\SavedOutput")
+
+    # Example Session A1 Ephys + Behavior
+    verify_session(
+        nwbfile_path=output_dir_path / "sub-m53_ses-231029.nwb",
+        behavior_file_path=data_dir_path / "A1_EphysBehavioralFiles" / "raw_m53_231029_001.mat",
+        ephys_folder_path=data_dir_path / "A1_EphysFiles" / "m53" / "Day1_A1",
+        max_workers=4,
+    )
@@ -0,0 +1,300 @@
+"""Primary script to run to convert new sessions of the dataset as they land from the rigs."""
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Literal, Optional
+
+import h5py
+from pydantic import DirectoryPath, FilePath
+
+from schneider_lab_to_nwb.tools import (
+    FileStabilityTracker,
+    MtimeIndexedScanner,
+    SupervisedProcessPool,
+    configure_io_admission,
+    load_max_readers_per_storage_root,
+    get_preloading_mp_context,
+)
+from schneider_lab_to_nwb.zempolich_2024.zempolich_2024_convert_all_sessions import (
+    WORKER_PRELOAD_MODULE_NAMES,
+    get_nwbfile_name_from_kwargs,
+    get_session_to_nwb_kwargs_per_session,
+    initialize_worker,
+    record_worker_crash,
+    safe_session_to_nwb,
+)
+
+# The folders of the data directory that get_session_to_nwb_kwargs_per_session() reads
+SESSION_ROOT_NAMES = (
+    "A1_EphysFiles",
+    "A1_EphysBehavioralFiles",
+    "A1_OptoBehavioralFiles",
+    "M2_EphysFiles",
+    "M2_EphysBehavioralFiles",
+    "M2_OptoBehavioralFiles",
+    "Videos",
+    "Intrinsic Imaging Data",
+)
+
+
+def watch_dataset(
+    *,
+    data_dir_path: DirectoryPath,
+    output_dir_path: DirectoryPath,
+    max_workers: int = 1,
+    poll_seconds: float = 60.0,
+    stable_seconds: float = 300.0,
+    max_readers_per_storage_root: Optional[dict[str, int]] = None,
+    backend: Literal["hdf5", "zarr"] = "hdf5",
+    session_to_nwb_options: Optional[dict] = None,
+    max_polls: Optional[int] = None,
+    verbose: bool = True,
+):
+    """Convert the sessions of the dataset that are not converted yet, then each new session as soon as it is complete.
+
+    The folders of the dataset are polled every poll_seconds with an MtimeIndexedScanner, so a poll costs one stat per
+    directory, and the sessions are only listed again when a directory changed. A new session is queued once all its
+    inputs are present (the behavior file, at least one video, the intrinsic signal images and, for ephys sessions, the
+    recording and its spike sorting) and none of its files changed for stable_seconds. The sessions run in warm worker
+    processes with the same error capture as dataset_to_nwb(): a failed session gets an ERROR file and is not retried
+    until the ERROR file is removed. Each session is written to a hidden '.<nwbfile_name>.partial' directory of the
+    output directory and only renamed into place once it succeeded, so that the output directory never holds a
+    partial NWB file, and a session is never considered converted while it has an ERROR file.
+
+    Parameters
+    ----------
+    data_dir_path : DirectoryPath
+        The path to the directory containing the raw data.
+    output_dir_path : DirectoryPath
+        The path to the directory where the NWB files will be saved.
+    max_workers : int, optional
+        The maximum number of workers that convert sessions at the same time, by default 1.
+    poll_seconds : float, optional
+        The time between two polls of the data directory, by default 60.0.
+    stable_seconds : float, optional
+        How long the files of a session must stay unchanged before it is converted, by default 300.0.
+    max_readers_per_storage_root : dict[str, int], optional
+        See dataset_to_nwb(), by default None (no limits).
+    backend : Literal["hdf5", "zarr"], optional
+        The backend of the NWB files, by default "hdf5"
+    session_to_nwb_options : dict, optional
+        Other arguments for session_to_nwb, applied to every session, ex. dict(split_ecephys=True), by default None.
+    max_polls : int, optional
+        The number of polls after which to stop, once the queued sessions are converted, by default None (run until
+        interrupted).
+    verbose : bool, optional
+        Whether to print when sessions are queued and converted, by default True
+    """
+    data_dir_path = Path(data_dir_path)
+    output_dir_path = Path(output_dir_path)
+    output_dir_path.mkdir(parents=True, exist_ok=True)
+    scanner = MtimeIndexedScanner(root_paths=[data_dir_path / root_name for root_name in SESSION_ROOT_NAMES])
+    stability_tracker = FileStabilityTracker(stable_seconds=stable_seconds)
+    configure_io_admission(max_readers_per_storage_root=max_readers_per_storage_root)
+
+    nwbfile_name_to_pending_kwargs = dict()
+    future_to_kwargs = dict()
+    queued_nwbfile_names = set()
+    num_polls = 0
+    with SupervisedProcessPool(
+        max_workers=max_workers,
+        initializer=initialize_worker,
+        initargs=(max_readers_per_storage_root,),
+        mp_context=get_preloading_mp_context(module_names=WORKER_PRELOAD_MODULE_NAMES),
+    ) as executor:
+        while max_polls is None or num_polls < max_polls:
+            if scanner.scan():
+                try:
+                    session_to_nwb_kwargs_per_session = get_session_to_nwb_kwargs_per_session(
+                        data_dir_path=data_dir_path
+                    )
+                except OSError as e:  # a folder is being created or moved; list again at the next poll
+                    session_to_nwb_kwargs_per_session = []
+                    scanner = MtimeIndexedScanner(root_paths=scanner.root_paths)
+                    if verbose:
+                        print(f"Could not list the sessions ({e!r}), retrying at the next poll.")
+                for session_to_nwb_kwargs in session_to_nwb_kwargs_per_session:
+                    session_to_nwb_kwargs.update(session_to_nwb_options or dict())
+                    session_to_nwb_kwargs.update(output_dir_path=output_dir_path, backend=backend, verbose=False)
+                    nwbfile_name = get_nwbfile_name_from_kwargs(session_to_nwb_kwargs)
+                    if nwbfile_name not in queued_nwbfile_names:
+                        nwbfile_name_to_pending_kwargs[nwbfile_name] = session_to_nwb_kwargs
+
+            for nwbfile_name, session_to_nwb_kwargs in list(nwbfile_name_to_pending_kwargs.items()):
+                exception_file_path = output_dir_path / f"ERROR_{nwbfile_name}.txt"
+                if exception_file_path.exists():  # kept pending, to be retried once the ERROR file is removed
+                    continue
+                if (output_dir_path / nwbfile_name).exists():
+                    nwbfile_name_to_pending_kwargs.pop(nwbfile_name)
+                    continue
+                input_file_paths = get_session_input_file_paths(session_to_nwb_kwargs=session_to_nwb_kwargs)
+                if input_file_paths is None or not stability_tracker.are_stable(file_paths=input_file_paths):
+                    continue
+                stability_tracker.forget(file_paths=input_file_paths)
+                nwbfile_name_to_pending_kwargs.pop(nwbfile_name)
+                queued_nwbfile_names.add(nwbfile_name)
+                future = executor.submit(
+                    safe_session_to_nwb,
+                    session_to_nwb_kwargs=dict(
+                        session_to_nwb_kwargs,
+                        output_dir_path=get_partial_dir_path(
+                            output_dir_path=output_dir_path, nwbfile_name=nwbfile_name
+                        ),
+                    ),
+                    exception_file_path=exception_file_path,
+                )
+                future_to_kwargs[future] = (nwbfile_name, session_to_nwb_kwargs, exception_file_path)
+                if verbose:
+                    print(f"Queued {nwbfile_name}")
+
+            for future in [future for future in future_to_kwargs if future.done()]:
+                nwbfile_name, session_to_nwb_kwargs, exception_file_path = future_to_kwargs.pop(future)
+                record_worker_crash(
+                    future=future, session_to_nwb_kwargs=session_to_nwb_kwargs, exception_file_path=exception_file_path
+                )
+                queued_nwbfile_names.discard(nwbfile_name)
+                if exception_file_path.exists():
+                    nwbfile_name_to_pending_kwargs[nwbfile_name] = session_to_nwb_kwargs
+                else:
+                    publish_session_output(output_dir_path=output_dir_path, nwbfile_name=nwbfile_name)
+                if verbose:
+                    status = "failed" if exception_file_path.exists() else "converted"
+                    print(f"{nwbfile_name} {status}")
+
+            num_polls += 1
+            if max_polls is None or num_polls < max_polls:
+                time.sleep(poll_seconds)
+
+        for future, (nwbfile_name, session_to_nwb_kwargs, exception_file_path) in future_to_kwargs.items():
+            future.exception()  # wait for the sessions still being converted
+            record_worker_crash(
+                future=future, session_to_nwb_kwargs=session_to_nwb_kwargs, exception_file_path=exception_file_path
+            )
+            if not exception_file_path.exists():
+                publish_session_output(output_dir_path=output_dir_path, nwbfile_name=nwbfile_name)
+
+
+def get_partial_dir_path(*, output_dir_path: DirectoryPath, nwbfile_name: str) -> Path:
+    """Get the hidden directory of the output directory to which a session is written before it is published."""
+    return Path(output_dir_path) / f".{nwbfile_name}.partial"
+
+
+def publish_session_output(*, output_dir_path: DirectoryPath, nwbfile_name: str):
+    """Rename the files of a converted session from its partial directory into the output directory.
+
+    The partial directory is inside the output directory, so each file (or NWB-Zarr store) is renamed into place
+    atomically. The NWB file is renamed last, after its companion files, so that it never links to a missing file.
+    The relative external links of the HDF5 files to files outside the partial directory (ex. the shared intrinsic
+    signal images) are first rebased onto the output directory.
+
+    Parameters
+    ----------
+    output_dir_path : DirectoryPath
+        The path to the directory where the NWB files are saved.
+    nwbfile_name : str
+        The name of the NWB file of the session.
+    """
+    output_dir_path = Path(output_dir_path)
+    partial_dir_path = get_partial_dir_path(output_dir_path=output_dir_path, nwbfile_name=nwbfile_name)
+    if not partial_dir_path.exists():  # the session was skipped, ex. claimed by another process
+        return
+    for file_path in sorted(partial_dir_path.iterdir(), key=lambda file_path: file_path.name == nwbfile_name):
+        if file_path.is_file() and h5py.is_hdf5(file_path):
+            rebase_external_links(file_path=file_path, new_dir_path=output_dir_path)
+        os.replace(file_path, output_dir_path / file_path.name)
+    shutil.rmtree(partial_dir_path)
+
+
+def rebase_external_links(*, file_path: FilePath, new_dir_path: DirectoryPath):
+    """Make the relative external links of an HDF5 file point to the same files once it is moved to a new directory.
+
+    Links to the files of its own directory (ex. a companion file) are kept, since those files move along with it.
+
+    Parameters
+    ----------
+    file_path : FilePath
+        Path to the HDF5 file, before it is moved.
+    new_dir_path : DirectoryPath
+        The path to the directory to which the file will be moved.
+    """
+    file_path = Path(file_path)
+    dir_path = file_path.parent.resolve()
+
+    def rebase_group(group: h5py.Group):
+        for name in list(group):
+            link = group.get(name, getlink=True)
+            if isinstance(link, h5py.ExternalLink) and not os.path.isabs(link.filename):
+                target_file_path = (dir_path / link.filename).resolve()
+                if target_file_path.parent != dir_path:
+                    del group[name]
+                    group[name] = h5py.ExternalLink(os.path.relpath(target_file_path, new_dir_path), link.path)
+            elif isinstance(link, h5py.HardLink) and isinstance(group[name], h5py.Group):
+                rebase_group(group=group[name])
+
+    new_dir_path = Path(new_dir_path).resolve()
+    with h5py.File(file_path, mode="a") as file:
+        rebase_group(group=file)
+
+
+def get_session_input_file_paths(*, session_to_nwb_kwargs: dict) -> Optional[list[Path]]:
+    """Get the input files of a session, if all of them are present.
+
+    Parameters
+    ----------
+    session_to_nwb_kwargs : dict
+        The arguments for session_to_nwb.
+
+    Returns
+    -------
+    Optional[list[Path]]
+        The behavior file, the videos, the intrinsic signal images and, for ephys sessions, every file of the ephys
+        folder. None if the session is not complete yet: a file is missing, there is no video, or the ephys folder has
+        no recording or no spike sorting.
+    """
+    behavior_file_path = Path(session_to_nwb_kwargs["behavior_file_path"])
+    video_folder_path = Path(session_to_nwb_kwargs["video_folder_path"])
+    isoi_folder_path = Path(session_to_nwb_kwargs["intrinsic_signal_optical_imaging_folder_path"])
+    if not behavior_file_path.exists() or not video_folder_path.exists():
+        return None
+    video_file_paths = [
+        file_path for file_path in video_folder_path.glob("*.mp4") if not file_path.name.startswith("._")
+    ]
+    isoi_file_paths = [isoi_folder_path / "Overlaid.jpg", isoi_folder_path / "Target.jpg"]
+    if len(video_file_paths) == 0 or not all(file_path.exists() for file_path in isoi_file_paths):
+        return None
+    input_file_paths = [behavior_file_path, *video_file_paths, *isoi_file_paths]
+
+    ephys_folder_path = session_to_nwb_kwargs.get("ephys_folder_path")
+    if ephys_folder_path is not None:
+        ephys_file_paths = [
+            Path(dir_path) / file_name
+            for dir_path, _, file_names in os.walk(ephys_folder_path)
+            for file_name in file_names
+        ]
+        file_names = {file_path.name for file_path in ephys_file_paths}
+        has_recording = any(file_path.suffix == ".continuous" for file_path in ephys_file_paths)
+        has_sorting = {"params.py", "spike_times.npy", "spike_clusters.npy"} <= file_names
+        if not has_recording or not has_sorting:
+            return None
+        input_file_paths.extend(ephys_file_paths)
+    return input_file_paths
+
+
+if __name__ == "__main__":
+
+    # Parameters for conversion
+    data_dir_path = Path("Z:\\Users\\Grant\\New Project Data for Conversion")
+    output_dir_path = Path("Z:\\Users\\Grant\\New Project Data for Conversion\\SavedOutput")
+    max_workers = 4
+    # Read from the YAML file set in the SCHNEIDER_LAB_TO_NWB_IO_ADMISSION_FILE environment variable, ex. "Z:\\": 4
+    max_readers_per_storage_root = load_max_readers_per_storage_root()
+
+    watch_dataset(
+        data_dir_path=data_dir_path,
+        output_dir_path=output_dir_path,
+        max_workers=max_workers,
+        poll_seconds=60.0,
+        stable_seconds=300.0,
+        max_readers_per_storage_root=max_readers_per_storage_root,
+    )
@@ -0,0 +1,13 @@
+"""Fixtures shared by the tests, built from the synthetic data generators."""
+import pytest
+
+from schneider_lab_to_nwb.zempolich_2024.zempolich_2024_synthetic_data import generate_synthetic_session
+
+SESSION_DURATION = 20.0  # long enough for a few trials, short enough to convert in seconds
+
+
+@pytest.fixture(scope="session")
+def zempolich_2024_ephys_session(tmp_path_factory) -> dict:
+    """The session_to_nwb() kwargs of a synthetic Zempolich 2024 ephys session, except output_dir_path."""
+    data_dir_path = tmp_path_factory.mktemp("zempolich_2024_data")
+    return generate_synthetic_session(data_dir_path=data_dir_path, duration=SESSION_DURATION)
@@ -0,0 +1,39 @@
+"""Tests of the data chunk iterators that stream large binary files."""
+import numpy as np
+
+from schneider_lab_to_nwb.tools import MemmapDataChunkIterator
+from schneider_lab_to_nwb.tools.io_admission import IOSlot
+
+
+class CountingIOSlot(IOSlot):
+    """An IOSlot that counts how many times it is taken."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.num_acquisitions = 0
+
+    def acquire(self):
+        self.num_acquisitions += 1
+        super().acquire()
+
+
+def test_memmap_iterator_holds_the_io_slot_for_each_buffer(tmp_path):
+    data = np.arange(1000 * 2, dtype="int16").reshape(1000, 2)
+    file_path = tmp_path / "audio.mic"
+    data.tofile(file_path)
+    io_slot = CountingIOSlot(storage_root=str(tmp_path), max_readers=1, lock_dir_path=tmp_path)
+    iterator = MemmapDataChunkIterator(
+        file_path=file_path,
+        dtype="int16",
+        shape=data.shape,
+        buffer_shape=(250, 2),
+        chunk_shape=(250, 2),
+        io_slot=io_slot,
+    )
+
+    buffers = [(data_chunk.selection, data_chunk.data) for data_chunk in iterator]
+
+    assert io_slot.num_acquisitions == len(buffers) == 4
+    assert io_slot._file is None  # released after each buffer
+    for selection, buffer in buffers:
+        np.testing.assert_array_equal(buffer, data[selection])
@@ -0,0 +1,56 @@
+"""Tests of the repacking of NWB files into cloud-optimized HDF5."""
+from datetime import datetime, timezone
+
+import h5py
+import numpy as np
+from hdmf.backends.hdf5 import H5DataIO
+from pynwb import NWBHDF5IO, NWBFile, TimeSeries
+
+from schneider_lab_to_nwb.tools.repack import get_time_chunk_shape, repack_nwbfile
+
+
+def test_repack_rechunks_large_datasets_along_time(tmp_path):
+    nwbfile_path = tmp_path / "sub-m53_ses-Day1.nwb"
+    output_file_path = tmp_path / "repacked" / "sub-m53_ses-Day1.nwb"
+    data = np.random.default_rng(seed=0).integers(-100, 100, size=(100_000, 16), dtype="int16")
+    small_data = np.arange(1000, dtype="float64")
+    nwbfile = NWBFile(
+        session_description="session", identifier="identifier", session_start_time=datetime.now(timezone.utc)
+    )
+    nwbfile.add_acquisition(TimeSeries(name="Contiguous", data=data, unit="V", rate=1000.0))
+    nwbfile.add_acquisition(
+        TimeSeries(
+            name="Compressed",
+            data=H5DataIO(data=data, chunks=(1000, 1), compression="gzip"),
+            unit="V",
+            rate=1000.0,
+        )
+    )
+    nwbfile.add_acquisition(TimeSeries(name="Small", data=small_data, unit="V", rate=1000.0))
+    with NWBHDF5IO(nwbfile_path, mode="w") as io:
+        io.write(nwbfile)
+
+    # The compressed dataset is written with chunks that do not compress as well, so the file may grow
+    is_repacked = repack_nwbfile(
+        nwbfile_path=nwbfile_path,
+        output_file_path=output_file_path,
+        target_chunk_mb=1.0,
+        min_dataset_mb=1.0,
+        max_size_increase=1.0,
+    )
+
+    assert is_repacked
+    expected_chunk_shape = get_time_chunk_shape(shape=data.shape, dtype=data.dtype, target_chunk_mb=1.0)
+    with h5py.File(output_file_path, mode="r") as file:
+        contiguous_dataset = file["acquisition/Contiguous/data"]
+        assert contiguous_dataset.chunks == expected_chunk_shape
+        np.testing.assert_array_equal(contiguous_dataset[:], data)
+        compressed_dataset = file["acquisition/Compressed/data"]
+        assert compressed_dataset.chunks == expected_chunk_shape
+        assert compressed_dataset.compression == "gzip"
+        np.testing.assert_array_equal(compressed_dataset[:], data)
+        small_dataset = file["acquisition/Small/data"]
+        assert small_dataset.chunks is None
+        np.testing.assert_array_equal(small_dataset[:], small_data)
+    with NWBHDF5IO(output_file_path, mode="r") as io:
+        assert io.read().acquisition["Contiguous"].rate == 1000.0
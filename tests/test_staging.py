@@ -0,0 +1,28 @@
+"""Tests of the staging of session inputs to a bounded scratch directory."""
+import threading
+
+from schneider_lab_to_nwb.tools import SessionStager
+
+
+def test_staging_a_staged_session_again_does_not_wait_for_itself(tmp_path):
+    source_dir_path = tmp_path / "source" / "m53"
+    source_dir_path.mkdir(parents=True)
+    source_file_path = source_dir_path / "session.mat"
+    source_file_path.write_bytes(b"0" * 600)
+    stager = SessionStager(scratch_dir_path=tmp_path / "scratch", max_scratch_gb=1000 / 1e9, max_staged_sessions=2)
+    staged_paths = stager.stage(session_name="session", source_paths=dict(file_path=source_file_path))
+
+    # The retried session holds more than half of the scratch space, so counting it twice would block forever
+    thread = threading.Thread(
+        target=stager.stage,
+        kwargs=dict(session_name="session", source_paths=dict(file_path=source_file_path)),
+        daemon=True,
+    )
+    thread.start()
+    thread.join(timeout=30.0)
+
+    assert not thread.is_alive()
+    assert staged_paths["file_path"].read_bytes() == source_file_path.read_bytes()
+    stager.release(session_name="session")
+    assert not stager.get_session_dir_path(session_name="session").exists()
+    assert stager.stage(session_name="other", source_paths=dict(file_path=source_file_path))["file_path"].exists()
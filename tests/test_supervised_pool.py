@@ -0,0 +1,45 @@
+"""Tests of the supervised process pool that runs the conversion of the sessions."""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from schneider_lab_to_nwb.tools import SupervisedProcessPool
+
+
+def square(value: int) -> int:
+    return value**2
+
+
+def sum_of_squares_in_a_nested_pool(values: list[int]) -> int:
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return sum(executor.map(square, values))
+
+
+def raise_value_error():
+    raise ValueError("failed in the worker")
+
+
+def get_pid() -> int:
+    return os.getpid()
+
+
+def test_task_runs_a_nested_pool():
+    with SupervisedProcessPool(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(sum_of_squares_in_a_nested_pool, [value, value + 1]) for value in range(3)]
+        results = [future.result(timeout=120.0) for future in futures]
+
+    assert results == [1, 5, 13]
+
+
+def test_exception_fails_only_its_task_and_workers_are_stopped():
+    pool = SupervisedProcessPool(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+    failed_future = pool.submit(raise_value_error)
+    future = pool.submit(get_pid)
+    with pytest.raises(ValueError, match="failed in the worker"):
+        failed_future.result(timeout=60.0)
+    worker_pid = future.result(timeout=60.0)
+    pool.shutdown(wait=True)
+
+    assert worker_pid not in [process.pid for process in multiprocessing.active_children()]
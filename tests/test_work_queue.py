@@ -0,0 +1,98 @@
+"""Tests of the file-lock work queue shared by several conversion processes."""
+import json
+import multiprocessing
+import os
+import socket
+import time
+
+from schneider_lab_to_nwb.tools import FileLockWorkQueue
+
+
+def claim_and_hold(queue_dir_path, task_name, start_time, results):
+    work_queue = FileLockWorkQueue(queue_dir_path=queue_dir_path, heartbeat_interval=0.5, stale_timeout=5.0)
+    time.sleep(max(start_time - time.time(), 0.0))  # every process claims at the same time
+    is_claimed = work_queue.claim(task_name=task_name)
+    results.put(is_claimed)
+    time.sleep(2.0)  # a live owner, so its lock is not stale for the other processes
+    if is_claimed:
+        work_queue.release(task_name=task_name)
+
+
+def test_claim_is_exclusive_and_release_marks_done(tmp_path):
+    work_queue = FileLockWorkQueue(queue_dir_path=tmp_path, heartbeat_interval=0.5, stale_timeout=5.0)
+    other_work_queue = FileLockWorkQueue(queue_dir_path=tmp_path, heartbeat_interval=0.5, stale_timeout=5.0)
+
+    assert work_queue.claim(task_name="session")
+    assert work_queue.owns(task_name="session")
+    assert not other_work_queue.claim(task_name="session")
+
+    work_queue.release(task_name="session", status="done")
+
+    assert work_queue.is_finished(task_name="session")
+    assert not (tmp_path / "session.lock").exists()
+    assert not other_work_queue.claim(task_name="session")
+
+
+def test_release_without_status_requeues_the_task(tmp_path):
+    work_queue = FileLockWorkQueue(queue_dir_path=tmp_path, heartbeat_interval=0.5, stale_timeout=5.0)
+    assert work_queue.claim(task_name="session")
+
+    work_queue.release(task_name="session", status=None)
+
+    assert not work_queue.is_finished(task_name="session")
+    assert work_queue.claim(task_name="session")
+    work_queue.release(task_name="session")
+
+
+def test_stale_lock_of_a_dead_process_is_taken_over(tmp_path):
+    process = multiprocessing.get_context("spawn").Process(target=time.sleep, args=(0.0,))
+    process.start()
+    process.join()
+    owner = dict(hostname=socket.gethostname(), pid=process.pid, token="dead", claimed_at=time.time())
+    with open(tmp_path / "session.lock", mode="w") as f:
+        json.dump(owner, f)
+    work_queue = FileLockWorkQueue(queue_dir_path=tmp_path, heartbeat_interval=0.5, stale_timeout=5.0)
+
+    assert work_queue.is_stale(task_name="session")
+    assert work_queue.claim(task_name="session")
+    assert work_queue.owns(task_name="session")
+    work_queue.release(task_name="session")
+    assert work_queue.is_finished(task_name="session")
+
+
+def test_concurrent_claims_have_a_single_winner(tmp_path):
+    mp_context = multiprocessing.get_context("spawn")
+    results = mp_context.Queue()
+    start_time = time.time() + 2.0
+    processes = [
+        mp_context.Process(target=claim_and_hold, args=(tmp_path, "session", start_time, results)) for _ in range(6)
+    ]
+    for process in processes:
+        process.start()
+    claims = [results.get(timeout=30.0) for _ in processes]
+    for process in processes:
+        process.join()
+
+    assert sum(claims) == 1
+    assert FileLockWorkQueue(queue_dir_path=tmp_path).is_finished(task_name="session")
+    assert not os.path.exists(tmp_path / "session.lock")
+
+
+def test_lock_of_a_live_owner_is_claimed_until_it_dies(tmp_path):
+    process = multiprocessing.get_context("spawn").Process(target=time.sleep, args=(60.0,))
+    process.start()
+    owner = dict(hostname=socket.gethostname(), pid=process.pid, token="other", claimed_at=time.time())
+    with open(tmp_path / "session.lock", mode="w") as f:
+        json.dump(owner, f)
+    work_queue = FileLockWorkQueue(queue_dir_path=tmp_path, heartbeat_interval=0.5, stale_timeout=5.0)
+
+    assert work_queue.is_claimed(task_name="session")
+    assert not work_queue.claim(task_name="session")
+
+    process.kill()
+    process.join()
+
+    assert not work_queue.is_claimed(task_name="session")
+    assert work_queue.claim(task_name="session")
+    work_queue.release(task_name="session")
+    assert not work_queue.is_claimed(task_name="session")
@@ -0,0 +1,122 @@
+"""Round-trip tests of the conversion of synthetic Zempolich 2024 sessions."""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from pynwb import NWBHDF5IO
+
+from schneider_lab_to_nwb.tools import (
+    generate_spike_trains,
+    generate_traces,
+    get_companion_nwbfile_path,
+    update_analysis_cache,
+)
+from schneider_lab_to_nwb.zempolich_2024 import Zempolich2024IntrinsicSignalOpticalImagingInterface
+from schneider_lab_to_nwb.zempolich_2024.zempolich_2024_convert_session import session_to_nwb
+from schneider_lab_to_nwb.tools.checkpointing import SAMPLE_INDEX_COLUMNS_STEP_NAME
+
+from conftest import SESSION_DURATION
+
+SAMPLING_FREQUENCY = 30_000.0
+NUM_CHANNELS = 128
+NUM_UNITS = 32
+
+
+def get_nwbfile_path(output_dir_path):
+    (nwbfile_path,) = [path for path in output_dir_path.glob("sub-*_ses-*.nwb") if "_desc-" not in path.name]
+    return nwbfile_path
+
+
+def assert_session_round_trips(nwbfile_path):
+    num_samples = int(SESSION_DURATION * SAMPLING_FREQUENCY)
+    spike_samples, spike_units = generate_spike_trains(
+        num_samples=num_samples, num_units=NUM_UNITS, sampling_frequency=SAMPLING_FREQUENCY, seed=0
+    )
+    first_traces = next(
+        generate_traces(
+            num_samples=num_samples,
+            num_channels=NUM_CHANNELS,
+            spike_samples=spike_samples,
+            spike_units=spike_units,
+            seed=0,
+        )
+    )
+    with NWBHDF5IO(nwbfile_path, mode="r", load_namespaces=True) as io:
+        nwbfile = io.read()
+        electrical_series = nwbfile.acquisition["ElectricalSeries"]
+        np.testing.assert_array_equal(electrical_series.data[:2048], first_traces[:2048])
+        assert electrical_series.rate == SAMPLING_FREQUENCY
+        assert len(nwbfile.electrodes) == NUM_CHANNELS
+
+        assert len(nwbfile.units) == NUM_UNITS
+        assert sum(len(spike_times) for spike_times in nwbfile.units["spike_times"][:]) == len(spike_samples)
+
+        trials = nwbfile.trials.to_dataframe()
+        assert len(trials) > 0
+        expected_start_indices = np.ceil(
+            (trials["start_time"] - electrical_series.starting_time) * SAMPLING_FREQUENCY - 1e-6
+        )
+        np.testing.assert_array_equal(trials["ElectricalSeries_start_index"], expected_start_indices)
+
+
+def test_session_to_nwb_round_trip(zempolich_2024_ephys_session, tmp_path):
+    session_to_nwb(**zempolich_2024_ephys_session, output_dir_path=tmp_path, verbose=False)
+
+    assert_session_round_trips(nwbfile_path=get_nwbfile_path(output_dir_path=tmp_path))
+
+
+def test_checkpointed_conversion_resumes(zempolich_2024_ephys_session, tmp_path, monkeypatch):
+    def fail(self, **kwargs):
+        raise RuntimeError("Interrupted conversion")
+
+    with monkeypatch.context() as patch:  # the images are the last interface written
+        patch.setattr(Zempolich2024IntrinsicSignalOpticalImagingInterface, "_get_images", fail)
+        with pytest.raises(RuntimeError, match="Interrupted conversion"):
+            session_to_nwb(**zempolich_2024_ephys_session, output_dir_path=tmp_path, checkpoint=True, verbose=False)
+    nwbfile_path = get_nwbfile_path(output_dir_path=tmp_path)
+    journal_path = nwbfile_path.with_name(nwbfile_path.name + ".journal.json")
+    with open(journal_path, mode="r") as f:
+        completed_interfaces = json.load(f)["completed_interfaces"]
+    assert "Recording" in completed_interfaces
+    assert "ISOI" not in completed_interfaces
+
+    session_to_nwb(**zempolich_2024_ephys_session, output_dir_path=tmp_path, checkpoint=True, verbose=False)
+
+    with open(journal_path, mode="r") as f:
+        resumed_completed_interfaces = json.load(f)["completed_interfaces"]
+    assert resumed_completed_interfaces["Recording"] == completed_interfaces["Recording"]  # not written again
+    assert {"ISOI", SAMPLE_INDEX_COLUMNS_STEP_NAME} <= set(resumed_completed_interfaces)
+    assert_session_round_trips(nwbfile_path=nwbfile_path)
+
+
+def test_split_conversion_and_analysis_cache(zempolich_2024_ephys_session, tmp_path):
+    output_dir_path = tmp_path / "output"
+    cache_dir_path = tmp_path / "analysis_cache"
+    session_to_nwb(**zempolich_2024_ephys_session, output_dir_path=output_dir_path, split_ecephys=True, verbose=False)
+    nwbfile_path = get_nwbfile_path(output_dir_path=output_dir_path)
+    companion_nwbfile_path = get_companion_nwbfile_path(nwbfile_path=nwbfile_path)
+
+    assert companion_nwbfile_path.exists()
+    assert_session_round_trips(nwbfile_path=nwbfile_path)  # the recording is read through the external links
+    identifiers = []
+    for path in (nwbfile_path, companion_nwbfile_path):
+        with NWBHDF5IO(path, mode="r", load_namespaces=True) as io:
+            identifiers.append(io.read().identifier)
+    assert identifiers[0] != identifiers[1]
+
+    update_analysis_cache(nwb_folder_path=output_dir_path, cache_dir_path=cache_dir_path)
+
+    with open(cache_dir_path / "_manifest.json", mode="r") as f:
+        assert list(json.load(f)) == [nwbfile_path.name]  # the companion file is not exported on its own
+    trials = pd.read_parquet(cache_dir_path / "trials")
+    with NWBHDF5IO(nwbfile_path, mode="r", load_namespaces=True) as io:
+        assert len(trials) == len(io.read().trials)
+    manifest_mtime = (cache_dir_path / "_manifest.json").stat().st_mtime_ns
+    partition_file_paths = sorted((cache_dir_path / "trials").rglob("*.parquet"))
+    partition_mtimes = [path.stat().st_mtime_ns for path in partition_file_paths]
+
+    update_analysis_cache(nwb_folder_path=output_dir_path, cache_dir_path=cache_dir_path)  # nothing changed
+
+    assert [path.stat().st_mtime_ns for path in partition_file_paths] == partition_mtimes
+    assert (cache_dir_path / "_manifest.json").stat().st_mtime_ns >= manifest_mtime
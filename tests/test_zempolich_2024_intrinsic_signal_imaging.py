@@ -0,0 +1,51 @@
+"""Tests of the shared intrinsic signal optical imaging files of the Zempolich 2024 conversion."""
+import os
+
+import numpy as np
+import pytest
+from pynwb import NWBHDF5IO
+from pynwb.base import Images
+from pynwb.image import RGBImage
+
+from schneider_lab_to_nwb.zempolich_2024 import zempolich_2024_intrinsic_signal_imaging_interface
+from schneider_lab_to_nwb.zempolich_2024.zempolich_2024_intrinsic_signal_imaging_interface import (
+    write_shared_images_file,
+)
+
+MODULE_METADATA = dict(name="intrinsic_signal_optical_imaging", description="Intrinsic signal optical imaging.")
+
+
+def get_images() -> Images:
+    image = RGBImage(name="overlaid_image", data=np.zeros((8, 8, 3), dtype="uint8"), description="Overlaid image.")
+    return Images(name="images", images=[image], description="Images.")
+
+
+def test_shared_images_file_open_elsewhere_is_reused(tmp_path, monkeypatch):
+    source_file_path = tmp_path / "overlaid_image.tiff"
+    source_file_path.write_bytes(b"image")
+    file_path = tmp_path / "shared" / "sub-m53_isoi-images.nwb"
+    write_shared_images_file(
+        file_path=file_path, images=get_images(), module_metadata=MODULE_METADATA, source_file_paths=(source_file_path,)
+    )
+    with NWBHDF5IO(file_path, mode="r") as io:
+        identifier = io.read().identifier
+
+    # A newer source image, while another conversion holds the file open, where Windows forbids replacing it
+    file_mtime = os.stat(file_path).st_mtime
+    os.utime(source_file_path, (file_mtime + 10.0, file_mtime + 10.0))
+
+    def replace_open_file(source, destination):
+        raise PermissionError(13, "The process cannot access the file because it is being used by another process")
+
+    monkeypatch.setattr(zempolich_2024_intrinsic_signal_imaging_interface.os, "replace", replace_open_file)
+    with pytest.warns(UserWarning, match="reused without being rewritten"):
+        write_shared_images_file(
+            file_path=file_path,
+            images=get_images(),
+            module_metadata=MODULE_METADATA,
+            source_file_paths=(source_file_path,),
+        )
+
+    assert sorted(os.listdir(file_path.parent)) == [file_path.name]
+    with NWBHDF5IO(file_path, mode="r") as io:
+        assert io.read().identifier == identifier
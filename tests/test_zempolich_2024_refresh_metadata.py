@@ -0,0 +1,45 @@
+"""Tests of the in-place refresh of the metadata of the Zempolich 2024 NWB files."""
+import pytest
+from pynwb import NWBHDF5IO
+
+from schneider_lab_to_nwb.tools import refresh_nwbfile_metadata
+from schneider_lab_to_nwb.zempolich_2024.zempolich_2024_convert_session import session_to_nwb
+from schneider_lab_to_nwb.zempolich_2024.zempolich_2024_refresh_metadata import get_metadata_updates
+from schneider_lab_to_nwb.zempolich_2024.zempolich_2024_synthetic_data import generate_synthetic_session
+
+
+@pytest.fixture
+def optogenetics_session(tmp_path) -> dict:
+    session_to_nwb_kwargs = generate_synthetic_session(data_dir_path=tmp_path / "data", duration=20.0, has_ephys=False)
+    session_to_nwb_kwargs.update(output_dir_path=tmp_path / "output", verbose=False)
+    session_to_nwb(**session_to_nwb_kwargs)
+    return session_to_nwb(**session_to_nwb_kwargs, metadata_only=True)
+
+
+def test_refresh_nwbfile_metadata(optogenetics_session):
+    nwbfile_path, metadata = optogenetics_session["nwbfile_path"], optogenetics_session["metadata"]
+    metadata["NWBFile"]["session_description"] = "Refreshed session description."
+    metadata["Optogenetics"]["OptogeneticStimulusSite"]["description"] = "Refreshed site description."
+    metadata["Optogenetics"]["OptogeneticSeries"]["description"] = "Refreshed series description."
+    metadata["Behavior"]["Module"]["description"] = "Refreshed module description."
+
+    changes = refresh_nwbfile_metadata(nwbfile_path=nwbfile_path, updates=get_metadata_updates(metadata=metadata))
+
+    assert len(changes) == 4
+    with NWBHDF5IO(nwbfile_path, mode="r", load_namespaces=True) as io:
+        nwbfile = io.read()
+        site_name = metadata["Optogenetics"]["OptogeneticStimulusSite"]["name"]
+        series_name = metadata["Optogenetics"]["OptogeneticSeries"]["name"]
+        assert nwbfile.session_description == "Refreshed session description."
+        assert nwbfile.ogen_sites[site_name].description == "Refreshed site description."
+        assert nwbfile.stimulus[series_name].description == "Refreshed series description."
+        assert nwbfile.processing[metadata["Behavior"]["Module"]["name"]].description == "Refreshed module description."
+
+
+def test_refresh_nwbfile_metadata_is_idempotent(optogenetics_session):
+    nwbfile_path, metadata = optogenetics_session["nwbfile_path"], optogenetics_session["metadata"]
+    updates = get_metadata_updates(metadata=metadata)
+
+    assert refresh_nwbfile_metadata(nwbfile_path=nwbfile_path, updates=updates) == []
+    with NWBHDF5IO(nwbfile_path, mode="r", load_namespaces=True) as io:
+        io.read()